@@ -27,6 +27,10 @@ from charmcraft.application.commands.lifecycle import (
     get_lifecycle_commands,
     PackCommand,
 )
+from charmcraft.application.commands.measurements import (
+    MeasureCompareCommand,
+    MeasureShowCommand,
+)
 from charmcraft.application.commands.remote import RemoteBuild
 from charmcraft.application.commands.store import (
     # auth
@@ -41,6 +45,7 @@ from charmcraft.application.commands.store import (
     ListNamesCommand,
     # pushing files and checking revisions
     UploadCommand,
+    WaitUploadCommand,
     ListRevisionsCommand,
     # release process, and show status
     ReleaseCommand,
@@ -85,6 +90,7 @@ def fill_command_groups(app: craft_application.Application) -> None:
         [
             # pushing files and checking revisions
             UploadCommand,
+            WaitUploadCommand,
             ListRevisionsCommand,
             # release process, and show status
             ReleaseCommand,
@@ -116,6 +122,8 @@ def fill_command_groups(app: craft_application.Application) -> None:
         [
             Analyse,
             Analyze,
+            MeasureCompareCommand,
+            MeasureShowCommand,
             TestCommand,
             Version,
         ],
@@ -129,6 +137,8 @@ __all__ = [
     "ExpandExtensionsCommand",
     "ExtensionsCommand",
     "InitCommand",
+    "MeasureCompareCommand",
+    "MeasureShowCommand",
     "get_lifecycle_commands",
     "PackCommand",
     "LoginCommand",
@@ -153,4 +163,5 @@ __all__ = [
     "SetResourceArchitecturesCommand",
     "TestCommand",
     "UploadResourceCommand",
+    "WaitUploadCommand",
 ]
@@ -19,18 +19,28 @@ import json
 import pathlib
 from collections.abc import Container
 
+import pydantic
+from craft_application import errors as craft_errors
 from craft_cli import emit
 from pydantic.json import pydantic_encoder
 
-from charmcraft import errors, linters
+from charmcraft import const, errors, linters, utils
 from charmcraft.application.commands import base
 from charmcraft.models import lint
+from charmcraft.models.charmcraft import AnalysisConfig
 
 OVERVIEW = """\
 Analyze a charm.
 
 Report the attributes and lint results directly in the terminal. Use
 `--force` to run even those configured to be ignored.
+
+Use `--timings` to also report how long each checker took to run (the
+durations are always included when using `--format`).
+
+If run in a project directory, the settings in the `analysis` section of
+its `charmcraft.yaml` (e.g. the payload budget thresholds) are used, as
+when packing.
 """
 
 
@@ -52,6 +62,11 @@ class Analyse(base.CharmcraftCommand):
             help=argparse.SUPPRESS,
         )
         parser.add_argument("--ignore", help="Linters to ignore (comma separated)")
+        parser.add_argument(
+            "--timings",
+            action="store_true",
+            help="Report how long each checker took to run",
+        )
         parser.add_argument("filepath", type=pathlib.Path, help="The charm to analyse")
 
     def run(self, parsed_args: argparse.Namespace) -> int:
@@ -65,26 +80,73 @@ class Analyse(base.CharmcraftCommand):
             )
 
         ignore = parsed_args.ignore.split(",") if parsed_args.ignore else []
+        config = self._get_analysis_config()
         if parsed_args.format:
-            return self._run_formatted(parsed_args.filepath, ignore=ignore)
-        return self._run_streaming(parsed_args.filepath, ignore=ignore)
+            return self._run_formatted(parsed_args.filepath, ignore=ignore, config=config)
+        return self._run_streaming(
+            parsed_args.filepath, ignore=ignore, config=config, timings=parsed_args.timings
+        )
+
+    @staticmethod
+    def _get_analysis_config() -> AnalysisConfig | None:
+        """Get the analysis configuration of the project in the current directory, if any.
+
+        The same thresholds and settings used when packing are used to analyse the
+        charm (but not the checkers to ignore, see the --force option).
+        """
+        charmcraft_yaml = utils.load_yaml(pathlib.Path(const.CHARMCRAFT_FILENAME))
+        if not isinstance(charmcraft_yaml, dict) or not charmcraft_yaml.get("analysis"):
+            return None
+        try:
+            return AnalysisConfig.unmarshal(charmcraft_yaml["analysis"])
+        except pydantic.ValidationError as err:
+            raise craft_errors.CraftValidationError.from_pydantic(
+                err, file_name=const.CHARMCRAFT_FILENAME
+            )
 
-    def _run_formatted(self, filepath: pathlib.Path, *, ignore=Container[str]) -> int:
+    def _run_formatted(
+        self,
+        filepath: pathlib.Path,
+        *,
+        ignore=Container[str],
+        config: AnalysisConfig | None = None,
+    ) -> int:
         """Run the command, formatting the output into JSON or similar at the end."""
-        results = list(self._services.analysis.lint_file(filepath))
-        emit.message(json.dumps(results, indent=4, default=pydantic_encoder))
+        results = list(self._services.analysis.lint_file(filepath, config=config))
+        output = []
+        for result in results:
+            result_dict = pydantic_encoder(result)
+            if result.data is None:
+                # only the checkers that provide structured data include it
+                del result_dict["data"]
+            if result.duration is None:
+                # ignored checkers are not run, so they have no duration
+                del result_dict["duration"]
+            output.append(result_dict)
+        emit.message(json.dumps(output, indent=4, default=pydantic_encoder))
         return max(r.level for r in results).return_code
 
-    def _run_streaming(self, filepath: pathlib.Path, *, ignore=Container[str]) -> int:
+    def _run_streaming(
+        self,
+        filepath: pathlib.Path,
+        *,
+        ignore=Container[str],
+        config: AnalysisConfig | None = None,
+        timings: bool = False,
+    ) -> int:
         """Run the command, printing linter results as we get them."""
         max_level = lint.ResultLevel.OK
         with emit.progress_bar(
             f"Linting {filepath.name}...", total=len(linters.CHECKERS)
         ) as progress:
             for result in self._services.analysis.lint_file(
-                filepath, ignore=ignore, include_ignored=False
+                filepath, ignore=ignore, include_ignored=False, config=config
             ):
-                emit.progress(str(result), permanent=True)
+                if timings:
+                    duration = "" if result.duration is None else f"{result.duration:.3f}s"
+                    emit.progress(f"{duration:>8} {result}", permanent=True)
+                else:
+                    emit.progress(str(result), permanent=True)
                 max_level = max(result.level, max_level)
                 progress.advance(1)
 
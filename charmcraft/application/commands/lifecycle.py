@@ -16,6 +16,7 @@
 """craft-application based lifecycle commands."""
 from __future__ import annotations
 
+import os
 import pathlib
 import sys
 import textwrap
@@ -26,7 +27,8 @@ from craft_application.commands import lifecycle
 from craft_cli import ArgumentParsingError, CraftError
 from typing_extensions import override
 
-from charmcraft import models, services, utils
+from charmcraft import env, instrum, measurements, models, services, utils
+from charmcraft.models import lint
 
 if TYPE_CHECKING:  # pragma: no cover
     import argparse
@@ -69,6 +71,9 @@ class PackCommand(lifecycle.PackCommand):
         """
     )
 
+    # whether to pack even after finding lint errors (set from the parsed arguments)
+    _force_packing = False
+
     @override
     def _fill_parser(self, parser: argparse.ArgumentParser) -> None:
         super()._fill_parser(parser)
@@ -90,6 +95,31 @@ class PackCommand(lifecycle.PackCommand):
             type=pathlib.Path,
             help="Dump measurements to the specified file",
         )
+        parser.add_argument(
+            "--measure-format",
+            choices=list(instrum.DUMP_FORMATS),
+            default="json",
+            help=(
+                "The format of the measurements file: Charmcraft's own JSON (default), "
+                "or a Trace Event file that can be loaded in Perfetto or chrome://tracing"
+            ),
+        )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help=(
+                "Profile the packing, dumping the profile of each measured phase "
+                "next to the measurements (requires --measure)"
+            ),
+        )
+        parser.add_argument(
+            "--measure-resources",
+            action="store_true",
+            help=(
+                "Record the resources used in every measurement, not only in the "
+                "coarse ones (requires --measure)"
+            ),
+        )
         include_charm_group = parser.add_mutually_exclusive_group()
         include_charm_group.add_argument(
             "--include-all-charms",
@@ -144,6 +174,12 @@ class PackCommand(lifecycle.PackCommand):
                     "--output-bundle can only be used when packing a bundle. "
                     f"Currently trying to pack: {package_service.project_dir}"
                 )
+        if parsed_args.profile and not parsed_args.measure:
+            raise ArgumentParsingError("--profile can only be used together with --measure.")
+        if parsed_args.measure_resources and not parsed_args.measure:
+            raise ArgumentParsingError(
+                "--measure-resources can only be used together with --measure."
+            )
 
     def _validate_bases_indices(self, bases_indices):
         """Validate that bases index is valid."""
@@ -182,4 +218,68 @@ class PackCommand(lifecycle.PackCommand):
         **kwargs: Any,  # noqa: ANN401 (allow dynamic typing)
     ) -> None:
         self._validate_args(parsed_args)
-        return super()._run(parsed_args, step_name, **kwargs)
+        if parsed_args.profile:
+            instrum.start_profiling()
+        if parsed_args.measure_resources:
+            instrum.record_all_resources()
+        self._force_packing = bool(parsed_args.force)
+        if not env.is_charmcraft_running_in_managed_mode():
+            # in managed mode the host already did it, before running all the instances
+            package_service = cast(services.PackageService, self._services.package)
+            package_service.clear_package_paths()
+        super()._run(parsed_args, step_name, **kwargs)
+        if parsed_args.measure:
+            self._dump_measurements(parsed_args)
+
+    def _dump_measurements(self, parsed_args: argparse.Namespace) -> None:
+        """Dump the measurements done while packing.
+
+        They are also recorded in the build history. In a managed instance they are
+        left in the project directory instead, for the host to merge them with its own
+        ones (and record them). The profiles of each phase, if profiling, go along
+        with the measurements.
+        """
+        package_service = cast(services.PackageService, self._services.package)
+        if env.is_charmcraft_running_in_managed_mode():
+            platform = os.getenv("CRAFT_PLATFORM", "unknown")
+            instrum.set_process(f"charmcraft ({platform} instance)")
+            instrum.dump(env.get_managed_measurements_path(package_service.project_dir, platform))
+        else:
+            instrum.DUMP_FORMATS[parsed_args.measure_format](parsed_args.measure)
+            project = cast(models.CharmcraftProject, self._services.project)
+            measurements.record_run(
+                project.name or package_service.project_dir.name, package_service.platform
+            )
+
+    @override
+    def _run_post_prime_steps(self) -> None:
+        super()._run_post_prime_steps()
+        self._report_lint_results()
+
+    def _report_lint_results(self) -> None:
+        """Show the linters that did not pass, stopping the packing on errors.
+
+        These are the same (memoized) results used to write the charm manifest, so the
+        prime directory is not linted again. Errors (or linters that crashed) stop the
+        packing, unless forced.
+        """
+        project = cast(models.CharmcraftProject, self._services.project)
+        if project.type != "charm":
+            return
+        package_service = cast(services.PackageService, self._services.package)
+        worst_level = lint.ResultLevel.OK
+        for result in package_service.get_lint_results():
+            if result.check_type != lint.CheckType.LINT:
+                continue
+            if result.level >= lint.ResultLevel.WARNING:
+                craft_cli.emit.progress(str(result), permanent=True)
+                worst_level = max(worst_level, result.level)
+
+        if worst_level >= lint.ResultLevel.ERROR:
+            if self._force_packing:
+                craft_cli.emit.progress("Packing anyway as requested.", permanent=True)
+            else:
+                raise CraftError(
+                    "Aborting due to lint errors (use --force to override).",
+                    retcode=worst_level.return_code,
+                )
@@ -0,0 +1,382 @@
+# Copyright 2024 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# For further info, check https://github.com/canonical/charmcraft
+
+"""Commands to inspect the measurements done when packing."""
+
+import argparse
+import pathlib
+import textwrap
+
+from craft_cli import CraftError, emit
+from tabulate import tabulate
+
+from charmcraft import measurements
+from charmcraft.application.commands import base
+from charmcraft.utils import cli
+
+
+def _format_seconds(value: float | None) -> str:
+    """Format a duration in seconds, if any."""
+    return "-" if value is None else f"{value:.2f}s"
+
+
+def _format_change(value: float | None) -> str:
+    """Format a relative change, if any."""
+    return "-" if value is None else f"{value:+.0%}"
+
+
+def _crop(text: str, width: int) -> str:
+    """Crop a text to the given width, marking it if cropped."""
+    return text if len(text) <= width else text[: width - 1] + "…"
+
+
+# the width of the names column in the timeline chart
+_NAME_WIDTH = 50
+
+
+def _render_timeline(nodes: list[measurements.Node], width: int) -> str:
+    """Render the measurements as a text icicle chart.
+
+    Each measurement is a row, indented under its parent, with a bar placed and
+    sized in the timeline of the whole run.
+    """
+    start = min(node.start for node in nodes)
+    span = max(node.end for node in nodes) - start or 1
+    lines = [f"Timeline of {span:.2f}s, each column is {span / width:.3f}s:"]
+    for node in nodes:
+        name = _crop("  " * node.depth + node.name, _NAME_WIDTH)
+        first = min(int((node.start - start) / span * width), width - 1)
+        last = max(round((node.end - start) / span * width), first + 1)
+        bar = " " * first + "█" * (last - first) + " " * (width - last)
+        duration = _format_seconds(node.duration) + ("+" if node.ongoing else " ")
+        lines.append(f"{name:<{_NAME_WIDTH}} {duration:>9} |{bar}|")
+    return "\n".join(lines)
+
+
+class MeasureCompareCommand(base.CharmcraftCommand):
+    """Compare the measurements of packing runs stored in the build history."""
+
+    name = "measure-compare"
+    help_msg = "Compare the measurements of packing runs"
+    overview = textwrap.dedent(
+        """
+        Compare the duration of each phase between two runs of `pack --measure`,
+        flagging the phases that got significantly slower.
+
+        Every run packed with `--measure` is stored in a local build history,
+        keyed by project, platform and Charmcraft version. Use `--list` to see
+        the stored runs and their ids.
+
+        With two run ids, the second run is compared against the first one. With
+        only one, the run is compared against the median of the previous runs of
+        the same project and platform (see `--window`). Without any, the latest
+        run is the one compared against the median of the previous ones.
+
+        A phase is flagged as slower when it took longer by at least the
+        `--threshold` percentage and by at least `--min-delta` seconds.
+        """
+    )
+    format_option = True
+
+    def fill_parser(self, parser: argparse.ArgumentParser) -> None:
+        """Add own parameters to the general parser."""
+        super().fill_parser(parser)
+        parser.add_argument(
+            "runs",
+            type=int,
+            nargs="*",
+            metavar="RUN",
+            help="The ids of the base and target runs, or only the target one",
+        )
+        parser.add_argument(
+            "--list", action="store_true", help="List the latest runs in the build history"
+        )
+        parser.add_argument("--project", help="Only consider the runs of this project")
+        parser.add_argument("--platform", help="Only consider the runs for this platform")
+        parser.add_argument(
+            "--window",
+            type=int,
+            default=5,
+            help="How many previous runs to take the median from (default: 5)",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=10,
+            help="Minimum slowdown, in percentage, to flag a phase (default: 10)",
+        )
+        parser.add_argument(
+            "--min-delta",
+            type=float,
+            default=0.5,
+            help="Minimum slowdown, in seconds, to flag a phase (default: 0.5)",
+        )
+
+    def run(self, parsed_args: argparse.Namespace) -> int:
+        """Run the command."""
+        if len(parsed_args.runs) > 2:
+            raise CraftError("Indicate at most two runs to compare.")
+
+        with measurements.BuildHistory(measurements.get_history_path()) as history:
+            if parsed_args.list:
+                self._list_runs(history, parsed_args)
+                return 0
+
+            if len(parsed_args.runs) == 2:
+                base_run = history.get_run(parsed_args.runs[0])
+                target = history.get_run(parsed_args.runs[1])
+                base_phases = base_run.phases
+                base_description = f"run {base_run.id}"
+            else:
+                if parsed_args.runs:
+                    target = history.get_run(parsed_args.runs[0])
+                else:
+                    latest = history.list_runs(
+                        project=parsed_args.project, platform=parsed_args.platform, limit=1
+                    )
+                    if not latest:
+                        raise CraftError(
+                            "No runs found in the build history.",
+                            resolution="Pack with '--measure' to record runs.",
+                        )
+                    target = latest[0]
+                previous = history.get_previous_runs(target, parsed_args.window)
+                if not previous:
+                    raise CraftError(
+                        f"No previous runs of {target.project!r} for {target.platform!r} "
+                        f"to compare run {target.id} with."
+                    )
+                base_phases = measurements.get_median_phases(previous)
+                base_description = f"median of {len(previous)} previous runs"
+
+        comparisons = measurements.compare_phases(
+            base_phases,
+            target.phases,
+            threshold=parsed_args.threshold / 100,
+            min_delta=parsed_args.min_delta,
+        )
+        self._show_comparison(comparisons, target, base_description, parsed_args.format)
+        return 0
+
+    def _list_runs(
+        self, history: measurements.BuildHistory, parsed_args: argparse.Namespace
+    ) -> None:
+        """Show the latest runs in the history."""
+        runs = history.list_runs(project=parsed_args.project, platform=parsed_args.platform)
+        if parsed_args.format:
+            info = [
+                {
+                    "id": run.id,
+                    "project": run.project,
+                    "platform": run.platform,
+                    "charmcraft_version": run.charmcraft_version,
+                    "started_at": run.started_at,
+                    "total": run.phases.get(measurements.TOTAL_PHASE),
+                }
+                for run in runs
+            ]
+            emit.message(cli.format_content(info, parsed_args.format))
+            return
+
+        if not runs:
+            emit.message("No runs found in the build history.")
+            return
+        headers = ["Run", "Started at", "Project", "Platform", "Charmcraft", "Total"]
+        data = [
+            [
+                run.id,
+                run.started_at,
+                run.project,
+                run.platform,
+                run.charmcraft_version,
+                _format_seconds(run.phases.get(measurements.TOTAL_PHASE)),
+            ]
+            for run in runs
+        ]
+        emit.message(tabulate(data, headers=headers, tablefmt="plain", disable_numparse=True))
+
+    def _show_comparison(
+        self,
+        comparisons: list[measurements.PhaseComparison],
+        target: measurements.Run,
+        base_description: str,
+        fmt: str | None,
+    ) -> None:
+        """Show the phases comparison."""
+        if fmt:
+            info = {
+                "target": target.id,
+                "base": base_description,
+                "phases": [
+                    {
+                        "name": comparison.name,
+                        "base": comparison.base,
+                        "target": comparison.target,
+                        "delta": comparison.delta,
+                        "slower": comparison.slower,
+                    }
+                    for comparison in comparisons
+                ],
+            }
+            emit.message(cli.format_content(info, fmt))
+            return
+
+        emit.message(
+            f"Comparing run {target.id} of {target.project!r} for {target.platform!r} "
+            f"(Charmcraft {target.charmcraft_version}) against the {base_description}:"
+        )
+        headers = ["Phase", "Base", "Target", "Delta", "Change", ""]
+        data = [
+            [
+                comparison.name,
+                _format_seconds(comparison.base),
+                _format_seconds(comparison.target),
+                _format_seconds(comparison.delta),
+                _format_change(comparison.change),
+                "SLOWER" if comparison.slower else "",
+            ]
+            for comparison in comparisons
+        ]
+        emit.message(tabulate(data, headers=headers, tablefmt="plain", disable_numparse=True))
+        slower = sum(comparison.slower for comparison in comparisons)
+        if slower:
+            emit.message(f"{slower} phase(s) got significantly slower.")
+
+
+class MeasureShowCommand(base.CharmcraftCommand):
+    """Show the measurements of a packing run in the terminal."""
+
+    name = "measure-show"
+    help_msg = "Show the measurements of a packing run"
+    overview = textwrap.dedent(
+        """
+        Show the measurements dumped by `pack --measure` (in the JSON format),
+        without needing any graphical environment.
+
+        The nested measurements are shown as a text icicle chart, where each
+        measurement is a bar placed in the timeline of the whole run, followed
+        by the critical path of the run (the chain of measurements that determined
+        its duration) and the phases where most time was spent outside any
+        nested measurement (self time).
+
+        Use `--svg` to also write the chart as a static SVG file, e.g. to keep it
+        as an artifact of a CI run.
+        """
+    )
+    format_option = True
+
+    def fill_parser(self, parser: argparse.ArgumentParser) -> None:
+        """Add own parameters to the general parser."""
+        super().fill_parser(parser)
+        parser.add_argument(
+            "filepath", type=pathlib.Path, help="The file with the measurements to show"
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=10,
+            help="How many phases to show in the self time table (default: 10)",
+        )
+        parser.add_argument(
+            "--max-depth",
+            type=int,
+            help="Do not show in the chart the measurements nested deeper than this",
+        )
+        parser.add_argument(
+            "--min-duration",
+            type=float,
+            default=0,
+            help="Do not show in the chart the measurements shorter than this, in seconds",
+        )
+        parser.add_argument(
+            "--width",
+            type=int,
+            default=60,
+            help="The width of the timeline in the chart, in columns (default: 60)",
+        )
+        parser.add_argument("--svg", type=pathlib.Path, help="Also write the chart to an SVG file")
+
+    def run(self, parsed_args: argparse.Namespace) -> int:
+        """Run the command."""
+        roots = measurements.load_tree(parsed_args.filepath)
+        if not roots:
+            raise CraftError(f"No measurements found in {str(parsed_args.filepath)!r}.")
+        critical_path = measurements.get_critical_path(roots)
+        self_times = measurements.get_self_times(roots)[: parsed_args.top]
+
+        if parsed_args.svg:
+            parsed_args.svg.write_text(measurements.render_svg(roots))
+
+        if parsed_args.format:
+            info = {
+                "critical_path": [
+                    {"name": node.name, "start": node.start, "duration": node.duration}
+                    for node in critical_path
+                ],
+                "self_times": [
+                    {
+                        "name": item.name,
+                        "count": item.count,
+                        "self_time": item.self_time,
+                        "total_time": item.total_time,
+                    }
+                    for item in self_times
+                ],
+            }
+            emit.message(cli.format_content(info, parsed_args.format))
+            return 0
+
+        nodes = [
+            node
+            for root in roots
+            for node in root.walk()
+            if (parsed_args.max_depth is None or node.depth <= parsed_args.max_depth)
+            and node.duration >= parsed_args.min_duration
+        ]
+        if nodes:
+            emit.message(_render_timeline(nodes, parsed_args.width))
+
+        start = min(root.start for root in roots)
+        headers = ["Phase", "Start", "Duration", "Self"]
+        data = [
+            [
+                # (tabulate strips leading spaces)
+                _crop("· " * node.depth + node.name, _NAME_WIDTH),
+                _format_seconds(node.start - start),
+                _format_seconds(node.duration),
+                _format_seconds(node.self_time),
+            ]
+            for node in critical_path
+        ]
+        emit.message("Critical path:")
+        emit.message(tabulate(data, headers=headers, tablefmt="plain", disable_numparse=True))
+
+        headers = ["Phase", "Count", "Self", "Total"]
+        data = [
+            [
+                _crop(item.name, _NAME_WIDTH),
+                item.count,
+                _format_seconds(item.self_time),
+                _format_seconds(item.total_time),
+            ]
+            for item in self_times
+        ]
+        emit.message("Top self time:")
+        emit.message(tabulate(data, headers=headers, tablefmt="plain", disable_numparse=True))
+
+        if parsed_args.svg:
+            emit.message(f"Chart written to {str(parsed_args.svg)!r}")
+        return 0
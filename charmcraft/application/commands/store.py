@@ -17,6 +17,7 @@
 """Commands related to Charmhub."""
 import argparse
 import collections
+import concurrent.futures
 import dataclasses
 import datetime
 import os
@@ -28,9 +29,9 @@ import tempfile
 import textwrap
 import typing
 import zipfile
-from collections.abc import Collection
+from collections.abc import Callable, Collection, Hashable, Iterable
 from operator import attrgetter
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, TypeVar
 
 import yaml
 from craft_application import util
@@ -44,16 +45,19 @@ from humanize import naturalsize
 from tabulate import tabulate
 
 import charmcraft.store.models
-from charmcraft import const, env, errors, parts, utils
+from charmcraft import const, env, errors, instrum, parts, utils
 from charmcraft.application.commands.base import CharmcraftCommand
 from charmcraft.models import project
-from charmcraft.store import Store
-from charmcraft.store.models import Entity
+from charmcraft.store import LibraryCache, Store
+from charmcraft.store.models import Entity, Uploaded
 from charmcraft.utils import cli
 
 if TYPE_CHECKING:
     from argparse import ArgumentParser, Namespace
 
+_T = TypeVar("_T")
+_K = TypeVar("_K", bound=Hashable)
+
 
 # some types
 class _EntityType(typing.NamedTuple):
@@ -72,6 +76,43 @@ ResourceType = _ResourceType()
 VALID_ATTENUATIONS = {getattr(attenuations, x) for x in dir(attenuations) if x.isupper()}
 BUNDLE_REGISTRATION_REMOVAL_URL = "https://discourse.charmhub.io/t/15344"
 
+# how many requests are done at the same time to the Store, when several are needed
+_STORE_WORKERS = 8
+
+
+def _run_concurrently(
+    func: Callable[[_K], _T], items: Iterable[_K]
+) -> tuple[dict[_K, _T], dict[_K, Exception]]:
+    """Call a function for each item in a bounded pool of threads.
+
+    Return the result or the error of each call, by item, in the order of the items.
+    """
+    func = instrum.propagate(func)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=_STORE_WORKERS) as executor:
+        futures = {item: executor.submit(func, item) for item in items}
+    results = {}
+    errors = {}
+    for item, future in futures.items():
+        try:
+            results[item] = future.result()
+        except Exception as exc:
+            errors[item] = exc
+    return results, errors
+
+
+def _format_errors(errors: dict[Any, Exception]) -> str:
+    """Format the error of each item, one per line."""
+    return "\n".join(f"- {item}: {error}" for item, error in errors.items())
+
+
+def _add_no_cache_option(parser: argparse.ArgumentParser) -> None:
+    """Add the option to not use the responses from the Store cached in previous runs."""
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Get all the information from Charmhub, not using what was recently cached",
+    )
+
 
 class LoginCommand(CharmcraftCommand):
     """Login to Charmhub."""
@@ -469,10 +510,11 @@ class ListNamesCommand(CharmcraftCommand):
             action="store_true",
             help="Include the names you are a collaborator of",
         )
+        _add_no_cache_option(parser)
 
     def run(self, parsed_args):
         """Run the command."""
-        store = Store(env.get_store_config())
+        store = Store(env.get_store_config(), use_cache=not parsed_args.no_cache)
         with_collab = parsed_args.include_collaborations
         result = store.list_registered_names(include_collaborations=with_collab)
 
@@ -544,10 +586,10 @@ def get_name_from_zip(filepath):
 
 
 class UploadCommand(CharmcraftCommand):
-    """Upload a charm or bundle to Charmhub."""
+    """Upload charms or bundles to Charmhub."""
 
     name = "upload"
-    help_msg = "Upload a charm or bundle to Charmhub"
+    help_msg = "Upload charms or bundles to Charmhub"
     overview = textwrap.dedent(
         """
         Upload a charm or bundle to Charmhub.
@@ -560,6 +602,13 @@ class UploadCommand(CharmcraftCommand):
         will report details of the failure, otherwise it will give you the
         new charm or bundle revision.
 
+        Several files can be indicated (e.g. the charms packed for different
+        platforms), which are uploaded and verified concurrently; a table with
+        the new revision of each one is shown at the end. If no file is
+        indicated, the packages listed by the last `pack` in the current
+        directory are uploaded. When releasing, the new revisions are only
+        released if all the uploads succeeded.
+
         Upload will take you through login if needed.
     """
     )
@@ -571,7 +620,14 @@ class UploadCommand(CharmcraftCommand):
         super().fill_parser(parser)
 
         parser.add_argument(
-            "filepath", type=utils.useful_filepath, help="The charm or bundle to upload"
+            "filepaths",
+            metavar="filepath",
+            nargs="*",
+            type=utils.useful_filepath,
+            help=(
+                "The charm(s) or bundle(s) to upload (by default, the packages left by "
+                "the last pack in the current directory)"
+            ),
         )
         parser.add_argument(
             "--release",
@@ -581,7 +637,7 @@ class UploadCommand(CharmcraftCommand):
         parser.add_argument(
             "--name",
             type=str,
-            help="Name of the charm or bundle on Charmhub to upload to",
+            help="Name of the charm or bundle on Charmhub to upload to (only for a single file)",
         )
         parser.add_argument(
             "--resource",
@@ -596,43 +652,222 @@ class UploadCommand(CharmcraftCommand):
 
     def run(self, parsed_args):
         """Run the command."""
-        if parsed_args.name:
-            name = parsed_args.name
-        else:
-            name = get_name_from_zip(parsed_args.filepath)
+        filepaths = parsed_args.filepaths or _get_packed_filepaths()
+        if len(filepaths) > 1:
+            if parsed_args.name:
+                raise ArgumentParsingError(
+                    "The --name option can only be used with a single file."
+                )
+            return self._upload_several(filepaths, parsed_args)
+
+        (filepath,) = filepaths
+        name = parsed_args.name or get_name_from_zip(filepath)
         store = Store(env.get_store_config())
-        result = store.upload(name, parsed_args.filepath)
+        result = store.upload(name, filepath)
+        return _report_upload(store, name, result, parsed_args)
 
-        if not result.ok:
-            if parsed_args.format:
-                errors = [{"code": err.code, "message": err.message} for err in result.errors]
-                info = {"errors": errors}
-                emit.message(cli.format_content(info, parsed_args.format))
-            else:
-                emit.message(f"Upload failed with status {result.status!r}:")
-                for error in result.errors:
-                    emit.message(f"- {error.code}: {error.message}")
-            return 1
+    def _upload_several(self, filepaths: list[pathlib.Path], parsed_args) -> int:
+        """Upload several files concurrently, then release them all if requested."""
+        names = {filepath: get_name_from_zip(filepath) for filepath in filepaths}
+        store = Store(env.get_store_config())
 
-        if parsed_args.release:
-            # also release!
-            store.release(name, result.revision, parsed_args.release, parsed_args.resource)
+        def upload(filepath: pathlib.Path) -> Uploaded:
+            # a progress bar per file would be mixed with the others, so a line when done
+            result = store.upload(names[filepath], filepath, show_progress=False)
+            emit.progress(
+                f"Uploaded {filepath.name!r}: revision {result.revision} ({result.status})",
+                permanent=True,
+            )
+            return result
+
+        # log in (if needed) once, not from every upload
+        with store.logged_in_once():
+            results, errors = _run_concurrently(upload, filepaths)
+        if errors:
+            message = f"Could not upload {len(errors)} of {len(filepaths)} files:\n"
+            uploaded = ", ".join(
+                f"{str(filepath)!r} (revision {result.revision})"
+                for filepath, result in results.items()
+                if result.ok
+            )
+            raise CraftError(
+                message + _format_errors(errors),
+                details=f"Uploaded files: {uploaded}" if uploaded else None,
+            )
+
+        all_ok = all(result.ok for result in results.values())
+        released = bool(parsed_args.release) and all_ok
+        if released:
+            # also release, all of them together!
+            with store.logged_in_once():
+                _, errors = _run_concurrently(
+                    lambda filepath: store.release(
+                        names[filepath],
+                        results[filepath].revision,
+                        parsed_args.release,
+                        parsed_args.resource,
+                    ),
+                    filepaths,
+                )
+            if errors:
+                raise CraftError(
+                    f"Could not release {len(errors)} of {len(filepaths)} revisions to "
+                    f"{', '.join(parsed_args.release)}:\n" + _format_errors(errors)
+                )
 
         if parsed_args.format:
-            info = {"revision": result.revision}
+            info = [
+                {
+                    "filepath": str(filepath),
+                    "name": names[filepath],
+                    "status": result.status,
+                    "revision": result.revision,
+                    "reused": result.reused,
+                    "errors": [
+                        {"code": err.code, "message": err.message} for err in result.errors
+                    ],
+                }
+                for filepath, result in results.items()
+            ]
             emit.message(cli.format_content(info, parsed_args.format))
         else:
-            emit.message(f"Revision {result.revision} of {str(name)!r} created")
-            if parsed_args.release:
-                msg = "Revision released to {}"
-                args = [", ".join(parsed_args.release)]
+            headers = ["File", "Name", "Revision", "Status"]
+            data = [
+                [
+                    filepath.name,
+                    names[filepath],
+                    "-" if result.revision is None else result.revision,
+                    f"{result.status} (reused)" if result.reused else result.status,
+                ]
+                for filepath, result in results.items()
+            ]
+            emit.message(tabulate(data, headers=headers, tablefmt="plain", disable_numparse=True))
+            for filepath, result in results.items():
+                if not result.ok:
+                    emit.message(
+                        f"Upload of {filepath.name!r} failed with status {result.status!r}:"
+                    )
+                    for error in result.errors:
+                        emit.message(f"- {error.code}: {error.message}")
+            if released:
+                msg = f"Revisions released to {', '.join(parsed_args.release)}"
                 if parsed_args.resource:
-                    msg += " (attaching resources: {})"
-                    args.append(
-                        ", ".join(f"{r.name!r} r{r.revision}" for r in parsed_args.resource)
+                    resources = ", ".join(
+                        f"{r.name!r} r{r.revision}" for r in parsed_args.resource
                     )
-                emit.message(msg.format(*args))
-        return 0
+                    msg += f" (attaching resources: {resources})"
+                emit.message(msg)
+            elif parsed_args.release:
+                emit.message("No revisions were released, as not all the uploads succeeded.")
+        return 0 if all_ok else 1
+
+
+def _get_packed_filepaths() -> list[pathlib.Path]:
+    """Get the paths of the packages left by the last pack in the current directory."""
+    packages_path = pathlib.Path(const.OUTPUT_PACKAGES_FILENAME)
+    if not packages_path.exists():
+        raise ArgumentParsingError(
+            "Indicate the file(s) to upload, as no packed files were found "
+            "in the current directory."
+        )
+    filenames = dict.fromkeys(packages_path.read_text().splitlines())
+    return [utils.useful_filepath(filename) for filename in filenames if filename]
+
+
+def _report_upload(store, name, result, parsed_args) -> int:
+    """Show the result of an upload, releasing the new revision if requested."""
+    if not result.ok:
+        if parsed_args.format:
+            errors = [{"code": err.code, "message": err.message} for err in result.errors]
+            info = {"errors": errors}
+            emit.message(cli.format_content(info, parsed_args.format))
+        else:
+            emit.message(f"Upload failed with status {result.status!r}:")
+            for error in result.errors:
+                emit.message(f"- {error.code}: {error.message}")
+        return 1
+
+    if parsed_args.release:
+        # also release!
+        store.release(name, result.revision, parsed_args.release, parsed_args.resource)
+
+    if parsed_args.format:
+        info = {"revision": result.revision, "reused": result.reused}
+        emit.message(cli.format_content(info, parsed_args.format))
+    else:
+        if result.reused:
+            emit.message(
+                f"Revision {result.revision} of {str(name)!r} has the same content, "
+                "not uploaded again"
+            )
+        else:
+            emit.message(f"Revision {result.revision} of {str(name)!r} created")
+        if parsed_args.release:
+            msg = "Revision released to {}"
+            args = [", ".join(parsed_args.release)]
+            if parsed_args.resource:
+                msg += " (attaching resources: {})"
+                args.append(", ".join(f"{r.name!r} r{r.revision}" for r in parsed_args.resource))
+            emit.message(msg.format(*args))
+    return 0
+
+
+class WaitUploadCommand(CharmcraftCommand):
+    """Wait for the review of a previous upload to end."""
+
+    name = "wait-upload"
+    help_msg = "Wait for the review of a previous upload to Charmhub"
+    overview = textwrap.dedent(
+        """
+        Wait for Charmhub to end the review of a previous upload, without
+        uploading the file again.
+
+        Use it when `upload` timed out while waiting for the review (the
+        upload id is shown in the error). The result is reported as `upload`
+        does, and the new revision can be released in the same way.
+
+        By default it waits up to 600 seconds, or what is set in the
+        CHARMCRAFT_UPLOAD_TIMEOUT environment variable; use `--timeout`
+        to change it.
+    """
+    )
+    format_option = True
+
+    def fill_parser(self, parser):
+        """Add own parameters to the general parser."""
+        super().fill_parser(parser)
+        parser.add_argument("name", help="The name of the charm or bundle uploaded to")
+        parser.add_argument("upload_id", metavar="upload-id", help="The id of the upload")
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            help="How many seconds to wait for the review to end",
+        )
+        parser.add_argument(
+            "--release",
+            action="append",
+            help="The channel(s) to release to (this option can be indicated multiple times)",
+        )
+        parser.add_argument(
+            "--resource",
+            action="append",
+            type=utils.ResourceOption(),
+            default=[],
+            help=(
+                "The resource(s) to attach to the release, in the <name>:<revision> format "
+                "(this option can be indicated multiple times)"
+            ),
+        )
+
+    def run(self, parsed_args):
+        """Run the command."""
+        if parsed_args.timeout is not None and parsed_args.timeout <= 0:
+            raise CraftError("The timeout must be a positive number of seconds.")
+        store = Store(env.get_store_config())
+        result = store.wait_for_upload(
+            parsed_args.name, parsed_args.upload_id, timeout=parsed_args.timeout
+        )
+        return _report_upload(store, parsed_args.name, result, parsed_args)
 
 
 class ListRevisionsCommand(CharmcraftCommand):
@@ -660,10 +895,11 @@ class ListRevisionsCommand(CharmcraftCommand):
         """Add own parameters to the general parser."""
         super().fill_parser(parser)
         parser.add_argument("name", help="The name of the charm or bundle")
+        _add_no_cache_option(parser)
 
     def run(self, parsed_args):
         """Run the command."""
-        store = Store(env.get_store_config())
+        store = Store(env.get_store_config(), use_cache=not parsed_args.no_cache)
         result = store.list_revisions(parsed_args.name)
 
         # build the structure that we need for both human and programmatic output
@@ -814,6 +1050,11 @@ class PromoteBundleCommand(CharmcraftCommand):
 
         This command must be run from the bundle project directory to be
         promoted.
+
+        The charms in the bundle are looked up and released concurrently; if
+        any of them fails, all the errors are reported together and the bundle
+        itself is not released. Use `--dry-run` to only show the planned
+        releases, without changing anything in the Store.
         """
     )
     always_load_project = True
@@ -843,6 +1084,11 @@ class PromoteBundleCommand(CharmcraftCommand):
             default=[],
             help="Any charms to exclude from the promotion process",
         )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only show the releases that would be done, without doing them",
+        )
 
     def run(self, parsed_args: "Namespace") -> None:
         """Run the command."""
@@ -963,11 +1209,20 @@ class PromoteBundleCommand(CharmcraftCommand):
             raise CraftError("Cannot find a bundle released to the given source channel.")
 
         # Get source channel charms
+        emit.progress(f"Getting the releases of {len(charms)} charms")
+        # log in (if needed) once, not from every thread
+        with store.logged_in_once():
+            charm_releases, lookup_errors = _run_concurrently(store.list_releases, charms)
+        if lookup_errors:
+            raise CraftError(
+                f"Could not get the releases of {len(lookup_errors)} charms:\n"
+                + _format_errors(lookup_errors)
+            )
         charm_revisions: dict[str, int] = {}
         charm_resources: dict[str, list[str]] = collections.defaultdict(list)
         error_charms = []
         for charm_name in charms:
-            channel_map, *_ = store.list_releases(charm_name)
+            channel_map, *_ = charm_releases[charm_name]
             for release in channel_map:
                 if release.channel == from_channel.name:
                     charm_revisions[charm_name] = release.revision
@@ -987,12 +1242,31 @@ class PromoteBundleCommand(CharmcraftCommand):
             with parsed_args.output_bundle.open("w+") as bundle_file:
                 yaml.dump(bundle_config, bundle_file)
 
-        for charm_name, charm_revision in charm_revisions.items():
-            store.release(
-                charm_name,
-                charm_revision,
-                channels=[to_channel.name],
-                resources=charm_resources[charm_name],
+        if parsed_args.dry_run:
+            self._show_planned_releases(
+                charm_revisions, charm_resources, bundle_name, bundle_revision, to_channel.name
+            )
+            return
+
+        emit.progress(f"Releasing {len(charm_revisions)} charms to {to_channel.name}")
+        with store.logged_in_once():
+            _, release_errors = _run_concurrently(
+                lambda charm_name: store.release(
+                    charm_name,
+                    charm_revisions[charm_name],
+                    channels=[to_channel.name],
+                    resources=charm_resources[charm_name],
+                ),
+                charm_revisions,
+            )
+        if release_errors:
+            released = [name for name in charm_revisions if name not in release_errors]
+            raise CraftError(
+                f"Could not release {len(release_errors)} of {len(charm_revisions)} charms "
+                f"to {to_channel.name}, so the bundle was not released:\n"
+                + _format_errors(release_errors),
+                details="Released charms: " + (", ".join(released) or "none"),
+                resolution="Fix the errors and run the command again.",
             )
 
         # Export a temporary bundle file with the charms in the target channel
@@ -1034,6 +1308,32 @@ class PromoteBundleCommand(CharmcraftCommand):
             f"released it to the {release_info['channel']!r} channel"
         )
 
+    @staticmethod
+    def _show_planned_releases(
+        charm_revisions: dict[str, int],
+        charm_resources: dict[str, list],
+        bundle_name: str,
+        bundle_revision: int,
+        to_channel: str,
+    ) -> None:
+        """Show the releases that would be done to promote the bundle."""
+        emit.message(f"Would release these charms to {to_channel}:")
+        data = [
+            [
+                charm_name,
+                revision,
+                ", ".join(f"{res.name} (r{res.revision})" for res in charm_resources[charm_name])
+                or "-",
+            ]
+            for charm_name, revision in charm_revisions.items()
+        ]
+        headers = ["Charm", "Revision", "Resources"]
+        emit.message(tabulate(data, headers=headers, tablefmt="plain", numalign="left"))
+        emit.message(
+            f"Then the bundle {bundle_name} (revision {bundle_revision} in the source channel) "
+            f"would be packed, uploaded and released to {to_channel}."
+        )
+
 
 class CloseCommand(CharmcraftCommand):
     """Close a channel for a charm or bundle."""
@@ -1104,6 +1404,7 @@ class StatusCommand(CharmcraftCommand):
         """Add own parameters to the general parser."""
         super().fill_parser(parser)
         parser.add_argument("name", help="The name of the charm or bundle")
+        _add_no_cache_option(parser)
 
     def _build_resources_repr(self, resources):
         """Build a representation of a list of resources."""
@@ -1119,7 +1420,7 @@ class StatusCommand(CharmcraftCommand):
 
     def run(self, parsed_args):
         """Run the command."""
-        store = Store(env.get_store_config())
+        store = Store(env.get_store_config(), use_cache=not parsed_args.no_cache)
         channel_map, channels, revisions = store.list_releases(parsed_args.name)
         if not channel_map:
             if parsed_args.format:
@@ -1602,41 +1903,49 @@ class FetchLibCommand(CharmcraftCommand):
                     )
             analysis.append((lib_data, error_message))
 
-        full_lib_data = []
-        for lib_data, error_message in analysis:
-            if error_message is None:
-                downloaded = store.get_library(lib_data.charm_name, lib_data.lib_id, lib_data.api)
-                if lib_data.content is None:
-                    # locally new
-                    lib_data.path.parent.mkdir(parents=True, exist_ok=True)
-                    lib_data.path.write_text(downloaded.content)
-                    message = (
-                        f"Library {lib_data.full_name} version "
-                        f"{downloaded.api:d}.{downloaded.patch:d} downloaded."
+        # download the libraries to update concurrently, but process them in order
+        to_fetch = [lib_data for lib_data, error_message in analysis if error_message is None]
+        get_library = instrum.propagate(store.get_library)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=_STORE_WORKERS) as executor:
+            downloads = executor.map(
+                lambda lib_data: get_library(lib_data.charm_name, lib_data.lib_id, lib_data.api),
+                to_fetch,
+            )
+            full_lib_data = []
+            for lib_data, error_message in analysis:
+                if error_message is None:
+                    downloaded = next(downloads)
+                    if lib_data.content is None:
+                        # locally new
+                        lib_data.path.parent.mkdir(parents=True, exist_ok=True)
+                        utils.write_text_atomically(lib_data.path, downloaded.content)
+                        message = (
+                            f"Library {lib_data.full_name} version "
+                            f"{downloaded.api:d}.{downloaded.patch:d} downloaded."
+                        )
+                    else:
+                        # XXX Facundo 2020-12-17: manage the case where the library was renamed
+                        # (related GH issue: #214)
+                        utils.write_text_atomically(lib_data.path, downloaded.content)
+                        message = (
+                            f"Library {lib_data.full_name} updated to version "
+                            f"{downloaded.api:d}.{downloaded.patch:d}."
+                        )
+
+                    # fix lib_data with new info so it's later available
+                    # for the case of programmatic output
+                    lib_data = dataclasses.replace(
+                        lib_data,
+                        patch=downloaded.patch,
+                        content=downloaded.content,
+                        content_hash=downloaded.content_hash,
                     )
                 else:
-                    # XXX Facundo 2020-12-17: manage the case where the library was renamed
-                    # (related GH issue: #214)
-                    lib_data.path.write_text(downloaded.content)
-                    message = (
-                        f"Library {lib_data.full_name} updated to version "
-                        f"{downloaded.api:d}.{downloaded.patch:d}."
-                    )
+                    message = error_message
+                full_lib_data.append((lib_data, error_message))
 
-                # fix lib_data with new info so it's later available
-                # for the case of programmatic output
-                lib_data = dataclasses.replace(
-                    lib_data,
-                    patch=downloaded.patch,
-                    content=downloaded.content,
-                    content_hash=downloaded.content_hash,
-                )
-            else:
-                message = error_message
-            full_lib_data.append((lib_data, error_message))
-
-            if not parsed_args.format:
-                emit.message(message)
+                if not parsed_args.format:
+                    emit.message(message)
 
         if parsed_args.format:
             output_data = []
@@ -1681,11 +1990,25 @@ class FetchLibs(CharmcraftCommand):
             # Always fetch precisely version 0.57.
             - lib: mysql.client
               version: "0.57"
+
+        The downloaded libraries are kept in a local cache shared by all the
+        projects, and reused instead of downloading them again. With `--offline`,
+        Charmhub is not contacted at all: the latest cached version matching each
+        library is used, failing if any library is not in the cache.
         """
     )
     format_option = True
     always_load_project = True
 
+    def fill_parser(self, parser: "ArgumentParser") -> None:
+        """Add own parameters to the general parser."""
+        super().fill_parser(parser)
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="Only use the libraries in the local cache, failing if any is missing",
+        )
+
     def run(self, parsed_args: argparse.Namespace) -> None:
         """Fetch libraries."""
         store = self._services.store
@@ -1696,8 +2019,13 @@ class FetchLibs(CharmcraftCommand):
                 resolution="Add a 'charm-libs' section to charmcraft.yaml.",
                 retcode=78,  # EX_CONFIG: configuration error
             )
-        emit.progress("Getting library metadata from charmhub")
-        libs_metadata = store.get_libraries_metadata_by_name(charm_libs)
+        cache = LibraryCache(env.get_charm_libs_cache_path())
+        if parsed_args.offline:
+            emit.progress("Getting library metadata from the local cache")
+            libs_metadata = self._get_cached_libraries_metadata(cache, charm_libs)
+        else:
+            emit.progress("Getting library metadata from charmhub")
+            libs_metadata = store.get_libraries_metadata_by_name(charm_libs)
         declared_libs = {lib.lib: lib for lib in charm_libs}
         missing_store_libs = declared_libs.keys() - libs_metadata.keys()
         if missing_store_libs:
@@ -1718,7 +2046,8 @@ class FetchLibs(CharmcraftCommand):
         }
         emit.trace(f"Local libraries: {local_libs}")
 
-        downloaded_libs = 0
+        # the cached libraries are used as they are, the rest are downloaded concurrently
+        to_write: list[tuple[charmcraft.store.models.Library, bool]] = []
         for lib_md in libs_metadata.values():
             lib_name = f"{lib_md.charm_name}.{lib_md.lib_name}"
             local_lib = local_libs.get(lib_name)
@@ -1730,25 +2059,71 @@ class FetchLibs(CharmcraftCommand):
                     permanent=True,
                 )
                 continue
-            lib_name = utils.get_lib_module_name(lib_md.charm_name, lib_md.lib_name, lib_md.api)
-            emit.progress(f"Downloading {lib_name}")
-            lib = store.get_library(
-                charm_name=lib_md.charm_name,
-                library_id=lib_md.lib_id,
-                api=lib_md.api,
-                patch=lib_md.patch,
-            )
-            if lib.content is None:
-                raise errors.CraftError(
-                    f"Store returned no content for '{lib.charm_name}.{lib.lib_name}'"
+            cached_lib = cache.get(lib_md)
+            if cached_lib is None:
+                lib_name = utils.get_lib_module_name(
+                    lib_md.charm_name, lib_md.lib_name, lib_md.api
                 )
-            downloaded_libs += 1
-            lib_path = utils.get_lib_path(lib_md.charm_name, lib_md.lib_name, lib_md.api)
-            lib_path.parent.mkdir(exist_ok=True, parents=True)
-            lib_path.write_text(lib.content)
-            emit.debug(f"Downloaded {lib_name}.")
+                emit.progress(f"Downloading {lib_name}")
+            to_write.append((cached_lib or lib_md, cached_lib is not None))
+
+        get_library = instrum.propagate(store.get_library)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=_STORE_WORKERS) as executor:
+            downloads = executor.map(
+                lambda lib_md: get_library(
+                    charm_name=lib_md.charm_name,
+                    library_id=lib_md.lib_id,
+                    api=lib_md.api,
+                    patch=lib_md.patch,
+                ),
+                [lib_md for lib_md, cached in to_write if not cached],
+            )
+            downloaded_libs = cached_libs = 0
+            for lib, cached in to_write:
+                lib_name = utils.get_lib_module_name(lib.charm_name, lib.lib_name, lib.api)
+                if cached:
+                    cached_libs += 1
+                    emit.debug(f"Using {lib_name} from the local cache.")
+                else:
+                    lib = next(downloads)
+                    if lib.content is None:
+                        raise errors.CraftError(
+                            f"Store returned no content for '{lib.charm_name}.{lib.lib_name}'"
+                        )
+                    downloaded_libs += 1
+                    cache.put(lib)
+                    emit.debug(f"Downloaded {lib_name}.")
+                lib_path = utils.get_lib_path(lib.charm_name, lib.lib_name, lib.api)
+                lib_path.parent.mkdir(exist_ok=True, parents=True)
+                utils.write_text_atomically(lib_path, lib.content)
 
         emit.message(f"Downloaded {downloaded_libs} charm libraries.")
+        if cached_libs:
+            emit.message(f"Used {cached_libs} charm libraries from the local cache.")
+
+    @staticmethod
+    def _get_cached_libraries_metadata(
+        cache: LibraryCache, charm_libs: Collection[project.CharmLib]
+    ) -> dict[str, charmcraft.store.models.Library]:
+        """Get the latest cached library matching each declared one, failing if any is missing."""
+        libs = {}
+        missing = []
+        for charm_lib in charm_libs:
+            charm_name, _, lib_name = charm_lib.lib.partition(".")
+            lib = cache.find(charm_name, lib_name, charm_lib.api_version, charm_lib.patch_version)
+            if lib is None:
+                missing.append(charm_lib.model_dump())
+            else:
+                libs[charm_lib.lib] = lib
+        if missing:
+            raise errors.CraftError(
+                "Could not find the following libraries in the local cache:\n"
+                + util.dump_yaml(missing),
+                resolution="Run 'charmcraft fetch-libs' without '--offline' to download them.",
+                reportable=False,
+                logpath_report=False,
+            )
+        return libs
 
 
 class ListLibCommand(CharmcraftCommand):
@@ -1787,6 +2162,7 @@ class ListLibCommand(CharmcraftCommand):
                 "metadata.yaml if not given)"
             ),
         )
+        _add_no_cache_option(parser)
 
     def run(self, parsed_args):
         """Run the command."""
@@ -1802,7 +2178,7 @@ class ListLibCommand(CharmcraftCommand):
                 )
 
         # get tips from the Store
-        store = Store(env.get_store_config(), needs_auth=False)
+        store = Store(env.get_store_config(), needs_auth=False, use_cache=not parsed_args.no_cache)
         to_query = [{"charm_name": charm_name}]
         libs_tips = store.get_libraries_tips(to_query)
 
@@ -1855,10 +2231,11 @@ class ListResourcesCommand(CharmcraftCommand):
         """Add own parameters to the general parser."""
         super().fill_parser(parser)
         parser.add_argument("charm_name", metavar="charm-name", help="The name of the charm")
+        _add_no_cache_option(parser)
 
     def run(self, parsed_args):
         """Run the command."""
-        store = Store(env.get_store_config())
+        store = Store(env.get_store_config(), use_cache=not parsed_args.no_cache)
         result = store.list_resources(parsed_args.charm_name)
 
         if parsed_args.format:
@@ -2057,8 +2434,14 @@ class UploadResourceCommand(CharmcraftCommand):
 
         if result.ok:
             if parsed_args.format:
-                info = {"revision": result.revision}
+                info = {"revision": result.revision, "reused": result.reused}
                 emit.message(cli.format_content(info, parsed_args.format))
+            elif result.reused:
+                emit.message(
+                    f"Revision {result.revision} of resource {parsed_args.resource_name!r} "
+                    f"for charm {parsed_args.charm_name!r} has the same content, "
+                    "not uploaded again.",
+                )
             else:
                 emit.message(
                     f"Revision {result.revision} created of resource "
@@ -26,7 +26,16 @@ from craft_application import util
 from craft_parts.plugins.plugins import PluginType
 from overrides import override
 
-from charmcraft import extensions, models, parts, preprocess, services
+from charmcraft import (
+    const,
+    extensions,
+    instrum,
+    measurements,
+    models,
+    parts,
+    preprocess,
+    services,
+)
 from charmcraft.application import commands
 from charmcraft.services import CharmcraftServiceFactory
 
@@ -144,25 +153,60 @@ class Charmcraft(craft_application.Application):
         """Run charmcraft in managed mode.
 
         Overrides the craft-application managed mode runner to move packed files
-        as needed.
+        as needed, and to collect the measurements done in the instances.
         """
         dispatcher = self._dispatcher or self._get_dispatcher()
         command = dispatcher.load_command(self.app_config)
         self._work_dir = self.project_dir
 
-        super().run_managed(platform, build_for)
+        measure = None
+        if not self.is_managed() and isinstance(command, commands.PackCommand):
+            # forget the packages of previous packs, the instances append theirs
+            (self._work_dir / const.OUTPUT_PACKAGES_FILENAME).unlink(missing_ok=True)
+            measure = dispatcher.parsed_args().measure
+            if measure and dispatcher.parsed_args().profile:
+                instrum.start_profiling()
+            if measure and dispatcher.parsed_args().measure_resources:
+                instrum.record_all_resources()
+
+        with instrum.Timer("Running in managed instances", with_resources=True):
+            super().run_managed(platform, build_for)
+            if measure:
+                self._merge_managed_measurements()
+        if measure:
+            instrum.DUMP_FORMATS[dispatcher.parsed_args().measure_format](measure)
+            self._record_measurements(platform, build_for)
 
         if not self.is_managed() and isinstance(command, commands.PackCommand):
             if output_dir := getattr(dispatcher.parsed_args(), "output", None):
                 output_path = pathlib.Path(output_dir).resolve()
                 output_path.mkdir(parents=True, exist_ok=True)
-                package_file_path = self._work_dir / ".charmcraft_output_packages.txt"
+                package_file_path = self._work_dir / const.OUTPUT_PACKAGES_FILENAME
                 if package_file_path.exists():
                     package_files = package_file_path.read_text().splitlines(keepends=False)
                     package_file_path.unlink(missing_ok=True)
                     for filename in package_files:
                         shutil.move(str(self._work_dir / filename), output_path / filename)
 
+    def _merge_managed_measurements(self) -> None:
+        """Merge the measurements left by the managed instances in the project directory.
+
+        The profiles dumped along with the measurements, if any, are merged too.
+        """
+        for measurements_path in sorted(self._work_dir.glob(const.MANAGED_MEASUREMENTS_GLOB)):
+            instrum.merge_from(measurements_path, remove=True)
+
+    def _record_measurements(self, platform: str | None, build_for: str | None) -> None:
+        """Record the measurements of the managed run in the build history."""
+        platforms = [
+            build_info.platform
+            for build_info in self._build_plan
+            if (not platform or platform == build_info.platform)
+            and (not build_for or build_for == build_info.build_for)
+        ]
+        project_name = self.services.project.name or self.project_dir.name
+        measurements.record_run(project_name, ",".join(platforms))
+
     def _expand_environment(self, yaml_data: dict[str, Any], build_for: str) -> None:
         """Perform expansion of project environment variables.
 
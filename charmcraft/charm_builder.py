@@ -29,10 +29,10 @@ import subprocess
 import sys
 
 from charmcraft import const, instrum
-from charmcraft.env import get_charm_builder_metrics_path
 from charmcraft.errors import DependencyError
 from charmcraft.jujuignore import JujuIgnore, default_juju_ignore
 from charmcraft.utils import (
+    PipTimings,
     collect_charmlib_pydeps,
     get_pip_command,
     get_pip_version,
@@ -226,7 +226,7 @@ class CharmBuilder:
         deps_mashup = "".join(map(repr, all_deps))
         return hashlib.sha1(deps_mashup.encode("utf8")).hexdigest()
 
-    @instrum.Timer("Installing dependencies")
+    @instrum.Timer("Installing dependencies", with_resources=True)
     def _install_dependencies(self, staging_venv_dir: pathlib.Path):
         """Install all dependencies in a specific directory."""
         # create virtualenv using the host environment python
@@ -243,50 +243,64 @@ class CharmBuilder:
                     [pip_cmd, "install", "--force-reinstall", f"pip@{KNOWN_GOOD_PIP_URL}"]
                 )
 
-        with instrum.Timer("Installing all dependencies"):
+        pip_timings = PipTimings()
+        with instrum.Timer("Installing all dependencies") as timer:
             if self.strict_dependencies:
-                self._install_strict_dependencies(pip_cmd)
-                return
-
-            # Non-strict dependency resolution:
-            # 1. Install binary-allowed packages
-            # 2. Install source packages
-            # 3. Install from requirements files and charm libs dependencies
-            if self.binary_python_packages:
-                print(
-                    "Installing binary-allowed packages and their dependencies.\n"
-                    "WARNING: dependencies may also be installed from binary wheels.\n"
-                    "Use strict mode to avoid these issues."
-                )
-                _process_run(
-                    get_pip_command(
-                        [pip_cmd, "install"],
-                        requirements_files=[],
-                        binary_deps=self.binary_python_packages,
-                    )
-                )
-            if self.python_packages:
-                print("Installing Python pre-dependencies from source.")
-                _process_run([pip_cmd, "install", "--no-binary=:all:", *self.python_packages])
-            if self.requirement_paths or self.charmlib_deps:
-                print("Installing packages from requirements files and charm lib dependencies.")
-                requirements_packages = get_requirements_file_package_names(
-                    *self.requirement_paths
-                )
-                new_libs_deps = exclude_packages(
-                    set(self.charmlib_deps), excluded=requirements_packages
-                )
-                _process_run(
-                    [
-                        pip_cmd,
-                        "install",
-                        "--no-binary=:all:",
-                        *(f"--requirement={path}" for path in self.requirement_paths),
-                        *new_libs_deps,
-                    ]
-                )
+                self._install_strict_dependencies(pip_cmd, pip_timings)
+            else:
+                self._install_non_strict_dependencies(pip_cmd, pip_timings)
+            timer.add_stats(pip_timings=pip_timings.timings)
+        if pip_timings.timings:
+            print("Time spent by pip in each package:")
+            print(pip_timings.get_summary())
+
+    def _install_non_strict_dependencies(
+        self, pip_cmd: str, pip_timings: PipTimings | None = None
+    ) -> None:
+        # Non-strict dependency resolution:
+        # 1. Install binary-allowed packages
+        # 2. Install source packages
+        # 3. Install from requirements files and charm libs dependencies
+        if self.binary_python_packages:
+            print(
+                "Installing binary-allowed packages and their dependencies.\n"
+                "WARNING: dependencies may also be installed from binary wheels.\n"
+                "Use strict mode to avoid these issues."
+            )
+            _process_run(
+                get_pip_command(
+                    [pip_cmd, "install"],
+                    requirements_files=[],
+                    binary_deps=self.binary_python_packages,
+                ),
+                pip_timings=pip_timings,
+            )
+        if self.python_packages:
+            print("Installing Python pre-dependencies from source.")
+            _process_run(
+                [pip_cmd, "install", "--no-binary=:all:", *self.python_packages],
+                pip_timings=pip_timings,
+            )
+        if self.requirement_paths or self.charmlib_deps:
+            print("Installing packages from requirements files and charm lib dependencies.")
+            requirements_packages = get_requirements_file_package_names(*self.requirement_paths)
+            new_libs_deps = exclude_packages(
+                set(self.charmlib_deps), excluded=requirements_packages
+            )
+            _process_run(
+                [
+                    pip_cmd,
+                    "install",
+                    "--no-binary=:all:",
+                    *(f"--requirement={path}" for path in self.requirement_paths),
+                    *new_libs_deps,
+                ],
+                pip_timings=pip_timings,
+            )
 
-    def _install_strict_dependencies(self, pip_cmd: str) -> None:
+    def _install_strict_dependencies(
+        self, pip_cmd: str, pip_timings: PipTimings | None = None
+    ) -> None:
         if not self.requirement_paths:
             raise DependencyError(
                 "No requirements files have been passed to the charm builder.",
@@ -303,7 +317,8 @@ class CharmBuilder:
                 [pip_cmd, "install", "--no-deps"],
                 self.requirement_paths,
                 binary_deps=self.binary_python_packages or [],
-            )
+            ),
+            pip_timings=pip_timings,
         )
         # Validate that the environment is consistent.
         _process_run([pip_cmd, "check"])
@@ -383,27 +398,38 @@ def _find_venv_site_packages(basedir):
     return basedir / "lib" / f"python{major}.{minor}" / "site-packages"
 
 
-def _process_run(cmd: list[str]) -> None:
+def _process_run(cmd: list[str], pip_timings: PipTimings | None = None) -> None:
     """Run an external command logging its output.
 
+    If the command is a pip run, its output can be parsed to time each package.
+
     :raises CraftError: if execution crashes or ends with return code not zero.
     """
     print(f"Running external command {cmd}")
-    try:
-        proc = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            text=True,
-        )
-    except Exception as exc:
-        raise RuntimeError(f"Subprocess command {cmd} execution crashed: {exc!r}")
-
-    # https://github.com/microsoft/pylance-release/issues/2385
-    for line in proc.stdout:  # pyright: ignore[reportOptionalIterable]
-        print(f"   :: {line.rstrip()}")
-    retcode = proc.wait()
+    with instrum.SubprocessTimer(cmd) as timer:
+        try:
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                universal_newlines=True,
+                text=True,
+            )
+        except Exception as exc:
+            raise RuntimeError(f"Subprocess command {cmd} execution crashed: {exc!r}")
+
+        try:
+            # https://github.com/microsoft/pylance-release/issues/2385
+            for line in proc.stdout:  # pyright: ignore[reportOptionalIterable]
+                timer.add_output(line)
+                if pip_timings is not None:
+                    pip_timings.feed(line)
+                print(f"   :: {line.rstrip()}")
+            retcode = timer.returncode = proc.wait()
+        finally:
+            # the pip phase measurements are nested in this one, so they must end first
+            if pip_timings is not None:
+                pip_timings.finish()
 
     if retcode:
         raise RuntimeError(f"Subprocess command {cmd} execution failed with retcode {retcode}")
@@ -452,6 +478,11 @@ def _parse_arguments() -> argparse.Namespace:
         type=pathlib.Path,
         help="Requirements file to install dependencies from.",
     )
+    parser.add_argument(
+        "--metrics-file",
+        type=pathlib.Path,
+        help="File to dump the measurements to, for Charmcraft to collect them.",
+    )
 
     return parser.parse_args()
 
@@ -460,20 +491,26 @@ def main():
     """Run the command-line interface."""
     options = _parse_arguments()
 
-    print("Starting charm builder")
-    builder = CharmBuilder(
-        builddir=options.builddir,
-        installdir=options.installdir,
-        entrypoint=options.entrypoint,
-        binary_python_packages=options.binary_package or [],
-        python_packages=options.package or [],
-        requirements=options.requirement or [],
-        strict_dependencies=options.strict_dependencies,
-    )
-    builder.build_charm()
+    with instrum.Timer("Full charm_builder.py main", with_resources=True):
+        print("Starting charm builder")
+        builder = CharmBuilder(
+            builddir=options.builddir,
+            installdir=options.installdir,
+            entrypoint=options.entrypoint,
+            binary_python_packages=options.binary_package or [],
+            python_packages=options.package or [],
+            requirements=options.requirement or [],
+            strict_dependencies=options.strict_dependencies,
+        )
+        builder.build_charm()
+    if options.metrics_file:
+        instrum.dump(options.metrics_file)
 
 
 if __name__ == "__main__":
-    with instrum.Timer("Full charm_builder.py main"):
-        main()
-    instrum.dump(get_charm_builder_metrics_path())
+    instrum.set_process("charm_builder.py")
+    if os.environ.get(const.PROFILE_ENV_VAR):
+        instrum.start_profiling()
+    if os.environ.get(const.ALL_RESOURCES_ENV_VAR):
+        instrum.record_all_resources()
+    main()
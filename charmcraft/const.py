@@ -30,8 +30,19 @@ SHARED_CACHE_ENV_VAR = "CRAFT_SHARED_CACHE"
 STORE_API_ENV_VAR = "CHARMCRAFT_STORE_API_URL"
 STORE_STORAGE_ENV_VAR = "CHARMCRAFT_UPLOAD_URL"
 STORE_REGISTRY_ENV_VAR = "CHARMCRAFT_REGISTRY_URL"
+HTTP_POOL_SIZE_ENV_VAR = "CHARMCRAFT_HTTP_POOL_SIZE"
+UPLOAD_TIMEOUT_ENV_VAR = "CHARMCRAFT_UPLOAD_TIMEOUT"
+PUSH_RETRIES_ENV_VAR = "CHARMCRAFT_PUSH_RETRIES"
+# read by craft-store too, to configure the retries of its requests
+STORE_RETRIES_ENV_VAR = "CRAFT_STORE_RETRIES"
+STORE_BACKOFF_ENV_VAR = "CRAFT_STORE_BACKOFF"
 # These are only for use within the managed environment
 MANAGED_MODE_ENV_VAR = "CHARMCRAFT_MANAGED_MODE"
+# Only for use by the charm and reactive builds, set when profiling or recording the
+# resources of every measurement, and where to leave the measurements
+PROFILE_ENV_VAR = "CHARMCRAFT_PROFILE"
+ALL_RESOURCES_ENV_VAR = "CHARMCRAFT_MEASURE_RESOURCES"
+METRICS_FILE_ENV_VAR = "CHARMCRAFT_METRICS_FILE"
 # endregion
 # region Project files and directories
 CHARMCRAFT_FILENAME = "charmcraft.yaml"
@@ -45,6 +56,11 @@ WORK_DIRNAME = "work_dir"
 BUILD_DIRNAME = "build"
 VENV_DIRNAME = "venv"
 STAGING_VENV_DIRNAME = "staging-venv"
+# The packages created by a pack, listed in the project directory
+OUTPUT_PACKAGES_FILENAME = ".charmcraft_output_packages.txt"
+# Measurements done in a managed instance, left in the project directory for the host
+MANAGED_MEASUREMENTS_TEMPLATE = ".charmcraft_measurements_{platform}.json"
+MANAGED_MEASUREMENTS_GLOB = ".charmcraft_measurements_*.json"
 # endregion
 # region Output files and directories
 # Dispatch script filename
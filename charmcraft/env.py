@@ -18,6 +18,7 @@
 import dataclasses
 import os
 import pathlib
+import secrets
 
 import platformdirs
 from craft_application.util import strtobool
@@ -36,6 +37,21 @@ def get_host_shared_cache_path() -> pathlib.Path:
     return platformdirs.user_cache_path(appname="charmcraft", ensure_exists=True)
 
 
+def get_charm_libs_cache_path() -> pathlib.Path:
+    """Path for the charm libraries cache, shared by all the projects in the host."""
+    return get_host_shared_cache_path() / "charm-libs"
+
+
+def get_upload_ledger_path() -> pathlib.Path:
+    """Path for the ledger of the files uploaded to the store from the host."""
+    return get_host_shared_cache_path() / "uploads"
+
+
+def get_http_cache_path() -> pathlib.Path:
+    """Path for the cache of the responses to the read-only requests to the store."""
+    return get_host_shared_cache_path() / "http"
+
+
 def get_managed_environment_home_path() -> pathlib.Path:
     """Path for home when running in managed environment."""
     return pathlib.Path("/root")
@@ -46,9 +62,30 @@ def get_managed_environment_log_path() -> pathlib.Path:
     return pathlib.Path("/tmp/charmcraft.log")
 
 
-def get_charm_builder_metrics_path() -> pathlib.Path:
-    """Path for charmcraft metrics when running charm_builder."""
-    return pathlib.Path("/tmp/charm_builder_metrics.json")
+# unique for this run, so concurrent runs in the same host don't mix their files
+_RUN_ID = f"{os.getpid()}-{secrets.token_hex(4)}"
+
+
+def get_charm_builder_metrics_path(part_name: str) -> pathlib.Path:
+    """Path for charmcraft metrics when running charm_builder for a part.
+
+    It's unique for the part and the run, so builds of several parts or concurrent
+    builds don't overwrite each other's metrics.
+    """
+    return pathlib.Path(f"/tmp/charm_builder_metrics_{_RUN_ID}_{part_name}.json")
+
+
+def get_charm_builder_metrics_paths() -> list[pathlib.Path]:
+    """Paths for all the charmcraft metrics left by charm_builder in this run."""
+    return sorted(pathlib.Path("/tmp").glob(f"charm_builder_metrics_{_RUN_ID}_*.json"))
+
+
+def get_managed_measurements_path(project_dir: pathlib.Path, platform: str) -> pathlib.Path:
+    """Path for the measurements done in a managed environment for a platform.
+
+    It's in the project directory, so it's available in the host when the instance is done.
+    """
+    return project_dir / const.MANAGED_MEASUREMENTS_TEMPLATE.format(platform=platform)
 
 
 def get_managed_environment_project_path() -> pathlib.Path:
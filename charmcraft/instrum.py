@@ -16,88 +16,603 @@
 
 """Provide utilities to measure performance in different parts of the app."""
 
+import contextvars
+import cProfile
+import functools
 import json
-import uuid
-from time import time
-from typing import Any
+import os
+import pathlib
+import pstats
+import re
+import subprocess
+import sys
+import threading
+from collections.abc import Callable, Sequence
+from time import perf_counter_ns, time
+from typing import Any, TypeVar
+
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore[assignment]
+
+T = TypeVar("T")
 
 # the base time of the started process: all the recorded times will be relative to
 # this one (they will be easier to read and simple to understand the time passed since
-# the process started until we started measuring)
+# the process started until we started measuring); the wall clock one is used to
+# align the measurements of different processes, and the performance counter one
+# (monotonic and with high resolution) is what is used for the measurements themselves
 _baseline = time()
+_baseline_ns = perf_counter_ns()
+
+# how many records are allocated at once when more are needed
+_RECORDS_CHUNK = 1024
+
+# the name of the process when not set explicitly, and the one for measurements
+# merged from files that do not include it
+DEFAULT_PROCESS = "charmcraft"
+UNKNOWN_PROCESS = "subprocess"
+
+# the file with the I/O counters of the process (only in Linux), and the (lazily
+# opened) file descriptor to read it, with the pid it belongs to and how many bytes
+# were read from it (to not count those in the measurements)
+_PROC_IO_PATH = "/proc/self/io"
+_proc_io: list | None = None
+_proc_io_lock = threading.Lock()
+
+# the phase for the code profiled outside of any measurement
+UNMEASURED_PHASE = "(unmeasured)"
+
+# the maximum RSS is reported in kibibytes in Linux, but in bytes in macOS
+_MAX_RSS_FACTOR = 1 if sys.platform == "darwin" else 1024
+
+
+def _get_io_counters() -> tuple[int, int] | tuple[None, None]:
+    """Get the bytes read and written by the process so far, if available.
+
+    These are the bytes passed through read and write calls, no matter if they
+    were served by the page cache or the actual storage.
+    """
+    global _proc_io  # noqa: PLW0603 (opened once per process)
+    pid = os.getpid()
+    with _proc_io_lock:
+        if _proc_io is None or _proc_io[0] != pid:
+            try:
+                _proc_io = [pid, os.open(_PROC_IO_PATH, os.O_RDONLY), 0]
+            except OSError:
+                _proc_io = [pid, None, 0]
+        fd = _proc_io[1]
+        if fd is None:
+            return None, None
+
+        # the kernel always starts the file with "rchar: N\nwchar: N\n"
+        data = os.pread(fd, 4096, 0)
+        fields = data.split(maxsplit=4)
+        if len(fields) < 4 or fields[0] != b"rchar:" or fields[2] != b"wchar:":
+            return None, None
+        read_bytes = int(fields[1]) - _proc_io[2]
+        _proc_io[2] += len(data)
+    return read_bytes, int(fields[3])
+
+
+def _get_resources() -> tuple | None:
+    """Get a snapshot of the resources used by the process and its children so far."""
+    if resource is None:
+        return None
+    usage_self = resource.getrusage(resource.RUSAGE_SELF)
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (
+        usage_self.ru_utime,
+        usage_self.ru_stime,
+        usage_children.ru_utime,
+        usage_children.ru_stime,
+        usage_self.ru_maxrss,
+        usage_children.ru_maxrss,
+        *_get_io_counters(),
+    )
+
+
+def _get_resources_delta(rstart: tuple, rend: tuple) -> dict[str, float | int | None]:
+    """Get the resources used between two snapshots.
+
+    CPU times are in seconds; the maximum RSS (a high-water mark, not a delta) and
+    the I/O counters are in bytes.
+    """
+    utime, stime, cutime, cstime, _, _, read_bytes, write_bytes = rstart
+    (e_utime, e_stime, e_cutime, e_cstime, maxrss, cmaxrss, e_read, e_write) = rend
+    return {
+        "cpu_user": e_utime - utime,
+        "cpu_system": e_stime - stime,
+        "children_cpu_user": e_cutime - cutime,
+        "children_cpu_system": e_cstime - cstime,
+        "max_rss": maxrss * _MAX_RSS_FACTOR,
+        "children_max_rss": cmaxrss * _MAX_RSS_FACTOR,
+        "read_bytes": None if read_bytes is None else e_read - read_bytes,
+        "write_bytes": None if write_bytes is None else e_write - write_bytes,
+    }
+
+
+class _Record:
+    """A single measurement."""
+
+    __slots__ = (
+        "parent",
+        "msg",
+        "extra",
+        "tstart",
+        "tend",
+        "process",
+        "rstart",
+        "rend",
+        "resources",
+        "thread",
+        "task",
+        "stats",
+    )
+
+    def __init__(self, parent: int | None, msg: str, extra: dict[str, Any], tstart: int):
+        self.parent = parent
+        self.msg = msg
+        self.extra = extra
+        self.tstart = tstart
+        self.tend: int | None = None
+        # the process where the measurement was done, if not this one
+        self.process: str | None = None
+        # snapshots of the used resources when starting and ending the measurement,
+        # or the already calculated usage for merged measurements
+        self.rstart: tuple | None = None
+        self.rend: tuple | None = None
+        self.resources: dict[str, Any] | None = None
+        # the thread and asyncio task (if any) where the measurement was done
+        self.thread: str | None = None
+        self.task: str | None = None
+        # statistics of the measured work, not part of what identifies it (unlike
+        # the extra info), e.g. the exit status of a command
+        self.stats: dict[str, Any] | None = None
+
+    def get_resources(self) -> dict[str, Any] | None:
+        """Get the resources used during the measurement, if known."""
+        if self.resources is None and self.rstart is not None and self.rend is not None:
+            return _get_resources_delta(self.rstart, self.rend)
+        return self.resources
+
+
+def get_phase_name(msg: str, extra: dict[str, Any]) -> str:
+    """Get the name of the phase of a measurement, from its message and extra info."""
+    if not extra:
+        return msg
+    return msg + " (" + ", ".join(f"{k}={v}" for k, v in extra.items()) + ")"
+
+
+def _get_profile_path(filename: str | os.PathLike, index: int, phase: str) -> pathlib.Path:
+    """Get the path of a phase profile, next to the measurements file."""
+    path = pathlib.Path(filename)
+    slug = re.sub(r"[^a-z0-9]+", "-", phase.lower()).strip("-")[:80]
+    return path.with_name(f"{path.stem}.{index:02d}-{slug}.pstats")
+
+
+class _Profiling:
+    """Profile the code run in a thread, split by the phase being measured.
+
+    Each phase (the innermost measurement in the thread) gets its own profiler, so
+    the functions called in it are accounted separately; the profilers are switched
+    as measurements start and end.
+    """
+
+    def __init__(self) -> None:
+        # only the thread that started the profiling is profiled
+        self.thread_id = threading.get_ident()
+        self.profilers: dict[str, cProfile.Profile] = {}
+        # the phases of the ongoing measurements, innermost last
+        self.phases = [UNMEASURED_PHASE]
+        self._switch(None, UNMEASURED_PHASE)
+
+    def _switch(self, from_phase: str | None, to_phase: str) -> None:
+        """Stop profiling a phase and start profiling another one."""
+        if from_phase is not None:
+            self.profilers[from_phase].disable()
+        profiler = self.profilers.get(to_phase)
+        if profiler is None:
+            profiler = self.profilers[to_phase] = cProfile.Profile()
+        profiler.enable()
+
+    def enter(self, phase: str) -> None:
+        """Start profiling a nested phase."""
+        self._switch(self.phases[-1], phase)
+        self.phases.append(phase)
+
+    def exit(self) -> None:
+        """Go back to profiling the phase of the outer measurement."""
+        if len(self.phases) == 1:
+            # a measurement started before profiling
+            return
+        phase = self.phases.pop()
+        self._switch(phase, self.phases[-1])
+
+    def stop(self) -> dict[str, pstats.Stats]:
+        """Stop profiling, returning the statistics of each phase."""
+        self.profilers[self.phases[-1]].disable()
+        return {phase: pstats.Stats(profiler) for phase, profiler in self.profilers.items()}
+
+
+def _to_seconds(timestamp_ns: int | None) -> float | None:
+    """Convert a performance counter timestamp to seconds since the baseline."""
+    if timestamp_ns is None:
+        return None
+    return (timestamp_ns - _baseline_ns) / 1e9
+
+
+def _from_seconds(timestamp: float | None) -> int | None:
+    """Convert seconds since the baseline to a performance counter timestamp."""
+    if timestamp is None:
+        return None
+    return round(timestamp * 1e9) + _baseline_ns
+
+
+def _get_task_name() -> str | None:
+    """Get the name of the running asyncio task, if any."""
+    # if asyncio is not even imported there is no task (and no need to import it)
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is None:
+        return None
+    loop = asyncio._get_running_loop()
+    if loop is None:
+        return None
+    task = asyncio.current_task(loop)
+    return None if task is None else task.get_name()
 
 
 class _Measurements:
-    """Hold the measurements done and provide utilities around that structure."""
-
-    def __init__(self):
-        # ancestors list when a measure starts (last item is direct parent); the
-        # first value is special, None, to reflect the "root", the rest are
-        # measurement ids
-        self.parents = [None]  # start with a unique "root"
-
-        # simple dict to hold measurements information; the key is the measurement
-        # id and each value holds all it info
-        self.measurements = {}
-
-    def start(self, msg: str, extra_info: dict[str, Any]):
-        """Start a measurement."""
-        this_id = uuid.uuid4().hex
-        parent_id = self.parents[-1]
-        self.parents.append(this_id)
-
-        extra_info = {k: str(v) for k, v in extra_info.items()}
-        self.measurements[this_id] = {
-            "parent": parent_id,
-            "msg": msg,
-            "extra": extra_info,
-            "tstart": time(),
-            "tend": None,
-        }
+    """Hold the measurements done and provide utilities around that structure.
+
+    Measurements are identified by consecutive integers, which are also the
+    index of their records. Records are allocated in chunks, so starting a
+    measurement is just filling one in: the extra info is kept as given, and only
+    converted to strings when dumped.
+
+    The current measurement (the parent of the ones started next) is kept in a
+    context variable, so each thread and asyncio task builds its own branch of the
+    tree: measurements in different threads or tasks can overlap freely.
+
+    Snapshotting the resources used costs several times more than the measurement
+    itself, so it is only done for the measurements that ask for it (the coarse
+    ones), unless asked for all of them.
+    """
+
+    def __init__(self, process: str = DEFAULT_PROCESS):
+        # the name of this process, to tell apart its measurements once merged
+        # with the ones of other processes
+        self.process = process
+
+        # the ongoing measurement in the current context, None being the "root"
+        self.current: contextvars.ContextVar[int | None] = contextvars.ContextVar(
+            "current_measurement", default=None
+        )
+
+        # the measurements records, indexed by measurement id; only the first
+        # `self.count` ones are used
+        self.records: list[_Record | None] = []
+        self.count = 0
+        self._lock = threading.Lock()
+
+        # the ongoing profiling, if any, and the profiles of each phase (by process,
+        # None being this one) once finished or merged from other processes
+        self.profiling: _Profiling | None = None
+        self.profiles: dict[tuple[str | None, str], pstats.Stats] = {}
+
+        # whether to record the resources used in every measurement
+        self.all_resources = False
+
+    def _add(self, record: _Record) -> int:
+        """Store a record, returning its measurement id."""
+        with self._lock:
+            this_id = self.count
+            if this_id == len(self.records):
+                self.records.extend([None] * _RECORDS_CHUNK)
+            self.records[this_id] = record
+            self.count += 1
         return this_id
 
-    def end(self, measurement_id):
-        """Finish the indicated measurement."""
-        if measurement_id != self.parents[-1]:
+    def start(self, msg: str, extra_info: dict[str, Any], *, resources: bool = False) -> int:
+        """Start a measurement, recording the resources it uses if indicated."""
+        record = _Record(self.current.get(), msg, extra_info, 0)
+        record.thread = threading.current_thread().name
+        record.task = _get_task_name()
+        if resources or self.all_resources:
+            record.rstart = _get_resources()
+        record.tstart = perf_counter_ns()
+        this_id = self._add(record)
+        self.current.set(this_id)
+        if self.profiling is not None and self.profiling.thread_id == threading.get_ident():
+            self.profiling.enter(get_phase_name(msg, extra_info))
+        return this_id
+
+    def end(self, measurement_id: int) -> float:
+        """Finish the indicated measurement, returning its duration in seconds."""
+        tend = perf_counter_ns()
+        if measurement_id != self.current.get():
+            # only the innermost measurement in this context can be ended
             raise ValueError("Overlapped measurements.")
 
-        self.measurements[measurement_id]["tend"] = time()
-        self.parents.pop()
+        if self.profiling is not None and self.profiling.thread_id == threading.get_ident():
+            self.profiling.exit()
+        record = self.records[measurement_id]
+        record.tend = tend
+        if record.rstart is not None:
+            record.rend = _get_resources()
+        self.current.set(record.parent)
+        return (tend - record.tstart) / 1e9
+
+    def add_extra(self, measurement_id: int, extra_info: dict[str, Any]) -> None:
+        """Add extra information to an ongoing measurement."""
+        record = self.records[measurement_id]
+        record.extra = {**record.extra, **extra_info}
+
+    def add_stats(self, measurement_id: int, stats: dict[str, Any]) -> None:
+        """Add statistics to an ongoing measurement."""
+        record = self.records[measurement_id]
+        record.stats = {**(record.stats or {}), **stats}
+
+    def start_profiling(self) -> None:
+        """Start profiling the current thread, split by the phase being measured."""
+        if self.profiling is None:
+            self.profiling = _Profiling()
+
+    def stop_profiling(self) -> None:
+        """Stop the ongoing profiling, if any, keeping its profiles."""
+        if self.profiling is None:
+            return
+        for phase, stats in self.profiling.stop().items():
+            self._add_profile((None, phase), stats)
+        self.profiling = None
+
+    def _add_profile(self, key: tuple[str | None, str], stats: pstats.Stats) -> None:
+        """Add the statistics of a phase, accumulating them if already present."""
+        if key in self.profiles:
+            self.profiles[key].add(stats)
+        else:
+            self.profiles[key] = stats
+
+    def _dump_profiles(self, filename: str | os.PathLike) -> list[dict[str, str]]:
+        """Dump the profile of each phase to its own file next to the measurements.
+
+        The profiling is stopped, if ongoing. Return the description of each dumped
+        profile, with its phase, process and file name.
+        """
+        self.stop_profiling()
+        dumped = []
+        for index, (process, phase) in enumerate(sorted(self.profiles, key=_get_profile_key)):
+            name = phase if process is None else f"{process}: {phase}"
+            path = _get_profile_path(filename, index, name)
+            self.profiles[(process, phase)].dump_stats(path)
+            dumped.append({"phase": phase, "process": process or self.process, "file": path.name})
+        return dumped
+
+    @property
+    def measurements(self) -> dict[str, dict[str, Any]]:
+        """The measurements in their serializable form, indexed by id.
+
+        Times are in seconds relative to the baseline, and the extra info values are
+        converted to strings, so no objects are leaked (the stats are expected to be
+        serializable already). The resources used during each measurement are
+        included when known.
+        """
+        result = {}
+        for measurement_id in range(self.count):
+            record = self.records[measurement_id]
+            result[str(measurement_id)] = {
+                "parent": None if record.parent is None else str(record.parent),
+                "msg": record.msg,
+                "extra": {k: str(v) for k, v in record.extra.items()},
+                "tstart": _to_seconds(record.tstart),
+                "tend": _to_seconds(record.tend),
+                "process": record.process or self.process,
+                "resources": record.get_resources(),
+                "thread": record.thread,
+                "task": record.task,
+                "stats": record.stats,
+            }
+        return result
 
     def dump(self, filename: str) -> None:
-        """Dump the ongoing measurements to the specified file in a JSON format."""
-        measurements = self.measurements.copy()
-        for m in measurements.values():
-            m["tstart"] -= _baseline
-            m["tend"] -= _baseline
-        measurements["__meta__"] = {"baseline": _baseline}
+        """Dump the ongoing measurements to the specified file in a JSON format.
+
+        If profiling, the profile of each phase is dumped next to the file, and
+        referenced from it.
+        """
+        measurements = self.measurements
+        measurements["__meta__"] = {"baseline": _baseline, "process": self.process}
+        if self.profiling is not None or self.profiles:
+            measurements["__meta__"]["profiles"] = self._dump_profiles(filename)
         with open(filename, "w") as fh:
             json.dump(measurements, fh, indent=4)
 
-    def merge_from(self, filename: str) -> None:
-        """Merge measurements from a file to the current ongoing structure."""
+    def dump_trace(self, filename: str) -> None:
+        """Dump the ongoing measurements to the specified file in the Trace Event format.
+
+        Each process (this one and the ones whose measurements were merged) gets its
+        own pid, so the resulting file can be loaded in any trace viewer (e.g.
+        Perfetto or chrome://tracing) to see the processes timelines side by side.
+        Inside each process, each thread and asyncio task gets its own tid, as their
+        measurements may overlap.
+
+        If profiling, the profile of each phase is dumped next to the file.
+        """
+        if self.profiling is not None or self.profiles:
+            self._dump_profiles(filename)
+        pids: dict[str, int] = {}
+        tids: dict[tuple[str, str | None, str | None], int] = {}
+        events = []
+        for measurement in self.measurements.values():
+            process = measurement["process"]
+            if process not in pids:
+                pids[process] = pid = len(pids) + 1
+                events.append(_get_trace_metadata_event(pid, 0, "process_name", process))
+                events.append(_get_trace_metadata_event(pid, 0, "process_sort_index", pid))
+            pid = pids[process]
+            thread_key = (process, measurement["thread"], measurement["task"])
+            if thread_key not in tids:
+                tids[thread_key] = tid = sum(key[0] == process for key in tids) + 1
+                thread_name = " / ".join(filter(None, thread_key[1:])) or "main"
+                events.append(_get_trace_metadata_event(pid, tid, "thread_name", thread_name))
+            event = {
+                "name": measurement["msg"],
+                "cat": "charmcraft",
+                "pid": pid,
+                "tid": tids[thread_key],
+                "ts": measurement["tstart"] * 1e6,
+                "args": measurement["extra"],
+            }
+            if measurement["resources"] or measurement["stats"]:
+                event["args"] = {
+                    **measurement["extra"],
+                    **(measurement["resources"] or {}),
+                    **(measurement["stats"] or {}),
+                }
+            if measurement["tend"] is None:
+                # still ongoing, shown as not finished
+                event["ph"] = "B"
+            else:
+                event["ph"] = "X"
+                event["dur"] = (measurement["tend"] - measurement["tstart"]) * 1e6
+            events.append(event)
+
+        trace = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"baseline": _baseline},
+        }
+        with open(filename, "w") as fh:
+            json.dump(trace, fh, indent=4)
+
+    def merge_from(self, filename: str | os.PathLike, *, remove: bool = False) -> None:
+        """Merge measurements from a file to the current ongoing structure.
+
+        The profiles referenced from the file, if any, are merged too, accumulated
+        with the ones of the same phase and process. If indicated, the file and the
+        profiles are removed once merged.
+        """
         with open(filename) as fh:
             to_merge = json.load(fh)
 
         # add the measurements from the file to this process ones, and while doing that
-        # hook "root" measurements to current one and shift times
-        current_id = self.parents[-1]
-        sublayer_baseline = to_merge.pop("__meta__")["baseline"]
-
+        # hook "root" measurements to current one and shift times (the times in the
+        # file are relative to its own baseline); the merged measurements get new ids,
+        # as the ones in the file are only unique for the process that dumped it
+        current_id = self.current.get()
+        meta = to_merge.pop("__meta__")
+        sublayer_shift = meta["baseline"] - _baseline
+        sublayer_process = meta.get("process", UNKNOWN_PROCESS)
+
+        def _get_process(process: str) -> str:
+            # measurements from processes started by the sublayer one are nested in it
+            if process == sublayer_process:
+                return sublayer_process
+            return f"{sublayer_process} > {process}"
+
+        new_ids = {}
         for mid, data in to_merge.items():
-            data["tstart"] += sublayer_baseline
-            data["tend"] += sublayer_baseline
-            if data["parent"] is None:
-                data["parent"] = current_id
-            self.measurements[mid] = data
+            record = _Record(None, data["msg"], data["extra"], 0)
+            record.process = _get_process(data.get("process", sublayer_process))
+            record.tstart = _from_seconds(data["tstart"] + sublayer_shift)
+            if data["tend"] is not None:
+                record.tend = _from_seconds(data["tend"] + sublayer_shift)
+            record.resources = data.get("resources")
+            record.thread = data.get("thread")
+            record.task = data.get("task")
+            record.stats = data.get("stats")
+            new_ids[mid] = self._add(record)
+        for mid, data in to_merge.items():
+            parent = data["parent"]
+            self.records[new_ids[mid]].parent = current_id if parent is None else new_ids[parent]
+
+        directory = pathlib.Path(filename).parent
+        for profile in meta.get("profiles", []):
+            stats = pstats.Stats(str(directory / profile["file"]))
+            self._add_profile((_get_process(profile["process"]), profile["phase"]), stats)
+            if remove:
+                (directory / profile["file"]).unlink()
+        if remove:
+            os.unlink(filename)
+
+
+def _get_profile_key(key: tuple[str | None, str]) -> tuple[str, str]:
+    """Sort the profiles with this process ones first."""
+    process, phase = key
+    return (process or "", phase)
+
+
+def _get_trace_metadata_event(pid: int, tid: int, name: str, value: str | int) -> dict[str, Any]:
+    """Get a Trace Event metadata event for a process or thread."""
+    arg_name = "sort_index" if name == "process_sort_index" else "name"
+    return {"name": name, "ph": "M", "pid": pid, "tid": tid, "args": {arg_name: value}}
 
 
 # unique _Measurements object and external api
 _measurements = _Measurements()
 dump = _measurements.dump
+dump_trace = _measurements.dump_trace
 merge_from = _measurements.merge_from
 
 
+def propagate(func: Callable[..., T]) -> Callable[..., T]:
+    """Wrap a function to run it in (a copy of) the current context.
+
+    New threads start with an empty context, so the measurements done in a function
+    run in a thread pool would not be nested in the one that submitted it; wrap the
+    function when submitting it to keep the measurements tree::
+
+        with Timer("Downloading"):
+            executor.submit(instrum.propagate(download), url)
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def _f(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return _f
+
+
+# the formats in which the measurements can be dumped
+DUMP_FORMATS = {"json": dump, "trace-event": dump_trace}
+
+
+def get_measurements() -> dict[str, dict[str, Any]]:
+    """Get the measurements done (or merged) so far, in the dumped format."""
+    return _measurements.measurements
+
+
+def start_profiling() -> None:
+    """Start profiling the current thread, split by the phase being measured.
+
+    The profiles are dumped next to the measurements file, one per phase, in the
+    `pstats` format (e.g. to be inspected with `python3 -m pstats FILE` or snakeviz).
+    """
+    _measurements.start_profiling()
+
+
+def record_all_resources() -> None:
+    """Record the resources used in every measurement, not only in the coarse ones."""
+    _measurements.all_resources = True
+
+
+def is_recording_all_resources() -> bool:
+    """Whether the resources used are recorded in every measurement."""
+    return _measurements.all_resources
+
+
+def is_profiling() -> bool:
+    """Whether the process is being profiled."""
+    return _measurements.profiling is not None
+
+
+def set_process(name: str) -> None:
+    """Set the name of the current process, which is kept in its measurements."""
+    _measurements.process = name
+
+
 class Timer:
     """Get the timing of a block of code.
 
@@ -124,31 +639,129 @@ class Timer:
             ...
             cm.mark("first half done!")
             ...
+
+    Extra info only known at the end of the block (e.g. its outcome) can be added
+    with the `add_extra` method; once the block is done, the duration of the
+    (last) measurement is available in the `duration` attribute.
+
+    The resources used (CPU, memory, I/O) are only recorded for coarse timers, the
+    ones created with `with_resources=True`, unless `record_all_resources` was called.
     """
 
-    def __init__(self, msg: str, **extra_info: dict[str, Any]):
+    def __init__(self, msg: str, *, with_resources: bool = False, **extra_info: dict[str, Any]):
         self.msg = msg
         self.extra_info = extra_info
+        self.with_resources = with_resources
         self.measurement_id = None
+        self.duration: float | None = None
 
     def __enter__(self):
-        self.measurement_id = _measurements.start(self.msg, self.extra_info)
+        self.measurement_id = _measurements.start(
+            self.msg, self.extra_info, resources=self.with_resources
+        )
         return self
 
     def __exit__(self, *exc):
-        _measurements.end(self.measurement_id)
+        self.duration = _measurements.end(self.measurement_id)
+
+    def add_extra(self, **extra_info: object) -> None:
+        """Add extra info to the ongoing measurement."""
+        _measurements.add_extra(self.measurement_id, extra_info)
+
+    def add_stats(self, **stats: object) -> None:
+        """Add statistics (serializable values) to the ongoing measurement."""
+        _measurements.add_stats(self.measurement_id, stats)
 
     def mark(self, msg: str, **extra_info: dict[str, Any]):
         """Mark middle measurements inside a contextual one."""
         # close the previous one, and start a new measure
         _measurements.end(self.measurement_id)
-        self.measurement_id = _measurements.start(msg, extra_info)
+        self.measurement_id = _measurements.start(msg, extra_info, resources=self.with_resources)
 
     def __call__(self, func):
         """Decorate a function with self class to measure its execution."""
 
         def _f(*args, **kwargs):
-            with self.__class__(self.msg, **self.extra_info):
+            with self.__class__(self.msg, with_resources=self.with_resources, **self.extra_info):
                 return func(*args, **kwargs)
 
         return _f
+
+
+def _get_children_cpu() -> float | None:
+    """Get the CPU time used so far by the finished children processes, if available."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class SubprocessTimer(Timer):
+    """Measure the run of an external command.
+
+    The tool run is kept as extra info (so the measurements of each tool can be told
+    apart), and the full command line, its exit status, the size of its output (if
+    captured) and the CPU time used by the children processes, as stats::
+
+        with SubprocessTimer(cmd) as timer:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+            for line in proc.stdout:
+                timer.add_output(line)
+            timer.returncode = proc.wait()
+
+    The children CPU time includes any other children processes finished meanwhile
+    (e.g. from other threads).
+    """
+
+    def __init__(self, cmd: Sequence[str | os.PathLike]):
+        argv = [os.fspath(arg) for arg in cmd]
+        super().__init__(
+            "Running external command", with_resources=True, tool=os.path.basename(argv[0])
+        )
+        self.argv = argv
+        self.returncode: int | None = None
+        self.output_bytes: int | None = None
+        self._children_cpu: float | None = None
+
+    def add_output(self, output: str | bytes | None) -> None:
+        """Account some output of the command, if captured."""
+        if output is None:
+            return
+        if isinstance(output, str):
+            output = output.encode(errors="replace")
+        self.output_bytes = (self.output_bytes or 0) + len(output)
+
+    def __enter__(self):
+        self._children_cpu = _get_children_cpu()
+        return super().__enter__()
+
+    def __exit__(self, *exc):
+        children_cpu = _get_children_cpu()
+        if children_cpu is not None and self._children_cpu is not None:
+            children_cpu -= self._children_cpu
+        self.add_stats(
+            argv=self.argv,
+            exit_status=self.returncode,
+            output_bytes=self.output_bytes,
+            children_cpu=children_cpu,
+        )
+        super().__exit__(*exc)
+
+
+def run(
+    cmd: Sequence[str | os.PathLike],
+    **kwargs: Any,  # noqa: ANN401 (same arguments as subprocess.run)
+) -> subprocess.CompletedProcess:
+    """Run an external command as `subprocess.run` does, measuring it."""
+    with SubprocessTimer(cmd) as timer:
+        try:
+            result = subprocess.run(cmd, **kwargs)  # noqa: PLW1510 (check is in kwargs)
+        except subprocess.CalledProcessError as exc:
+            timer.returncode = exc.returncode
+            timer.add_output(exc.stdout)
+            timer.add_output(exc.stderr)
+            raise
+        timer.returncode = result.returncode
+        timer.add_output(result.stdout)
+        timer.add_output(result.stderr)
+    return result
@@ -17,16 +17,26 @@
 """Analyze and lint charm structures and files."""
 import abc
 import ast
+import collections
+import heapq
 import os
 import pathlib
+import posixpath
+import re
 import shlex
+import subprocess
 import typing
-from collections.abc import Generator
+import zipfile
+from collections.abc import Generator, Iterator
 from typing import final
 
 import yaml
+from humanize import naturalsize
 
-from charmcraft import const, utils
+from charmcraft import const, instrum, utils
+from charmcraft.models.charmcraft import AnalysisConfig
+from charmcraft.models.charmcraft import ImportTime as ImportTimeConfig
+from charmcraft.models.charmcraft import PayloadBudget as PayloadBudgetConfig
 from charmcraft.models.lint import CheckResult, CheckType, LintResult
 from charmcraft.models.metadata import CharmMetadataLegacy
 
@@ -75,9 +85,17 @@ class BaseChecker(metaclass=abc.ABCMeta):
     name: str
     url: str
     text: str
+    # structured details of the result, for the checkers that provide them
+    data: dict[str, typing.Any] | None = None
 
     exception_result: str
 
+    # opt-in checkers set this to False, and to True in `configure` when enabled
+    enabled: bool = True
+
+    def configure(self, config: AnalysisConfig) -> None:  # noqa: B027 (optional hook)
+        """Configure the checker from the project's analysis configuration."""
+
     @abc.abstractmethod
     def run(self, basedir: pathlib.Path) -> str:
         """Run this checker."""
@@ -86,18 +104,23 @@ class BaseChecker(metaclass=abc.ABCMeta):
     @final
     def get_result(self, base_dir: pathlib.Path) -> CheckResult:
         """Get the result of a single checker."""
-        try:
-            result = self.run(base_dir)
-        except Exception as exc:
-            result = self.exception_result
-            if not self.text:
-                self.text = str(exc)
+        with instrum.Timer("Running checker", checker=self.name) as timer:
+            try:
+                result = self.run(base_dir)
+            except Exception as exc:
+                result = self.exception_result
+                if not self.text:
+                    self.text = str(exc)
+            # a stat, not extra info, so the phase name is the same whatever the result
+            timer.add_stats(result=str(result))
         return CheckResult(
             check_type=self.check_type,
             name=self.name,
             url=self.url,
             text=self.text,
             result=result,
+            data=self.data,
+            duration=timer.duration,
         )
 
     @final
@@ -272,6 +295,178 @@ class Framework(AttributeChecker):
         return self.result
 
 
+class ImportTime(AttributeChecker):
+    """Measure the time it takes to import the modules used by the charm entrypoint.
+
+    This checker is opt-in, through the ``import-time`` key of the ``analysis`` section
+    in ``charmcraft.yaml``. The modules imported by the entrypoint are imported by an
+    isolated Python interpreter run with ``-X importtime``, using the Python paths set
+    by 'dispatch'; the entrypoint itself is not run, so no charm logic is executed.
+
+    The total import time and the slowest modules (by their own import time) are
+    provided as result data, which is stored in the manifest.
+    """
+
+    name = "import-time"
+    url = BASE_DOCS_URL
+    enabled = False
+
+    class Result:
+        """Possible results for this attribute checker."""
+
+        MEASURED = "measured"
+        UNKNOWN = LintResult.UNKNOWN
+
+    # written to stderr just before importing the entrypoint modules, to leave out
+    # the imports done by the interpreter startup
+    START_MARKER = "charmcraft-import-time-start"
+    # written to stderr (with the module and the error) for each module that fails to import
+    FAILED_MARKER = "charmcraft-import-time-failed"
+
+    def __init__(self):
+        self.text = ""
+        self.config = ImportTimeConfig()
+
+    def configure(self, config: AnalysisConfig) -> None:
+        """Get the settings from the project's analysis configuration."""
+        self.config = config.import_time
+        self.enabled = config.import_time.enabled
+
+    @staticmethod
+    def _get_python_paths(basedir: pathlib.Path) -> list[str]:
+        """Get the PYTHONPATH entries set by 'dispatch', as absolute paths."""
+        pythonpath_re = re.compile(r"PYTHONPATH=(\S+)")
+        try:
+            match = pythonpath_re.search((basedir / const.DISPATCH_FILENAME).read_text())
+        except (OSError, UnicodeDecodeError):
+            match = None
+        if match is None:
+            match = pythonpath_re.search(const.DISPATCH_CONTENT)
+        paths = typing.cast(re.Match, match).group(1).split(":")
+        return [str(basedir / path) for path in paths if path]
+
+    @staticmethod
+    def _get_imported_modules(filepath: pathlib.Path) -> list[str]:
+        """Get the absolute modules imported by a Python file, without duplicates.
+
+        Only the imports at the top level of the module are taken: the ones inside
+        functions are done lazily, and the ones in blocks (e.g. under TYPE_CHECKING,
+        or fallbacks for an ImportError) may not be done at all.
+        """
+        modules: dict[str, None] = {}
+        for node in ast.parse(filepath.read_bytes()).body:
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    modules[alias.name] = None
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                modules[node.module] = None
+        return list(modules)
+
+    def _get_import_code(self, module: str) -> str:
+        """Get the code to import a module, reporting (and surviving) its failure."""
+        return "\n".join(
+            [
+                "try:",
+                f"    import {module}",
+                "except Exception as exc:",
+                "    error = '%s: %s' % (type(exc).__name__, exc)",
+                f"    print({self.FAILED_MARKER!r}, {module!r}, error, file=sys.stderr, flush=True)",
+            ]
+        )
+
+    def _parse_import_failures(self, output: str) -> dict[str, str]:
+        """Get the modules that failed to import, with their errors."""
+        failures = {}
+        for line in output.splitlines():
+            if line.startswith(self.FAILED_MARKER + " "):
+                _, module, error = line.split(" ", 2)
+                failures[module] = error
+        return failures
+
+    def _parse_import_times(self, output: str) -> list[tuple[str, int, int, int]]:
+        """Parse the '-X importtime' output after the start marker.
+
+        :returns: the name, nesting depth, self and cumulative microseconds of each module.
+        """
+        lines = iter(output.splitlines())
+        for line in lines:
+            if line == self.START_MARKER:
+                break
+        modules = []
+        for line in lines:
+            if not line.startswith("import time:"):
+                continue
+            self_us, cumulative_us, name = line.removeprefix("import time:").split("|", 2)
+            if not self_us.strip().isdigit():
+                continue  # the header line
+            stripped_name = name.lstrip(" ")
+            depth = (len(name) - len(stripped_name) - 1) // 2
+            modules.append((stripped_name, depth, int(self_us), int(cumulative_us)))
+        return modules
+
+    def run(self, basedir: pathlib.Path) -> str:
+        """Run the proper verifications."""
+        entrypoint = check_dispatch_with_python_entrypoint(basedir)
+        if entrypoint is None:
+            self.text = "Cannot find a Python entrypoint to analyse."
+            return self.Result.UNKNOWN
+
+        python_paths = [str(entrypoint.parent), *self._get_python_paths(basedir)]
+        script = "\n".join(
+            [
+                "import sys",
+                f"sys.path[:0] = {python_paths!r}",
+                f"print({self.START_MARKER!r}, file=sys.stderr, flush=True)",
+                *(
+                    self._get_import_code(module)
+                    for module in self._get_imported_modules(entrypoint)
+                ),
+            ]
+        )
+        try:
+            proc = instrum.run(
+                ["python3", "-I", "-X", "importtime", "-c", script],
+                cwd=basedir,
+                capture_output=True,
+                text=True,
+                timeout=self.config.timeout,
+                check=False,
+            )
+        except subprocess.TimeoutExpired:
+            self.text = (
+                f"Importing the entrypoint modules took more than {self.config.timeout} seconds."
+            )
+            return self.Result.UNKNOWN
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1:] or [f"exit code {proc.returncode}"]
+            self.text = f"Cannot import the entrypoint modules: {error[0]}"
+            return self.Result.UNKNOWN
+
+        modules = self._parse_import_times(proc.stderr)
+        total_us = sum(cumulative_us for _, depth, _, cumulative_us in modules if depth == 0)
+        slowest = sorted(modules, key=lambda module: module[2], reverse=True)[: self.config.top]
+        self.data = {
+            "total-us": total_us,
+            "modules": [
+                {"name": name, "self-us": self_us, "cumulative-us": cumulative_us}
+                for name, _, self_us, cumulative_us in slowest
+            ],
+        }
+        failures = self._parse_import_failures(proc.stderr)
+        if failures:
+            self.data["failed-modules"] = list(failures)
+        self.text = f"Importing the entrypoint modules takes {total_us / 1000:.1f} ms."
+        if slowest:
+            detail = ", ".join(
+                f"{name} ({self_us / 1000:.1f} ms)" for name, _, self_us, _ in slowest
+            )
+            self.text += f" Slowest modules: {detail}."
+        if failures:
+            detail = ", ".join(f"{module} ({error})" for module, error in failures.items())
+            self.text += f" Could not import: {detail}."
+        return self.Result.MEASURED
+
+
 class JujuMetadata(Linter):
     """Check that the metadata.yaml file exists and is valid.
 
@@ -542,20 +737,57 @@ class AdditionalFiles(Linter):
         )
     }
 
-    def _check_additional_files(self, stage_dir: pathlib.Path, prime_dir: pathlib.Path) -> str:
-        """Compare the staged files with the prime files."""
-        errors: list[str] = []
-        stage_dir = stage_dir.absolute()
-        prime_dir = prime_dir.absolute()
+    # stop walking (and reporting) after this many additional files are found
+    MAX_REPORTED_FILES = 100
 
-        stage_files = {f.relative_to(stage_dir) for f in stage_dir.rglob("*")}
-        prime_files = {f.relative_to(prime_dir) for f in prime_dir.rglob("*")}
+    @staticmethod
+    def _sorted_entries(dirpath: str) -> list[os.DirEntry]:
+        """Get the entries of a directory sorted by name."""
+        with os.scandir(dirpath) as it:
+            return sorted(it, key=lambda entry: entry.name)
+
+    def _iter_additional_files(
+        self, stage_dir: str | None, prime_dir: str, relative: str = ""
+    ) -> Iterator[str]:
+        """Yield the paths (relative to the prime dir) that are in prime but not in stage.
+
+        Both trees are walked simultaneously, one directory level at a time, so the full
+        listing of the trees is never held in memory. Directories that are the very same
+        inode in both trees are not descended into.
+        """
+        stage_entries = self._sorted_entries(stage_dir) if stage_dir is not None else []
+        stage_idx = 0
+        for entry in self._sorted_entries(prime_dir):
+            while stage_idx < len(stage_entries) and stage_entries[stage_idx].name < entry.name:
+                stage_idx += 1
+            staged = None
+            if stage_idx < len(stage_entries) and stage_entries[stage_idx].name == entry.name:
+                staged = stage_entries[stage_idx]
+
+            relpath = os.path.join(relative, entry.name)
+            if staged is None and pathlib.Path(relpath) not in self.IGNORE_FILES:
+                yield relpath
+
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            if staged is None or not staged.is_dir(follow_symlinks=False):
+                yield from self._iter_additional_files(None, entry.path, relpath)
+            elif not os.path.samestat(
+                entry.stat(follow_symlinks=False), staged.stat(follow_symlinks=False)
+            ):
+                yield from self._iter_additional_files(staged.path, entry.path, relpath)
 
-        prime_files = prime_files - self.IGNORE_FILES
+    def _check_additional_files(self, stage_dir: pathlib.Path, prime_dir: pathlib.Path) -> str:
+        """Compare the staged files with the prime files."""
+        if os.path.samestat(stage_dir.stat(), prime_dir.stat()):
+            return self.Result.OK
 
-        for prime_file in prime_files:
-            if prime_file not in stage_files:
-                errors.append(f"File '{prime_file}' is not staged but in the charm.")
+        errors: list[str] = []
+        for prime_file in self._iter_additional_files(str(stage_dir), str(prime_dir)):
+            if len(errors) == self.MAX_REPORTED_FILES:
+                errors.append(f"(only the first {self.MAX_REPORTED_FILES} files are listed)")
+                break
+            errors.append(f"File '{prime_file}' is not staged but in the charm.")
 
         if errors:
             self.text = "Error: Additional files found in the charm:\n" + "\n".join(errors)
@@ -574,6 +806,154 @@ class AdditionalFiles(Linter):
         return self._check_additional_files(stage_dir, basedir)
 
 
+class PayloadBudget(Linter):
+    """Check the size of the charm payload.
+
+    It reports the total size, the compressed size, the number of files and directories,
+    and the largest files and Python packages (those under ``venv/``). The result is a
+    warning or an error if any of the thresholds configured in the ``payload-budget``
+    key of the ``analysis`` section in ``charmcraft.yaml`` is exceeded.
+
+    If the packed charm file is available, all figures are taken from the zip central
+    directory, without extracting anything. Otherwise the directory is walked and the
+    compressed size is unknown.
+    """
+
+    name = "payload-budget"
+    url = BASE_DOCS_URL
+
+    def __init__(self):
+        self.text = ""
+        self.budget = PayloadBudgetConfig()
+        self.charm_file: pathlib.Path | None = None
+
+    def configure(self, config: AnalysisConfig) -> None:
+        """Get the thresholds from the project's analysis configuration."""
+        self.budget = config.payload_budget
+
+    def _iter_zip_entries(self, charm_file: pathlib.Path) -> Iterator[tuple[str, int, int | None]]:
+        """Yield the path, size and compressed size of each file in the charm file."""
+        with zipfile.ZipFile(charm_file) as zip_file:
+            for info in zip_file.infolist():
+                if not info.is_dir():
+                    yield info.filename, info.file_size, info.compress_size
+
+    def _iter_dir_entries(self, basedir: pathlib.Path) -> Iterator[tuple[str, int, int | None]]:
+        """Yield the path and size of each file in the directory.
+
+        Symlinks are not followed (so a link loop can't make the walk endless): each one,
+        even if pointing to a directory, is counted as a single inode with its own size.
+        """
+        for dirpath, dirnames, filenames in os.walk(basedir, followlinks=False):
+            reldir = pathlib.PurePath(dirpath).relative_to(basedir).as_posix()
+            dir_links = [name for name in dirnames if pathlib.Path(dirpath, name).is_symlink()]
+            for filename in filenames + dir_links:
+                size = os.lstat(os.path.join(dirpath, filename)).st_size
+                yield posixpath.normpath(posixpath.join(reldir, filename)), size, None
+
+    def _check_threshold(
+        self,
+        title: str,
+        value: int,
+        warning: int | None,
+        error: int | None,
+        fmt: typing.Callable[[int], str],
+    ) -> tuple[str, str] | None:
+        """Compare a value with its thresholds; return the result and its explanation."""
+        if error is not None and value > error:
+            return self.Result.ERROR, f"{title} {fmt(value)} is over the limit of {fmt(error)}"
+        if warning is not None and value > warning:
+            return self.Result.WARNING, f"{title} {fmt(value)} is over {fmt(warning)}"
+        return None
+
+    def run(self, basedir: pathlib.Path) -> str:
+        """Run the proper verifications."""
+        if self.charm_file is None:
+            entries = self._iter_dir_entries(basedir)
+        else:
+            entries = self._iter_zip_entries(self.charm_file)
+
+        total_size = 0
+        compressed_size: int | None = 0
+        file_count = 0
+        directories: set[str] = set()
+        largest_files: list[tuple[int, str]] = []  # a min-heap of the largest files
+        packages: collections.Counter[str] = collections.Counter()
+        for path, size, compressed in entries:
+            file_count += 1
+            total_size += size
+            if compressed is None or compressed_size is None:
+                compressed_size = None
+            else:
+                compressed_size += compressed
+            parent = posixpath.dirname(path)
+            while parent and parent not in directories:
+                directories.add(parent)
+                parent = posixpath.dirname(parent)
+            if len(largest_files) < self.budget.top:
+                heapq.heappush(largest_files, (size, path))
+            else:
+                heapq.heappushpop(largest_files, (size, path))
+            top_dir, _, subpath = path.partition("/")
+            if top_dir == const.VENV_DIRNAME and "/" in subpath:
+                packages[subpath.partition("/")[0]] += size
+        inode_count = file_count + len(directories)
+
+        def _fmt_size(value: int) -> str:
+            return naturalsize(value, binary=True)
+
+        def _fmt_count(value: int) -> str:
+            return f"{value} files and directories"
+
+        checks = [
+            ("Size", total_size, self.budget.warning_size, self.budget.error_size, _fmt_size),
+            (
+                "Inode count",
+                inode_count,
+                self.budget.warning_files,
+                self.budget.error_files,
+                _fmt_count,
+            ),
+        ]
+        summary = f"Payload of {_fmt_size(total_size)}"
+        if compressed_size is not None:
+            summary += f" ({_fmt_size(compressed_size)} compressed)"
+            checks.append(
+                (
+                    "Compressed size",
+                    compressed_size,
+                    self.budget.warning_compressed_size,
+                    self.budget.error_compressed_size,
+                    _fmt_size,
+                )
+            )
+        lines = [f"{summary} in {_fmt_count(inode_count)}."]
+        if largest_files:
+            heavy = ", ".join(
+                f"{path} ({_fmt_size(size)})" for size, path in sorted(largest_files, reverse=True)
+            )
+            lines.append(f"Largest files: {heavy}.")
+        if packages:
+            heavy = ", ".join(
+                f"{name} ({_fmt_size(size)})"
+                for name, size in packages.most_common(self.budget.top)
+            )
+            lines.append(f"Largest packages: {heavy}.")
+
+        result = self.Result.OK
+        for title, value, warning, error, fmt in checks:
+            exceeded = self._check_threshold(title, value, warning, error, fmt)
+            if exceeded is None:
+                continue
+            level, explanation = exceeded
+            lines.insert(0, f"{explanation}.")
+            if level == self.Result.ERROR or result == self.Result.OK:
+                result = level
+
+        self.text = "\n".join(lines)
+        return result
+
+
 # all checkers to run; the order here is important, as some checkers depend on the
 # results from others
 CHECKERS: list[type[BaseChecker]] = [
@@ -585,4 +965,6 @@ CHECKERS: list[type[BaseChecker]] = [
     Framework,
     Entrypoint,
     AdditionalFiles,
+    PayloadBudget,
+    ImportTime,
 ]
@@ -0,0 +1,503 @@
+# Copyright 2024 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# For further info, check https://github.com/canonical/charmcraft
+
+"""Analysis and history of the measurements done when packing."""
+
+import dataclasses
+import datetime
+import json
+import pathlib
+import sqlite3
+import statistics
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any
+from xml.sax.saxutils import escape
+
+from craft_cli import CraftError, emit
+from typing_extensions import Self
+
+import charmcraft
+from charmcraft import env, instrum
+
+# the file, in the shared cache directory, with the history of the measured runs
+HISTORY_FILENAME = "build-history.sqlite3"
+
+# the name of the phase with the duration of the whole run
+TOTAL_PHASE = "Total"
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project TEXT NOT NULL,
+        platform TEXT NOT NULL,
+        charmcraft_version TEXT NOT NULL,
+        started_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS runs_by_key ON runs (project, platform, charmcraft_version);
+    CREATE TABLE IF NOT EXISTS phases (
+        run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+        name TEXT NOT NULL,
+        duration REAL NOT NULL,
+        PRIMARY KEY (run_id, name)
+    );
+"""
+
+
+def get_phase_name(measurement: Mapping[str, Any]) -> str:
+    """Get the name of the phase of a measurement, from its message and extra info.
+
+    The process is included if known, as the same message may be measured in
+    different processes (e.g. in different managed instances).
+    """
+    name = instrum.get_phase_name(measurement["msg"], measurement["extra"])
+    if measurement.get("process"):
+        name = f"{measurement['process']}: {name}"
+    return name
+
+
+def get_phases(measurements: Mapping[str, Mapping[str, Any]]) -> dict[str, float]:
+    """Get the duration of each phase from the (dumped format) measurements of a run.
+
+    Measurements with the same phase name are added together, and the ongoing ones
+    are ignored. The whole span of the measurements is included as the total phase.
+    """
+    phases: dict[str, float] = {}
+    start = end = None
+    for measurement_id, measurement in measurements.items():
+        if measurement_id == "__meta__" or measurement["tend"] is None:
+            continue
+        name = get_phase_name(measurement)
+        duration = measurement["tend"] - measurement["tstart"]
+        phases[name] = phases.get(name, 0) + duration
+        start = measurement["tstart"] if start is None else min(start, measurement["tstart"])
+        end = measurement["tend"] if end is None else max(end, measurement["tend"])
+    if start is not None and end is not None:
+        phases[TOTAL_PHASE] = end - start
+    return phases
+
+
+@dataclasses.dataclass
+class Node:
+    """A measurement in the tree of measurements of a run.
+
+    Ongoing measurements are considered to end when the last measurement ended.
+    """
+
+    name: str
+    start: float
+    end: float
+    process: str | None = None
+    ongoing: bool = False
+    depth: int = 0
+    children: list["Node"] = dataclasses.field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        """The duration of the measurement, in seconds."""
+        return self.end - self.start
+
+    @property
+    def self_time(self) -> float:
+        """The time spent in the measurement but not in any of its children.
+
+        Children overlapping in time (e.g. run in different threads) are only
+        accounted once.
+        """
+        covered = 0.0
+        cursor = self.start
+        for child in sorted(self.children, key=lambda node: node.start):
+            start = max(child.start, cursor)
+            end = min(child.end, self.end)
+            if end > start:
+                covered += end - start
+                cursor = end
+        return self.duration - covered
+
+    def walk(self) -> Iterator["Node"]:
+        """Iterate over this node and all its descendants, depth first."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def get_tree(measurements: Mapping[str, Mapping[str, Any]]) -> list[Node]:
+    """Build the tree of measurements from their dumped format, returning its roots.
+
+    Siblings are sorted by start time.
+    """
+    items = {mid: data for mid, data in measurements.items() if mid != "__meta__"}
+    last_end = max(
+        (data["tend"] if data["tend"] is not None else data["tstart"] for data in items.values()),
+        default=0,
+    )
+    nodes = {
+        mid: Node(
+            name=get_phase_name(data),
+            start=data["tstart"],
+            end=last_end if data["tend"] is None else data["tend"],
+            process=data.get("process"),
+            ongoing=data["tend"] is None,
+        )
+        for mid, data in items.items()
+    }
+    roots = []
+    for mid, data in items.items():
+        parent = nodes.get(data["parent"]) if data["parent"] is not None else None
+        if parent is None:
+            roots.append(nodes[mid])
+        else:
+            parent.children.append(nodes[mid])
+
+    def _sort(siblings: list[Node], depth: int) -> None:
+        siblings.sort(key=lambda node: node.start)
+        for node in siblings:
+            node.depth = depth
+            _sort(node.children, depth + 1)
+
+    _sort(roots, 0)
+    return roots
+
+
+def _get_critical_chain(nodes: list[Node], end: float) -> list[Node]:
+    """Get the chain of sibling nodes that gates reaching the given end time.
+
+    Walking back from the end, the node ending last is the one that was being waited
+    for; before it started, the node ending last before that, and so on.
+    """
+    chain = []
+    limit = end
+    candidates = sorted(nodes, key=lambda node: node.end)
+    while candidates:
+        # tolerate rounding errors in the dumped times
+        ended = [node for node in candidates if node.end <= limit + 1e-6]
+        if not ended:
+            break
+        node = ended[-1]
+        chain.append(node)
+        limit = node.start
+        candidates = [candidate for candidate in ended[:-1] if candidate.end <= limit + 1e-6]
+    return chain[::-1]
+
+
+def get_critical_path(roots: list[Node]) -> list[Node]:
+    """Get the measurements in the critical path of a run, in chronological order.
+
+    The critical path is the chain of measurements that determined the duration of
+    the run: nested measurements are expanded right after their parent, so only the
+    branches actually waited for are included (e.g. the slowest of several
+    measurements done concurrently).
+    """
+    path = []
+
+    def _expand(nodes: list[Node], end: float) -> None:
+        for node in _get_critical_chain(nodes, end):
+            path.append(node)
+            _expand(node.children, node.end)
+
+    if roots:
+        _expand(roots, max(root.end for root in roots))
+    return path
+
+
+@dataclasses.dataclass(frozen=True)
+class SelfTime:
+    """The aggregated self time of all the measurements of a phase."""
+
+    name: str
+    count: int
+    self_time: float
+    total_time: float
+
+
+def get_self_times(roots: list[Node]) -> list[SelfTime]:
+    """Get the self time of each phase in a run, sorted with the biggest first."""
+    aggregated: dict[str, list] = {}
+    for root in roots:
+        for node in root.walk():
+            entry = aggregated.setdefault(node.name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += node.self_time
+            entry[2] += node.duration
+    self_times = [SelfTime(name, *values) for name, values in aggregated.items()]
+    return sorted(self_times, key=lambda item: (-item.self_time, item.name))
+
+
+# the palette for the measurements in the SVG chart, one color per process
+_SVG_COLORS = ["#e95420", "#0e8420", "#335280", "#c7162b", "#f99b11", "#772953"]
+_SVG_ROW_HEIGHT = 20
+_SVG_FONT_SIZE = 12
+
+
+def render_svg(roots: list[Node], *, width: int = 1200) -> str:
+    """Render the tree of measurements as an icicle chart in a static SVG document.
+
+    Each measurement is a box as wide as its duration, under its parent; hovering
+    over a box shows its full name and duration.
+    """
+    nodes = [node for root in roots for node in root.walk()]
+    if nodes:
+        start = min(node.start for node in nodes)
+        span = max(node.end for node in nodes) - start or 1
+        depth = max(node.depth for node in nodes) + 1
+    else:
+        start, span, depth = 0, 1, 0
+    height = depth * _SVG_ROW_HEIGHT
+    colors: dict[str | None, str] = {}
+
+    elements = []
+    for node in nodes:
+        color = colors.setdefault(node.process, _SVG_COLORS[len(colors) % len(_SVG_COLORS)])
+        x = (node.start - start) / span * width
+        box_width = max(node.duration / span * width, 0.5)
+        y = node.depth * _SVG_ROW_HEIGHT
+        title = f"{node.name}: {node.duration:.3f}s" + (" (ongoing)" if node.ongoing else "")
+        elements.append(
+            f"<g><title>{escape(title)}</title>"
+            f'<rect x="{x:.2f}" y="{y}" width="{box_width:.2f}" height="{_SVG_ROW_HEIGHT - 1}" '
+            f'fill="{color}" stroke="white" stroke-width="0.5"/>'
+        )
+        # only label the boxes wide enough for some text, cropped to the box
+        max_chars = int((box_width - 6) / (_SVG_FONT_SIZE * 0.6))
+        if max_chars >= 4:
+            label = node.name if len(node.name) <= max_chars else node.name[: max_chars - 1] + "…"
+            elements.append(
+                f'<text x="{x + 3:.2f}" y="{y + _SVG_ROW_HEIGHT - 6}">{escape(label)}</text>'
+            )
+        elements.append("</g>")
+
+    header = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="monospace" '
+        f'font-size="{_SVG_FONT_SIZE}" fill="white">'
+    )
+    return "\n".join([header, *elements, "</svg>", ""])
+
+
+def load_tree(path: pathlib.Path) -> list[Node]:
+    """Load the tree of measurements from a file dumped with `pack --measure`."""
+    try:
+        measurements = json.loads(path.read_text())
+    except OSError as exc:
+        raise CraftError(f"Cannot read the measurements file {str(path)!r}: {exc}") from exc
+    except json.JSONDecodeError as exc:
+        raise CraftError(f"Invalid measurements file {str(path)!r}: {exc}") from exc
+    if not isinstance(measurements, dict) or "__meta__" not in measurements:
+        raise CraftError(
+            f"Invalid measurements file {str(path)!r}.",
+            resolution="Use a file dumped by 'charmcraft pack --measure' in the JSON format.",
+        )
+    return get_tree(measurements)
+
+
+def get_median_phases(runs: Iterable["Run"]) -> dict[str, float]:
+    """Get the median duration of each phase across several runs.
+
+    Each phase median is calculated among the runs that include it.
+    """
+    durations: dict[str, list[float]] = {}
+    for run in runs:
+        for name, duration in run.phases.items():
+            durations.setdefault(name, []).append(duration)
+    return {name: statistics.median(values) for name, values in durations.items()}
+
+
+@dataclasses.dataclass(frozen=True)
+class Run:
+    """A measured run stored in the history."""
+
+    id: int
+    project: str
+    platform: str
+    charmcraft_version: str
+    started_at: str
+    phases: dict[str, float]
+
+
+@dataclasses.dataclass(frozen=True)
+class PhaseComparison:
+    """The comparison of a phase duration between a base and a target."""
+
+    name: str
+    base: float | None
+    target: float | None
+    slower: bool = False
+
+    @property
+    def delta(self) -> float | None:
+        """How much longer (in seconds) the phase took in the target."""
+        if self.base is None or self.target is None:
+            return None
+        return self.target - self.base
+
+    @property
+    def change(self) -> float | None:
+        """How much longer the phase took in the target, relative to the base."""
+        if self.delta is None or not self.base:
+            return None
+        return self.delta / self.base
+
+
+def compare_phases(
+    base: Mapping[str, float],
+    target: Mapping[str, float],
+    *,
+    threshold: float,
+    min_delta: float,
+) -> list[PhaseComparison]:
+    """Compare the phases durations of a target against a base.
+
+    A phase is flagged as slower if it took longer in the target by at least
+    `threshold` (relative to the base) and by at least `min_delta` seconds, so
+    short phases jittering do not get flagged. The result is sorted with the
+    biggest slowdowns first, and the phases only in the base or the target last.
+    """
+    comparisons = []
+    for name in {**base, **target}:
+        comparison = PhaseComparison(name=name, base=base.get(name), target=target.get(name))
+        if comparison.delta is not None and comparison.delta >= min_delta:
+            if comparison.change is None or comparison.change >= threshold:
+                comparison = dataclasses.replace(comparison, slower=True)
+        comparisons.append(comparison)
+
+    def _sort_key(comparison: PhaseComparison) -> tuple[bool, float, str]:
+        delta = comparison.delta
+        return (delta is None, -delta if delta is not None else 0, comparison.name)
+
+    return sorted(comparisons, key=_sort_key)
+
+
+class BuildHistory:
+    """The history of the measured runs, stored in a SQLite database.
+
+    Each run is keyed by the project, platform and Charmcraft version, and holds the
+    duration of each phase.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # a generous timeout, as several Charmcraft processes may be recording at once
+        self._connection = sqlite3.connect(path, timeout=30)
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def add_run(
+        self,
+        *,
+        project: str,
+        platform: str,
+        phases: Mapping[str, float],
+        charmcraft_version: str = charmcraft.__version__,
+        started_at: datetime.datetime | None = None,
+    ) -> int:
+        """Store a run with its phases durations, returning its id."""
+        if started_at is None:
+            started_at = datetime.datetime.now(tz=datetime.timezone.utc)
+        with self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO runs (project, platform, charmcraft_version, started_at) "
+                "VALUES (?, ?, ?, ?)",
+                (project, platform, charmcraft_version, started_at.isoformat(timespec="seconds")),
+            )
+            run_id = cursor.lastrowid
+            self._connection.executemany(
+                "INSERT INTO phases (run_id, name, duration) VALUES (?, ?, ?)",
+                [(run_id, name, duration) for name, duration in phases.items()],
+            )
+        return run_id
+
+    def _get_runs(self, query: str, params: Iterable[Any]) -> list[Run]:
+        """Get the runs (with their phases) selected by a query on the runs table."""
+        rows = self._connection.execute(
+            "SELECT id, project, platform, charmcraft_version, started_at FROM runs " + query,
+            tuple(params),
+        ).fetchall()
+        runs = []
+        for row in rows:
+            phases = dict(
+                self._connection.execute(
+                    "SELECT name, duration FROM phases WHERE run_id = ?", (row[0],)
+                ).fetchall()
+            )
+            runs.append(Run(*row, phases=phases))
+        return runs
+
+    def get_run(self, run_id: int) -> Run:
+        """Get a run by its id."""
+        runs = self._get_runs("WHERE id = ?", [run_id])
+        if not runs:
+            raise CraftError(
+                f"Run {run_id} not found in the build history.",
+                resolution="Use 'charmcraft measure-compare --list' to see the stored runs.",
+            )
+        return runs[0]
+
+    def list_runs(
+        self, *, project: str | None = None, platform: str | None = None, limit: int = 20
+    ) -> list[Run]:
+        """Get the latest runs, optionally filtered by project and platform."""
+        conditions = []
+        params: list[Any] = []
+        if project is not None:
+            conditions.append("project = ?")
+            params.append(project)
+        if platform is not None:
+            conditions.append("platform = ?")
+            params.append(platform)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        params.append(limit)
+        return self._get_runs(where + "ORDER BY id DESC LIMIT ?", params)
+
+    def get_previous_runs(self, run: Run, limit: int) -> list[Run]:
+        """Get the runs before the given one for the same project and platform.
+
+        Runs done with other Charmcraft versions are included, so regressions between
+        versions can be spotted.
+        """
+        return self._get_runs(
+            "WHERE project = ? AND platform = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            [run.project, run.platform, run.id, limit],
+        )
+
+
+def get_history_path() -> pathlib.Path:
+    """Get the path of the build history database."""
+    return env.get_host_shared_cache_path() / HISTORY_FILENAME
+
+
+def record_run(project: str, platform: str) -> None:
+    """Store the phases of the measurements done (or merged) in this process.
+
+    Failing to store the run is not fatal for the run itself.
+    """
+    phases = get_phases(instrum.get_measurements())
+    try:
+        with BuildHistory(get_history_path()) as history:
+            run_id = history.add_run(project=project, platform=platform, phases=phases)
+    except (OSError, sqlite3.Error) as exc:
+        emit.debug(f"Could not record the measurements in the build history: {exc!r}")
+        return
+    emit.debug(f"Measurements recorded in the build history as run {run_id}")
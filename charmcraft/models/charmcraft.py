@@ -104,10 +104,38 @@ class Ignore(CraftBaseModel):
     linters: list[LinterName] = []
 
 
+class PayloadBudget(CraftBaseModel):
+    """Definition of `analysis.payload-budget` configuration.
+
+    Sizes are in bytes. Thresholds set to null are not checked.
+    """
+
+    warning_size: pydantic.NonNegativeInt | None = 100 * 1024 * 1024
+    error_size: pydantic.NonNegativeInt | None = None
+    warning_compressed_size: pydantic.NonNegativeInt | None = None
+    error_compressed_size: pydantic.NonNegativeInt | None = None
+    warning_files: pydantic.NonNegativeInt | None = 20000
+    error_files: pydantic.NonNegativeInt | None = None
+    top: pydantic.PositiveInt = 5
+
+
+class ImportTime(CraftBaseModel):
+    """Definition of `analysis.import-time` configuration.
+
+    The import time analysis is opt-in, as it runs a Python interpreter on the charm.
+    """
+
+    enabled: bool = False
+    top: pydantic.PositiveInt = 10
+    timeout: pydantic.PositiveFloat = 60.0
+
+
 class AnalysisConfig(CraftBaseModel):
     """Definition of `analysis` configuration."""
 
     ignore: Ignore = Ignore()
+    payload_budget: PayloadBudget = PayloadBudget()
+    import_time: ImportTime = ImportTime()
 
 
 class Links(CraftBaseModel):
@@ -15,7 +15,7 @@
 # For further info, check https://github.com/canonical/charmcraft
 """Models for linters."""
 import enum
-from typing import final
+from typing import Any, final
 
 from pydantic import dataclasses
 
@@ -84,6 +84,8 @@ class CheckResult:
     url: str
     check_type: CheckType
     text: str
+    data: dict[str, Any] | None = None
+    duration: float | None = None
 
     @property
     def level(self) -> ResultLevel:
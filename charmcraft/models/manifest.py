@@ -27,6 +27,7 @@ class Attribute(models.BaseMetadata):
 
     name: str
     result: str
+    data: dict[str, Any] | None = None
 
 
 class Manifest(models.BaseMetadata):
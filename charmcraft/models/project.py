@@ -393,7 +393,8 @@ class CharmcraftProject(models.Project, metaclass=abc.ABCMeta):
             """\
             How analysis done on the charm will behave.
 
-            Currently the only options are to ignore attributes or linters."""
+            The options are to ignore attributes or linters, to set the thresholds
+            of the payload-budget linter and to enable the import-time attribute."""
         ),
     )
     charmhub: Charmhub | None = pydantic.Field(
@@ -96,12 +96,17 @@ class PartsLifecycle:
             emit.debug(f"Executing parts lifecycle in {str(self._project_dir)!r}")
             actions = self._lcm.plan(target_step)
             emit.debug(f"Parts actions: {actions}")
-            with instrum.Timer("Running action executor") as executor_timer:
+            with instrum.Timer("Running action executor", with_resources=True) as executor_timer:
                 with self._lcm.action_executor() as aex:
                     executor_timer.mark("Context enter")
                     for act in actions:
                         emit.progress(f"Running step {act.step.name} for part {act.part_name!r}")
-                        with instrum.Timer("Running step", step=act.step.name, part=act.part_name):  # type: ignore[arg-type]
+                        with instrum.Timer(
+                            "Running step",
+                            with_resources=True,
+                            step=act.step.name,  # type: ignore[arg-type]
+                            part=act.part_name,  # type: ignore[arg-type]
+                        ):
                             with emit.open_stream("Execute action") as stream:
                                 aex.execute([act], stdout=stream, stderr=stream)
                     executor_timer.mark("Context exit")
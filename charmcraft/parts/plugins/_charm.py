@@ -30,7 +30,7 @@ from craft_parts.packages import platform
 from craft_parts.utils import os_utils
 from typing_extensions import Self
 
-from charmcraft import charm_builder, env, instrum
+from charmcraft import charm_builder, const, env, instrum
 
 PACKAGE_NAME_REGEX = re.compile(r"[A-Za-z0-9_.-]+")
 
@@ -267,6 +267,12 @@ class CharmPlugin(plugins.Plugin):
         if os_special_paths:
             build_env["PATH"] = os_special_paths + ":" + build_env["PATH"]
 
+        # profile the charm builder too, if profiling this process
+        if instrum.is_profiling():
+            build_env[const.PROFILE_ENV_VAR] = "1"
+        if instrum.is_recording_all_resources():
+            build_env[const.ALL_RESOURCES_ENV_VAR] = "1"
+
         env_flags = [f"{key}={value}" for key, value in build_env.items()]
 
         # invoke the charm builder
@@ -282,6 +288,8 @@ class CharmPlugin(plugins.Plugin):
             str(self._part_info.part_build_dir),
             "--installdir",
             str(self._part_info.part_install_dir),
+            "--metrics-file",
+            str(env.get_charm_builder_metrics_path(self._part_info.part_name)),
         ]
 
         if options.charm_entrypoint:
@@ -347,8 +355,13 @@ class CharmPlugin(plugins.Plugin):
         return parameters
 
     def post_build_callback(self, step_info):
-        """Collect metrics left by charm_builder.py."""
-        instrum.merge_from(env.get_charm_builder_metrics_path())
+        """Collect metrics left by charm_builder.py.
+
+        The callback runs after building any part, so all the metrics left so far are
+        collected (and removed, not to collect them again), whatever part they are for.
+        """
+        for metrics_path in env.get_charm_builder_metrics_paths():
+            instrum.merge_from(metrics_path, remove=True)
 
     def _get_os_special_priority_paths(self) -> str | None:
         """Return a str of PATH for special OS."""
@@ -15,6 +15,7 @@
 """Charmcraft's reactive plugin for craft-parts."""
 
 import json
+import os
 import shlex
 import subprocess
 import sys
@@ -22,9 +23,11 @@ from pathlib import Path
 from typing import Literal, cast
 
 import overrides
-from craft_parts import plugins
+from craft_parts import Step, callbacks, plugins
 from craft_parts.errors import PluginEnvironmentValidationError
 
+from charmcraft import const, env, instrum
+
 
 class ReactivePluginProperties(plugins.PluginProperties, frozen=True):
     """Properties used to pack reactive charms using charm-tools."""
@@ -105,11 +108,21 @@ class ReactivePlugin(plugins.Plugin):
 
     def get_build_environment(self) -> dict[str, str]:
         """Return a dictionary with the environment to use in the build step."""
-        return {
+        environment = {
             # Cryptography fails to load OpenSSL legacy provider in some circumstances.
             # Since we don't need the legacy provider, this works around that bug.
-            "CRYPTOGRAPHY_OPENSSL_NO_LEGACY": "true"
+            "CRYPTOGRAPHY_OPENSSL_NO_LEGACY": "true",
+            # where the build leaves its measurements, for the post-build callback
+            const.METRICS_FILE_ENV_VAR: str(
+                env.get_charm_builder_metrics_path(self._part_info.part_name)
+            ),
         }
+        # profile the build too, if profiling this process
+        if instrum.is_profiling():
+            environment[const.PROFILE_ENV_VAR] = "1"
+        if instrum.is_recording_all_resources():
+            environment[const.ALL_RESOURCES_ENV_VAR] = "1"
+        return environment
 
     def get_build_commands(self) -> list[str]:
         """Return a list of commands to run during the build step."""
@@ -130,8 +143,21 @@ class ReactivePlugin(plugins.Plugin):
         # Expand any such strings as we add them to the command.
         for arg in options.reactive_charm_build_arguments:
             command.extend(shlex.split(arg))
+
+        # hook a callback after the BUILD happened (to collect metrics left by the build)
+        callbacks.register_post_step(self.post_build_callback, step_list=[Step.BUILD])
+
         return [" ".join(shlex.quote(i) for i in command)]
 
+    def post_build_callback(self, step_info):
+        """Collect metrics left by the build.
+
+        The callback runs after building any part, so all the metrics left so far are
+        collected (and removed, not to collect them again), whatever part they are for.
+        """
+        for metrics_path in env.get_charm_builder_metrics_paths():
+            instrum.merge_from(metrics_path, remove=True)
+
 
 def run_charm_tool(args: list[str]):
     """Run the charm tool, log and check exit code."""
@@ -140,7 +166,7 @@ def run_charm_tool(args: list[str]):
 
     print(f"charm tool execution command={args}")
     try:
-        completed_process = subprocess.run(args, check=True)
+        completed_process = instrum.run(args, check=True)
     except subprocess.CalledProcessError as call_error:
         exc = call_error
         if call_error.returncode < 100 or call_error.returncode >= 200:
@@ -203,10 +229,18 @@ def build(
 
 
 if __name__ == "__main__":
-    returncode = build(
-        charm_name=sys.argv[1],
-        build_dir=Path(sys.argv[2]),
-        install_dir=Path(sys.argv[3]),
-        charm_build_arguments=sys.argv[4:],
-    )
+    instrum.set_process("reactive build")
+    if os.environ.get(const.PROFILE_ENV_VAR):
+        instrum.start_profiling()
+    if os.environ.get(const.ALL_RESOURCES_ENV_VAR):
+        instrum.record_all_resources()
+    with instrum.Timer("Building reactive charm", with_resources=True):
+        returncode = build(
+            charm_name=sys.argv[1],
+            build_dir=Path(sys.argv[2]),
+            install_dir=Path(sys.argv[3]),
+            charm_build_arguments=sys.argv[4:],
+        )
+    if metrics_file := os.environ.get(const.METRICS_FILE_ENV_VAR):
+        instrum.dump(metrics_file)
     sys.exit(returncode)
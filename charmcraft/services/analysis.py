@@ -17,14 +17,18 @@
 """Service class for packing."""
 from __future__ import annotations
 
+import hashlib
+import os
 import pathlib
 import tempfile
 import zipfile
-from collections.abc import Container, Iterator
+from collections.abc import Container, Hashable, Iterable, Iterator
 
 import craft_application
+from craft_cli import emit
 
-from charmcraft import errors, linters, models
+from charmcraft import const, errors, linters, models
+from charmcraft.models.charmcraft import AnalysisConfig
 from charmcraft.models.lint import CheckResult
 
 
@@ -37,56 +41,178 @@ class AnalysisService(craft_application.AppService):
         self, app: craft_application.AppMetadata, services: craft_application.ServiceFactory
     ) -> None:
         super().__init__(app, services)
+        # all the results (including ignored ones) of the lint runs done in this process
+        self._lint_cache: dict[tuple[Hashable, ...], list[CheckResult]] = {}
+
+    @staticmethod
+    def _get_fingerprint(path: pathlib.Path) -> str:
+        """Get a fingerprint of a directory tree, from the names and stats of its entries.
+
+        The charm manifest is left out, as it's written from the lint results.
+        """
+        digest = hashlib.sha256()
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            reldir = os.path.relpath(dirpath, path)
+            for name in sorted(dirnames + filenames):
+                if reldir == os.curdir and name == const.MANIFEST_FILENAME:
+                    continue
+                stat = os.lstat(os.path.join(dirpath, name))
+                entry = f"{reldir}/{name}\0{stat.st_mode}\0{stat.st_size}\0{stat.st_mtime_ns}\n"
+                digest.update(entry.encode("utf8", "surrogateescape"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _get_cache_key(
+        target: Hashable, ignore: Container[str], config: AnalysisConfig | None
+    ) -> tuple[Hashable, ...]:
+        """Get the key to memoize the results of linting a target with some settings."""
+        ignore_key = frozenset(ignore) if isinstance(ignore, Iterable) else ignore
+        config_key = None if config is None else config.model_dump_json()
+        return (target, ignore_key, config_key)
+
+    @staticmethod
+    def _filter_results(
+        results: Iterable[CheckResult], ignore: Container[str], include_ignored: bool
+    ) -> Iterator[CheckResult]:
+        """Filter out the results of the ignored checkers if not included."""
+        for result in results:
+            if include_ignored or result.name not in ignore:
+                yield result
 
     def lint_directory(
-        self, path: pathlib.Path, *, ignore: Container[str] = (), include_ignored: bool = True
+        self,
+        path: pathlib.Path,
+        *,
+        ignore: Container[str] = (),
+        include_ignored: bool = True,
+        config: AnalysisConfig | None = None,
+        charm_file: pathlib.Path | None = None,
     ) -> Iterator[CheckResult]:
-        """Lint an unpacked charm in the given directory."""
-        for checker, run in self._gen_checkers(ignore=ignore):
-            if run:
-                yield checker.get_result(path)
-            elif include_ignored:
-                yield checker.get_ignore_result()
+        """Lint an unpacked charm in the given directory.
+
+        The results are memoized for the process, so linting the same (unchanged)
+        directory with the same settings again does not run the checkers again.
+
+        :param path: The path to the directory
+        :param ignore: a list of checker names to ignore.
+        :param include_ignored: Whether to include ignored values in the output
+        :param config: The analysis configuration of the project, if any.
+        :param charm_file: The charm file the directory was unpacked from, if any.
+        """
+        cache_key = self._get_cache_key((self._get_fingerprint(path), charm_file), ignore, config)
+        if cache_key in self._lint_cache:
+            emit.debug(f"Reusing the lint results for {str(path)!r}")
+            yield from self._filter_results(self._lint_cache[cache_key], ignore, include_ignored)
+            return
+
+        results = []
+        checkers = self._gen_checkers(ignore=ignore, config=config, charm_file=charm_file)
+        for checker, run in checkers:
+            result = checker.get_result(path) if run else checker.get_ignore_result()
+            results.append(result)
+            if run or include_ignored:
+                yield result
+        self._lint_cache[cache_key] = results
 
     def lint_file(
-        self, path: pathlib.Path, *, ignore: Container[str] = (), include_ignored: bool = True
+        self,
+        path: pathlib.Path,
+        *,
+        ignore: Container[str] = (),
+        include_ignored: bool = True,
+        config: AnalysisConfig | None = None,
     ) -> Iterator[CheckResult]:
         """Lint a packed charm.
 
+        The results are memoized for the process, so linting the same (unchanged)
+        file with the same settings again does not even extract it.
+
         :param path: The path to the file
         :param ignore: a list of checker names to ignore.
         :param include_ignored: Whether to include ignored values in the output
+        :param config: The analysis configuration of the project, if any.
 
         raises: FileNotFoundError if the file doesn't exist
         """
         path = path.resolve(strict=True)
+        stat = path.stat()
+        cache_key = self._get_cache_key(
+            (str(path), stat.st_size, stat.st_mtime_ns), ignore, config
+        )
+        if cache_key in self._lint_cache:
+            emit.debug(f"Reusing the lint results for {str(path)!r}")
+            yield from self._filter_results(self._lint_cache[cache_key], ignore, include_ignored)
+            return
+
+        # the payload budget checker reads the zip central directory, so if it's the only
+        # one to run there is no need to extract the file
+        checkers = list(self._gen_checkers(ignore=ignore, config=config, charm_file=path))
+        extract = any(
+            run and not isinstance(checker, linters.PayloadBudget) for checker, run in checkers
+        )
 
         with tempfile.TemporaryDirectory(prefix=f"charmcraft_{path.name}_") as directory:
             directory_path = pathlib.Path(directory)
             try:
                 with zipfile.ZipFile(path) as zip_file:
-                    zip_file.extractall(directory_path)
-                    # fix permissions as extractall does not keep them (see https://bugs.python.org/issue15795)
-                    for name in zip_file.namelist():
-                        info = zip_file.getinfo(name)
-                        inside_zip_mode = info.external_attr >> 16
-                        extracted_file = directory_path / name
-                        current_mode = extracted_file.stat().st_mode
-                        if current_mode != inside_zip_mode:
-                            extracted_file.chmod(inside_zip_mode)
+                    if extract:
+                        self._extract(zip_file, directory_path)
             except zipfile.BadZipfile as exc:
                 raise errors.CraftError(
                     f"Cannot open charm file '{path}': {exc.args[0]}",
                     resolution=f"Check the charm file at {path}",
                     reportable=False,
                 )
-            yield from self.lint_directory(
-                directory_path, ignore=ignore, include_ignored=include_ignored
-            )
+            if extract:
+                all_results = self.lint_directory(
+                    directory_path,
+                    ignore=ignore,
+                    include_ignored=True,
+                    config=config,
+                    charm_file=path,
+                )
+            else:
+                emit.debug(f"Not extracting {str(path)!r}, no checker needs its content")
+                all_results = (
+                    checker.get_result(directory_path) if run else checker.get_ignore_result()
+                    for checker, run in checkers
+                )
+            results = []
+            for result in all_results:
+                results.append(result)
+                if include_ignored or result.name not in ignore:
+                    yield result
+            self._lint_cache[cache_key] = results
+
+    @staticmethod
+    def _extract(zip_file: zipfile.ZipFile, directory_path: pathlib.Path) -> None:
+        """Extract all the charm file into the directory, keeping the permissions."""
+        zip_file.extractall(directory_path)
+        # fix permissions as extractall does not keep them (see https://bugs.python.org/issue15795)
+        for name in zip_file.namelist():
+            info = zip_file.getinfo(name)
+            inside_zip_mode = info.external_attr >> 16
+            extracted_file = directory_path / name
+            current_mode = extracted_file.stat().st_mode
+            if current_mode != inside_zip_mode:
+                extracted_file.chmod(inside_zip_mode)
 
     @staticmethod
-    def _gen_checkers(ignore: Container[str]) -> Iterator[tuple[linters.BaseChecker, bool]]:
+    def _gen_checkers(
+        ignore: Container[str],
+        config: AnalysisConfig | None = None,
+        charm_file: pathlib.Path | None = None,
+    ) -> Iterator[tuple[linters.BaseChecker, bool]]:
         """Generate the checker classes to run, in their correct order."""
         for cls in linters.CHECKERS:
             run_linter = cls.name not in ignore
-            yield cls(), run_linter
+            checker = cls()
+            if config is not None:
+                checker.configure(config)
+            if not checker.enabled:
+                # opt-in checkers are not even reported as ignored
+                continue
+            if isinstance(checker, linters.PayloadBudget):
+                checker.charm_file = charm_file
+            yield checker, run_linter
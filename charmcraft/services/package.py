@@ -25,7 +25,6 @@ from collections.abc import Iterable
 from typing import TYPE_CHECKING, cast
 
 import craft_application
-import yaml
 from craft_application import services, util
 from craft_cli import emit
 from craft_providers import bases
@@ -68,6 +67,11 @@ class PackageService(services.PackageService):
         self._platform = build_plan[0].platform
         self._build_plan = build_plan
 
+    @property
+    def platform(self) -> str:
+        """The platform being packed for."""
+        return self._platform
+
     def pack(self, prime_dir: pathlib.Path, dest: pathlib.Path) -> list[pathlib.Path]:
         """Create one or more packages as appropriate.
 
@@ -85,12 +89,21 @@ class PackageService(services.PackageService):
         self._write_package_paths(packages)
         return packages
 
+    def clear_package_paths(self) -> None:
+        """Forget the packages written by previous packs, before packing again.
+
+        The file is appended to by each platform packed, so it has to be removed when
+        starting to pack to only hold the packages of the last pack.
+        """
+        (self.project_dir / const.OUTPUT_PACKAGES_FILENAME).unlink(missing_ok=True)
+
     def _write_package_paths(self, packages: Iterable[pathlib.Path]) -> None:
         """Write the paths of packages to a hidden file in the project directory.
 
-        This allows Charmcraft to output the packages to arbitrary directories on the host.
+        This allows Charmcraft to output the packages to arbitrary directories on the host,
+        and to upload the last packed ones without indicating them.
         """
-        packages_file = self.project_dir / ".charmcraft_output_packages.txt"
+        packages_file = self.project_dir / const.OUTPUT_PACKAGES_FILENAME
 
         with packages_file.open("at") as file:
             file.writelines(f"{package.name}\n" for package in packages)
@@ -161,13 +174,12 @@ class PackageService(services.PackageService):
         if source_path.is_file():
             shutil.copyfile(source_path, dest_path)
             return
-        with dest_path.open("wt+") as dest_file:
-            yaml.safe_dump(model, dest_file)
+        dest_path.write_text(utils.dump_yaml(model, sort_keys=True))
 
     def get_manifest(self, lint_results: Iterable[lint.CheckResult]) -> Manifest:
         """Get the manifest for this charm."""
         attributes = [
-            Attribute(name=result.name, result=result.result)
+            Attribute(name=result.name, result=result.result, data=result.data)
             for result in lint_results
             if result.check_type == lint.CheckType.ATTRIBUTE
         ]
@@ -220,39 +232,33 @@ class PackageService(services.PackageService):
             return [models.Base.from_str_and_arch(self._project.base, architectures)]
         raise TypeError(f"Unknown charm type {self._project.__class__}, cannot get bases.")
 
+    def get_lint_results(self) -> list[lint.CheckResult]:
+        """Lint the prime directory using the project's analysis configuration.
+
+        The analysis service memoizes the results, so this can be called as many times
+        as needed without linting the same prime directory again.
+        """
+        if self._project.analysis:
+            ignore_checkers = {
+                *self._project.analysis.ignore.linters,
+                *self._project.analysis.ignore.attributes,
+            }
+        else:
+            ignore_checkers = set()
+        return list(
+            self._services.analysis.lint_directory(
+                self._services.lifecycle.prime_dir,
+                ignore=ignore_checkers,
+                config=self._project.analysis,
+            )
+        )
+
     def write_metadata(self, path: pathlib.Path) -> None:
         """Write additional charm metadata.
 
         :param path: The path to the prime directory.
         """
         path.mkdir(parents=True, exist_ok=True)
-        if isinstance(self._project, BasesCharm | PlatformCharm):
-            if self._project.analysis:
-                ignore_checkers = {
-                    *self._project.analysis.ignore.linters,
-                    *self._project.analysis.ignore.attributes,
-                }
-            else:
-                ignore_checkers = set()
-            lint_results = self._services.analysis.lint_directory(
-                self._services.lifecycle.prime_dir, ignore=ignore_checkers
-            )
-            manifest = self.get_manifest(lint_results)
-            # Converting the manifest to a dictionary here is fairly fragile.
-            # We need to include unset/default values in order to ensure that the
-            # architecture is included on each base in the manifest, even when the
-            # architectures are inferred. However, we also need to exclude Nones so that
-            # image-info isn't included in manifest.yaml if it doesn't exist.
-            # Tread carefully when changing this next line. Treat it like an antique
-            # crystal wine glass.
-            (path / "manifest.yaml").write_text(
-                utils.dump_yaml(
-                    manifest.model_dump(
-                        mode="json", by_alias=True, exclude_unset=False, exclude_none=True
-                    )
-                )
-            )
-
         project_dict = self._project.marshal()
 
         # If there is a reactive part, defer to it for the existence of metadata.yaml.
@@ -271,3 +277,22 @@ class PackageService(services.PackageService):
             self._write_file_or_object(actions, "actions.yaml", path)
         if config := cast(dict | None, project_dict.get("config")):
             self._write_file_or_object(config, "config.yaml", path)
+
+        # The manifest is written last, so the prime directory is complete when linted
+        # and later lint runs (e.g. when packing) can reuse these results.
+        if isinstance(self._project, BasesCharm | PlatformCharm):
+            manifest = self.get_manifest(self.get_lint_results())
+            # Converting the manifest to a dictionary here is fairly fragile.
+            # We need to include unset/default values in order to ensure that the
+            # architecture is included on each base in the manifest, even when the
+            # architectures are inferred. However, we also need to exclude Nones so that
+            # image-info isn't included in manifest.yaml if it doesn't exist.
+            # Tread carefully when changing this next line. Treat it like an antique
+            # crystal wine glass.
+            (path / "manifest.yaml").write_text(
+                utils.dump_yaml(
+                    manifest.model_dump(
+                        mode="json", by_alias=True, exclude_unset=False, exclude_none=True
+                    )
+                )
+            )
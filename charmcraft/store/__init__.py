@@ -15,18 +15,23 @@
 # For further info, check https://github.com/canonical/charmcraft
 """Store module for Charmcraft."""
 
-from charmcraft.store.client import build_user_agent, AnonymousClient, Client
+from charmcraft.store.client import build_user_agent, get_http_session, AnonymousClient, Client
 from charmcraft.store import models
+from charmcraft.store.cache import HTTPCache, LibraryCache, UploadLedger
 from charmcraft.store.models import LibraryMetadataRequest
 from charmcraft.store.store import Store, AUTH_DEFAULT_TTL, AUTH_DEFAULT_PERMISSIONS
 
 __all__ = [
     "build_user_agent",
+    "get_http_session",
     "AnonymousClient",
     "Client",
     "AUTH_DEFAULT_PERMISSIONS",
     "AUTH_DEFAULT_TTL",
     "Store",
     "models",
+    "HTTPCache",
+    "LibraryCache",
+    "UploadLedger",
     "LibraryMetadataRequest",
 ]
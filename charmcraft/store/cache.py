@@ -0,0 +1,258 @@
+# Copyright 2024 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# For further info, check https://github.com/canonical/charmcraft
+"""Local caches of the data retrieved from the Store."""
+import collections
+import dataclasses
+import hashlib
+import json
+import pathlib
+import shutil
+import threading
+import time
+from typing import Any
+
+from craft_cli import emit
+
+from charmcraft import utils
+from charmcraft.store.models import Library
+
+# how long (in seconds) a cached response is kept, even if it could still be revalidated
+HTTP_CACHE_MAX_AGE = 7 * 24 * 3600
+
+
+class LibraryCache:
+    """A cache of charm libraries, shared by all the projects in the host.
+
+    Each library version is kept in its own file, keyed by the library id, its API
+    and patch versions and its content hash, so the cached libraries never need to
+    be invalidated.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+
+    def _get_entry_path(self, lib: Library) -> pathlib.Path:
+        """Get the path of the cache entry for a library."""
+        filename = f"{lib.lib_id}_{lib.api}.{lib.patch}_{lib.content_hash}.json"
+        return self.path / lib.charm_name / lib.lib_name / filename
+
+    @staticmethod
+    def _load(path: pathlib.Path) -> Library | None:
+        """Load a cache entry, if valid."""
+        try:
+            lib = Library(**json.loads(path.read_text()))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as exc:
+            emit.debug(f"Ignoring invalid cached library {str(path)!r}: {exc!r}")
+            return None
+        if lib.content is None:
+            return None
+        return lib
+
+    def get(self, lib: Library) -> Library | None:
+        """Get the cached version (with its content) of a library, if any."""
+        return self._load(self._get_entry_path(lib))
+
+    def find(
+        self, charm_name: str, lib_name: str, api: int, patch: int | None = None
+    ) -> Library | None:
+        """Find the latest cached version of a library for an API version, if any.
+
+        If a patch version is given, only that version is searched for.
+        """
+        found = None
+        for path in sorted((self.path / charm_name / lib_name).glob("*.json")):
+            lib = self._load(path)
+            if lib is None or lib.api != api or patch not in (None, lib.patch):
+                continue
+            if found is None or lib.patch > found.patch:
+                found = lib
+        return found
+
+    def put(self, lib: Library) -> None:
+        """Keep a library (with its content) in the cache.
+
+        Failing to write to the cache is not an error, the library just isn't cached.
+        """
+        path = self._get_entry_path(lib)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            utils.write_text_atomically(path, json.dumps(dataclasses.asdict(lib)))
+        except OSError as exc:
+            emit.debug(f"Could not cache library {lib.charm_name}.{lib.lib_name}: {exc!r}")
+
+
+def _write_private(base_path: pathlib.Path, path: pathlib.Path, text: str) -> None:
+    """Write a file (under the base path) that only the user can access.
+
+    The base directory and the one holding the file are created accessible only by
+    the user too, as the names of the entries may already tell something.
+    """
+    base_path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    path.parent.mkdir(mode=0o700, exist_ok=True)
+    utils.write_text_atomically(path, text, mode=0o600)
+
+
+class UploadLedger:
+    """A ledger of the digests of the files uploaded to the store from the host.
+
+    The digest of each file is computed while it's pushed, and recorded along with
+    the file's size and modification time, so the digest of the same (unchanged) file
+    is known the next time without reading it again.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+
+    def _get_entry_path(self, filepath: pathlib.Path) -> pathlib.Path:
+        """Get the path of the ledger entry for a file."""
+        key = hashlib.sha256(str(filepath.resolve()).encode("utf8", "surrogateescape"))
+        return self.path / f"{key.hexdigest()}.json"
+
+    def get_digest(self, filepath: pathlib.Path) -> str | None:
+        """Get the recorded SHA3-384 digest of a file, if it did not change since."""
+        path = self._get_entry_path(filepath)
+        try:
+            entry = json.loads(path.read_text())
+            stat = filepath.stat()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            emit.debug(f"Ignoring invalid upload ledger entry {str(path)!r}: {exc!r}")
+            return None
+        if entry.get("size") != stat.st_size or entry.get("mtime_ns") != stat.st_mtime_ns:
+            return None
+        return entry.get("sha3-384")
+
+    def put(self, filepath: pathlib.Path, digest: str) -> None:
+        """Record the SHA3-384 digest of a file.
+
+        Failing to write to the ledger is not an error, the digest just isn't recorded.
+        """
+        path = self._get_entry_path(filepath)
+        try:
+            stat = filepath.stat()
+            entry = {
+                "path": str(filepath.resolve()),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha3-384": digest,
+            }
+            _write_private(self.path, path, json.dumps(entry))
+        except OSError as exc:
+            emit.debug(f"Could not record the upload of {str(filepath)!r}: {exc!r}")
+
+
+class HTTPCache:
+    """A cache of the responses to the read-only requests to the store, in the host.
+
+    Each response is kept in its own file, along with its ETag and Last-Modified
+    headers so it can be revalidated with a conditional request when it's too old
+    to be used as is. The responses are grouped by package, so the requests that
+    change a package can drop all the cached responses about it.
+
+    The responses are keyed by the user, so the entries of old credentials would pile
+    up: the ones older than HTTP_CACHE_MAX_AGE are dropped when the cache is written.
+
+    If not enabled, the cached responses are neither used nor stored, but the cache
+    is still invalidated.
+    """
+
+    def __init__(self, path: pathlib.Path, *, enabled: bool = True) -> None:
+        self.path = path
+        self.enabled = enabled
+        self.counters: collections.Counter[str] = collections.Counter()
+        self._lock = threading.Lock()
+        self._pruned = False
+
+    def _get_entry_path(self, group: str, key: str) -> pathlib.Path:
+        """Get the path of the cache entry for a request."""
+        return self.path / group / f"{key}.json"
+
+    def get(self, group: str, key: str) -> dict[str, Any] | None:
+        """Get the cached response to a request (with when it was stored), if any."""
+        if not self.enabled:
+            return None
+        path = self._get_entry_path(group, key)
+        try:
+            entry = json.loads(path.read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            emit.debug(f"Ignoring invalid cached response {str(path)!r}: {exc!r}")
+            return None
+        if not isinstance(entry, dict) or "content" not in entry or "stored_at" not in entry:
+            return None
+        return entry
+
+    def put(
+        self,
+        group: str,
+        key: str,
+        content: Any,  # noqa: ANN401 (any decoded JSON)
+        *,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        """Keep the response to a request in the cache, as stored now.
+
+        Failing to write to the cache is not an error, the response just isn't cached.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            pruned, self._pruned = self._pruned, True
+        if not pruned:
+            self.prune()
+        path = self._get_entry_path(group, key)
+        entry = {
+            "stored_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "content": content,
+        }
+        try:
+            _write_private(self.path, path, json.dumps(entry))
+        except OSError as exc:
+            emit.debug(f"Could not cache the response in {str(path)!r}: {exc!r}")
+
+    def prune(self) -> None:
+        """Drop the cached responses older than HTTP_CACHE_MAX_AGE, and the empty groups."""
+        oldest = time.time() - HTTP_CACHE_MAX_AGE
+        try:
+            for group_path in self.path.iterdir():
+                if not group_path.is_dir():
+                    continue
+                for path in group_path.glob("*.json"):
+                    if path.stat().st_mtime < oldest:
+                        path.unlink(missing_ok=True)
+                if not any(group_path.iterdir()):
+                    group_path.rmdir()
+        except OSError as exc:
+            emit.debug(f"Could not prune the cached responses in {str(self.path)!r}: {exc!r}")
+
+    def invalidate(self, group: str) -> None:
+        """Drop all the cached responses of a group."""
+        shutil.rmtree(self.path / group, ignore_errors=True)
+
+    def count(self, outcome: str) -> str:
+        """Count a hit, revalidation or miss of the cache, and summarize the counters."""
+        with self._lock:
+            self.counters[outcome] += 1
+            return ", ".join(
+                f"{name}: {self.counters[name]}" for name in ("hits", "revalidated", "misses")
+            )
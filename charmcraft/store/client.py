@@ -16,9 +16,18 @@
 
 """A client to hit the Store."""
 
+import contextlib
+import contextvars
+import hashlib
+import itertools
+import json
 import os
 import platform
-from collections.abc import Sequence
+import re
+import threading
+import time
+import urllib.parse
+from collections.abc import Callable, Iterator, Sequence
 from json.decoder import JSONDecodeError
 from typing import Any
 
@@ -26,16 +35,36 @@ import craft_store
 import requests
 from craft_cli import CraftError, emit
 from craft_store import endpoints
+from requests.adapters import BaseAdapter, HTTPAdapter, Retry
 from requests_toolbelt import (  # type: ignore[import]
     MultipartEncoder,
     MultipartEncoderMonitor,
 )
 
-from charmcraft import __version__, const, utils
+from charmcraft import __version__, const, instrum, utils
+from charmcraft.store.cache import HTTPCache
 from charmcraft.store.models import Library, LibraryMetadataRequest
 
 TESTING_ENV_PREFIXES = ["TRAVIS", "AUTOPKGTEST_TMP"]
 
+# how many connections are kept alive per host, by default
+DEFAULT_HTTP_POOL_SIZE = 10
+
+# how many times the whole push of a file is retried after a transient error, by default, and
+# the delay before the first retry (doubled for each of the next ones)
+DEFAULT_PUSH_RETRIES = 3
+PUSH_RETRY_DELAY = 1
+
+# the read-only endpoints whose responses are cached, with how long (in seconds) a
+# cached response is used as is; after that it's revalidated with the store
+HTTP_CACHE_TTLS = [
+    ("GET", re.compile(r"/v1/charm"), 60),
+    ("POST", re.compile(r"/v1/charm/libraries/bulk"), 300),
+    ("GET", re.compile(r"/v1/charm/[^/]+/releases"), 30),
+    ("GET", re.compile(r"/v1/charm/[^/]+/revisions"), 30),
+    ("GET", re.compile(r"/v1/charm/[^/]+/resources"), 60),
+]
+
 
 def build_user_agent():
     """Build the charmcraft's user agent."""
@@ -47,28 +76,313 @@ def build_user_agent():
     return f"charmcraft/{__version__}{testing}{os_platform} python/{platform.python_version()}"
 
 
+class _PooledHTTPAdapter(HTTPAdapter):
+    """An HTTP adapter that measures each request, and if it needed a new connection."""
+
+    def _get_pool(self, request, verify, proxies, cert):  # type: ignore[no-untyped-def]
+        """Get the connections pool that sending the request uses (the proxy's, if any)."""
+        if hasattr(self, "get_connection_with_tls_context"):  # requests >= 2.32.2
+            return self.get_connection_with_tls_context(
+                request, verify, proxies=proxies, cert=cert
+            )
+        return self.get_connection(request.url, proxies)
+
+    def send(self, request, *args, **kwargs) -> requests.Response:  # type: ignore[no-untyped-def]
+        """Send the request, measuring it."""
+        # requests' sessions pass all the options to the adapter by keyword
+        verify, cert = kwargs.get("verify", True), kwargs.get("cert")
+        try:
+            pool = self._get_pool(request, verify, kwargs.get("proxies"), cert)
+        except ValueError:
+            # an invalid URL or proxy, let requests report it
+            return super().send(request, *args, **kwargs)
+        connections = pool.num_connections
+        host = urllib.parse.urlsplit(request.url).hostname
+        with instrum.Timer("HTTP request", method=request.method, host=host) as timer:
+            try:
+                return super().send(request, *args, **kwargs)
+            finally:
+                timer.add_stats(new_connections=pool.num_connections - connections)
+
+
+_http_session: requests.Session | None = None
+_http_session_lock = threading.Lock()
+
+
+def _get_http_pool_size() -> int:
+    """Get the size of the HTTP connections pool, from the environment if set there."""
+    value = os.getenv(const.HTTP_POOL_SIZE_ENV_VAR)
+    if value is None:
+        return DEFAULT_HTTP_POOL_SIZE
+    try:
+        pool_size = int(value)
+    except ValueError:
+        pool_size = 0
+    if pool_size < 1:
+        raise CraftError(
+            f"Invalid value for {const.HTTP_POOL_SIZE_ENV_VAR}: {value!r}.",
+            resolution="Set it to a positive number of connections.",
+        )
+    return pool_size
+
+
+def _get_store_retry_value(env_var: str, default: int) -> int:
+    """Get a setting of craft-store's retries, from its environment variable if set there.
+
+    As craft-store does, invalid values are ignored.
+    """
+    try:
+        value = int(os.environ[env_var])
+    except (KeyError, ValueError):
+        return default
+    return default if value < 0 else value
+
+
+# set while polling the store, whose answers when it's busy are handled by the poller
+_polling: contextvars.ContextVar[bool] = contextvars.ContextVar("polling", default=False)
+
+
+@contextlib.contextmanager
+def polling() -> Iterator[None]:
+    """Send the requests in the context (in this thread) as polls of the store.
+
+    The statuses of a busy store (429 and 503) are not retried for them, and the
+    Retry-After header is not waited for, so the poller can decide when to poll again.
+    """
+    token = _polling.set(True)
+    try:
+        yield
+    finally:
+        _polling.reset(token)
+
+
+class _StoreSession(requests.Session):
+    """A session that sends the polls of the store through their own adapter."""
+
+    polling_adapter: HTTPAdapter
+
+    def get_adapter(self, url: str) -> BaseAdapter:
+        """Get the adapter for the URL, the polling one if polling."""
+        if _polling.get():
+            return self.polling_adapter
+        return super().get_adapter(url)
+
+
+def get_http_session() -> requests.Session:
+    """Get the HTTP session shared by all the clients to the store.
+
+    The connections in its pool are kept alive and reused across clients (e.g.
+    the authenticated and the anonymous ones), so the TLS handshakes are done once
+    per host. The pool size can be set in the environment, and requests are
+    retried as craft-store's clients do (except when polling, see `polling`).
+    """
+    global _http_session  # noqa: PLW0603 (a single session for the whole process)
+    with _http_session_lock:
+        if _http_session is None:
+            total = _get_store_retry_value(
+                const.STORE_RETRIES_ENV_VAR, craft_store.http_client.REQUEST_TOTAL_RETRIES
+            )
+            backoff_factor = _get_store_retry_value(
+                const.STORE_BACKOFF_ENV_VAR, craft_store.http_client.REQUEST_BACKOFF
+            )
+            pool_size = _get_http_pool_size()
+            adapter = _PooledHTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=Retry(
+                    total=total,
+                    backoff_factor=backoff_factor,
+                    status_forcelist=[500, 502, 503, 504],
+                ),
+            )
+            session = _StoreSession()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.polling_adapter = _PooledHTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=Retry(
+                    total=total,
+                    backoff_factor=backoff_factor,
+                    status_forcelist=[500, 502, 504],
+                    respect_retry_after_header=False,
+                ),
+            )
+            _http_session = session
+        return _http_session
+
+
+def _get_push_retries() -> int:
+    """Get how many times pushing a file is retried, from the environment if set there."""
+    value = os.getenv(const.PUSH_RETRIES_ENV_VAR)
+    if value is None:
+        return DEFAULT_PUSH_RETRIES
+    try:
+        retries = int(value)
+    except ValueError:
+        retries = -1
+    if retries < 0:
+        raise CraftError(
+            f"Invalid value for {const.PUSH_RETRIES_ENV_VAR}: {value!r}.",
+            resolution="Set it to zero or a positive number of retries.",
+        )
+    return retries
+
+
+def _is_transient_error(error: craft_store.errors.CraftStoreError) -> bool:
+    """Tell if an error pushing a file is worth retrying."""
+    if isinstance(error, craft_store.errors.StoreServerError):
+        status_code = error.response.status_code
+        return status_code == 429 or status_code >= 500
+    return isinstance(error, craft_store.errors.NetworkError)
+
+
+class _HashingReader:
+    """A file wrapper that hashes the bytes while they are read."""
+
+    def __init__(self, file, hasher) -> None:  # type: ignore[no-untyped-def]
+        self._file = file
+        self._hasher = hasher
+
+    def read(self, size: int = -1) -> bytes:
+        """Read from the file, hashing what was read."""
+        data = self._file.read(size)
+        self._hasher.update(data)
+        return data
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401 (any attribute of the file)
+        return getattr(self._file, name)
+
+
+def _get_cache_ttl(method: str, urlpath: str) -> float | None:
+    """Get how long the response to a request is used from the cache, if cacheable."""
+    path = urllib.parse.urlsplit(urlpath).path
+    for ttl_method, pattern, ttl in HTTP_CACHE_TTLS:
+        if method == ttl_method and pattern.fullmatch(path):
+            return ttl
+    return None
+
+
+def _get_cache_group(urlpath: str) -> str:
+    """Get the group of the cached responses of a request, by package."""
+    parts = urllib.parse.urlsplit(urlpath).path.strip("/").split("/")
+    return re.sub(r"[^\w-]", "_", "_".join(parts[1:3]))
+
+
+def _invalidate_cache(http_cache: HTTPCache, urlpath: str) -> None:
+    """Drop the cached responses that a request changing the store may outdate.
+
+    Registering or unregistering a name also changes the list of registered names.
+    """
+    http_cache.invalidate(_get_cache_group(urlpath))
+    if urllib.parse.urlsplit(urlpath).path.strip("/").count("/") <= 2:
+        http_cache.invalidate(_get_cache_group("/v1/charm"))
+
+
+def _get_json(response: requests.Response) -> dict[str, Any]:
+    """Return .json() from a request.Response."""
+    try:
+        return response.json()
+    except JSONDecodeError as json_error:
+        raise CraftError(
+            f"Could not retrieve json response ({response.status_code} from request"
+        ) from json_error
+
+
+def _request_json_cached(
+    request_urlpath: Callable[..., requests.Response],
+    http_cache: HTTPCache,
+    method: str,
+    urlpath: str,
+    *args,
+    identity: str,
+    ttl: float,
+    **kwargs,
+) -> dict[str, Any]:
+    """Return .json() from the response to a urlpath, using the cache if possible.
+
+    A cached response is used as is while it's not older than the TTL, and after that
+    it's revalidated with the store through a conditional request. The identity (of
+    the user) is part of the key, so the cached responses are never shared by users.
+    """
+    request = json.dumps([identity, method, urlpath, args, kwargs], sort_keys=True, default=str)
+    key = hashlib.sha256(request.encode()).hexdigest()
+    group = _get_cache_group(urlpath)
+
+    entry = http_cache.get(group, key)
+    if entry is not None:
+        if 0 <= time.time() - entry["stored_at"] < ttl:
+            emit.debug(f"HTTP cache hit for {method} {urlpath} ({http_cache.count('hits')})")
+            return entry["content"]
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        kwargs["headers"] = headers
+
+    response = request_urlpath(method, urlpath, *args, **kwargs)
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if entry is not None and response.status_code == 304:
+        # still valid, and the validators may not be repeated in the response
+        content = entry["content"]
+        etag = etag or entry.get("etag")
+        last_modified = last_modified or entry.get("last_modified")
+        outcome, counter = "revalidated", "revalidated"
+    else:
+        content = _get_json(response)
+        outcome, counter = "miss", "misses"
+    http_cache.put(group, key, content, etag=etag, last_modified=last_modified)
+    emit.debug(f"HTTP cache {outcome} for {method} {urlpath} ({http_cache.count(counter)})")
+    return content
+
+
+class _SharedSessionHTTPClient(craft_store.http_client.HTTPClient):
+    """A craft-store's HTTP client that sends the requests through the shared session."""
+
+    def __init__(self, *, user_agent: str) -> None:
+        super().__init__(user_agent=user_agent)
+        self._session = get_http_session()
+
+
 class AnonymousClient:
     """Lightweight layer that access public store data."""
 
-    def __init__(self, api_base_url: str, storage_base_url: str):
+    def __init__(
+        self, api_base_url: str, storage_base_url: str, *, http_cache: HTTPCache | None = None
+    ):
         self.api_base_url = api_base_url.rstrip("/")
         self.storage_base_url = storage_base_url.rstrip("/")
-        self._http_client = craft_store.http_client.HTTPClient(user_agent=build_user_agent())
+        self.http_cache = http_cache
+        self._http_client = _SharedSessionHTTPClient(user_agent=build_user_agent())
 
-    def request_urlpath_text(self, method: str, urlpath: str, *args, **kwargs) -> str:
+    def request_urlpath(self, method: str, urlpath: str, *args, **kwargs) -> requests.Response:
         """Return a request.Response to a urlpath."""
-        return self._http_client.request(method, self.api_base_url + urlpath, *args, **kwargs).text
+        return self._http_client.request(method, self.api_base_url + urlpath, *args, **kwargs)
+
+    def request_urlpath_text(self, method: str, urlpath: str, *args, **kwargs) -> str:
+        """Return the text from a request.Response to a urlpath."""
+        return self.request_urlpath(method, urlpath, *args, **kwargs).text
 
     def request_urlpath_json(self, method: str, urlpath: str, *args, **kwargs) -> dict[str, Any]:
-        """Return .json() from a request.Response to a urlpath."""
-        response = self._http_client.request(method, self.api_base_url + urlpath, *args, **kwargs)
+        """Return .json() from a request.Response to a urlpath.
 
-        try:
-            return response.json()
-        except JSONDecodeError as json_error:
-            raise CraftError(
-                f"Could not retrieve json response ({response.status_code} from request"
-            ) from json_error
+        The responses of the read-only endpoints are cached, if there is a cache.
+        """
+        ttl = _get_cache_ttl(method, urlpath)
+        if self.http_cache is None or ttl is None:
+            return _get_json(self.request_urlpath(method, urlpath, *args, **kwargs))
+        return _request_json_cached(
+            self.request_urlpath,
+            self.http_cache,
+            method,
+            urlpath,
+            *args,
+            identity="",
+            ttl=ttl,
+            **kwargs,
+        )
 
     def get_library(
         self, *, charm_name: str, library_id: str, api: int | None = None, patch: int | None = None
@@ -124,6 +438,7 @@ class Client(craft_store.StoreClient):
         endpoints: endpoints.Endpoints = endpoints.CHARMHUB,
         environment_auth: str = const.ALTERNATE_AUTH_ENV_VAR,
         user_agent: str = build_user_agent(),
+        http_cache: HTTPCache | None = None,
     ):
         """Initialise a Charmcraft store client.
 
@@ -135,6 +450,7 @@ class Client(craft_store.StoreClient):
             api_base_url = base_url
         self.api_base_url = api_base_url.rstrip("/")
         self.storage_base_url = storage_base_url.rstrip("/")
+        self.http_cache = http_cache
 
         super().__init__(
             base_url=api_base_url,
@@ -145,6 +461,7 @@ class Client(craft_store.StoreClient):
             environment_auth=environment_auth,
             ephemeral=ephemeral,
         )
+        self.http_client = _SharedSessionHTTPClient(user_agent=user_agent)
 
     def login(self, *args, **kwargs):
         """Intercept regular login functionality to forbid it when using alternate auth."""
@@ -164,43 +481,120 @@ class Client(craft_store.StoreClient):
             )
         return super().logout(*args, **kwargs)
 
-    def request_urlpath_text(self, method: str, urlpath: str, *args, **kwargs) -> str:
+    def request(  # type: ignore[no-untyped-def]
+        self, method: str, url: str, *args, **kwargs
+    ) -> requests.Response:
+        """Perform an authenticated request.
+
+        The requests that change the store (e.g. releasing, or registering a name)
+        drop the cached responses they may outdate.
+        """
+        try:
+            return super().request(method, url, *args, **kwargs)
+        finally:
+            if self.http_cache is not None and url.startswith(self.api_base_url + "/"):
+                urlpath = url[len(self.api_base_url) :]
+                if method != "GET" and _get_cache_ttl(method, urlpath) is None:
+                    _invalidate_cache(self.http_cache, urlpath)
+
+    def request_urlpath(self, method: str, urlpath: str, *args, **kwargs) -> requests.Response:
         """Return a request.Response to a urlpath."""
-        return super().request(method, self.api_base_url + urlpath, *args, **kwargs).text
+        return self.request(method, self.api_base_url + urlpath, *args, **kwargs)
+
+    def request_urlpath_text(self, method: str, urlpath: str, *args, **kwargs) -> str:
+        """Return the text from a request.Response to a urlpath."""
+        return self.request_urlpath(method, urlpath, *args, **kwargs).text
 
     def request_urlpath_json(self, method: str, urlpath: str, *args, **kwargs) -> dict[str, Any]:
-        """Return .json() from a request.Response to a urlpath."""
-        response = super().request(method, self.api_base_url + urlpath, *args, **kwargs)
+        """Return .json() from a request.Response to a urlpath.
 
-        try:
-            return response.json()
-        except JSONDecodeError as json_error:
-            raise CraftError(
-                f"Could not retrieve json response ({response.status_code} from request"
-            ) from json_error
+        The responses of the read-only endpoints are cached, if there is a cache.
+        """
+        ttl = _get_cache_ttl(method, urlpath)
+        if self.http_cache is None or ttl is None:
+            return _get_json(self.request_urlpath(method, urlpath, *args, **kwargs))
+        return _request_json_cached(
+            self.request_urlpath,
+            self.http_cache,
+            method,
+            urlpath,
+            *args,
+            identity=self._get_authorization_header(),
+            ttl=ttl,
+            **kwargs,
+        )
 
     def push_file(self, filepath) -> str:
         """Push the bytes from filepath to the Storage."""
+        upload_id, _ = self.push_file_hashed(filepath)
+        return upload_id
+
+    def push_file_hashed(self, filepath, *, show_progress: bool = True) -> tuple[str, str]:
+        """Push the bytes from filepath to the Storage, hashing them while pushed.
+
+        The progress bar can be left out, e.g. when pushing several files at once.
+
+        After transient errors (network issues, or the storage being unavailable) the
+        whole push is retried from the start: the storage takes each file in a single
+        request, so nothing of a failed push is kept.
+
+        Return the upload id and the SHA3-384 digest of the file.
+        """
         emit.progress(f"Starting to push {str(filepath)!r}")
+        retries = _get_push_retries()
+
+        for attempt in itertools.count():
+            hasher = hashlib.sha3_384()
+            try:
+                response = self._push_whole_file(filepath, hasher, show_progress=show_progress)
+                break
+            except (
+                craft_store.errors.NetworkError,
+                craft_store.errors.StoreServerError,
+            ) as error:
+                if attempt >= retries or not _is_transient_error(error):
+                    raise
+                delay = PUSH_RETRY_DELAY * 2**attempt
+                emit.progress(
+                    f"Pushing {str(filepath)!r} failed ({error}), pushing it again in {delay}s "
+                    f"(retry {attempt + 1} of {retries})",
+                    permanent=True,
+                )
+                time.sleep(delay)
+
+        result = response.json()
+        if not result["successful"]:
+            raise CraftError(f"Server error while pushing file: {result}")
+
+        upload_id = result["upload_id"]
+        emit.progress(f"Uploading bytes ended, id {upload_id}")
+        return upload_id, hasher.hexdigest()
+
+    def _push_whole_file(  # type: ignore[no-untyped-def]
+        self, filepath, hasher, *, show_progress: bool = True
+    ) -> requests.Response:
+        """Push all the bytes from filepath to the Storage in a single request.
 
+        The progress is shown if indicated.
+        """
         with filepath.open("rb") as fh:
             encoder = MultipartEncoder(
-                fields={"binary": (filepath.name, fh, "application/octet-stream")}
+                fields={
+                    "binary": (
+                        filepath.name,
+                        _HashingReader(fh, hasher),
+                        "application/octet-stream",
+                    )
+                }
             )
 
             # create a monitor (so that progress can be displayed) as call the real pusher
             monitor = MultipartEncoderMonitor(encoder)
+            if not show_progress:
+                return self._storage_push(monitor)
             with emit.progress_bar("Uploading...", monitor.len, delta=False) as progress:
                 monitor.callback = lambda mon: progress.advance(mon.bytes_read)
-                response = self._storage_push(monitor)
-
-        result = response.json()
-        if not result["successful"]:
-            raise CraftError(f"Server error while pushing file: {result}")
-
-        upload_id = result["upload_id"]
-        emit.progress(f"Uploading bytes ended, id {upload_id}")
-        return upload_id
+                return self._storage_push(monitor)
 
     def _storage_push(self, monitor) -> requests.Response:
         """Push bytes to the storage."""
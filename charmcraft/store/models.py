@@ -99,6 +99,8 @@ class Uploaded:
     status: int
     revision: int
     errors: list[Error]
+    # an existing revision with the same content was reused, instead of uploading again
+    reused: bool = False
 
 
 @dataclasses.dataclass(frozen=True)
@@ -126,6 +128,7 @@ class Revision:
     status: str
     errors: list[Error]
     bases: list[Base]
+    sha3_384: str | None = None
 
 
 @dataclasses.dataclass(frozen=True)
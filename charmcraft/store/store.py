@@ -15,11 +15,14 @@
 # For further info, check https://github.com/canonical/charmcraft
 
 """The Store API handling."""
+import contextlib
+import email.utils
 import os
 import pathlib
 import platform
+import random
 import time
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
 from functools import wraps
 from typing import Any
 
@@ -32,10 +35,13 @@ from craft_store.models.resource_revision_model import (
 )
 from dateutil import parser
 
-from charmcraft import const
+from charmcraft import const, env
+from charmcraft.store.cache import HTTPCache, UploadLedger
 from charmcraft.store.client import (
     AnonymousClient,
     Client,
+    _get_json,
+    polling,
 )
 from charmcraft.store.models import (
     Account,
@@ -66,7 +72,17 @@ UPLOAD_ENDING_STATUSES = {
     "approved": True,
     "rejected": False,
 }
-POLL_DELAYS = [0.2, 0.3, 0.5, 1, 1, 1, 2] + [3] * 18  # total is 60 seconds
+
+# the delays between polls for the upload status grow exponentially up to a limit,
+# and each one is randomized (between half and all of it) to spread the load in the store
+POLL_INITIAL_DELAY = 0.5
+POLL_MAX_DELAY = 15
+POLL_BACKOFF_FACTOR = 2
+# the statuses of the answers to a poll that tell the store is too busy, to poll later
+POLL_BUSY_STATUSES = (429, 503)
+
+# how long to wait for the store to finish reviewing an upload, by default
+DEFAULT_UPLOAD_TIMEOUT = 600
 
 # default restrictions to get auth credentials
 AUTH_DEFAULT_TTL = 3600 * 30
@@ -78,6 +94,51 @@ AUTH_DEFAULT_PERMISSIONS = [
 ]
 
 
+def _get_upload_timeout() -> float:
+    """Get how many seconds to wait for an upload review, from the environment if set there."""
+    value = os.getenv(const.UPLOAD_TIMEOUT_ENV_VAR)
+    if value is None:
+        return DEFAULT_UPLOAD_TIMEOUT
+    try:
+        timeout = float(value)
+    except ValueError:
+        timeout = 0
+    if timeout <= 0:
+        raise CraftError(
+            f"Invalid value for {const.UPLOAD_TIMEOUT_ENV_VAR}: {value!r}.",
+            resolution="Set it to a positive number of seconds.",
+        )
+    return timeout
+
+
+def _get_poll_delays() -> Iterator[float]:
+    """Generate the delays between polls, growing exponentially and with jitter."""
+    delay = POLL_INITIAL_DELAY
+    while True:
+        yield random.uniform(delay / 2, delay)  # noqa: S311 (not for cryptography)
+        delay = min(delay * POLL_BACKOFF_FACTOR, POLL_MAX_DELAY)
+
+
+def _get_retry_after(headers) -> float | None:
+    """Get the seconds to wait indicated by the Retry-After header, if any.
+
+    The header can hold the number of seconds or an HTTP date.
+    """
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        emit.debug(f"Ignoring invalid Retry-After header: {value!r}")
+        return None
+    return max(retry_at.timestamp() - time.time(), 0)
+
+
 def _build_errors(item):
     """Build a list of Errors from response item."""
     return [Error(message=e["message"], code=e["code"]) for e in (item["errors"] or [])]
@@ -93,6 +154,24 @@ def _build_revision(item: dict[str, Any]) -> Revision:
         status=item["status"],
         errors=_build_errors(item),
         bases=bases,
+        sha3_384=item.get("sha3-384"),
+    )
+
+
+def _build_reused_upload(revision: int) -> Uploaded:
+    """Build the result of an upload that reused an existing revision."""
+    return Uploaded(ok=True, status="approved", revision=revision, errors=[], reused=True)
+
+
+def _get_bases_key(bases: Iterable[dict[str, Any]]) -> frozenset[tuple[str, str, tuple[str, ...]]]:
+    """Get a comparable key for a list of resource bases, filling the defaults."""
+    return frozenset(
+        (
+            base.get("name", "all"),
+            base.get("channel", "all"),
+            tuple(sorted(base.get("architectures", ["all"]))),
+        )
+        for base in bases
     )
 
 
@@ -144,7 +223,7 @@ def _store_client_wrapper(auto_login: bool = True) -> Callable[[Callable], Calla
                         "Charmcraft error: internal inconsistency detected "
                         "(CredentialsUnavailable error while having user provided credentials)."
                     )
-                if not auto_login:
+                if not auto_login or not self._auto_login:
                     raise
                 emit.progress("Credentials not found. Trying to log in...")
             except craft_store.errors.StoreServerError as error:
@@ -154,7 +233,7 @@ def _store_client_wrapper(auto_login: bool = True) -> Callable[[Callable], Calla
                             "Provided credentials are no longer valid for Charmhub. "
                             "Regenerate them and try again."
                         )
-                    if not auto_login:
+                    if not auto_login or not self._auto_login:
                         raise CraftError("Existing credentials are no longer valid for Charmhub.")
                     emit.progress("Existing credentials no longer valid. Trying to log in...")
                     # Clear credentials before trying to login again
@@ -174,16 +253,27 @@ def _store_client_wrapper(auto_login: bool = True) -> Callable[[Callable], Calla
 class Store:
     """The main interface to the Store's API."""
 
-    def __init__(self, charmhub_config, ephemeral=False, needs_auth=True):
+    # whether to log in when the credentials are missing or no longer valid
+    _auto_login = True
+
+    def __init__(self, charmhub_config, ephemeral=False, needs_auth=True, use_cache=False):
+        # the cache is always invalidated, but only used (and updated) if indicated, as
+        # only the commands that just show information can afford slightly old data
+        http_cache = HTTPCache(env.get_http_cache_path(), enabled=use_cache)
         if needs_auth:
             try:
                 self._client = Client(
-                    charmhub_config.api_url, charmhub_config.storage_url, ephemeral=ephemeral
+                    charmhub_config.api_url,
+                    charmhub_config.storage_url,
+                    ephemeral=ephemeral,
+                    http_cache=http_cache,
                 )
             except craft_store.errors.NoKeyringError as error:
                 raise CraftError(str(error)) from error
         else:
-            self._client = AnonymousClient(charmhub_config.api_url, charmhub_config.storage_url)
+            self._client = AnonymousClient(
+                charmhub_config.api_url, charmhub_config.storage_url, http_cache=http_cache
+            )
 
     def login(self, permissions=None, ttl=None, charms=None, bundles=None, channels=None):
         """Login into the store."""
@@ -252,6 +342,26 @@ class Store:
         """Check if current credentials authenticated."""
         self._client.whoami()
 
+    @_store_client_wrapper()
+    def ensure_logged_in(self) -> None:
+        """Check that the current credentials are valid, logging in if needed."""
+        self._check_authorized()
+
+    @contextlib.contextmanager
+    def logged_in_once(self) -> Iterator[None]:
+        """Log in (if needed) now, and not again from the calls done inside the context.
+
+        Use it around calls done from several threads: if the credentials expired
+        meanwhile, each thread would log out and in at the same time; instead, those
+        calls fail.
+        """
+        self.ensure_logged_in()
+        self._auto_login = False
+        try:
+            yield
+        finally:
+            self._auto_login = True
+
     @_store_client_wrapper()
     def register_name(self, name, entity_type):
         """Register the specified name for the authenticated user."""
@@ -289,46 +399,154 @@ class Store:
             )
         return result
 
-    def _upload(self, endpoint, filepath, *, extra_fields=None):
-        """Upload for all charms, bundles and resources (generic process)."""
+    def _upload(
+        self, endpoint, filepath, *, extra_fields=None, find_revision=None, show_progress=True
+    ):
+        """Upload for all charms, bundles and resources (generic process).
+
+        If given, `find_revision` is called with the SHA3-384 digest of the file to find
+        an existing revision with the same content, which is then reused. The digest is
+        taken from the uploads ledger if the file was pushed before (so the push is
+        skipped), otherwise it's computed while pushing the file.
+        """
         self._check_authorized()
+        ledger = UploadLedger(env.get_upload_ledger_path())
+
+        known_digest = None
+        if find_revision is not None:
+            known_digest = ledger.get_digest(filepath)
+            if known_digest is not None:
+                revision = find_revision(known_digest)
+                if revision is not None:
+                    emit.progress(
+                        f"Not uploading {str(filepath)!r}, "
+                        f"revision {revision} has the same content"
+                    )
+                    return _build_reused_upload(revision)
+
+        upload_id, digest = self._client.push_file_hashed(filepath, show_progress=show_progress)
+        ledger.put(filepath, digest)
+        if find_revision is not None and digest != known_digest:
+            revision = find_revision(digest)
+            if revision is not None:
+                emit.progress(
+                    f"Not creating a revision for upload {upload_id}, "
+                    f"revision {revision} has the same content"
+                )
+                return _build_reused_upload(revision)
 
-        upload_id = self._client.push_file(filepath)
         payload = {"upload-id": upload_id}
         if extra_fields is not None:
             payload.update(extra_fields)
         response = self._client.request_urlpath_json("POST", endpoint, json=payload)
         status_url = response["status-url"]
         emit.progress(f"Upload {upload_id} started, got status url {status_url}")
+        return self._wait_for_upload(upload_id, status_url, _get_upload_timeout())
 
-        for poll_delay in POLL_DELAYS:
-            response = self._client.request_urlpath_json("GET", status_url)
-            emit.progress(f"Status checked: {response}")
-
-            # as we're asking for a single upload_id, the response will always have only one item
-            (revision,) = response["revisions"]
-            status = revision["status"]
+    def _find_charm_revision(self, name: str, digest: str) -> int | None:
+        """Find an approved revision of a charm or bundle with the given content."""
+        response = self._client.request_urlpath_json("GET", f"/v1/charm/{name}/revisions")
+        for item in response["revisions"]:
+            revision = _build_revision(item)
+            if revision.sha3_384 == digest and revision.status == "approved":
+                return revision.revision
+        return None
 
-            if status in UPLOAD_ENDING_STATUSES:
-                return Uploaded(
-                    ok=UPLOAD_ENDING_STATUSES[status],
-                    errors=_build_errors(revision),
-                    status=status,
-                    revision=revision["revision"],
-                )
+    def _find_resource_revision(
+        self,
+        charm_name: str,
+        resource_name: str,
+        resource_type,
+        bases: list[dict[str, Any]],
+        digest: str,
+    ) -> int | None:
+        """Find a revision of a resource with the given content, type and bases."""
+        bases_key = _get_bases_key(bases)
+        for revision in self._client.list_resource_revisions(charm_name, resource_name):
+            if (
+                revision.sha3_384 == digest
+                and revision.type == resource_type
+                and _get_bases_key(base.marshal() for base in revision.bases) == bases_key
+            ):
+                return revision.revision
+        return None
+
+    def _wait_for_upload(self, upload_id, status_url, timeout):
+        """Poll the status url until the upload review ends, or the timeout is reached.
+
+        The delays between polls grow exponentially (with jitter), unless the store
+        indicates how long to wait in a Retry-After header. If the store is too busy to
+        answer, it's polled again later (within the timeout).
+        """
+        deadline = time.monotonic() + timeout
+        poll_delays = _get_poll_delays()
+        while True:
+            try:
+                with polling():
+                    response = self._client.request_urlpath("GET", status_url)
+            except craft_store.errors.StoreServerError as error:
+                if error.response.status_code not in POLL_BUSY_STATUSES:
+                    raise
+                emit.debug(f"Charmhub is busy ({error.response.status_code}), polling later")
+                headers = error.response.headers
+            else:
+                status_info = _get_json(response)
+                emit.progress(f"Status checked: {status_info}")
+
+                # as we're asking for a single upload_id, the response will always have
+                # only one item
+                (revision,) = status_info["revisions"]
+                status = revision["status"]
+
+                if status in UPLOAD_ENDING_STATUSES:
+                    return Uploaded(
+                        ok=UPLOAD_ENDING_STATUSES[status],
+                        errors=_build_errors(revision),
+                        status=status,
+                        revision=revision["revision"],
+                    )
+                headers = response.headers
 
-            time.sleep(poll_delay)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            poll_delay = _get_retry_after(headers)
+            if poll_delay is None:
+                poll_delay = next(poll_delays)
+            time.sleep(min(poll_delay, remaining))
 
-        # no success in all the attempts to get an ending status
+        # no ending status before the timeout
         raise CraftError(
-            f"Timeout polling Charmhub for upload status (after {sum(POLL_DELAYS)}s)."
+            f"Timeout polling Charmhub for upload status (after {timeout:g}s).",
+            resolution=(
+                f"The upload id is {upload_id!r}: use the 'wait-upload' command to "
+                "keep waiting for it, instead of uploading again."
+            ),
         )
 
     @_store_client_wrapper()
-    def upload(self, name, filepath):
-        """Upload the content of filepath to the indicated charm."""
+    def wait_for_upload(self, name, upload_id, timeout=None):
+        """Wait for the review of an upload (of a charm, bundle or resource) to end."""
+        if timeout is None:
+            timeout = _get_upload_timeout()
+        status_url = f"/v1/charm/{name}/revisions/review?upload-id={upload_id}"
+        emit.progress(f"Waiting for upload {upload_id}, with status url {status_url}")
+        return self._wait_for_upload(upload_id, status_url, timeout)
+
+    @_store_client_wrapper()
+    def upload(self, name, filepath, *, show_progress=True):
+        """Upload the content of filepath to the indicated charm.
+
+        The progress bar of the push can be left out, e.g. when uploading several files
+        at once.
+        """
         endpoint = f"/v1/charm/{name}/revisions"
-        return self._upload(endpoint, filepath)
+        return self._upload(
+            endpoint,
+            filepath,
+            find_revision=lambda digest: self._find_charm_revision(name, digest),
+            show_progress=show_progress,
+        )
 
     @_store_client_wrapper()
     def upload_resource(
@@ -347,7 +565,14 @@ class Store:
             "bases": bases,
         }
         endpoint = f"/v1/charm/{charm_name}/resources/{resource_name}/revisions"
-        return self._upload(endpoint, filepath, extra_fields=extra_fields)
+        return self._upload(
+            endpoint,
+            filepath,
+            extra_fields=extra_fields,
+            find_revision=lambda digest: self._find_resource_revision(
+                charm_name, resource_name, resource_type, bases, digest
+            ),
+        )
 
     @_store_client_wrapper()
     def list_revisions(self, name):
@@ -44,7 +44,14 @@ from charmcraft.utils.platform import (
     get_os_platform,
     validate_architectures,
 )
-from charmcraft.utils.file import S_IRALL, S_IXALL, make_executable, useful_filepath, build_zip
+from charmcraft.utils.file import (
+    S_IRALL,
+    S_IXALL,
+    make_executable,
+    useful_filepath,
+    build_zip,
+    write_text_atomically,
+)
 from charmcraft.utils.package import (
     get_pypi_packages,
     PACKAGE_LINE_REGEX,
@@ -54,6 +61,7 @@ from charmcraft.utils.package import (
     get_pip_version,
     get_requirements_file_package_names,
     validate_strict_dependencies,
+    PipTimings,
 )
 from charmcraft.utils.parts import extend_python_build_environment, get_charm_copy_commands
 from charmcraft.utils.project import (
@@ -85,6 +93,7 @@ __all__ = [
     "make_executable",
     "useful_filepath",
     "build_zip",
+    "write_text_atomically",
     "PACKAGE_LINE_REGEX",
     "format_timestamp",
     "get_pypi_packages",
@@ -94,6 +103,7 @@ __all__ = [
     "get_pip_version",
     "get_requirements_file_package_names",
     "validate_strict_dependencies",
+    "PipTimings",
     "SingleOptionEnsurer",
     "OutputFormat",
     "ResourceOption",
@@ -17,6 +17,8 @@
 import io
 import os
 import pathlib
+import shutil
+import tempfile
 import zipfile
 from _stat import S_IRGRP, S_IROTH, S_IRUSR, S_IXGRP, S_IXOTH, S_IXUSR
 
@@ -42,6 +44,30 @@ def make_executable(fh: io.IOBase) -> None:
     os.fchmod(fileno, mode)
 
 
+def write_text_atomically(path: pathlib.Path, text: str, *, mode: int | None = None) -> None:
+    """Write a text file so it never holds a partial content, even if interrupted.
+
+    The text is written to a temporary file in the same directory, which then
+    replaces the destination file. The file gets the given mode; if none, it keeps
+    its permissions if it existed, or is made readable by everyone if not.
+    """
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    temp_path = pathlib.Path(temp_name)
+    try:
+        with os.fdopen(fd, "w") as fh:
+            fh.write(text)
+        if mode is not None:
+            temp_path.chmod(mode)
+        elif path.exists():
+            shutil.copymode(path, temp_path)
+        else:
+            temp_path.chmod(0o644)
+        temp_path.replace(path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
 def useful_filepath(filepath: PathOrString) -> pathlib.Path:
     """Return a valid Path with username expansion for filepath.
 
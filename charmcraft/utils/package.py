@@ -17,13 +17,35 @@
 import pathlib
 import re
 import string
-import subprocess
 from collections.abc import Collection, Iterable
 
-from charmcraft import errors
+from charmcraft import errors, instrum
 
 PACKAGE_LINE_REGEX = re.compile(r"^([A-Za-z0-9_.-]+)( *[~<>=!]==?)?")
 
+# the phases of a pip install that are timed for each package
+PIP_PHASES = ("resolve", "download", "build-wheel", "install")
+
+# pip installs all the collected packages at once, so that time is not per package
+ALL_PACKAGES = "(all)"
+
+# the lines of pip's output that start (or end, with no phase) a phase
+_PIP_PACKAGE = r"(?P<package>[A-Za-z0-9][A-Za-z0-9._-]*)"
+_PIP_OUTPUT_PATTERNS = [
+    (re.compile(rf"Collecting {_PIP_PACKAGE}"), "resolve"),
+    (re.compile(rf"Requirement already satisfied: {_PIP_PACKAGE}"), "resolve"),
+    (re.compile(r"\s+(Downloading|Using cached) "), "download"),
+    (re.compile(rf"\s*Building wheel for {_PIP_PACKAGE} "), "build-wheel"),
+    (re.compile(r"Installing collected packages: "), "install"),
+    (
+        re.compile(
+            r"(Building wheels for collected packages|Successfully built|Failed to build"
+            r"|Successfully installed)\b"
+        ),
+        None,
+    ),
+]
+
 
 def get_pypi_packages(*requirements: Iterable[str]) -> set[str]:
     """Get a set of pypi packages from requirements files.
@@ -133,7 +155,7 @@ def get_pip_command(
 
 def get_pip_version(pip_cmd: str) -> tuple[int, ...]:
     """Get the version of pip available from a specific pip command."""
-    result = subprocess.run([pip_cmd, "--version"], text=True, capture_output=True, check=True)
+    result = instrum.run([pip_cmd, "--version"], text=True, capture_output=True, check=True)
     version_data = result.stdout.split(" ")
     if len(version_data) < 2:
         raise ValueError("Unknown pip version")
@@ -163,3 +185,78 @@ def validate_strict_dependencies(
 
     if extra_packages:
         raise errors.MissingDependenciesError(extra_packages)
+
+
+class PipTimings:
+    """Attribute the time spent by pip to each package and phase, parsing its output.
+
+    Each line of pip's output that starts a phase for a package (e.g. "Collecting
+    ops" or "Building wheel for ops") starts a measurement of that phase, which ends
+    when the next phase starts or with `finish`. The accumulated duration of each
+    phase is available in `timings`, per package (with canonicalized names).
+    """
+
+    def __init__(self) -> None:
+        self.timings: dict[str, dict[str, float]] = {}
+        self._package: str | None = None
+        self._timer: instrum.Timer | None = None
+
+    def feed(self, line: str) -> None:
+        """Process a line of pip's output."""
+        for pattern, phase in _PIP_OUTPUT_PATTERNS:
+            if match := pattern.match(line):
+                self._switch(phase, match)
+                return
+
+    def _switch(self, phase: str | None, match: re.Match) -> None:
+        """Start a new phase, finishing the ongoing one; no phase just finishes it."""
+        if phase is None:
+            self.finish()
+            return
+        if phase == "install":
+            package = ALL_PACKAGES
+        elif phase == "download":
+            # downloads belong to the package being resolved
+            package = self._package
+            if package is None:
+                return
+        else:
+            package = self._package = re.sub(r"[-_.]+", "-", match.group("package")).lower()
+
+        timer = self._timer
+        if timer is not None and timer.extra_info == {"package": package, "phase": phase}:
+            return
+        self.finish()
+        self._timer = instrum.Timer("Running pip phase", package=package, phase=phase)
+        self._timer.__enter__()
+
+    def finish(self) -> None:
+        """Finish the ongoing phase, if any."""
+        timer = self._timer
+        if timer is None:
+            return
+        timer.__exit__(None, None, None)
+        self._timer = None
+        phases = self.timings.setdefault(timer.extra_info["package"], {})
+        phase = timer.extra_info["phase"]
+        phases[phase] = phases.get(phase, 0) + (timer.duration or 0)
+
+    def get_summary(self) -> str:
+        """Get a table with the time spent in each phase, per package, slowest first."""
+
+        def _format(value: float | None) -> str:
+            return "-" if value is None else f"{value:.2f}s"
+
+        rows = [["Package", *PIP_PHASES, "Total"]]
+        timings = sorted(self.timings.items(), key=lambda item: (-sum(item[1].values()), item[0]))
+        for package, phases in timings:
+            durations = [phases.get(phase) for phase in PIP_PHASES]
+            rows.append([package, *map(_format, durations), _format(sum(phases.values()))])
+        widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+        return "\n".join(
+            "  ".join(
+                cell.ljust(width) if column == 0 else cell.rjust(width)
+                for column, (cell, width) in enumerate(zip(row, widths))
+            ).rstrip()
+            for row in rows
+        )
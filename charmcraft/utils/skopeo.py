@@ -23,7 +23,7 @@ import subprocess
 from collections.abc import Sequence
 from typing import Any, cast, overload
 
-from charmcraft import errors
+from charmcraft import errors, instrum
 
 
 class Skopeo:
@@ -73,7 +73,7 @@ class Skopeo:
     def _run_skopeo(self, command: Sequence[str], **kwargs) -> subprocess.CompletedProcess:
         """Run skopeo, converting the error message if necessary."""
         try:
-            return subprocess.run(command, check=True, **kwargs)
+            return instrum.run(command, check=True, **kwargs)
         except subprocess.CalledProcessError as exc:
             raise errors.SubprocessError.from_subprocess(exc) from exc
 
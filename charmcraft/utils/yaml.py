@@ -45,7 +45,11 @@ def _repr_str(dumper: yaml.SafeDumper, data: str) -> yaml.ScalarNode:
     return dumper.represent_scalar("tag:yaml.org,2002:str", data)
 
 
-def dump_yaml(data: Any) -> str:  # noqa: ANN401: yaml.dump takes anything, so why can't we?
+def dump_yaml(
+    data: Any,  # noqa: ANN401 (yaml.dump takes anything, so why can't we?)
+    *,
+    sort_keys: bool = False,
+) -> str:
     """Dump a craft model to a YAML string."""
     yaml.add_representer(str, _repr_str, Dumper=yaml.SafeDumper)
     yaml.add_representer(
@@ -56,4 +60,4 @@ def dump_yaml(data: Any) -> str:  # noqa: ANN401: yaml.dump takes anything, so w
         yaml.representer.SafeRepresenter.represent_str,
         Dumper=yaml.SafeDumper,
     )
-    return yaml.dump(data, Dumper=yaml.SafeDumper, sort_keys=False)
+    return yaml.dump(data, Dumper=yaml.SafeDumper, sort_keys=sort_keys)
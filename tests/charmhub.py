@@ -0,0 +1,594 @@
+# Copyright 2024 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# For further info, check https://github.com/canonical/charmcraft
+"""A local stand-in for Charmhub (and its storage), to test and benchmark the store commands.
+
+It implements, in memory, the endpoints used by the Store and its clients: pushing
+files to the storage, uploading revisions and polling their review, releases, the
+libraries, the resources and the OCI registry credentials. Each request can be
+delayed (to mimic the latency of the real store) and failures can be injected.
+
+It can also be run on its own, to try the commands by hand against it:
+
+    python -m tests.charmhub --port 8080 --latency 0.05 --charm my-charm
+"""
+
+import argparse
+import base64
+import datetime
+import hashlib
+import http.server
+import itertools
+import json
+import re
+import threading
+import time
+import urllib.parse
+from collections.abc import Callable
+from typing import Any
+
+from craft_store import creds
+from requests_toolbelt.multipart.decoder import MultipartDecoder  # type: ignore[import]
+from typing_extensions import Self
+
+# the risks of the default track, from the most to the least stable
+RISKS = ["stable", "candidate", "beta", "edge"]
+
+
+def get_auth_value(macaroon: str = "fake-macaroon") -> str:
+    """Get credentials to use with the stand-in through the CHARMCRAFT_AUTH variable."""
+    return base64.b64encode(creds.marshal_candid_credentials(macaroon).encode()).decode()
+
+
+def _now() -> str:
+    return datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Dispatch each request to the route of the stand-in that matches it."""
+
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def _handle(self) -> None:
+        charmhub = self.server.charmhub
+        url = urllib.parse.urlsplit(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        fault = charmhub.get_fault(self.command, url.path)
+        if fault == "drop":
+            # the connection is lost in the middle of the request
+            self.rfile.read(length // 2)
+            self.close_connection = True
+            return
+
+        body = self.rfile.read(length)
+        charmhub.record(self.command, url.path)
+        if charmhub.latency:
+            time.sleep(charmhub.latency)
+        if fault is not None:
+            content = {"error-list": [{"code": "injected", "message": "Injected fault"}]}
+            retry_after = charmhub.fault_retry_after
+            headers = {} if retry_after is None else {"Retry-After": retry_after}
+            self._send(fault, content, headers)
+            return
+
+        status, content = charmhub.dispatch(
+            self.command,
+            url.path,
+            urllib.parse.parse_qs(url.query),
+            self.headers,
+            body,
+        )
+        self._send(status, content)
+
+    def _send(self, status: int, content: Any, headers: dict[str, str] | None = None) -> None:
+        if isinstance(content, str):
+            body = content.encode()
+            content_type = "text/plain"
+        else:
+            body = json.dumps(content).encode()
+            content_type = "application/json"
+        etag = f'"{hashlib.sha256(body).hexdigest()}"'
+        if status == 200 and self.command in ("GET", "POST"):
+            if self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status in (200, 304):
+            self.send_header("ETag", etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self._handle()
+
+    def do_POST(self) -> None:
+        self._handle()
+
+    def do_DELETE(self) -> None:
+        self._handle()
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    charmhub: "FakeCharmhub"
+
+
+class FakeCharmhub:
+    """A stand-in for Charmhub and its storage, serving both in a local port.
+
+    :param latency: how long (in seconds) each request is delayed before answering it.
+    :param review_polls: how many times the status of an upload is polled before its
+        review ends (the first poll is the number 1).
+    """
+
+    def __init__(self, *, latency: float = 0, review_polls: int = 1) -> None:
+        self.latency = latency
+        self.review_polls = review_polls
+        # the Retry-After header sent with the injected faults, if any
+        self.fault_retry_after: str | None = None
+        # all the requests received, as (method, path)
+        self.requests: list[tuple[str, str]] = []
+        self.packages: dict[str, dict[str, Any]] = {}
+        self.libraries: list[dict[str, Any]] = []
+        self._pushed: dict[str, dict[str, Any]] = {}
+        self._uploads: dict[str, dict[str, Any]] = {}
+        self._faults: list[tuple[str, re.Pattern[str], list[int | str]]] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._server: _Server | None = None
+        self._routes: list[tuple[str, re.Pattern[str], Callable[..., tuple[int, Any]]]] = [
+            ("POST", re.compile(r"/unscanned-upload/"), self._push),
+            ("GET", re.compile(r"/v1/tokens/whoami"), self._whoami),
+            ("GET", re.compile(r"/v1/charm"), self._list_names),
+            ("POST", re.compile(r"/v1/charm"), self._register_name),
+            ("POST", re.compile(r"/v1/charm/libraries/bulk"), self._libraries_bulk),
+            ("GET", re.compile(r"/v1/charm/libraries/(?P<charm>[^/]+)/(?P<lib_id>[^/]+)"), self._get_library),
+            ("GET", re.compile(r"/v1/charm/(?P<name>[^/]+)/revisions"), self._list_revisions),
+            ("POST", re.compile(r"/v1/charm/(?P<name>[^/]+)/revisions"), self._upload_revision),
+            ("GET", re.compile(r"/v1/charm/(?P<name>[^/]+)(/resources/[^/]+)?/revisions/review"), self._review),
+            ("GET", re.compile(r"/v1/charm/(?P<name>[^/]+)/releases"), self._list_releases),
+            ("POST", re.compile(r"/v1/charm/(?P<name>[^/]+)/releases"), self._release),
+            ("GET", re.compile(r"/v1/charm/(?P<name>[^/]+)/resources"), self._list_resources),
+            ("GET", re.compile(r"/v1/charm/(?P<name>[^/]+)/resources/(?P<resource>[^/]+)/revisions"), self._list_resource_revisions),
+            ("POST", re.compile(r"/v1/charm/(?P<name>[^/]+)/resources/(?P<resource>[^/]+)/revisions"), self._upload_resource_revision),
+            ("GET", re.compile(r"/v1/charm/(?P<name>[^/]+)/resources/(?P<resource>[^/]+)/oci-image/upload-credentials"), self._oci_credentials),
+            ("POST", re.compile(r"/v1/charm/(?P<name>[^/]+)/resources/(?P<resource>[^/]+)/oci-image/blob"), self._oci_blob),
+        ]  # fmt: skip
+
+    # -- serving
+
+    @property
+    def url(self) -> str:
+        """The URL of the stand-in (for both the API and the storage)."""
+        if self._server is None:
+            raise RuntimeError("The Charmhub stand-in is not serving.")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, port: int = 0) -> None:
+        """Serve in a thread, in the given local port (a free one by default)."""
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._server.charmhub = self
+        thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+
+    def stop(self) -> None:
+        """Stop serving."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    # -- setting up
+
+    def add_package(self, name: str, package_type: str = "charm") -> dict[str, Any]:
+        """Register a package, without revisions nor releases."""
+        with self._lock:
+            return self.packages.setdefault(
+                name,
+                {
+                    "name": name,
+                    "type": package_type,
+                    "revisions": [],
+                    "channel-map": [],
+                    "resources": {},
+                },
+            )
+
+    def add_resource(self, charm_name: str, name: str, resource_type: str = "file") -> None:
+        """Declare a resource for a charm, without revisions."""
+        with self._lock:
+            package = self.add_package(charm_name)
+            package["resources"][name] = {"name": name, "type": resource_type, "revisions": []}
+
+    def add_library(
+        self, charm_name: str, lib_name: str, api: int = 0, patch: int = 1
+    ) -> dict[str, Any]:
+        """Publish a version of a library of a charm."""
+        content = f'LIBID = "{charm_name}-{lib_name}"\nLIBAPI = {api}\nLIBPATCH = {patch}\n'
+        library = {
+            "charm-name": charm_name,
+            "library-name": lib_name,
+            "library-id": f"{charm_name}-{lib_name}",
+            "api": api,
+            "patch": patch,
+            "content": content,
+            "hash": hashlib.sha256(content.encode()).hexdigest(),
+        }
+        with self._lock:
+            self.libraries.append(library)
+        return library
+
+    def add_revision(self, name: str, content: bytes) -> int:
+        """Create an (approved) revision of a package with the given content."""
+        with self._lock:
+            upload_id = self._keep_pushed(content)
+            upload = {"name": name, "resource": None, "request": {}}
+            return self._create_revision(upload_id, upload)
+
+    def add_release(self, name: str, revision: int, channel: str) -> None:
+        """Release a revision of a package in a channel, without resources."""
+        with self._lock:
+            self._set_release(self.packages[name], revision, channel, [])
+
+    def inject_faults(self, method: str, path_pattern: str, *faults: int | str) -> None:
+        """Answer the next requests to the matching paths with the given faults, in order.
+
+        Each fault is an HTTP status code to answer with, or "drop" to lose the
+        connection in the middle of the request.
+        """
+        with self._lock:
+            self._faults.append((method, re.compile(path_pattern), list(faults)))
+
+    def get_fault(self, method: str, path: str) -> int | str | None:
+        """Get the fault to answer a request with, if any is pending."""
+        with self._lock:
+            for fault_method, pattern, faults in self._faults:
+                if fault_method == method and pattern.fullmatch(path) and faults:
+                    return faults.pop(0)
+        return None
+
+    def record(self, method: str, path: str) -> None:
+        """Record a received request."""
+        with self._lock:
+            self.requests.append((method, path))
+
+    def count_requests(self, method: str, path_pattern: str) -> int:
+        """Count the received requests to the matching paths."""
+        pattern = re.compile(path_pattern)
+        with self._lock:
+            return sum(
+                1
+                for req_method, path in self.requests
+                if req_method == method and pattern.fullmatch(path)
+            )
+
+    # -- the endpoints
+
+    def dispatch(
+        self, method: str, path: str, query: dict[str, list[str]], headers, body: bytes
+    ) -> tuple[int, Any]:
+        """Answer a request, with its status code and content."""
+        authenticated = path.startswith("/v1/") and not path.startswith("/v1/charm/libraries")
+        if authenticated and not headers.get("Authorization", "").startswith("Macaroon "):
+            return 401, {"error-list": [{"code": "unauthorized", "message": "Login needed"}]}
+
+        for route_method, pattern, handler in self._routes:
+            match = pattern.fullmatch(path)
+            if route_method == method and match:
+                params = match.groupdict()
+                if "name" in params and params["name"] not in self.packages:
+                    return _not_found(f"Unknown package {params['name']!r}")
+                with self._lock:
+                    return handler(query=query, headers=headers, body=body, **params)
+        return _not_found(f"Unknown endpoint {method} {path}")
+
+    def _keep_pushed(self, content: bytes) -> str:
+        """Keep the size and digests of a pushed file, returning its upload id."""
+        upload_id = f"upload-{next(self._ids)}"
+        self._pushed[upload_id] = {
+            "size": len(content),
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "sha3-384": hashlib.sha3_384(content).hexdigest(),
+            "sha384": hashlib.sha384(content).hexdigest(),
+            "sha512": hashlib.sha512(content).hexdigest(),
+        }
+        return upload_id
+
+    def _push(self, headers, body: bytes, **_) -> tuple[int, Any]:
+        (part,) = MultipartDecoder(body, headers["Content-Type"]).parts
+        return 200, {"successful": True, "upload_id": self._keep_pushed(part.content)}
+
+    def _whoami(self, **_) -> tuple[int, Any]:
+        return 200, {
+            "account": {"display-name": "Fake User", "username": "fake-user", "id": "fake-id"},
+            "packages": None,
+            "channels": None,
+            "permissions": ["package-manage", "package-view"],
+        }
+
+    def _list_names(self, **_) -> tuple[int, Any]:
+        results = [
+            {
+                "name": package["name"],
+                "type": package["type"],
+                "private": False,
+                "status": "registered",
+                "publisher": {"display-name": "Fake User"},
+            }
+            for package in self.packages.values()
+        ]
+        return 200, {"results": results}
+
+    def _register_name(self, body: bytes, **_) -> tuple[int, Any]:
+        request = json.loads(body)
+        if request["name"] in self.packages:
+            return 409, {"error-list": [{"code": "conflict", "message": "Already registered"}]}
+        self.add_package(request["name"], request.get("type", "charm"))
+        return 200, {"id": request["name"]}
+
+    def _libraries_bulk(self, body: bytes, **_) -> tuple[int, Any]:
+        tips: dict[tuple[str, int], dict[str, Any]] = {}
+        for item in json.loads(body):
+            for library in self.libraries:
+                if "library-id" in item:
+                    if library["library-id"] != item["library-id"]:
+                        continue
+                elif (
+                    library["charm-name"] != item["charm-name"]
+                    or item.get("library-name", library["library-name"]) != library["library-name"]
+                ):
+                    continue
+                if item.get("api", library["api"]) != library["api"]:
+                    continue
+                key = (library["library-id"], library["api"])
+                if key not in tips or tips[key]["patch"] < library["patch"]:
+                    tips[key] = library
+        libraries = [
+            {key: value for key, value in library.items() if key != "content"}
+            for library in tips.values()
+        ]
+        return 200, {"libraries": libraries}
+
+    def _get_library(self, lib_id: str, query, **_) -> tuple[int, Any]:
+        api = int(query["api"][0]) if "api" in query else None
+        patch = int(query["patch"][0]) if "patch" in query else None
+        found = [
+            library
+            for library in self.libraries
+            if library["library-id"] == lib_id
+            and api in (None, library["api"])
+            and patch in (None, library["patch"])
+        ]
+        if not found:
+            return _not_found(f"Unknown library {lib_id!r}")
+        return 200, max(found, key=lambda library: (library["api"], library["patch"]))
+
+    def _list_revisions(self, name: str, **_) -> tuple[int, Any]:
+        return 200, {"revisions": self.packages[name]["revisions"]}
+
+    def _start_upload(
+        self, name: str, body: bytes, status_url: str, resource: str | None = None
+    ) -> tuple[int, Any]:
+        request = json.loads(body)
+        upload_id = request["upload-id"]
+        if upload_id not in self._pushed:
+            return _not_found(f"Unknown upload id {upload_id!r}")
+        self._uploads[upload_id] = {
+            "name": name,
+            "resource": resource,
+            "request": request,
+            "polls": 0,
+            "revision": None,
+        }
+        return 200, {"status-url": f"{status_url}?upload-id={upload_id}"}
+
+    def _upload_revision(self, name: str, body: bytes, **_) -> tuple[int, Any]:
+        return self._start_upload(name, body, f"/v1/charm/{name}/revisions/review")
+
+    def _upload_resource_revision(
+        self, name: str, resource: str, body: bytes, **_
+    ) -> tuple[int, Any]:
+        if resource not in self.packages[name]["resources"]:
+            return _not_found(f"Unknown resource {resource!r}")
+        status_url = f"/v1/charm/{name}/resources/{resource}/revisions/review"
+        return self._start_upload(name, body, status_url, resource)
+
+    def _review(self, name: str, query, **_) -> tuple[int, Any]:
+        (upload_id,) = query["upload-id"]
+        upload = self._uploads.get(upload_id)
+        if upload is None or upload["name"] != name:
+            return _not_found(f"Unknown upload id {upload_id!r}")
+
+        upload["polls"] += 1
+        if upload["polls"] >= self.review_polls and upload["revision"] is None:
+            upload["revision"] = self._create_revision(upload_id, upload)
+        status = "new" if upload["revision"] is None else "approved"
+        item = {
+            "upload-id": upload_id,
+            "status": status,
+            "revision": upload["revision"],
+            "errors": None,
+        }
+        return 200, {"revisions": [item]}
+
+    def _create_revision(self, upload_id: str, upload: dict[str, Any]) -> int:
+        """Create the revision of an upload, once its review ends."""
+        pushed = self._pushed[upload_id]
+        package = self.packages[upload["name"]]
+        if upload["resource"] is None:
+            revisions = package["revisions"]
+            revision = len(revisions) + 1
+            revisions.insert(
+                0,
+                {
+                    "revision": revision,
+                    "version": str(revision),
+                    "created-at": _now(),
+                    "status": "approved",
+                    "errors": None,
+                    "bases": [{"name": "ubuntu", "channel": "22.04", "architecture": "amd64"}],
+                    "sha3-384": pushed["sha3-384"],
+                },
+            )
+            return revision
+
+        resource = package["resources"][upload["resource"]]
+        revision = len(resource["revisions"]) + 1
+        resource["revisions"].insert(
+            0,
+            {
+                "name": resource["name"],
+                "type": upload["request"].get("type", resource["type"]),
+                "revision": revision,
+                "created-at": _now(),
+                "bases": upload["request"].get("bases", [{"architectures": ["all"]}]),
+                **pushed,
+            },
+        )
+        return revision
+
+    def _list_releases(self, name: str, **_) -> tuple[int, Any]:
+        package = self.packages[name]
+        channels = [
+            {
+                "name": f"latest/{risk}",
+                "track": "latest",
+                "risk": risk,
+                "branch": None,
+                "fallback": None if index == 0 else f"latest/{RISKS[index - 1]}",
+            }
+            for index, risk in enumerate(RISKS)
+        ]
+        released = {item["revision"] for item in package["channel-map"]}
+        revisions = [item for item in package["revisions"] if item["revision"] in released]
+        return 200, {
+            "channel-map": package["channel-map"],
+            "package": {"channels": channels},
+            "revisions": revisions,
+        }
+
+    def _release(self, name: str, body: bytes, **_) -> tuple[int, Any]:
+        package = self.packages[name]
+        known = {item["revision"] for item in package["revisions"]}
+        requests = json.loads(body)
+        for request in requests:
+            if request["revision"] not in known:
+                return _not_found(f"Unknown revision {request['revision']}")
+            for resource in request["resources"]:
+                if resource["name"] not in package["resources"]:
+                    return _not_found(f"Unknown resource {resource['name']!r}")
+        for request in requests:
+            self._set_release(
+                package, request["revision"], request["channel"], request["resources"]
+            )
+        return 200, {"released": [request["channel"] for request in requests]}
+
+    def _set_release(
+        self,
+        package: dict[str, Any],
+        revision: int,
+        channel: str,
+        resources: list[dict[str, Any]],
+    ) -> None:
+        """Release a revision in a channel, replacing the one released there, if any."""
+        if "/" not in channel:
+            channel = f"latest/{channel}"
+        package["channel-map"] = [
+            item for item in package["channel-map"] if item["channel"] != channel
+        ]
+        package["channel-map"].append(
+            {
+                "channel": channel,
+                "revision": revision,
+                "expiration-date": None,
+                "base": {"name": "ubuntu", "channel": "22.04", "architecture": "amd64"},
+                "resources": [
+                    {**resource, "type": package["resources"][resource["name"]]["type"]}
+                    for resource in resources
+                ],
+            }
+        )
+
+    def _list_resources(self, name: str, **_) -> tuple[int, Any]:
+        resources = [
+            {"name": resource["name"], "type": resource["type"], "optional": False}
+            for resource in self.packages[name]["resources"].values()
+        ]
+        return 200, {"resources": resources}
+
+    def _list_resource_revisions(self, name: str, resource: str, **_) -> tuple[int, Any]:
+        if resource not in self.packages[name]["resources"]:
+            return _not_found(f"Unknown resource {resource!r}")
+        return 200, {"revisions": self.packages[name]["resources"][resource]["revisions"]}
+
+    def _oci_credentials(self, name: str, resource: str, **_) -> tuple[int, Any]:
+        return 200, {
+            "image-name": f"{self.url.split('//')[1]}/{name}/{resource}",
+            "username": "fake-user",
+            "password": "fake-password",
+        }
+
+    def _oci_blob(self, name: str, resource: str, body: bytes, **_) -> tuple[int, Any]:
+        digest = json.loads(body)["image-digest"]
+        image_name = f"{self.url.split('//')[1]}/{name}/{resource}"
+        blob = {"ImageName": f"{image_name}@{digest}", "Username": "fake-user", "Password": "x"}
+        return 200, json.dumps(blob)
+
+
+def _not_found(message: str) -> tuple[int, Any]:
+    return 404, {"error-list": [{"code": "not-found", "message": message}]}
+
+
+def main() -> None:
+    """Serve the stand-in until interrupted."""
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for Charmhub.")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0, help="Delay of each request (s)")
+    parser.add_argument("--review-polls", type=int, default=1)
+    parser.add_argument("--charm", action="append", default=[], help="Register a charm")
+    args = parser.parse_args()
+
+    charmhub = FakeCharmhub(latency=args.latency, review_polls=args.review_polls)
+    for name in args.charm:
+        charmhub.add_package(name)
+    charmhub.start(args.port)
+    print(f"Serving a Charmhub stand-in at {charmhub.url}, use it with:")
+    print(f"  export CHARMCRAFT_STORE_API_URL={charmhub.url}")
+    print(f"  export CHARMCRAFT_UPLOAD_URL={charmhub.url}")
+    print(f"  export CHARMCRAFT_AUTH={get_auth_value()}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        charmhub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -17,11 +17,19 @@
 """Tests for the Store API layer (code in store/store.py)."""
 
 import base64
+import email.utils
+import itertools
+import json
+import os
+import pathlib
 import platform
-from unittest.mock import MagicMock, call, patch
+import time
+from types import SimpleNamespace
+from unittest.mock import ANY, MagicMock, call, patch
 
 import craft_store
 import pytest
+import requests
 from craft_cli import CraftError
 from craft_store import attenuations
 from craft_store.endpoints import Package
@@ -31,18 +39,27 @@ from craft_store.errors import (
     NetworkError,
     StoreServerError,
 )
+from craft_store.models.resource_revision_model import (
+    CharmResourceRevision,
+    ResponseCharmResourceBase,
+)
 from dateutil import parser
 
-from charmcraft import const
+from charmcraft import const, env
 from charmcraft.store import (
     AUTH_DEFAULT_PERMISSIONS,
     AUTH_DEFAULT_TTL,
     AnonymousClient,
     Client,
     Store,
+    UploadLedger,
+)
+from charmcraft.store.models import Base, Library, Uploaded
+from charmcraft.store.store import (
+    POLL_MAX_DELAY,
+    _get_poll_delays,
+    _store_client_wrapper,
 )
-from charmcraft.store.models import Base, Library
-from charmcraft.store.store import _store_client_wrapper
 from charmcraft.utils import ResourceOption
 from tests.commands.test_store_client import FakeResponse
 
@@ -52,17 +69,47 @@ def client_mock(monkeypatch):
     """Fixture to provide a mocked client."""
     monkeypatch.setattr(platform, "node", lambda: "fake-host")
     client_mock = MagicMock(spec=Client)
-    with patch("charmcraft.store.store.Client", lambda api, storage, ephemeral=True: client_mock):
+    with patch(
+        "charmcraft.store.store.Client",
+        lambda api, storage, ephemeral=True, http_cache=None: client_mock,
+    ):
         yield client_mock
 
 
+@pytest.fixture(autouse=True)
+def shared_cache(monkeypatch, tmp_path):
+    """Keep the uploads ledger (in the shared cache) in a temporary directory."""
+    monkeypatch.setenv(const.SHARED_CACHE_ENV_VAR, str(tmp_path / "shared-cache"))
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """Fake the clock used when polling the store, recording the sleeps."""
+    clock = SimpleNamespace(now=0, sleeps=[])
+
+    def sleep(seconds):
+        clock.sleeps.append(seconds)
+        clock.now += seconds
+
+    fake_time = SimpleNamespace(monotonic=lambda: clock.now, sleep=sleep, time=time.time)
+    monkeypatch.setattr("charmcraft.store.store.time", fake_time)
+    return clock
+
+
+def _status_response(content, headers=None):
+    """Build a response from the store with the status of an upload."""
+    response = FakeResponse(content=json.dumps(content), status_code=200)
+    response.headers = requests.structures.CaseInsensitiveDict(headers or {})
+    return response
+
+
 @pytest.fixture
 def anonymous_client_mock(monkeypatch):
     """Fixture to provide a mocked anonymous client."""
     anonymous_client_mock = MagicMock(spec=AnonymousClient)
     with patch(
         "charmcraft.store.store.AnonymousClient",
-        lambda api, storage: anonymous_client_mock,
+        lambda api, storage, http_cache=None: anonymous_client_mock,
     ):
         yield anonymous_client_mock
 
@@ -75,8 +122,23 @@ def test_client_init(charmhub_config):
     with patch("charmcraft.store.store.Client") as client_mock:
         Store(charmhub_config)
     assert client_mock.mock_calls == [
-        call(charmhub_config.api_url, charmhub_config.storage_url, ephemeral=False),
+        call(
+            charmhub_config.api_url,
+            charmhub_config.storage_url,
+            ephemeral=False,
+            http_cache=ANY,
+        ),
     ]
+    http_cache = client_mock.call_args.kwargs["http_cache"]
+    assert http_cache.path == env.get_http_cache_path()
+    assert not http_cache.enabled
+
+
+def test_client_init_use_cache(charmhub_config):
+    """Check that the client is initiated with an enabled cache, if indicated."""
+    with patch("charmcraft.store.store.Client") as client_mock:
+        Store(charmhub_config, use_cache=True)
+    assert client_mock.call_args.kwargs["http_cache"].enabled
 
 
 def test_client_init_ephemeral(charmhub_config):
@@ -84,7 +146,12 @@ def test_client_init_ephemeral(charmhub_config):
     with patch("charmcraft.store.store.Client") as client_mock:
         Store(charmhub_config, ephemeral=True)
     assert client_mock.mock_calls == [
-        call(charmhub_config.api_url, charmhub_config.storage_url, ephemeral=True),
+        call(
+            charmhub_config.api_url,
+            charmhub_config.storage_url,
+            ephemeral=True,
+            http_cache=ANY,
+        ),
     ]
 
 
@@ -94,16 +161,19 @@ def test_client_init_ephemeral(charmhub_config):
 def test_anonymous_client_init(charmhub_config):
     """Check that the client is initiated ok even without config."""
     with patch("charmcraft.store.store.AnonymousClient") as anonymous_client_mock:
-        Store(charmhub_config, needs_auth=False)
+        Store(charmhub_config, needs_auth=False, use_cache=True)
     assert anonymous_client_mock.mock_calls == [
-        call(charmhub_config.api_url, charmhub_config.storage_url),
+        call(charmhub_config.api_url, charmhub_config.storage_url, http_cache=ANY),
     ]
+    assert anonymous_client_mock.call_args.kwargs["http_cache"].enabled
 
 
 # -- tests for store_client_wrapper
 
 
 class _FakeAPI:
+    _auto_login = True
+
     def __init__(self, exceptions):
         self.login_called = False
         self.logout_called = False
@@ -413,6 +483,21 @@ def test_logout(client_mock, charmhub_config):
     assert result is None
 
 
+def test_logged_in_once(client_mock, charmhub_config):
+    """Credentials are checked on entering, and calls inside don't log in again."""
+    store = Store(charmhub_config)
+    client_mock.request_urlpath_json.side_effect = StoreServerError(FakeResponse("auth", 401))
+
+    with store.logged_in_once():
+        assert client_mock.mock_calls == [call.whoami()]
+        with pytest.raises(CraftError) as cm:
+            store.list_registered_names(include_collaborations=False)
+
+    assert str(cm.value) == "Existing credentials are no longer valid for Charmhub."
+    assert [name for name, _, _ in client_mock.mock_calls if name in ("login", "logout")] == []
+    assert store._auto_login is True
+
+
 def test_whoami_simple(client_mock, charmhub_config):
     """Simple whoami case."""
     store = Store(charmhub_config)
@@ -704,7 +789,7 @@ def test_upload_straightforward(client_mock, emitter, charmhub_config):
 
     # the first response, for when pushing bytes
     test_upload_id = "test-upload-id"
-    client_mock.push_file.return_value = test_upload_id
+    client_mock.push_file_hashed.return_value = (test_upload_id, "test-digest")
 
     # the second response, for telling the store it was pushed
     test_status_url = "https://store.c.c/status"
@@ -716,14 +801,14 @@ def test_upload_straightforward(client_mock, emitter, charmhub_config):
         "revisions": [{"status": test_status_ok, "revision": test_revision, "errors": None}]
     }
 
-    client_mock.request_urlpath_json.side_effect = [
-        {"status-url": test_status_url},
-        status_response,
+    client_mock.request_urlpath_json.return_value = {"status-url": test_status_url}
+    client_mock.request_urlpath.side_effect = [
+        _status_response(status_response),
     ]
 
     test_status_resolution = "test-ok-or-not"
     fake_statuses = {test_status_ok: test_status_resolution}
-    test_filepath = "test-filepath"
+    test_filepath = pathlib.Path("test-filepath")
     test_endpoint = "/v1/test/revisions/endpoint/"
     with patch.dict("charmcraft.store.store.UPLOAD_ENDING_STATUSES", fake_statuses):
         result = store._upload(test_endpoint, test_filepath)
@@ -731,9 +816,9 @@ def test_upload_straightforward(client_mock, emitter, charmhub_config):
     # check all client calls
     assert client_mock.mock_calls == [
         call.whoami(),
-        call.push_file(test_filepath),
+        call.push_file_hashed(test_filepath, show_progress=True),
         call.request_urlpath_json("POST", test_endpoint, json={"upload-id": test_upload_id}),
-        call.request_urlpath_json("GET", test_status_url),
+        call.request_urlpath("GET", test_status_url),
     ]
 
     # check result (build after patched ending struct)
@@ -753,13 +838,13 @@ def test_upload_straightforward(client_mock, emitter, charmhub_config):
     )
 
 
-def test_upload_polls_status_ok(client_mock, emitter, charmhub_config):
+def test_upload_polls_status_ok(client_mock, emitter, charmhub_config, fake_clock):
     """Upload polls status url until the end is indicated."""
     store = Store(charmhub_config)
 
     # first and second response, for pushing bytes and let the store know about it
     test_upload_id = "test-upload-id"
-    client_mock.push_file.return_value = test_upload_id
+    client_mock.push_file_hashed.return_value = (test_upload_id, "test-digest")
     test_status_url = "https://store.c.c/status"
 
     # the status checking response, will answer something not done yet twice, then ok
@@ -774,24 +859,23 @@ def test_upload_polls_status_ok(client_mock, emitter, charmhub_config):
     status_response_3 = {
         "revisions": [{"status": test_status_ok, "revision": test_revision, "errors": None}]
     }
-    client_mock.request_urlpath_json.side_effect = [
-        {"status-url": test_status_url},
-        status_response_1,
-        status_response_2,
-        status_response_3,
+    client_mock.request_urlpath_json.return_value = {"status-url": test_status_url}
+    client_mock.request_urlpath.side_effect = [
+        _status_response(status_response_1),
+        _status_response(status_response_2),
+        _status_response(status_response_3),
     ]
 
     test_status_resolution = "clean and crispy"
     fake_statuses = {test_status_ok: test_status_resolution}
     with patch.dict("charmcraft.store.store.UPLOAD_ENDING_STATUSES", fake_statuses):
-        with patch("charmcraft.store.store.POLL_DELAYS", [0.1] * 5):
-            result = store._upload("/test/endpoint/", "some-filepath")
+        result = store._upload("/test/endpoint/", pathlib.Path("some-filepath"))
 
     # check the status-checking client calls (kept going until third one)
     assert client_mock.mock_calls[3:] == [
-        call.request_urlpath_json("GET", test_status_url),
-        call.request_urlpath_json("GET", test_status_url),
-        call.request_urlpath_json("GET", test_status_url),
+        call.request_urlpath("GET", test_status_url),
+        call.request_urlpath("GET", test_status_url),
+        call.request_urlpath("GET", test_status_url),
     ]
 
     # check result which must have values from final result
@@ -812,18 +896,87 @@ def test_upload_polls_status_ok(client_mock, emitter, charmhub_config):
         ]
     )
 
+    # the delays between polls grow exponentially, with jitter
+    first_delay, second_delay = fake_clock.sleeps
+    assert 0.25 <= first_delay <= 0.5
+    assert 0.5 <= second_delay <= 1
 
-def test_upload_polls_status_timeout(client_mock, emitter, charmhub_config):
-    """Upload polls status url until a timeout is achieved.
 
-    This is simulated patching a POLL_DELAYS structure shorter than the
-    number of "keep going" responses.
-    """
+def test_upload_polls_status_retry_after(client_mock, charmhub_config, fake_clock):
+    """Upload waits between polls what the store indicates, if it does."""
+    store = Store(charmhub_config)
+    client_mock.push_file_hashed.return_value = ("test-upload-id", "test-digest")
+    client_mock.request_urlpath_json.return_value = {"status-url": "/status"}
+    in_progress = {"revisions": [{"status": "still-scanning", "revision": None, "errors": None}]}
+    approved = {"revisions": [{"status": "approved", "revision": 7, "errors": None}]}
+    retry_at = email.utils.formatdate(time.time() + 30, usegmt=True)
+    client_mock.request_urlpath.side_effect = [
+        _status_response(in_progress, headers={"Retry-After": "7"}),
+        _status_response(in_progress, headers={"Retry-After": retry_at}),
+        _status_response(in_progress, headers={"Retry-After": "not a delay"}),
+        _status_response(approved),
+    ]
+
+    result = store._upload("/test/endpoint/", pathlib.Path("some-filepath"))
+
+    assert result.revision == 7
+    retry_after_seconds, retry_after_date, backoff = fake_clock.sleeps
+    assert retry_after_seconds == 7
+    assert 28 <= retry_after_date <= 30
+    assert 0.25 <= backoff <= 0.5
+
+
+@pytest.mark.parametrize("status_code", [429, 503])
+def test_upload_polls_status_busy(client_mock, emitter, charmhub_config, fake_clock, status_code):
+    """Upload keeps polling when the store is too busy, waiting what it indicates."""
+    store = Store(charmhub_config)
+    client_mock.push_file_hashed.return_value = ("test-upload-id", "test-digest")
+    client_mock.request_urlpath_json.return_value = {"status-url": "/status"}
+    approved = {"revisions": [{"status": "approved", "revision": 7, "errors": None}]}
+    busy_response = _status_response({}, headers={"Retry-After": "12"})
+    busy_response.status_code = status_code
+    client_mock.request_urlpath.side_effect = [
+        StoreServerError(busy_response),
+        _status_response(approved),
+    ]
+
+    result = store._upload("/test/endpoint/", pathlib.Path("some-filepath"))
+
+    assert result.revision == 7
+    assert fake_clock.sleeps == [12]
+    emitter.assert_debug(f"Charmhub is busy ({status_code}), polling later")
+
+
+def test_upload_polls_status_server_error(client_mock, charmhub_config, fake_clock):
+    """Other errors polling the status are not retried."""
+    store = Store(charmhub_config)
+    client_mock.push_file_hashed.return_value = ("test-upload-id", "test-digest")
+    client_mock.request_urlpath_json.return_value = {"status-url": "/status"}
+    error_response = _status_response({}, headers={"Retry-After": "12"})
+    error_response.status_code = 500
+    client_mock.request_urlpath.side_effect = [StoreServerError(error_response)]
+
+    with pytest.raises(StoreServerError):
+        store._upload("/test/endpoint/", pathlib.Path("some-filepath"))
+    assert fake_clock.sleeps == []
+
+
+def test_upload_poll_delays_limit():
+    """The delays between polls grow up to a limit."""
+    delays = itertools.islice(_get_poll_delays(), 20)
+
+    for attempt, delay in enumerate(delays):
+        ceiling = min(0.5 * 2**attempt, POLL_MAX_DELAY)
+        assert ceiling / 2 <= delay <= ceiling
+
+
+def test_upload_polls_status_timeout(client_mock, emitter, charmhub_config, fake_clock):
+    """Upload polls status url until the configured timeout is reached."""
     store = Store(charmhub_config)
 
     # first and second response, for pushing bytes and let the store know about it
     test_upload_id = "test-upload-id"
-    client_mock.push_file.return_value = test_upload_id
+    client_mock.push_file_hashed.return_value = (test_upload_id, "test-digest")
     test_status_url = "https://store.c.c/status"
 
     # the status checking response, will answer something not done yet twice, then ok
@@ -831,20 +984,70 @@ def test_upload_polls_status_timeout(client_mock, emitter, charmhub_config):
     status_response = {
         "revisions": [{"status": "still-scanning", "revision": None, "errors": None}]
     }
-    client_mock.request_urlpath_json.side_effect = [
-        {"status-url": test_status_url},
-        status_response,
-        status_response,
-        status_response,
-    ]
+    client_mock.request_urlpath_json.return_value = {"status-url": test_status_url}
+    client_mock.request_urlpath.side_effect = lambda method, url: _status_response(status_response)
 
     test_status_resolution = "clean and crispy"
     fake_statuses = {test_status_ok: test_status_resolution}
     with patch.dict("charmcraft.store.store.UPLOAD_ENDING_STATUSES", fake_statuses):
-        with patch("charmcraft.store.store.POLL_DELAYS", [0.1] * 2):
+        with patch.dict(os.environ, {const.UPLOAD_TIMEOUT_ENV_VAR: "2"}):
             with pytest.raises(CraftError) as cm:
-                store._upload("/test/endpoint/", "some-filepath")
-    assert str(cm.value) == "Timeout polling Charmhub for upload status (after 0.2s)."
+                store._upload("/test/endpoint/", pathlib.Path("some-filepath"))
+    assert str(cm.value) == "Timeout polling Charmhub for upload status (after 2s)."
+    assert cm.value.resolution == (
+        "The upload id is 'test-upload-id': use the 'wait-upload' command to "
+        "keep waiting for it, instead of uploading again."
+    )
+
+    # it did not wait beyond the timeout
+    assert fake_clock.now == 2
+
+
+@pytest.mark.parametrize("value", ["0", "-3", "soon"])
+def test_upload_polls_status_invalid_timeout(monkeypatch, client_mock, charmhub_config, value):
+    """The timeout set in the environment must be a positive number of seconds."""
+    monkeypatch.setenv(const.UPLOAD_TIMEOUT_ENV_VAR, value)
+    store = Store(charmhub_config)
+    client_mock.push_file_hashed.return_value = ("test-upload-id", "test-digest")
+    client_mock.request_urlpath_json.return_value = {"status-url": "/status"}
+
+    with pytest.raises(CraftError) as cm:
+        store._upload("/test/endpoint/", pathlib.Path("some-filepath"))
+    assert str(cm.value) == f"Invalid value for CHARMCRAFT_UPLOAD_TIMEOUT: {value!r}."
+
+
+def test_wait_for_upload(client_mock, emitter, charmhub_config, fake_clock):
+    """Wait for a previous upload, polling its review status."""
+    store = Store(charmhub_config)
+    in_progress = {"revisions": [{"status": "still-scanning", "revision": None, "errors": None}]}
+    approved = {"revisions": [{"status": "approved", "revision": 7, "errors": None}]}
+    client_mock.request_urlpath.side_effect = [
+        _status_response(in_progress),
+        _status_response(approved),
+    ]
+
+    result = store.wait_for_upload("test-charm", "test-upload-id")
+
+    status_url = "/v1/charm/test-charm/revisions/review?upload-id=test-upload-id"
+    assert client_mock.mock_calls == [
+        call.request_urlpath("GET", status_url),
+        call.request_urlpath("GET", status_url),
+    ]
+    assert result.ok
+    assert result.revision == 7
+    emitter.assert_progress(f"Waiting for upload test-upload-id, with status url {status_url}")
+
+
+def test_wait_for_upload_timeout(client_mock, charmhub_config, fake_clock):
+    """Wait for a previous upload up to the given timeout."""
+    store = Store(charmhub_config)
+    in_progress = {"revisions": [{"status": "still-scanning", "revision": None, "errors": None}]}
+    client_mock.request_urlpath.side_effect = lambda method, url: _status_response(in_progress)
+
+    with pytest.raises(CraftError) as cm:
+        store.wait_for_upload("test-charm", "test-upload-id", timeout=1.5)
+    assert str(cm.value) == "Timeout polling Charmhub for upload status (after 1.5s)."
+    assert fake_clock.now == 1.5
 
 
 def test_upload_error(client_mock, charmhub_config):
@@ -853,7 +1056,7 @@ def test_upload_error(client_mock, charmhub_config):
 
     # the first response, for when pushing bytes
     test_upload_id = "test-upload-id"
-    client_mock.push_file.return_value = test_upload_id
+    client_mock.push_file_hashed.return_value = (test_upload_id, "test-digest")
 
     # the second response, for telling the store it was pushed
     test_status_url = "https://store.c.c/status"
@@ -874,14 +1077,14 @@ def test_upload_error(client_mock, charmhub_config):
         ]
     }
 
-    client_mock.request_urlpath_json.side_effect = [
-        {"status-url": test_status_url},
-        status_response,
+    client_mock.request_urlpath_json.return_value = {"status-url": test_status_url}
+    client_mock.request_urlpath.side_effect = [
+        _status_response(status_response),
     ]
 
     test_status_resolution = "test-ok-or-not"
     fake_statuses = {test_status_bad: test_status_resolution}
-    test_filepath = "test-filepath"
+    test_filepath = pathlib.Path("test-filepath")
     with patch.dict("charmcraft.store.store.UPLOAD_ENDING_STATUSES", fake_statuses):
         result = store._upload("/test/endpoint/", test_filepath)
 
@@ -905,7 +1108,9 @@ def test_upload_charmbundles_endpoint(charmhub_config):
     with patch.object(store, "_upload") as mock:
         mock.return_value = test_results
         result = store.upload("test-charm", "test-filepath")
-    mock.assert_called_once_with("/v1/charm/test-charm/revisions", "test-filepath")
+    mock.assert_called_once_with(
+        "/v1/charm/test-charm/revisions", "test-filepath", find_revision=ANY, show_progress=True
+    )
     assert result == test_results
 
 
@@ -923,6 +1128,7 @@ def test_upload_resources_endpoint(charmhub_config):
         expected_endpoint,
         "test-filepath",
         extra_fields={"type": "test-type", "bases": [{"architectures": ["all"]}]},
+        find_revision=ANY,
     )
     assert result == test_results
 
@@ -933,7 +1139,7 @@ def test_upload_including_extra_parameters(client_mock, emitter, charmhub_config
 
     # the first response, for when pushing bytes
     test_upload_id = "test-upload-id"
-    client_mock.push_file.return_value = test_upload_id
+    client_mock.push_file_hashed.return_value = (test_upload_id, "test-digest")
 
     # the second response, for telling the store it was pushed
     test_status_url = "https://store.c.c/status"
@@ -945,14 +1151,14 @@ def test_upload_including_extra_parameters(client_mock, emitter, charmhub_config
         "revisions": [{"status": test_status_ok, "revision": test_revision, "errors": None}]
     }
 
-    client_mock.request_urlpath_json.side_effect = [
-        {"status-url": test_status_url},
-        status_response,
+    client_mock.request_urlpath_json.return_value = {"status-url": test_status_url}
+    client_mock.request_urlpath.side_effect = [
+        _status_response(status_response),
     ]
 
     test_status_resolution = "test-ok-or-not"
     fake_statuses = {test_status_ok: test_status_resolution}
-    test_filepath = "test-filepath"
+    test_filepath = pathlib.Path("test-filepath")
     test_endpoint = "/v1/test/revisions/endpoint/"
     extra_fields = {"extra-key": "1", "more": "2"}
     with patch.dict("charmcraft.store.store.UPLOAD_ENDING_STATUSES", fake_statuses):
@@ -961,16 +1167,146 @@ def test_upload_including_extra_parameters(client_mock, emitter, charmhub_config
     # check all client calls
     assert client_mock.mock_calls == [
         call.whoami(),
-        call.push_file(test_filepath),
+        call.push_file_hashed(test_filepath, show_progress=True),
         call.request_urlpath_json(
             "POST",
             test_endpoint,
             json={"upload-id": test_upload_id, "extra-key": "1", "more": "2"},
         ),
-        call.request_urlpath_json("GET", test_status_url),
+        call.request_urlpath("GET", test_status_url),
+    ]
+
+
+def _charm_revisions_response(digest, status="approved"):
+    """Build the response listing the revisions of a charm, one with the given digest."""
+    return {
+        "revisions": [
+            {
+                "revision": revision,
+                "version": None,
+                "created-at": "2020-06-29T22:11:00.123",
+                "status": status,
+                "errors": None,
+                "bases": [],
+                "sha3-384": revision_digest,
+            }
+            for revision, revision_digest in [(4, "other-digest"), (5, digest)]
+        ]
+    }
+
+
+def _resource_revision(digest, architectures):
+    """Build a resource revision with the given digest and architectures."""
+    return CharmResourceRevision(
+        bases=[ResponseCharmResourceBase(architectures=architectures)],
+        created_at="2024-01-01T00:00:00",
+        name="test-resource",
+        revision=3,
+        sha256="",
+        sha3_384=digest,
+        sha384="",
+        sha512="",
+        size=10,
+        type="file",
+    )
+
+
+def test_upload_reused_known_digest(tmp_path, client_mock, emitter, charmhub_config):
+    """A file pushed before is not pushed again if a revision has the same content."""
+    store = Store(charmhub_config)
+    filepath = tmp_path / "test.charm"
+    filepath.write_text("charm content")
+    UploadLedger(env.get_upload_ledger_path()).put(filepath, "test-digest")
+    client_mock.request_urlpath_json.return_value = _charm_revisions_response("test-digest")
+
+    result = store.upload("test-charm", filepath)
+
+    assert result == Uploaded(ok=True, status="approved", revision=5, errors=[], reused=True)
+    assert client_mock.mock_calls == [
+        call.whoami(),
+        call.request_urlpath_json("GET", "/v1/charm/test-charm/revisions"),
+    ]
+    emitter.assert_progress(f"Not uploading {str(filepath)!r}, revision 5 has the same content")
+
+
+def test_upload_reused_pushed_digest(tmp_path, client_mock, emitter, charmhub_config):
+    """No revision is created if one has the content of the (just hashed) pushed file."""
+    store = Store(charmhub_config)
+    filepath = tmp_path / "test.charm"
+    filepath.write_text("charm content")
+    client_mock.push_file_hashed.return_value = ("test-upload-id", "test-digest")
+    client_mock.request_urlpath_json.return_value = _charm_revisions_response("test-digest")
+
+    result = store.upload("test-charm", filepath)
+
+    assert result == Uploaded(ok=True, status="approved", revision=5, errors=[], reused=True)
+    assert client_mock.mock_calls == [
+        call.whoami(),
+        call.push_file_hashed(filepath, show_progress=True),
+        call.request_urlpath_json("GET", "/v1/charm/test-charm/revisions"),
+    ]
+    emitter.assert_progress(
+        "Not creating a revision for upload test-upload-id, revision 5 has the same content"
+    )
+    # the digest was recorded for the next time
+    assert UploadLedger(env.get_upload_ledger_path()).get_digest(filepath) == "test-digest"
+
+
+@pytest.mark.parametrize("status", ["approved", "rejected"])
+def test_upload_not_reused(tmp_path, client_mock, charmhub_config, status):
+    """A new revision is created if no approved revision has the same content."""
+    store = Store(charmhub_config)
+    filepath = tmp_path / "test.charm"
+    filepath.write_text("charm content")
+    UploadLedger(env.get_upload_ledger_path()).put(filepath, "test-digest")
+    client_mock.push_file_hashed.return_value = ("test-upload-id", "new-digest")
+    client_mock.request_urlpath_json.side_effect = [
+        _charm_revisions_response("test-digest", status="rejected"),
+        _charm_revisions_response("other-digest", status=status),
+        {"status-url": "/status"},
+    ]
+    client_mock.request_urlpath.return_value = _status_response(
+        {"revisions": [{"status": "approved", "revision": 6, "errors": None}]}
+    )
+
+    result = store.upload("test-charm", filepath)
+
+    assert result == Uploaded(ok=True, status="approved", revision=6, errors=[])
+    assert client_mock.mock_calls[-3:] == [
+        call.request_urlpath_json("GET", "/v1/charm/test-charm/revisions"),
+        call.request_urlpath_json(
+            "POST", "/v1/charm/test-charm/revisions", json={"upload-id": "test-upload-id"}
+        ),
+        call.request_urlpath("GET", "/status"),
     ]
 
 
+@pytest.mark.parametrize(
+    ("architectures", "reused"), [(["amd64", "arm64"], True), (["amd64"], False)]
+)
+def test_upload_resource_reused(tmp_path, client_mock, charmhub_config, architectures, reused):
+    """A resource revision is reused only if it has the same content, type and bases."""
+    store = Store(charmhub_config)
+    filepath = tmp_path / "test.bin"
+    filepath.write_text("resource content")
+    UploadLedger(env.get_upload_ledger_path()).put(filepath, "test-digest")
+    client_mock.list_resource_revisions.return_value = [
+        _resource_revision("test-digest", architectures)
+    ]
+    client_mock.push_file_hashed.return_value = ("test-upload-id", "test-digest")
+    client_mock.request_urlpath_json.return_value = {"status-url": "/status"}
+    client_mock.request_urlpath.return_value = _status_response(
+        {"revisions": [{"status": "approved", "revision": 4, "errors": None}]}
+    )
+
+    bases = [{"name": "all", "channel": "all", "architectures": ["arm64", "amd64"]}]
+    result = store.upload_resource("test-charm", "test-resource", "file", filepath, bases=bases)
+
+    assert result.reused == reused
+    assert result.revision == (3 if reused else 4)
+    client_mock.list_resource_revisions.assert_called_with("test-charm", "test-resource")
+
+
 # -- tests for list revisions
 
 
@@ -29,6 +29,7 @@ from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
 
 from charmcraft import const
 from charmcraft.store import AnonymousClient, Client, build_user_agent
+from charmcraft.store.client import _SharedSessionHTTPClient
 from charmcraft.utils import OSPlatform
 
 # something well formed as tests exercise the internal machinery
@@ -140,7 +141,10 @@ def test_client_init():
     with patch("craft_store.StoreClient.__init__") as mock_client_init:
         with patch("charmcraft.store.client.build_user_agent") as mock_ua:
             mock_ua.return_value = user_agent
-            Client(api_url, storage_url, user_agent=user_agent)
+            client = Client(api_url, storage_url, user_agent=user_agent)
+    # the requests are sent through the HTTP session shared by all the clients
+    assert isinstance(client.http_client, _SharedSessionHTTPClient)
+    assert client.http_client.user_agent == user_agent
     mock_client_init.assert_called_with(
         base_url=api_url,
         storage_base_url=storage_url,
@@ -373,7 +377,9 @@ def test_anonymous_client_request_success_simple():
     """Hits the server, all ok."""
     response_value = {"foo": "bar"}
     fake_response = FakeResponse(content=json.dumps(response_value), status_code=200)
-    with patch("craft_store.http_client.HTTPClient.request") as mock_http_client_request:
+    with patch(
+        "charmcraft.store.client._SharedSessionHTTPClient.request"
+    ) as mock_http_client_request:
         mock_http_client_request.return_value = fake_response
         client = AnonymousClient("http://api.test", "http://storage.test")
         result = client.request_urlpath_json("GET", "/somepath")
@@ -386,7 +392,9 @@ def test_anonymous_client_request_success_without_json_parsing():
     """Hits the server, all ok, return the raw response without parsing the json."""
     response_value = "whatever test response"
     fake_response = FakeResponse(content=response_value, status_code=200)
-    with patch("craft_store.http_client.HTTPClient.request") as mock_http_client_request:
+    with patch(
+        "charmcraft.store.client._SharedSessionHTTPClient.request"
+    ) as mock_http_client_request:
         client = AnonymousClient("http://api.test", "http://storage.test")
         mock_http_client_request.return_value = fake_response
         result = client.request_urlpath_text("GET", "/somepath")
@@ -397,7 +405,9 @@ def test_anonymous_client_request_success_without_json_parsing():
 
 def test_anonymous_client_request_text_error():
     """Hits the server in text mode, getting an error."""
-    with patch("craft_store.http_client.HTTPClient.request") as mock_http_client_request:
+    with patch(
+        "charmcraft.store.client._SharedSessionHTTPClient.request"
+    ) as mock_http_client_request:
         original_error_text = "bad bad server"
         mock_http_client_request.side_effect = craft_store.errors.CraftStoreError(
             original_error_text
@@ -412,7 +422,9 @@ def test_anonymous_client_request_text_error():
 
 def test_anonymous_client_request_json_error():
     """Hits the server in json mode, getting an error."""
-    with patch("craft_store.http_client.HTTPClient.request") as mock_http_client_request:
+    with patch(
+        "charmcraft.store.client._SharedSessionHTTPClient.request"
+    ) as mock_http_client_request:
         original_error_text = "bad bad server"
         mock_http_client_request.side_effect = craft_store.errors.CraftStoreError(
             original_error_text
@@ -429,7 +441,9 @@ def test_anonymous_client_hit_success_withbody():
     """Hits the server including a body, all ok."""
     response_value = {"foo": "bar"}
     fake_response = FakeResponse(content=response_value, status_code=200)
-    with patch("craft_store.http_client.HTTPClient.request") as mock_http_client_request:
+    with patch(
+        "charmcraft.store.client._SharedSessionHTTPClient.request"
+    ) as mock_http_client_request:
         mock_http_client_request.return_value = fake_response
         client = AnonymousClient("http://api.test", "http://storage.test")
 
@@ -18,12 +18,15 @@ import json
 import sys
 import zipfile
 from argparse import ArgumentParser, Namespace
+from unittest.mock import Mock
 
 import pytest
+from craft_application.errors import CraftValidationError
 from craft_cli import CraftError
 
 from charmcraft import linters
 from charmcraft.application.commands.analyse import Analyse
+from charmcraft.models.charmcraft import PayloadBudget
 from charmcraft.models.lint import LintResult
 
 
@@ -48,7 +51,7 @@ def test_expanded_charm_permissions(config, fake_project_dir, monkeypatch, modeb
     with zipfile.ZipFile(str(charm_file), "w") as zf:
         zf.write(str(payload_file), payload_file.name)
 
-    args = Namespace(filepath=charm_file, force=None, format=None, ignore=None)
+    args = Namespace(filepath=charm_file, force=None, format=None, ignore=None, timings=False)
     Analyse(config).run(args)
 
 
@@ -58,7 +61,7 @@ def test_corrupt_charm(new_path, config):
     charm_file = new_path / "foobar.charm"
     charm_file.write_text("this is not a real zip content")
 
-    args = Namespace(filepath=charm_file, force=None, format=None, ignore=None)
+    args = Namespace(filepath=charm_file, force=None, format=None, ignore=None, timings=False)
     with pytest.raises(CraftError) as cm:
         Analyse(config).run(args)
     assert str(cm.value) == (f"Cannot open charm file '{charm_file}': File is not a zip file")
@@ -75,7 +78,7 @@ def create_a_valid_zip(tmp_path):
 def test_integration_linters(new_path, emitter, config, monkeypatch):
     """Integration test with a real analysis."""
     fake_charm = create_a_valid_zip(new_path)
-    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None)
+    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None, timings=False)
     Analyse(config).run(args)
 
     emitter.assert_progress(
@@ -84,6 +87,63 @@ def test_integration_linters(new_path, emitter, config, monkeypatch):
     )
 
 
+def test_integration_payload_budget_from_project(new_path, emitter, config):
+    """The payload budget thresholds of the project in the directory are used."""
+    (new_path / "charmcraft.yaml").write_text(
+        "analysis:\n  payload-budget:\n    warning-files: 0\n"
+    )
+    fake_charm = create_a_valid_zip(new_path)
+    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None, timings=False)
+    Analyse(config).run(args)
+
+    emitter.assert_progress(
+        "payload-budget: [WARNING] Inode count 1 files and directories is over 0 files and "
+        "directories.\n"
+        "Payload of 12 Bytes (12 Bytes compressed) in 1 files and directories.\n"
+        "Largest files: fake_file (12 Bytes). "
+        "(https://juju.is/docs/sdk/charmcraft-analyzers-and-linters)",
+        permanent=True,
+    )
+
+
+@pytest.mark.parametrize("indicated_format", [None, "json"])
+def test_analysis_config_from_project(
+    monkeypatch, new_path, service_factory, config, *, indicated_format
+):
+    """The analysis configuration of the project in the directory is passed to the linting."""
+    (new_path / "charmcraft.yaml").write_text(
+        "analysis:\n  payload-budget:\n    warning-size: 1024\n    top: 2\n"
+    )
+    fake_charm = create_a_valid_zip(new_path)
+    mock_lint_file = Mock(
+        return_value=[
+            linters.CheckResult("check", LintResult.OK, "url", linters.CheckType.LINT, "text")
+        ]
+    )
+    monkeypatch.setattr(service_factory.analysis, "lint_file", mock_lint_file)
+    args = Namespace(
+        filepath=fake_charm, force=None, format=indicated_format, ignore=None, timings=False
+    )
+    Analyse(config).run(args)
+
+    config = mock_lint_file.call_args.kwargs["config"]
+    assert config.payload_budget == PayloadBudget(warning_size=1024, top=2)
+
+
+@pytest.mark.parametrize("content", ["", "name: my-charm\n", "analysis:\n"])
+def test_analysis_config_no_project_config(new_path, content):
+    (new_path / "charmcraft.yaml").write_text(content)
+
+    assert Analyse._get_analysis_config() is None
+
+
+def test_analysis_config_invalid(new_path):
+    (new_path / "charmcraft.yaml").write_text("analysis:\n  payload-budget:\n    top: 0\n")
+
+    with pytest.raises(CraftValidationError):
+        Analyse._get_analysis_config()
+
+
 @pytest.mark.parametrize("indicated_format", [None, "json"])
 def test_complete_set_of_results(
     check, emitter, service_factory, config, monkeypatch, fake_project_dir, indicated_format
@@ -143,7 +203,9 @@ def test_complete_set_of_results(
     ]
 
     fake_charm = create_a_valid_zip(fake_project_dir)
-    args = Namespace(filepath=fake_charm, force=None, format=indicated_format, ignore=None)
+    args = Namespace(
+        filepath=fake_charm, force=None, format=indicated_format, ignore=None, timings=False
+    )
     monkeypatch.setattr(
         service_factory.analysis, "lint_directory", lambda *a, **k: linting_results
     )
@@ -232,7 +294,7 @@ def test_only_attributes(emitter, service_factory, config, monkeypatch, fake_pro
     ]
 
     fake_charm = create_a_valid_zip(fake_project_dir)
-    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None)
+    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None, timings=False)
     monkeypatch.setattr(
         service_factory.analysis, "lint_directory", lambda *a, **k: linting_results
     )
@@ -256,7 +318,7 @@ def test_only_warnings(emitter, service_factory, config, monkeypatch, fake_proje
     ]
 
     fake_charm = create_a_valid_zip(fake_project_dir)
-    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None)
+    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None, timings=False)
     monkeypatch.setattr(
         service_factory.analysis, "lint_directory", lambda *a, **k: linting_results
     )
@@ -280,7 +342,7 @@ def test_only_errors(emitter, service_factory, config, monkeypatch, fake_project
     ]
 
     fake_charm = create_a_valid_zip(fake_project_dir)
-    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None)
+    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None, timings=False)
     monkeypatch.setattr(
         service_factory.analysis, "lint_directory", lambda *a, **k: linting_results
     )
@@ -311,7 +373,7 @@ def test_both_errors_and_warnings(emitter, service_factory, config, monkeypatch,
     ]
 
     fake_charm = create_a_valid_zip(fake_project_dir)
-    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None)
+    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None, timings=False)
     monkeypatch.setattr(
         service_factory.analysis, "lint_directory", lambda *a, **k: linting_results
     )
@@ -336,7 +398,7 @@ def test_only_lint_ok(emitter, service_factory, config, monkeypatch, fake_projec
     ]
 
     fake_charm = create_a_valid_zip(fake_project_dir)
-    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None)
+    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None, timings=False)
     monkeypatch.setattr(
         service_factory.analysis, "lint_directory", lambda *a, **k: linting_results
     )
@@ -363,8 +425,63 @@ def test_only_fatal(emitter, service_factory, config, monkeypatch, fake_project_
     )
 
     fake_charm = create_a_valid_zip(fake_project_dir)
-    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None)
+    args = Namespace(filepath=fake_charm, force=None, format=None, ignore=None, timings=False)
     retcode = Analyse(config).run(args)
 
     emitter.assert_progress("check-lint: [FATAL] text (url)", permanent=True)
     assert retcode == 1
+
+
+@pytest.mark.parametrize("indicated_format", [None, "json"])
+def test_timings(
+    emitter, service_factory, config, monkeypatch, fake_project_dir, *, indicated_format
+):
+    """The checkers durations are reported when asked, and always in the formatted output."""
+    linting_results = [
+        linters.CheckResult(
+            name="check-lint-01",
+            check_type=linters.CheckType.LINT,
+            url="url-01",
+            text="text-01",
+            result=LintResult.OK,
+            duration=0.1234,
+        ),
+        linters.CheckResult(
+            name="check-lint-02",
+            check_type=linters.CheckType.LINT,
+            url="url-02",
+            text="",
+            result=LintResult.IGNORED,
+        ),
+    ]
+    fake_charm = create_a_valid_zip(fake_project_dir)
+    args = Namespace(
+        filepath=fake_charm, force=None, format=indicated_format, ignore=None, timings=True
+    )
+    monkeypatch.setattr(
+        service_factory.analysis, "lint_directory", lambda *a, **k: linting_results
+    )
+    Analyse(config).run(args)
+
+    if indicated_format is None:
+        emitter.assert_progress("  0.123s check-lint-01: [OK] text-01 (url-01)", permanent=True)
+        emitter.assert_progress("         check-lint-02: (url-02) ", permanent=True)
+    else:
+        text = emitter.assert_message(r"\[.*\]", regex=True)
+        assert json.loads(text) == [
+            {
+                "check_type": "lint",
+                "name": "check-lint-01",
+                "result": "ok",
+                "text": "text-01",
+                "url": "url-01",
+                "duration": 0.1234,
+            },
+            {
+                "check_type": "lint",
+                "name": "check-lint-02",
+                "result": "ignored",
+                "text": "",
+                "url": "url-02",
+            },
+        ]
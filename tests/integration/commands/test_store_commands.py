@@ -15,7 +15,9 @@
 # For further info, check https://github.com/canonical/charmcraft
 """Integration tests for store commands."""
 import argparse
+import dataclasses
 import sys
+import threading
 from unittest import mock
 
 import pytest
@@ -259,8 +261,8 @@ def test_fetchlib_all(emitter, store_mock, tmp_path, monkeypatch, config, format
             charm_name="testcharm2",
         ),
     }
-    _store_libs_info = [
-        Library(
+    _store_libs_info = {
+        "lib_id_1": Library(
             lib_id="lib_id_1",
             content="new lib content 1",
             content_hash="xxx",
@@ -269,7 +271,7 @@ def test_fetchlib_all(emitter, store_mock, tmp_path, monkeypatch, config, format
             lib_name="testlib1",
             charm_name="testcharm1",
         ),
-        Library(
+        "lib_id_2": Library(
             lib_id="lib_id_2",
             content="new lib content 2",
             content_hash="yyy",
@@ -278,22 +280,27 @@ def test_fetchlib_all(emitter, store_mock, tmp_path, monkeypatch, config, format
             lib_name="testlib2",
             charm_name="testcharm2",
         ),
-    ]
-    store_mock.get_library.side_effect = lambda *a: _store_libs_info.pop(0)
+    }
+    # the libraries are downloaded concurrently, so in any order
+    store_mock.get_library.side_effect = lambda charm, lib_id, api: _store_libs_info[lib_id]
 
     args = argparse.Namespace(library=None, format=formatted)
     FetchLibCommand(config).run(args)
 
-    assert store_mock.mock_calls == [
-        mock.call.get_libraries_tips(
-            [
-                {"lib_id": "lib_id_1", "api": 0},
-                {"lib_id": "lib_id_2", "api": 3},
-            ]
-        ),
-        mock.call.get_library("testcharm1", "lib_id_1", 0),
-        mock.call.get_library("testcharm2", "lib_id_2", 3),
-    ]
+    assert store_mock.mock_calls[0] == mock.call.get_libraries_tips(
+        [
+            {"lib_id": "lib_id_1", "api": 0},
+            {"lib_id": "lib_id_2", "api": 3},
+        ]
+    )
+    store_mock.get_library.assert_has_calls(
+        [
+            mock.call("testcharm1", "lib_id_1", 0),
+            mock.call("testcharm2", "lib_id_2", 3),
+        ],
+        any_order=True,
+    )
+    assert store_mock.get_library.call_count == 2
     names = [
         "charms.testcharm1.v0.testlib1",
         "charms.testcharm2.v3.testlib2",
@@ -337,6 +344,54 @@ def test_fetchlib_all(emitter, store_mock, tmp_path, monkeypatch, config, format
     assert saved_file.read_text() == "new lib content 2"
 
 
+def test_fetchlib_all_concurrent(emitter, store_mock, tmp_path, monkeypatch, config):
+    """The libraries are downloaded concurrently, but reported in order."""
+    monkeypatch.chdir(tmp_path)
+    factory.create_lib_filepath("testcharm1", "testlib1", api=0, patch=1, lib_id="lib_id_1")
+    factory.create_lib_filepath("testcharm2", "testlib2", api=0, patch=1, lib_id="lib_id_2")
+
+    libs = {
+        lib_id: Library(
+            lib_id=lib_id,
+            content=f"new content of {lib_name}",
+            content_hash="xxx",
+            api=0,
+            patch=2,
+            lib_name=lib_name,
+            charm_name=charm_name,
+        )
+        for lib_id, lib_name, charm_name in [
+            ("lib_id_1", "testlib1", "testcharm1"),
+            ("lib_id_2", "testlib2", "testcharm2"),
+        ]
+    }
+    store_mock.get_libraries_tips.return_value = {
+        (lib_id, 0): dataclasses.replace(lib, content=None) for lib_id, lib in libs.items()
+    }
+    second_downloaded = threading.Event()
+
+    def get_library(charm_name, lib_id, api):
+        # the first download only finishes after the second one was done
+        if lib_id == "lib_id_1":
+            assert second_downloaded.wait(timeout=5)
+        else:
+            second_downloaded.set()
+        return libs[lib_id]
+
+    store_mock.get_library.side_effect = get_library
+
+    FetchLibCommand(config).run(argparse.Namespace(library=None, format=None))
+
+    emitter.assert_messages(
+        [
+            "Library charms.testcharm1.v0.testlib1 updated to version 0.2.",
+            "Library charms.testcharm2.v0.testlib2 updated to version 0.2.",
+        ]
+    )
+    saved_file = tmp_path / "lib" / "charms" / "testcharm1" / "v0" / "testlib1.py"
+    assert saved_file.read_text() == "new content of testlib1"
+
+
 @pytest.mark.parametrize("formatted", [None, "json"])
 def test_fetchlib_store_not_found(emitter, store_mock, config, formatted):
     """The indicated library is not found in the store."""
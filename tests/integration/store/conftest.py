@@ -0,0 +1,138 @@
+# Copyright 2024 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# For further info, check https://github.com/canonical/charmcraft
+"""Fixtures to run the store code against a local stand-in for Charmhub."""
+import dataclasses
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+
+import pytest
+
+from charmcraft import const
+from charmcraft.store import client
+from tests.charmhub import FakeCharmhub, get_auth_value
+
+# to run each command more times in the benchmarks (the median duration is reported)
+BENCHMARK_REPEATS_ENV_VAR = "CHARMCRAFT_BENCHMARK_REPEATS"
+
+
+@pytest.fixture
+def charmhub():
+    """Serve a Charmhub stand-in, with a registered charm."""
+    with FakeCharmhub() as charmhub:
+        charmhub.add_package("my-charm")
+        yield charmhub
+
+
+@pytest.fixture
+def charmhub_env(monkeypatch, tmp_path, charmhub) -> dict[str, str]:
+    """Point the store code to the stand-in, with fake credentials and an empty cache.
+
+    Return the variables set, to run Charmcraft itself with them.
+    """
+    variables = {
+        const.STORE_API_ENV_VAR: charmhub.url,
+        const.STORE_STORAGE_ENV_VAR: charmhub.url,
+        const.ALTERNATE_AUTH_ENV_VAR: get_auth_value(),
+        const.SHARED_CACHE_ENV_VAR: str(tmp_path / "shared-cache"),
+    }
+    for name, value in variables.items():
+        monkeypatch.setenv(name, value)
+    # the shared HTTP session may have been created in other tests, for other settings
+    monkeypatch.setattr(client, "_http_session", None)
+    monkeypatch.setattr(client, "PUSH_RETRY_DELAY", 0)
+    return variables
+
+
+@dataclasses.dataclass(frozen=True)
+class BenchmarkResult:
+    """The measurements of running a command several times."""
+
+    name: str
+    durations: list[float]
+    requests: int
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.durations)
+
+
+BENCHMARK_RESULTS = pytest.StashKey[list[BenchmarkResult]]()
+
+
+def pytest_terminal_summary(terminalreporter, config) -> None:
+    """Show the results of the benchmarks run, if any."""
+    results = config.stash.get(BENCHMARK_RESULTS, [])
+    if not results:
+        return
+    terminalreporter.write_sep("-", "store commands benchmarks")
+    terminalreporter.write_line(f"{'Command':<30} {'Median':>8} {'Min':>8} {'Max':>8} Requests")
+    for result in results:
+        terminalreporter.write_line(
+            f"{result.name:<30} {result.median:>7.2f}s {min(result.durations):>7.2f}s "
+            f"{max(result.durations):>7.2f}s {result.requests:>8}"
+        )
+
+
+@pytest.fixture
+def benchmark(request, record_property, tmp_path, charmhub, charmhub_env):
+    """Run a Charmcraft command as a separate process several times, measuring it.
+
+    The command can be run once before each measured run (e.g. to fill the cache),
+    and a setup function can be called before each measured run (with its number).
+    The requests to the stand-in are counted only for the measured runs.
+    """
+    env = {**os.environ, **charmhub_env}
+    repeats = int(os.getenv(BENCHMARK_REPEATS_ENV_VAR, "1"))
+
+    def run_charmcraft(args: tuple[str, ...]) -> float:
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-m", "charmcraft", *args],
+            cwd=tmp_path,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        duration = time.perf_counter() - start
+        assert result.returncode == 0, result.stderr
+        return duration
+
+    def benchmark(
+        *args: str, setup: Callable[[int], None] | None = None, warm_up: bool = False
+    ) -> BenchmarkResult:
+        durations = []
+        requests = 0
+        for run_number in range(repeats):
+            if warm_up:
+                run_charmcraft(args)
+            if setup is not None:
+                setup(run_number)
+            requests_before = len(charmhub.requests)
+            durations.append(run_charmcraft(args))
+            requests += len(charmhub.requests) - requests_before
+
+        result = BenchmarkResult(request.node.callspec.id, durations, requests // repeats)
+        request.config.stash.setdefault(BENCHMARK_RESULTS, []).append(result)
+        record_property("median_seconds", round(result.median, 3))
+        record_property("requests", result.requests)
+        return result
+
+    return benchmark
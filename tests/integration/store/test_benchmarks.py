@@ -0,0 +1,120 @@
+# Copyright 2024 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# For further info, check https://github.com/canonical/charmcraft
+"""Benchmarks of the store commands, run end to end against the Charmhub stand-in.
+
+Each command is run as a separate Charmcraft process (as users run it) against a
+stand-in that delays every request, measuring the wall time of the command and
+counting the requests it did. The results are shown in the summary of the test
+run and recorded as properties of each test (so they end up in the JUnit report).
+
+Most of the duration of each command is the start up of Charmcraft, so the time
+spent with the store is the difference to the cached commands (that do no requests).
+"""
+import zipfile
+
+import pytest
+
+from tests.charmhub import FakeCharmhub
+
+pytestmark = pytest.mark.slow
+
+# the latency of each request to the stand-in, similar to the real store's
+LATENCY = 0.05
+
+
+def _build_charm(path, content: str) -> None:
+    """Build a (minimal) charm file, with the given content to make it unique."""
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("metadata.yaml", "name: my-charm\n")
+        zf.writestr("content.txt", content)
+
+
+@pytest.fixture(autouse=True)
+def bench_charmhub(charmhub: FakeCharmhub) -> FakeCharmhub:
+    """Fill the stand-in with revisions, releases, resources and libraries."""
+    for number in range(1, 21):
+        charmhub.add_revision("my-charm", f"revision {number}".encode())
+    for risk, revision in [("stable", 17), ("candidate", 18), ("beta", 19), ("edge", 20)]:
+        charmhub.add_release("my-charm", revision, risk)
+    charmhub.add_resource("my-charm", "my-file")
+    charmhub.add_resource("my-charm", "my-image", "oci-image")
+    for lib_name in ["first_lib", "second_lib", "third_lib"]:
+        charmhub.add_library("my-charm", lib_name)
+    charmhub.latency = LATENCY
+    return charmhub
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        pytest.param(["names"], id="names"),
+        pytest.param(["revisions", "my-charm", "--no-cache"], id="revisions"),
+        pytest.param(["status", "my-charm", "--no-cache"], id="status"),
+        pytest.param(["resources", "my-charm", "--no-cache"], id="resources"),
+        pytest.param(["list-lib", "my-charm", "--no-cache"], id="list-lib"),
+        pytest.param(["release", "my-charm", "--revision=20", "--channel=beta"], id="release"),
+    ],
+)
+def test_commands(benchmark, args):
+    result = benchmark(*args)
+
+    assert result.requests >= 1
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        pytest.param(["status", "my-charm"], id="status-cached"),
+        pytest.param(["revisions", "my-charm"], id="revisions-cached"),
+    ],
+)
+def test_commands_cached(benchmark, args):
+    """With the cache just filled, the commands that only show information do no requests."""
+    result = benchmark(*args, warm_up=True)
+
+    assert result.requests == 0
+
+
+@pytest.mark.parametrize("files", [pytest.param(1, id="upload"), pytest.param(4, id="upload-4")])
+def test_upload(benchmark, tmp_path, files):
+    """Upload new charms (with a different content each time), and release them."""
+    filepaths = [tmp_path / f"my-charm_{number}.charm" for number in range(files)]
+
+    def build_charms(run_number: int) -> None:
+        for filepath in filepaths:
+            _build_charm(filepath, f"{filepath.name} in run {run_number}")
+
+    args = ["upload", *map(str, filepaths), "--name=my-charm", "--release=edge"]
+    if files > 1:
+        args.remove("--name=my-charm")
+    result = benchmark(*args, setup=build_charms)
+
+    # push, look for the same content, create the revision, poll its review, release
+    assert result.requests >= 5 * files
+
+
+@pytest.mark.parametrize("fault", [pytest.param("drop", id="upload-dropped-push")])
+def test_upload_push_fault(benchmark, charmhub, tmp_path, fault):
+    """Upload a new charm, with a fault when pushing it the first time."""
+    filepath = tmp_path / "my-charm.charm"
+
+    def build_charm(run_number: int) -> None:
+        _build_charm(filepath, f"run {run_number}")
+        charmhub.inject_faults("POST", "/unscanned-upload/", fault)
+
+    result = benchmark("upload", str(filepath), setup=build_charm)
+
+    assert result.requests >= 5
@@ -0,0 +1,191 @@
+# Copyright 2024 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# For further info, check https://github.com/canonical/charmcraft
+"""Tests for the Store against the local stand-in for Charmhub, through real HTTP."""
+import time
+from types import SimpleNamespace
+
+import pytest
+from craft_cli import CraftError
+
+from charmcraft import const, env
+from charmcraft.store import Store
+from charmcraft.store.models import Resource
+from charmcraft.utils import ResourceOption
+
+
+@pytest.fixture
+def store(charmhub_env) -> Store:
+    return Store(env.get_store_config())
+
+
+@pytest.fixture
+def charm_file(tmp_path):
+    filepath = tmp_path / "my-charm.charm"
+    filepath.write_bytes(b"charm content")
+    return filepath
+
+
+def test_upload_and_release(charmhub, store, charm_file):
+    uploaded = store.upload("my-charm", charm_file)
+    assert uploaded.ok
+    assert uploaded.revision == 1
+
+    store.release("my-charm", 1, ["edge", "latest/beta"], [])
+
+    channel_map, channels, revisions = store.list_releases("my-charm")
+    assert sorted((item.channel, item.revision) for item in channel_map) == [
+        ("latest/beta", 1),
+        ("latest/edge", 1),
+    ]
+    assert [channel.name for channel in channels] == [
+        "latest/stable",
+        "latest/candidate",
+        "latest/beta",
+        "latest/edge",
+    ]
+    assert [revision.revision for revision in revisions] == [1]
+    assert [revision.revision for revision in store.list_revisions("my-charm")] == [1]
+
+
+def test_upload_review_polled(monkeypatch, charmhub, store, charm_file):
+    monkeypatch.setattr("charmcraft.store.store.POLL_INITIAL_DELAY", 0.01)
+    charmhub.review_polls = 3
+
+    uploaded = store.upload("my-charm", charm_file)
+
+    assert uploaded.ok
+    assert charmhub.count_requests("GET", r"/v1/charm/my-charm/revisions/review") == 3
+
+
+def test_upload_review_busy(monkeypatch, charmhub, store, charm_file):
+    """A busy store is polled again later, when it tells, and not only in craft-store retries."""
+    monkeypatch.setenv(const.STORE_RETRIES_ENV_VAR, "1")
+    sleeps = []
+    monkeypatch.setattr(
+        "charmcraft.store.store.time",
+        SimpleNamespace(monotonic=time.monotonic, time=time.time, sleep=sleeps.append),
+    )
+    charmhub.fault_retry_after = "2"
+    charmhub.inject_faults("GET", r"/v1/charm/my-charm/revisions/review", 503, 503, 429)
+
+    uploaded = store.upload("my-charm", charm_file)
+
+    assert uploaded.ok
+    assert charmhub.count_requests("GET", r"/v1/charm/my-charm/revisions/review") == 4
+    assert sleeps == [2, 2, 2]
+
+
+def test_upload_same_content(charmhub, store, charm_file, tmp_path):
+    """The revision with the same content is reused, without pushing the file again."""
+    store.upload("my-charm", charm_file)
+    copied_file = tmp_path / "copy.charm"
+    copied_file.write_bytes(charm_file.read_bytes())
+
+    reused = store.upload("my-charm", charm_file)
+    reused_copy = store.upload("my-charm", copied_file)
+
+    assert (reused.revision, reused.reused) == (1, True)
+    assert (reused_copy.revision, reused_copy.reused) == (1, True)
+    # the copy is pushed, as it was never uploaded from the host, but not reviewed
+    assert charmhub.count_requests("POST", "/unscanned-upload/") == 2
+    assert charmhub.count_requests("POST", "/v1/charm/my-charm/revisions") == 1
+
+
+def test_upload_push_faults(charmhub, store, charm_file):
+    """The push is retried after transient errors, even if the connection is lost."""
+    charmhub.inject_faults("POST", "/unscanned-upload/", "drop", 503)
+
+    uploaded = store.upload("my-charm", charm_file)
+
+    assert uploaded.ok
+    # (the dropped request is not even received)
+    assert charmhub.count_requests("POST", "/unscanned-upload/") == 2
+
+
+def test_upload_unknown_package(store, charm_file):
+    with pytest.raises(CraftError, match="Unknown package 'other-charm'"):
+        store.upload("other-charm", charm_file)
+
+
+def test_resources(charmhub, store, charm_file, tmp_path):
+    charmhub.add_resource("my-charm", "my-file")
+    resource_file = tmp_path / "resource.txt"
+    resource_file.write_text("resource content")
+
+    uploaded = store.upload_resource("my-charm", "my-file", "file", resource_file)
+    reused = store.upload_resource("my-charm", "my-file", "file", resource_file)
+    store.upload("my-charm", charm_file)
+    store.release("my-charm", 1, ["edge"], [ResourceOption(name="my-file", revision=1)])
+
+    assert (uploaded.revision, uploaded.reused) == (1, False)
+    assert (reused.revision, reused.reused) == (1, True)
+    assert [resource.name for resource in store.list_resources("my-charm")] == ["my-file"]
+    (revision,) = store.list_resource_revisions("my-charm", "my-file")
+    assert revision.revision == 1
+    assert revision.size == len("resource content")
+    (release,) = store.list_releases("my-charm")[0]
+    assert release.resources == [
+        Resource(name="my-file", revision=1, resource_type="file", optional=None)
+    ]
+
+
+def test_oci_image(charmhub, store):
+    charmhub.add_resource("my-charm", "my-image", "oci-image")
+
+    credentials = store.get_oci_registry_credentials("my-charm", "my-image")
+    blob = store.get_oci_image_blob("my-charm", "my-image", "sha256:abcd")
+
+    assert credentials.image_name.endswith("/my-charm/my-image")
+    assert f"{credentials.image_name}@sha256:abcd" in blob
+
+
+def test_libraries(charmhub, charmhub_env):
+    charmhub.add_library("my-charm", "my_lib", api=0, patch=1)
+    charmhub.add_library("my-charm", "my_lib", api=0, patch=3)
+    charmhub.add_library("my-charm", "my_lib", api=1, patch=0)
+    charmhub.add_library("my-charm", "other_lib")
+    store = Store(env.get_store_config(), needs_auth=False)
+
+    tips = store.get_libraries_tips([{"charm_name": "my-charm", "lib_name": "my_lib"}])
+    library = store.get_library("my-charm", "my-charm-my_lib", 0)
+
+    assert sorted((lib.api, lib.patch) for lib in tips.values()) == [(0, 3), (1, 0)]
+    assert (library.api, library.patch) == (0, 3)
+    assert "LIBPATCH = 3" in library.content
+
+
+def test_names(charmhub, store):
+    store.register_name("other-charm", "charm")
+
+    names = store.list_registered_names(include_collaborations=False)
+
+    assert [name.name for name in names] == ["my-charm", "other-charm"]
+    assert store.whoami().account.username == "fake-user"
+
+
+def test_cached_releases(charmhub, charmhub_env, store, charm_file):
+    """The cached releases are used while fresh, until the package is changed."""
+    cached_store = Store(env.get_store_config(), use_cache=True)
+    store.upload("my-charm", charm_file)
+
+    cached_store.list_releases("my-charm")
+    cached_store.list_releases("my-charm")
+    assert charmhub.count_requests("GET", "/v1/charm/my-charm/releases") == 1
+
+    store.release("my-charm", 1, ["edge"], [])
+    (release,) = cached_store.list_releases("my-charm")[0]
+    assert release.revision == 1
+    assert charmhub.count_requests("GET", "/v1/charm/my-charm/releases") == 2
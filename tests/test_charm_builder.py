@@ -22,16 +22,17 @@ import socket
 import subprocess
 import sys
 from collections.abc import Callable
-from unittest.mock import call, patch
+from unittest.mock import ANY, Mock, call, patch
 
 import pytest
 
-from charmcraft import charm_builder, const
+from charmcraft import charm_builder, const, instrum
 from charmcraft.charm_builder import (
     KNOWN_GOOD_PIP_URL,
     CharmBuilder,
     _process_run,
 )
+from charmcraft.utils import PipTimings
 
 
 def test_build_generics_simple_files(tmp_path):
@@ -728,7 +729,7 @@ def test_build_dependencies_virtualenv(
     formatted_calls = [
         [param.format(reqs_file=str(reqs_file)) for param in call] for call in expected_call_params
     ]
-    extra_pip_calls = [call([pip_cmd, *params]) for params in formatted_calls]
+    extra_pip_calls = [call([pip_cmd, *params], pip_timings=ANY) for params in formatted_calls]
 
     assert mock.mock_calls == [
         call(["python3", "-m", "venv", str(tmp_path / const.STAGING_VENV_DIRNAME)]),
@@ -779,7 +780,8 @@ def test_build_dependencies_virtualenv_multiple(tmp_path, assert_output):
                 "--no-binary=:all:",
                 f"--requirement={reqs_file_1}",
                 f"--requirement={reqs_file_2}",
-            ]
+            ],
+            pip_timings=ANY,
         ),
     ]
 
@@ -790,6 +792,38 @@ def test_build_dependencies_virtualenv_multiple(tmp_path, assert_output):
     assert_output("Handling dependencies", "Installing dependencies")
 
 
+def test_build_dependencies_pip_timings(tmp_path, assert_output):
+    """The time spent by pip in each package is summarized and kept in the metrics."""
+    build_dir = tmp_path / const.BUILD_DIRNAME
+    build_dir.mkdir()
+
+    builder = CharmBuilder(
+        builddir=tmp_path,
+        installdir=build_dir,
+        entrypoint=pathlib.Path("whatever"),
+        python_packages=["ops"],
+    )
+
+    def fake_run(cmd, pip_timings=None):
+        if pip_timings is not None:
+            pip_timings.feed("Collecting ops\n")
+            pip_timings.finish()
+
+    with patch("charmcraft.charm_builder.get_pip_version") as mock_pip_version:
+        mock_pip_version.return_value = (24, 1)
+        with patch("charmcraft.charm_builder._process_run", side_effect=fake_run):
+            with patch("shutil.copytree"):
+                builder.handle_dependencies()
+
+    assert_output("Time spent by pip in each package:")
+    (record,) = [
+        record
+        for record in instrum.get_measurements().values()
+        if record["msg"] == "Installing all dependencies"
+    ]
+    assert list(record["stats"]["pip_timings"]) == ["ops"]
+
+
 def test_build_dependencies_virtualenv_none(tmp_path, assert_output):
     """The virtualenv is NOT created if no needed."""
     build_dir = tmp_path / const.BUILD_DIRNAME
@@ -1224,6 +1258,26 @@ def test_builder_arguments_full(tmp_path):
     mock_collect_pydeps.assert_called_with(pathlib.Path("builddir"))
 
 
+@pytest.mark.parametrize("metrics_file", [None, "metrics.json"])
+def test_builder_metrics_file(tmp_path, monkeypatch, metrics_file):
+    """The measurements are dumped to the metrics file, if given."""
+    fake_argv = ["cmd", "--builddir", "builddir", "--installdir", "installdir"]
+    if metrics_file:
+        fake_argv += ["--metrics-file", str(tmp_path / metrics_file)]
+    monkeypatch.setattr(sys, "argv", fake_argv)
+    mock_dump = Mock()
+    monkeypatch.setattr(instrum, "dump", mock_dump)
+
+    with patch("charmcraft.charm_builder.CharmBuilder.build_charm"):
+        with patch("charmcraft.charm_builder.collect_charmlib_pydeps"):
+            charm_builder.main()
+
+    if metrics_file:
+        mock_dump.assert_called_once_with(tmp_path / metrics_file)
+    else:
+        mock_dump.assert_not_called()
+
+
 # --- subprocess runner tests
 
 
@@ -1258,6 +1312,30 @@ def test_processrun_stderr_logged(assert_output):
     )
 
 
+def test_processrun_pip_timings(assert_output):
+    """The output of the command is parsed to time pip phases, if indicated."""
+    cmd = [sys.executable, "-c", "print('Collecting ops')"]
+    pip_timings = PipTimings()
+    _process_run(cmd, pip_timings=pip_timings)
+    assert list(pip_timings.timings) == ["ops"]
+    assert_output("   :: Collecting ops")
+
+
+def test_processrun_pip_timings_interrupted(monkeypatch):
+    """The pip phase measurements are finished even if handling the output fails."""
+    cmd = [sys.executable, "-c", "print('Collecting ops')"]
+    pip_timings = PipTimings()
+
+    def broken_print(text):
+        if text.startswith("   :: "):
+            raise BrokenPipeError("stdout is gone")
+
+    monkeypatch.setattr(charm_builder, "print", broken_print, raising=False)
+    with pytest.raises(BrokenPipeError):
+        _process_run(cmd, pip_timings=pip_timings)
+    assert list(pip_timings.timings) == ["ops"]
+
+
 def test_processrun_failed():
     """It's logged in error if subprocess is run but ends with return code not zero."""
     cmd = [sys.executable, "-c", "exit(3)"]
@@ -33,6 +33,49 @@ def test_get_managed_environment_log_path():
     assert dirpath == pathlib.Path("/tmp/charmcraft.log")
 
 
+def test_get_charm_builder_metrics_path(monkeypatch):
+    monkeypatch.setattr(env, "_RUN_ID", "123-abcd")
+
+    path = env.get_charm_builder_metrics_path("my-part")
+
+    assert path == pathlib.Path("/tmp/charm_builder_metrics_123-abcd_my-part.json")
+
+
+def test_get_charm_builder_metrics_path_unique():
+    """Paths are unique per part and run."""
+    path = env.get_charm_builder_metrics_path("my-part")
+
+    assert path != env.get_charm_builder_metrics_path("other-part")
+    assert env._RUN_ID in path.name
+
+
+def test_get_charm_builder_metrics_paths(fs, monkeypatch):
+    monkeypatch.setattr(env, "_RUN_ID", "123-abcd")
+    for name in ["part-b", "part-a"]:
+        fs.create_file(env.get_charm_builder_metrics_path(name))
+    fs.create_file("/tmp/charm_builder_metrics_456-ef01_part-a.json")  # other run
+
+    assert env.get_charm_builder_metrics_paths() == [
+        pathlib.Path("/tmp/charm_builder_metrics_123-abcd_part-a.json"),
+        pathlib.Path("/tmp/charm_builder_metrics_123-abcd_part-b.json"),
+    ]
+
+
+def test_get_charm_libs_cache_path(monkeypatch, tmp_path):
+    monkeypatch.setenv(const.SHARED_CACHE_ENV_VAR, str(tmp_path))
+    assert env.get_charm_libs_cache_path() == tmp_path / "charm-libs"
+
+
+def test_get_upload_ledger_path(monkeypatch, tmp_path):
+    monkeypatch.setenv(const.SHARED_CACHE_ENV_VAR, str(tmp_path))
+    assert env.get_upload_ledger_path() == tmp_path / "uploads"
+
+
+def test_get_http_cache_path(monkeypatch, tmp_path):
+    monkeypatch.setenv(const.SHARED_CACHE_ENV_VAR, str(tmp_path))
+    assert env.get_http_cache_path() == tmp_path / "http"
+
+
 def test_get_managed_environment_project_path():
     dirpath = env.get_managed_environment_project_path()
 
@@ -16,7 +16,13 @@
 
 """Tests for the instrumentator module."""
 
+import asyncio
+import concurrent.futures
 import json
+import pathlib
+import pstats
+import subprocess
+import threading
 from unittest.mock import patch
 
 import pytest
@@ -27,8 +33,14 @@ from charmcraft.instrum import Timer, _Measurements
 
 @pytest.fixture
 def fake_times():
-    """Provide times from 5 by 10."""
-    with patch("charmcraft.instrum.time", side_effect=list(range(5, 100, 10))):
+    """Provide times from 5 by 10 (in seconds from a baseline at 1000)."""
+    fake_counter = [n * 1_000_000_000 for n in range(5, 100, 10)]
+    with (
+        patch("charmcraft.instrum.perf_counter_ns", side_effect=fake_counter),
+        patch("charmcraft.instrum._baseline_ns", 0),
+        patch("charmcraft.instrum._baseline", 1000),
+        patch("charmcraft.instrum._get_resources", return_value=None),
+    ):
         yield
 
 
@@ -40,54 +52,106 @@ def test_measurement_start_end_cycle(fake_times):
     measurements = _Measurements()
 
     mid = measurements.start("test msg", {"foo": "bar"})
-    assert measurements.parents == [None, mid]
-    recorded = measurements.measurements[mid]
+    assert measurements.current.get() == mid
+    recorded = measurements.measurements[str(mid)]
     assert recorded == {
         "parent": None,
         "msg": "test msg",
         "extra": {"foo": "bar"},
         "tstart": 5,
         "tend": None,
+        "process": "charmcraft",
+        "resources": None,
+        "thread": "MainThread",
+        "task": None,
+        "stats": None,
     }
 
     measurements.end(mid)
-    assert measurements.parents == [None]
-    recorded = measurements.measurements[mid]
+    assert measurements.current.get() is None
+    recorded = measurements.measurements[str(mid)]
     assert recorded == {
         "parent": None,
         "msg": "test msg",
         "extra": {"foo": "bar"},
         "tstart": 5,
         "tend": 15,
+        "process": "charmcraft",
+        "resources": None,
+        "thread": "MainThread",
+        "task": None,
+        "stats": None,
     }
 
 
+def test_measurement_end_duration(fake_times):
+    """Ending a measurement returns its duration."""
+    measurements = _Measurements()
+
+    mid = measurements.start("test msg", {})
+    assert measurements.end(mid) == 10
+
+
+def test_measurement_add_extra():
+    """Extra info can be added to an ongoing measurement."""
+    measurements = _Measurements()
+
+    mid = measurements.start("test msg", {"foo": "bar"})
+    measurements.add_extra(mid, {"result": 42})
+    assert measurements.measurements[str(mid)]["extra"] == {"foo": "bar", "result": "42"}
+
+
+def test_measurement_add_extra_not_shared():
+    """Adding extra info does not change the dict given when starting the measurement."""
+    measurements = _Measurements()
+    extra_info = {"foo": "bar"}
+
+    mid = measurements.start("test msg", extra_info)
+    measurements.add_extra(mid, {"result": 42})
+    assert extra_info == {"foo": "bar"}
+
+
+def test_measurement_compact_ids():
+    """Measurement ids are consecutive integers, with records allocated in chunks."""
+    measurements = _Measurements()
+
+    mids = []
+    for _ in range(instrum._RECORDS_CHUNK + 1):
+        mid = measurements.start("test msg", {})
+        measurements.end(mid)
+        mids.append(mid)
+
+    assert mids == list(range(instrum._RECORDS_CHUNK + 1))
+    assert measurements.count == instrum._RECORDS_CHUNK + 1
+    assert len(measurements.records) == 2 * instrum._RECORDS_CHUNK
+
+
 def test_measurement_tree():
     """A tree is built for the measurements."""
     measurements = _Measurements()
 
     # start first
     mid_1 = measurements.start("test msg", {})
-    assert measurements.parents == [None, mid_1]
-    assert measurements.measurements[mid_1]["parent"] is None
+    assert measurements.current.get() == mid_1
+    assert measurements.measurements[str(mid_1)]["parent"] is None
 
     # start second
     mid_2 = measurements.start("test msg", {})
-    assert measurements.parents == [None, mid_1, mid_2]
-    assert measurements.measurements[mid_2]["parent"] == mid_1
+    assert measurements.current.get() == mid_2
+    assert measurements.measurements[str(mid_2)]["parent"] == str(mid_1)
 
     # start third
     mid_3 = measurements.start("test msg", {})
-    assert measurements.parents == [None, mid_1, mid_2, mid_3]
-    assert measurements.measurements[mid_3]["parent"] == mid_2
+    assert measurements.current.get() == mid_3
+    assert measurements.measurements[str(mid_3)]["parent"] == str(mid_2)
 
     # end them all
     measurements.end(mid_3)
-    assert measurements.parents == [None, mid_1, mid_2]
+    assert measurements.current.get() == mid_2
     measurements.end(mid_2)
-    assert measurements.parents == [None, mid_1]
+    assert measurements.current.get() == mid_1
     measurements.end(mid_1)
-    assert measurements.parents == [None]
+    assert measurements.current.get() is None
 
 
 def test_measurement_extra_info_complex():
@@ -97,7 +161,10 @@ def test_measurement_extra_info_complex():
     weird_object = object()
 
     mid = measurements.start("test msg", {"foo": 42, "bar": weird_object})
-    assert measurements.measurements[mid]["extra"] == {"foo": "42", "bar": str(weird_object)}
+    assert measurements.measurements[str(mid)]["extra"] == {
+        "foo": "42",
+        "bar": str(weird_object),
+    }
 
 
 def test_measurement_overlapped_measurements():
@@ -120,18 +187,22 @@ def test_measurement_dump(tmp_path, fake_times):
     measurements.end(mid)
 
     measures_filepath = tmp_path / "measures.json"
-    with patch("charmcraft.instrum._baseline", 3):
-        measurements.dump(measures_filepath)
+    measurements.dump(measures_filepath)
 
     dumped_content = json.loads(measures_filepath.read_text())
     assert dumped_content == {
-        "__meta__": {"baseline": 3},  # patched value
-        mid: {
+        "__meta__": {"baseline": 1000, "process": "charmcraft"},  # patched value
+        str(mid): {
             "extra": {"foo": "bar"},
             "msg": "test msg",
             "parent": None,
-            "tstart": 2,  # relative to baseline
-            "tend": 12,  # relative to baseline
+            "tstart": 5,  # relative to baseline
+            "tend": 15,  # relative to baseline
+            "process": "charmcraft",
+            "resources": None,
+            "thread": "MainThread",
+            "task": None,
+            "stats": None,
         },
     }
 
@@ -144,32 +215,38 @@ def test_measurement_merge_simple(tmp_path, fake_times):
     measurements_outer = _Measurements()
     mid_outer = measurements_outer.start("outer msg", {})
 
-    # meanwhile, start the inner measure
+    # meanwhile, start the inner measure (in a process started 12 seconds later)
     measurements_inner = _Measurements()
     mid_inner = measurements_inner.start("inner msg", {})
     measurements_inner.end(mid_inner)
-    with patch("charmcraft.instrum._baseline", 12):
+    with patch("charmcraft.instrum._baseline", 1012):
         measurements_inner.dump(measures_filepath)
 
     # confirm dumped info
     dumped_content = json.loads(measures_filepath.read_text())
     assert dumped_content == {
-        "__meta__": {"baseline": 12},  # patched value
-        mid_inner: {
+        "__meta__": {"baseline": 1012, "process": "charmcraft"},  # patched value
+        str(mid_inner): {
             "extra": {},
             "msg": "inner msg",
             "parent": None,
-            "tstart": 3,  # relative to baseline
-            "tend": 13,  # relative to baseline
+            "tstart": 15,  # relative to its baseline
+            "tend": 25,  # relative to its baseline
+            "process": "charmcraft",
+            "resources": None,
+            "thread": "MainThread",
+            "task": None,
+            "stats": None,
         },
     }
 
     # merge from it and check merged structure
     measurements_outer.merge_from(measures_filepath)
-    merged = measurements_outer.measurements[mid_inner]
-    assert merged["parent"] == mid_outer  # not None anymore
-    assert merged["tstart"] == 15  # back to absolute
-    assert merged["tend"] == 25  # back to absolute
+    (mid_merged,) = set(measurements_outer.measurements) - {str(mid_outer)}
+    merged = measurements_outer.measurements[mid_merged]
+    assert merged["parent"] == str(mid_outer)  # not None anymore
+    assert merged["tstart"] == 27  # relative to this baseline
+    assert merged["tend"] == 37  # relative to this baseline
 
 
 def test_measurement_merge_complex(tmp_path, fake_times):
@@ -190,51 +267,737 @@ def test_measurement_merge_complex(tmp_path, fake_times):
     mid_inner_3 = measurements_inner.start("inner msg 3", {})  # fake time: 65
     measurements_inner.end(mid_inner_3)  # fake time: 75
 
-    # dump it all
-    with patch("charmcraft.instrum._baseline", 20):
+    # dump it all (from a process started 20 seconds earlier)
+    with patch("charmcraft.instrum._baseline", 980):
         measurements_inner.dump(measures_filepath)
 
     # confirm dumped info
     dumped_content = json.loads(measures_filepath.read_text())
     assert dumped_content == {
-        "__meta__": {"baseline": 20},  # patched value
-        mid_inner_1: {
+        "__meta__": {"baseline": 980, "process": "charmcraft"},  # patched value
+        str(mid_inner_1): {
             "extra": {},
             "msg": "inner msg 1",
             "parent": None,
-            "tstart": 5,  # relative to baseline
-            "tend": 35,  # relative to baseline
+            "tstart": 25,  # relative to its baseline
+            "tend": 55,  # relative to its baseline
+            "process": "charmcraft",
+            "resources": None,
+            "thread": "MainThread",
+            "task": None,
+            "stats": None,
         },
-        mid_inner_2: {
+        str(mid_inner_2): {
             "extra": {},
             "msg": "inner msg 2",
-            "parent": mid_inner_1,
-            "tstart": 15,  # relative to baseline
-            "tend": 25,  # relative to baseline
+            "parent": str(mid_inner_1),
+            "tstart": 35,  # relative to its baseline
+            "tend": 45,  # relative to its baseline
+            "process": "charmcraft",
+            "resources": None,
+            "thread": "MainThread",
+            "task": None,
+            "stats": None,
         },
-        mid_inner_3: {
+        str(mid_inner_3): {
             "extra": {},
             "msg": "inner msg 3",
             "parent": None,
-            "tstart": 45,  # relative to baseline
-            "tend": 55,  # relative to baseline
+            "tstart": 65,  # relative to its baseline
+            "tend": 75,  # relative to its baseline
+            "process": "charmcraft",
+            "resources": None,
+            "thread": "MainThread",
+            "task": None,
+            "stats": None,
         },
     }
 
-    # merge from it and check merged structure
+    # merge from it and check merged structure; merged ids follow the existing ones
     measurements_outer.merge_from(measures_filepath)
-    merged_1 = measurements_outer.measurements[mid_inner_1]
-    assert merged_1["parent"] == mid_outer_2  # the parent is the "current" outer measure
-    assert merged_1["tstart"] == 25  # back to absolute
-    assert merged_1["tend"] == 55  # back to absolute
-    merged_2 = measurements_outer.measurements[mid_inner_2]
-    assert merged_2["parent"] == mid_inner_1  # inside the structure, parent respected
-    assert merged_2["tstart"] == 35  # back to absolute
-    assert merged_2["tend"] == 45  # back to absolute
-    merged_3 = measurements_outer.measurements[mid_inner_3]
-    assert merged_3["parent"] == mid_outer_2  # the parent is the "current" outer measure
-    assert merged_3["tstart"] == 65  # back to absolute
-    assert merged_3["tend"] == 75  # back to absolute
+    merged_1 = measurements_outer.measurements["2"]
+    assert merged_1["msg"] == "inner msg 1"
+    assert merged_1["parent"] == str(mid_outer_2)  # the parent is the "current" outer measure
+    assert merged_1["tstart"] == 5  # relative to this baseline
+    assert merged_1["tend"] == 35  # relative to this baseline
+    merged_2 = measurements_outer.measurements["3"]
+    assert merged_2["msg"] == "inner msg 2"
+    assert merged_2["parent"] == "2"  # inside the structure, parent respected
+    assert merged_2["tstart"] == 15  # relative to this baseline
+    assert merged_2["tend"] == 25  # relative to this baseline
+    merged_3 = measurements_outer.measurements["4"]
+    assert merged_3["msg"] == "inner msg 3"
+    assert merged_3["parent"] == str(mid_outer_2)  # the parent is the "current" outer measure
+    assert merged_3["tstart"] == 45  # relative to this baseline
+    assert merged_3["tend"] == 55  # relative to this baseline
+
+
+def test_measurement_merge_old_format(tmp_path):
+    """Measurements dumped with the previous format (uuid ids) can be merged."""
+    measures_filepath = tmp_path / "measures.json"
+    measures_filepath.write_text(
+        json.dumps(
+            {
+                "__meta__": {"baseline": instrum._baseline},
+                "4b0c7f1c9bb74b5bb2ed5c2ce3e11a41": {
+                    "parent": None,
+                    "msg": "outer",
+                    "extra": {"foo": "bar"},
+                    "tstart": 1.5,
+                    "tend": 3.5,
+                },
+                "a9d7e2a4a5f6470b8a1f9f1f0b0d6a2c": {
+                    "parent": "4b0c7f1c9bb74b5bb2ed5c2ce3e11a41",
+                    "msg": "inner",
+                    "extra": {},
+                    "tstart": 2.0,
+                    "tend": 3.0,
+                },
+            }
+        )
+    )
+
+    measurements = _Measurements()
+    measurements.merge_from(measures_filepath)
+
+    assert measurements.measurements == {
+        "0": {
+            "parent": None,
+            "msg": "outer",
+            "extra": {"foo": "bar"},
+            "tstart": pytest.approx(1.5),
+            "tend": pytest.approx(3.5),
+            "process": "subprocess",
+            "resources": None,
+            "thread": None,
+            "task": None,
+            "stats": None,
+        },
+        "1": {
+            "parent": "0",
+            "msg": "inner",
+            "extra": {},
+            "tstart": pytest.approx(2.0),
+            "tend": pytest.approx(3.0),
+            "process": "subprocess",
+            "resources": None,
+            "thread": None,
+            "task": None,
+            "stats": None,
+        },
+    }
+
+
+def test_measurement_merge_nested_processes(tmp_path, fake_times):
+    """Measurements from processes started by the merged one are nested in it."""
+    builder_filepath = tmp_path / "builder.json"
+    instance_filepath = tmp_path / "instance.json"
+
+    measurements_builder = _Measurements(process="builder")
+    mid = measurements_builder.start("builder msg", {})  # fake time: 5
+    measurements_builder.end(mid)  # fake time: 15
+    measurements_builder.dump(builder_filepath)
+
+    measurements_instance = _Measurements(process="instance")
+    mid = measurements_instance.start("instance msg", {})  # fake time: 25
+    measurements_instance.merge_from(builder_filepath)
+    measurements_instance.end(mid)  # fake time: 35
+    measurements_instance.dump(instance_filepath)
+
+    measurements_host = _Measurements()
+    measurements_host.merge_from(instance_filepath)
+
+    processes = {m["msg"]: m["process"] for m in measurements_host.measurements.values()}
+    assert processes == {
+        "instance msg": "instance",
+        "builder msg": "instance > builder",
+    }
+
+
+def test_measurement_dump_trace(tmp_path, fake_times):
+    """Dump the measurements in the Trace Event format, with a pid per process."""
+    merged_filepath = tmp_path / "merged.json"
+    measurements_inner = _Measurements(process="inner")
+    mid = measurements_inner.start("inner msg", {})  # fake time: 5
+    measurements_inner.end(mid)  # fake time: 15
+    measurements_inner.dump(merged_filepath)
+
+    measurements = _Measurements()
+    mid_1 = measurements.start("outer msg", {"foo": 42})  # fake time: 25
+    measurements.merge_from(merged_filepath)
+    measurements.end(mid_1)  # fake time: 35
+    measurements.start("ongoing msg", {})  # fake time: 45
+
+    trace_filepath = tmp_path / "trace.json"
+    measurements.dump_trace(trace_filepath)
+
+    dumped_content = json.loads(trace_filepath.read_text())
+    assert dumped_content == {
+        "traceEvents": [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": 0,
+                "args": {"name": "charmcraft"},
+            },
+            {
+                "name": "process_sort_index",
+                "ph": "M",
+                "pid": 1,
+                "tid": 0,
+                "args": {"sort_index": 1},
+            },
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "MainThread"}},
+            {
+                "name": "outer msg",
+                "cat": "charmcraft",
+                "ph": "X",
+                "pid": 1,
+                "tid": 1,
+                "ts": 25_000_000,
+                "dur": 10_000_000,
+                "args": {"foo": "42"},
+            },
+            {"name": "process_name", "ph": "M", "pid": 2, "tid": 0, "args": {"name": "inner"}},
+            {
+                "name": "process_sort_index",
+                "ph": "M",
+                "pid": 2,
+                "tid": 0,
+                "args": {"sort_index": 2},
+            },
+            {"name": "thread_name", "ph": "M", "pid": 2, "tid": 1, "args": {"name": "MainThread"}},
+            {
+                "name": "inner msg",
+                "cat": "charmcraft",
+                "ph": "X",
+                "pid": 2,
+                "tid": 1,
+                "ts": 5_000_000,
+                "dur": 10_000_000,
+                "args": {},
+            },
+            {
+                "name": "ongoing msg",
+                "cat": "charmcraft",
+                "ph": "B",
+                "pid": 1,
+                "tid": 1,
+                "ts": 45_000_000,
+                "args": {},
+            },
+        ],
+        "displayTimeUnit": "ms",
+        "otherData": {"baseline": 1000},
+    }
+
+
+def test_set_process(monkeypatch):
+    """The process name is kept in the measurements."""
+    measurements = _Measurements()
+    monkeypatch.setattr(instrum, "_measurements", measurements)
+
+    instrum.set_process("test process")
+    mid = measurements.start("test msg", {})
+    assert measurements.measurements[str(mid)]["process"] == "test process"
+
+
+def test_measurement_resources(fake_times):
+    """The resources used during the measurement are recorded."""
+    measurements = _Measurements()
+    snapshots = [
+        (1.0, 0.5, 3.0, 1.0, 1000, 2000, 100, 10),
+        (1.5, 0.75, 4.0, 1.5, 1200, 3000, 150, 30),
+    ]
+
+    with patch("charmcraft.instrum._get_resources", side_effect=snapshots):
+        mid = measurements.start("test msg", {}, resources=True)
+        measurements.end(mid)
+
+    assert measurements.measurements[str(mid)]["resources"] == {
+        "cpu_user": 0.5,
+        "cpu_system": 0.25,
+        "children_cpu_user": 1.0,
+        "children_cpu_system": 0.5,
+        "max_rss": 1200 * instrum._MAX_RSS_FACTOR,
+        "children_max_rss": 3000 * instrum._MAX_RSS_FACTOR,
+        "read_bytes": 50,
+        "write_bytes": 20,
+    }
+
+
+def test_measurement_resources_no_io(fake_times):
+    """The I/O counters are not always available."""
+    measurements = _Measurements()
+    snapshots = [
+        (1.0, 0.5, 3.0, 1.0, 1000, 2000, None, None),
+        (1.5, 0.75, 4.0, 1.5, 1200, 3000, None, None),
+    ]
+
+    with patch("charmcraft.instrum._get_resources", side_effect=snapshots):
+        mid = measurements.start("test msg", {}, resources=True)
+        measurements.end(mid)
+
+    resources = measurements.measurements[str(mid)]["resources"]
+    assert resources["read_bytes"] is None
+    assert resources["write_bytes"] is None
+
+
+@pytest.mark.skipif(instrum.resource is None, reason="No resource usage in this platform")
+def test_measurement_resources_real():
+    """Real resources are recorded, consistently."""
+    measurements = _Measurements()
+
+    mid = measurements.start("test msg", {}, resources=True)
+    pathlib.Path(__file__).read_bytes()
+    measurements.end(mid)
+
+    resources = measurements.measurements[str(mid)]["resources"]
+    assert resources["cpu_user"] >= 0
+    assert resources["cpu_system"] >= 0
+    assert resources["max_rss"] > 0
+    if resources["read_bytes"] is not None:
+        assert resources["read_bytes"] > 0
+
+
+def test_measurement_resources_not_asked():
+    """The resources are not snapshotted for the measurements that do not ask for it."""
+    measurements = _Measurements()
+
+    with patch("charmcraft.instrum._get_resources") as mock_resources:
+        mid = measurements.start("test msg", {})
+        measurements.end(mid)
+
+    mock_resources.assert_not_called()
+    assert measurements.measurements[str(mid)]["resources"] is None
+
+
+def test_measurement_resources_all(fake_times):
+    """The resources can be recorded for all the measurements."""
+    measurements = _Measurements()
+    measurements.all_resources = True
+    snapshots = [
+        (1.0, 0.5, 3.0, 1.0, 1000, 2000, 100, 10),
+        (1.5, 0.75, 4.0, 1.5, 1200, 3000, 150, 30),
+    ]
+
+    with patch("charmcraft.instrum._get_resources", side_effect=snapshots):
+        mid = measurements.start("test msg", {})
+        measurements.end(mid)
+
+    assert measurements.measurements[str(mid)]["resources"]["cpu_user"] == 0.5
+
+
+def test_record_all_resources(monkeypatch):
+    measurements = _Measurements()
+    monkeypatch.setattr(instrum, "_measurements", measurements)
+
+    assert not instrum.is_recording_all_resources()
+    instrum.record_all_resources()
+    assert instrum.is_recording_all_resources()
+    assert measurements.all_resources
+
+
+def test_get_io_counters(tmp_path, monkeypatch):
+    """The read and written bytes are taken from the process I/O file."""
+    proc_io = tmp_path / "io"
+    proc_io.write_text(
+        "rchar: 1234\nwchar: 567\nsyscr: 10\nsyscw: 5\nread_bytes: 0\nwrite_bytes: 4096\n"
+    )
+    monkeypatch.setattr(instrum, "_PROC_IO_PATH", str(proc_io))
+    monkeypatch.setattr(instrum, "_proc_io", None)
+
+    assert instrum._get_io_counters() == (1234, 567)
+    # reading the file is not counted
+    assert instrum._get_io_counters() == (1234 - len(proc_io.read_bytes()), 567)
+
+
+def test_get_io_counters_missing(tmp_path, monkeypatch):
+    """No I/O counters if the process I/O file is not there."""
+    monkeypatch.setattr(instrum, "_PROC_IO_PATH", str(tmp_path / "missing"))
+    monkeypatch.setattr(instrum, "_proc_io", None)
+
+    assert instrum._get_io_counters() == (None, None)
+
+
+def test_measurement_merge_resources(tmp_path, fake_times):
+    """The resources of merged measurements are kept, and exported in the traces."""
+    measures_filepath = tmp_path / "measures.json"
+    resources = {"cpu_user": 0.5, "read_bytes": 50}
+    measures_filepath.write_text(
+        json.dumps(
+            {
+                "__meta__": {"baseline": 1000, "process": "inner"},
+                "0": {
+                    "parent": None,
+                    "msg": "inner msg",
+                    "extra": {"foo": "bar"},
+                    "tstart": 1,
+                    "tend": 2,
+                    "process": "inner",
+                    "resources": resources,
+                },
+            }
+        )
+    )
+
+    measurements = _Measurements()
+    measurements.merge_from(measures_filepath)
+    assert measurements.measurements["0"]["resources"] == resources
+
+    trace_filepath = tmp_path / "trace.json"
+    measurements.dump_trace(trace_filepath)
+    (event,) = (e for e in json.loads(trace_filepath.read_text())["traceEvents"] if e["ph"] == "X")
+    assert event["args"] == {"foo": "bar", "cpu_user": 0.5, "read_bytes": 50}
+
+
+def test_measurement_stats(tmp_path, fake_times):
+    """The stats are kept apart from the extra info, merged, and exported in the traces."""
+    measurements = _Measurements()
+    mid = measurements.start("test msg", {"foo": "bar"})
+    measurements.add_stats(mid, {"exit_status": 0})
+    measurements.add_stats(mid, {"argv": ["ls", "-l"]})
+    measurements.end(mid)
+    measurements.dump(tmp_path / "measures.json")
+
+    merged = _Measurements()
+    merged.merge_from(tmp_path / "measures.json")
+    (measurement,) = merged.measurements.values()
+    assert measurement["extra"] == {"foo": "bar"}
+    assert measurement["stats"] == {"exit_status": 0, "argv": ["ls", "-l"]}
+
+    trace_filepath = tmp_path / "trace.json"
+    merged.dump_trace(trace_filepath)
+    (event,) = (e for e in json.loads(trace_filepath.read_text())["traceEvents"] if e["ph"] == "X")
+    assert event["args"] == {"foo": "bar", "exit_status": 0, "argv": ["ls", "-l"]}
+
+
+def test_measurement_merge_remove(tmp_path):
+    """The merged file and its profiles can be removed once merged."""
+    dumped = _Measurements(process="inner")
+    dumped.start_profiling()
+    dumped.dump(tmp_path / "measures.json")
+    (tmp_path / "other.pstats").touch()
+
+    measurements = _Measurements()
+    measurements.merge_from(tmp_path / "measures.json", remove=True)
+
+    assert measurements.profiles
+    assert [path.name for path in tmp_path.iterdir()] == ["other.pstats"]
+
+
+def test_measurement_threads(fake_times):
+    """Measurements in different threads can overlap, each thread with its own branch."""
+    measurements = _Measurements()
+    thread_started = threading.Event()
+    main_ended = threading.Event()
+
+    def _in_thread():
+        mid = measurements.start("thread msg", {})  # fake time: 15
+        thread_started.set()
+        main_ended.wait()
+        measurements.end(mid)  # fake time: 35
+
+    mid_main = measurements.start("main msg", {})  # fake time: 5
+    thread = threading.Thread(target=_in_thread, name="test-thread")
+    thread.start()
+    thread_started.wait()
+    measurements.end(mid_main)  # fake time: 25 (before the thread one ends)
+    main_ended.set()
+    thread.join()
+
+    main, in_thread = measurements.measurements.values()
+    assert main["thread"] == "MainThread"
+    assert (main["tstart"], main["tend"]) == (5, 25)
+    # new threads start at the root
+    assert in_thread["parent"] is None
+    assert in_thread["thread"] == "test-thread"
+    assert (in_thread["tstart"], in_thread["tend"]) == (15, 35)
+    assert measurements.current.get() is None
+
+
+def test_measurement_threads_propagated(monkeypatch):
+    """Measurements in threads are nested in the one that submitted them, if propagated."""
+    measurements = _Measurements()
+    monkeypatch.setattr(instrum, "_measurements", measurements)
+
+    def _in_thread(value):
+        with Timer("thread msg", value=value):
+            return value * 2
+
+    with Timer("main msg"):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(instrum.propagate(_in_thread), [1, 2, 3]))
+
+    assert results == [2, 4, 6]
+    main_id, *thread_ids = measurements.measurements
+    for thread_id in thread_ids:
+        in_thread = measurements.measurements[thread_id]
+        assert in_thread["msg"] == "thread msg"
+        assert in_thread["parent"] == main_id
+        assert in_thread["thread"].startswith("ThreadPoolExecutor")
+
+
+def test_measurement_tasks():
+    """Measurements in asyncio tasks are nested in their parents, with the task name."""
+    measurements = _Measurements()
+
+    async def _task(name):
+        mid = measurements.start(name, {})
+        await asyncio.sleep(0)
+        measurements.end(mid)
+
+    async def _main():
+        mid = measurements.start("main msg", {})
+        await asyncio.gather(
+            asyncio.create_task(_task("task msg 1"), name="task-1"),
+            asyncio.create_task(_task("task msg 2"), name="task-2"),
+        )
+        measurements.end(mid)
+
+    asyncio.run(_main())
+
+    main, task_1, task_2 = measurements.measurements.values()
+    assert main["parent"] is None
+    assert task_1["parent"] == task_2["parent"] == "0"
+    assert (task_1["task"], task_2["task"]) == ("task-1", "task-2")
+
+
+def test_measurement_dump_trace_threads(tmp_path, fake_times):
+    """Each thread and task gets its own tid in the traces."""
+    measurements = _Measurements()
+    measurements.start("main msg", {})
+
+    def _in_thread():
+        measurements.start("thread msg", {})
+
+    thread = threading.Thread(target=_in_thread, name="test-thread")
+    thread.start()
+    thread.join()
+
+    trace_filepath = tmp_path / "trace.json"
+    measurements.dump_trace(trace_filepath)
+
+    events = json.loads(trace_filepath.read_text())["traceEvents"]
+    thread_names = {e["tid"]: e["args"]["name"] for e in events if e["name"] == "thread_name"}
+    assert thread_names == {1: "MainThread", 2: "test-thread"}
+    tids = {e["name"]: e["tid"] for e in events if e["ph"] == "B"}
+    assert tids == {"main msg": 1, "thread msg": 2}
+
+
+def _profiled_outer():
+    return _profiled_inner()
+
+
+def _profiled_inner():
+    return 42
+
+
+def _get_profiled_functions(stats):
+    return {funcname for (_, _, funcname) in stats.stats if funcname.startswith("_profiled")}
+
+
+def test_profiling_split_by_phase():
+    """Each phase gets its own profile, with only the functions called in it."""
+    measurements = _Measurements()
+    measurements.start_profiling()
+    mid1 = measurements.start("outer", {"part": "charm"})
+    _profiled_outer()
+    mid2 = measurements.start("inner", {})
+    _profiled_inner()
+    measurements.end(mid2)
+    measurements.end(mid1)
+    _profiled_inner()
+    measurements.stop_profiling()
+
+    assert measurements.profiling is None
+    profiles = {
+        phase: _get_profiled_functions(stats)
+        for (process, phase), stats in measurements.profiles.items()
+    }
+    assert profiles == {
+        "(unmeasured)": {"_profiled_inner"},
+        "outer (part=charm)": {"_profiled_outer", "_profiled_inner"},
+        "inner": {"_profiled_inner"},
+    }
+    assert all(process is None for process, _ in measurements.profiles)
+
+
+def test_profiling_accumulated_by_phase():
+    """Measurements with the same phase share the profile."""
+    measurements = _Measurements()
+    measurements.start_profiling()
+    for _ in range(3):
+        mid = measurements.start("step", {})
+        _profiled_inner()
+        measurements.end(mid)
+    measurements.stop_profiling()
+
+    stats = measurements.profiles[(None, "step")]
+    (calls,) = [
+        values[1]
+        for (_, _, funcname), values in stats.stats.items()
+        if funcname == "_profiled_inner"
+    ]
+    assert calls == 3
+
+
+def test_profiling_started_inside_measurement():
+    """Measurements started before profiling do not break it when ended."""
+    measurements = _Measurements()
+    mid1 = measurements.start("outer", {})
+    measurements.start_profiling()
+    mid2 = measurements.start("inner", {})
+    measurements.end(mid2)
+    measurements.end(mid1)
+    _profiled_inner()
+    measurements.stop_profiling()
+
+    assert set(measurements.profiles) == {(None, "(unmeasured)"), (None, "inner")}
+    assert _get_profiled_functions(measurements.profiles[(None, "(unmeasured)")]) == {
+        "_profiled_inner"
+    }
+
+
+def test_profiling_other_threads():
+    """Only the thread that started the profiling is profiled and split."""
+    measurements = _Measurements()
+    measurements.start_profiling()
+
+    def _in_thread():
+        mid = measurements.start("in thread", {})
+        measurements.end(mid)
+
+    thread = threading.Thread(target=_in_thread)
+    thread.start()
+    thread.join()
+    measurements.stop_profiling()
+
+    assert set(measurements.profiles) == {(None, "(unmeasured)")}
+
+
+def test_profiling_not_started():
+    """Without profiling nothing is profiled nor dumped."""
+    measurements = _Measurements()
+    mid = measurements.start("test msg", {})
+    measurements.end(mid)
+    measurements.stop_profiling()
+
+    assert measurements.profiles == {}
+
+
+def test_profiling_dump(tmp_path):
+    """The profiles are dumped next to the measurements and referenced from them."""
+    measurements = _Measurements(process="test process")
+    measurements.start_profiling()
+    mid = measurements.start("Installing dependencies", {"part": "charm"})
+    _profiled_outer()
+    measurements.end(mid)
+    # dumping stops the profiling
+    measurements.dump(tmp_path / "measures.json")
+
+    assert measurements.profiling is None
+    meta = json.loads((tmp_path / "measures.json").read_text())["__meta__"]
+    assert meta["profiles"] == [
+        {
+            "phase": "(unmeasured)",
+            "process": "test process",
+            "file": "measures.00-unmeasured.pstats",
+        },
+        {
+            "phase": "Installing dependencies (part=charm)",
+            "process": "test process",
+            "file": "measures.01-installing-dependencies-part-charm.pstats",
+        },
+    ]
+    stats = pstats.Stats(str(tmp_path / "measures.01-installing-dependencies-part-charm.pstats"))
+    assert _get_profiled_functions(stats) == {"_profiled_outer", "_profiled_inner"}
+
+
+def test_profiling_dump_trace(tmp_path):
+    """The profiles are also dumped next to a trace."""
+    measurements = _Measurements()
+    measurements.start_profiling()
+
+    measurements.dump_trace(tmp_path / "trace.json")
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "trace.00-unmeasured.pstats",
+        "trace.json",
+    ]
+
+
+def test_profiling_merge(tmp_path):
+    """The profiles of merged measurements are merged, labelled with their process."""
+    builder = _Measurements(process="charm_builder.py")
+    builder.start_profiling()
+    mid = builder.start("Installing", {})
+    _profiled_inner()
+    builder.end(mid)
+    builder.dump(tmp_path / "builder.json")
+
+    instance = _Measurements(process="instance")
+    instance.start_profiling()
+    mid = instance.start("Building", {})
+    instance.merge_from(tmp_path / "builder.json")
+    instance.merge_from(tmp_path / "builder.json")
+    instance.end(mid)
+    instance.dump(tmp_path / "instance.json")
+
+    host = _Measurements()
+    host.merge_from(tmp_path / "instance.json")
+
+    assert sorted(host.profiles) == [
+        ("instance", "(unmeasured)"),
+        ("instance", "Building"),
+        ("instance > charm_builder.py", "(unmeasured)"),
+        ("instance > charm_builder.py", "Installing"),
+    ]
+    stats = host.profiles[("instance > charm_builder.py", "Installing")]
+    (calls,) = [
+        values[1]
+        for (_, _, funcname), values in stats.stats.items()
+        if funcname == "_profiled_inner"
+    ]
+    assert calls == 2  # merged twice in the instance
+
+    host.dump(tmp_path / "host.json")
+    assert [
+        profile["file"]
+        for profile in json.loads((tmp_path / "host.json").read_text())["__meta__"]["profiles"]
+    ] == [
+        "host.00-instance-unmeasured.pstats",
+        "host.01-instance-building.pstats",
+        "host.02-instance-charm-builder-py-unmeasured.pstats",
+        "host.03-instance-charm-builder-py-installing.pstats",
+    ]
+
+
+def test_is_profiling(monkeypatch):
+    measurements = _Measurements()
+    monkeypatch.setattr(instrum, "_measurements", measurements)
+
+    assert not instrum.is_profiling()
+    instrum.start_profiling()
+    assert instrum.is_profiling()
+    measurements.stop_profiling()
+    assert not instrum.is_profiling()
+
+
+@pytest.mark.parametrize(
+    ("msg", "extra", "expected"),
+    [
+        ("Packing", {}, "Packing"),
+        (
+            "Running step",
+            {"step": "BUILD", "part": "charm"},
+            "Running step (step=BUILD, part=charm)",
+        ),
+    ],
+)
+def test_get_phase_name(msg, extra, expected):
+    assert instrum.get_phase_name(msg, extra) == expected
 
 
 # -- tests for the Timer class
@@ -256,9 +1019,66 @@ def test_timer_as_context_manager(fake_times, monkeypatch):
         "extra": {"foo": "42"},
         "tstart": 5,
         "tend": 15,
+        "process": "charmcraft",
+        "resources": None,
+        "thread": "MainThread",
+        "task": None,
+        "stats": None,
     }
 
 
+def test_timer_add_extra_and_duration(fake_times, monkeypatch):
+    """Extra info can be added in the context manager, and its duration is kept."""
+    measurements = _Measurements()
+    monkeypatch.setattr(instrum, "_measurements", measurements)
+
+    with Timer("test message", foo=42) as timer:
+        assert timer.duration is None
+        timer.add_extra(result="ok")
+    assert timer.duration == 10
+
+    (recorded,) = measurements.measurements.values()
+    assert recorded["extra"] == {"foo": "42", "result": "ok"}
+
+
+def test_timer_add_stats(fake_times, monkeypatch):
+    """Stats can be added in the context manager."""
+    measurements = _Measurements()
+    monkeypatch.setattr(instrum, "_measurements", measurements)
+
+    with Timer("test message", foo=42) as timer:
+        timer.add_stats(size=1024)
+
+    (recorded,) = measurements.measurements.values()
+    assert recorded["extra"] == {"foo": "42"}
+    assert recorded["stats"] == {"size": 1024}
+
+
+def test_timer_with_resources(monkeypatch):
+    """Coarse timers record the resources used, also in their marks and as decorators."""
+    measurements = _Measurements()
+    monkeypatch.setattr(instrum, "_measurements", measurements)
+    snapshot = (1.0, 0.5, 3.0, 1.0, 1000, 2000, 100, 10)
+
+    @Timer("decorated", with_resources=True)
+    def decorated():
+        pass
+
+    with patch("charmcraft.instrum._get_resources", return_value=snapshot):
+        with Timer("coarse", with_resources=True, foo=42) as timer:
+            timer.mark("second half")
+        with Timer("fine"):
+            pass
+        decorated()
+
+    recorded = {m["msg"]: m for m in measurements.measurements.values()}
+    assert recorded["coarse"]["extra"] == {"foo": "42"}
+    assert recorded["coarse"]["resources"]["cpu_user"] == 0
+    assert recorded["second half"]["resources"]["cpu_user"] == 0
+    assert recorded["decorated"]["resources"]["cpu_user"] == 0
+    assert recorded["fine"]["resources"] is None
+
+
 def test_timer_as_context_manager_with_mark(fake_times, monkeypatch):
     """Use test as a context manager, hitting marks in the code block."""
     measurements = _Measurements()
@@ -279,6 +1099,11 @@ def test_timer_as_context_manager_with_mark(fake_times, monkeypatch):
         "extra": {"foo": "42"},
         "tstart": 5,
         "tend": 15,
+        "process": "charmcraft",
+        "resources": None,
+        "thread": "MainThread",
+        "task": None,
+        "stats": None,
     }
 
 
@@ -302,6 +1127,11 @@ def test_timer_as_decorator(fake_times, monkeypatch):
         "extra": {"foo": "42"},
         "tstart": 5,
         "tend": 15,
+        "process": "charmcraft",
+        "resources": None,
+        "thread": "MainThread",
+        "task": None,
+        "stats": None,
     }
 
     # then the measure between both marks
@@ -311,6 +1141,11 @@ def test_timer_as_decorator(fake_times, monkeypatch):
         "extra": {},
         "tstart": 25,
         "tend": 35,
+        "process": "charmcraft",
+        "resources": None,
+        "thread": "MainThread",
+        "task": None,
+        "stats": None,
     }
 
     # finally the measure between second mark and the end of the context manager
@@ -320,4 +1155,94 @@ def test_timer_as_decorator(fake_times, monkeypatch):
         "extra": {},
         "tstart": 45,
         "tend": 55,
+        "process": "charmcraft",
+        "resources": None,
+        "thread": "MainThread",
+        "task": None,
+        "stats": None,
     }
+
+
+# -- tests for the subprocess instrumentation
+
+
+@pytest.fixture
+def measurements(monkeypatch):
+    measurements = _Measurements()
+    monkeypatch.setattr(instrum, "_measurements", measurements)
+    return measurements
+
+
+def test_subprocess_timer(measurements, monkeypatch):
+    """The run of an external command is measured with its stats."""
+    children_cpu = iter([1.5, 2.25])
+    monkeypatch.setattr(instrum, "_get_children_cpu", lambda: next(children_cpu))
+
+    with instrum.SubprocessTimer([pathlib.Path("/usr/bin/pip"), "install", "foo"]) as timer:
+        timer.add_output("some output\n")
+        timer.add_output(b"bytes")
+        timer.add_output(None)
+        timer.add_output("ñ")
+        timer.returncode = 0
+
+    (recorded,) = measurements.measurements.values()
+    assert recorded["msg"] == "Running external command"
+    assert recorded["extra"] == {"tool": "pip"}
+    assert recorded["stats"] == {
+        "argv": ["/usr/bin/pip", "install", "foo"],
+        "exit_status": 0,
+        "output_bytes": 12 + 5 + 2,
+        "children_cpu": 0.75,
+    }
+
+
+def test_subprocess_timer_no_output(measurements, monkeypatch):
+    """The stats unknown are kept as such."""
+    monkeypatch.setattr(instrum, "_get_children_cpu", lambda: None)
+
+    with pytest.raises(FileNotFoundError):
+        with instrum.SubprocessTimer(["missing-tool"]):
+            raise FileNotFoundError
+
+    (recorded,) = measurements.measurements.values()
+    assert recorded["stats"] == {
+        "argv": ["missing-tool"],
+        "exit_status": None,
+        "output_bytes": None,
+        "children_cpu": None,
+    }
+
+
+def test_run(measurements):
+    """Run a real command, measuring it."""
+    result = instrum.run(["echo", "hello"], capture_output=True, text=True, check=True)
+
+    assert result.stdout == "hello\n"
+    (recorded,) = measurements.measurements.values()
+    assert recorded["extra"] == {"tool": "echo"}
+    stats = recorded["stats"]
+    assert (stats["argv"], stats["exit_status"], stats["output_bytes"]) == (
+        ["echo", "hello"],
+        0,
+        6,
+    )
+    if instrum.resource is not None:
+        assert stats["children_cpu"] >= 0
+
+
+def test_run_not_captured(measurements):
+    instrum.run(["true"])
+
+    (recorded,) = measurements.measurements.values()
+    assert recorded["stats"]["exit_status"] == 0
+    assert recorded["stats"]["output_bytes"] is None
+
+
+def test_run_failed(measurements):
+    """A failed command is measured, and the error raised."""
+    with pytest.raises(subprocess.CalledProcessError):
+        instrum.run(["sh", "-c", "echo bad >&2; exit 3"], capture_output=True, check=True)
+
+    (recorded,) = measurements.measurements.values()
+    assert recorded["stats"]["exit_status"] == 3
+    assert recorded["stats"]["output_bytes"] == 4
@@ -18,24 +18,31 @@
 
 import pathlib
 import sys
+import zipfile
 from textwrap import dedent
 from unittest.mock import patch
 
 import pytest
 
-from charmcraft import const
+from charmcraft import const, instrum
 from charmcraft.linters import (
+    CHECKERS,
     AdditionalFiles,
     Entrypoint,
     Framework,
+    ImportTime,
     JujuActions,
     JujuConfig,
     JujuMetadata,
     Language,
     NamingConventions,
+    PayloadBudget,
     check_dispatch_with_python_entrypoint,
     get_entrypoint_from_dispatch,
 )
+from charmcraft.models.charmcraft import AnalysisConfig
+from charmcraft.models.charmcraft import ImportTime as ImportTimeConfig
+from charmcraft.models.charmcraft import PayloadBudget as PayloadBudgetConfig
 from charmcraft.models.lint import LintResult
 
 EXAMPLE_DISPATCH = """
@@ -1066,3 +1073,421 @@ def test_additional_files_checker_generated_ignore(tmp_path, file):
 
     assert result == LintResult.OK
     assert linter.text == "No additional files found in the charm."
+
+
+def test_additional_files_checker_nested(tmp_path):
+    """The additional files checker reports files inside non-staged directories."""
+    stage_dir = tmp_path / "stage"
+    (stage_dir / "lib" / "staged").mkdir(parents=True)
+    prime_dir = tmp_path / "prime"
+    (prime_dir / "lib" / "staged").mkdir(parents=True)
+    (prime_dir / "lib" / "extra").mkdir(parents=True)
+    (prime_dir / "lib" / "extra" / "file_added").write_text("")
+    (prime_dir / "lib" / "staged" / "file_added").write_text("")
+
+    linter = AdditionalFiles()
+    result = linter.run(prime_dir)
+
+    assert result == LintResult.ERROR
+    assert linter.text == (
+        "Error: Additional files found in the charm:\n"
+        "File 'lib/extra' is not staged but in the charm.\n"
+        "File 'lib/extra/file_added' is not staged but in the charm.\n"
+        "File 'lib/staged/file_added' is not staged but in the charm."
+    )
+
+
+def test_additional_files_checker_same_directory(tmp_path):
+    """The additional files checker does not walk directories shared by stage and prime."""
+    prime_dir = tmp_path / "prime"
+    prime_dir.mkdir()
+    (prime_dir / "file_added").write_text("")
+    (tmp_path / "stage").symlink_to(prime_dir)
+
+    linter = AdditionalFiles()
+    with patch.object(linter, "_iter_additional_files") as mock_iter:
+        result = linter.run(prime_dir)
+
+    assert result == LintResult.OK
+    mock_iter.assert_not_called()
+
+
+def test_additional_files_checker_limit(tmp_path, monkeypatch):
+    """The additional files checker stops reporting after too many files."""
+    monkeypatch.setattr(AdditionalFiles, "MAX_REPORTED_FILES", 2)
+    stage_dir = tmp_path / "stage"
+    stage_dir.mkdir()
+    prime_dir = tmp_path / "prime"
+    prime_dir.mkdir()
+    for name in ("file1", "file2", "file3", "file4"):
+        (prime_dir / name).write_text("")
+
+    linter = AdditionalFiles()
+    result = linter.run(prime_dir)
+
+    assert result == LintResult.ERROR
+    assert linter.text == (
+        "Error: Additional files found in the charm:\n"
+        "File 'file1' is not staged but in the charm.\n"
+        "File 'file2' is not staged but in the charm.\n"
+        "(only the first 2 files are listed)"
+    )
+
+
+# --- tests for Payload Budget checker
+
+
+def _create_payload(basedir):
+    """Create a small charm payload, with a couple of packages in the venv."""
+    (basedir / "venv" / "ops").mkdir(parents=True)
+    (basedir / "venv" / "yaml").mkdir()
+    (basedir / "venv" / "ops" / "model.py").write_bytes(b"x" * 3000)
+    (basedir / "venv" / "ops" / "charm.py").write_bytes(b"x" * 1000)
+    (basedir / "venv" / "yaml" / "_yaml.so").write_bytes(b"x" * 5000)
+    (basedir / "venv" / "direct.pth").write_bytes(b"x" * 100)
+    (basedir / "dispatch").write_bytes(b"x" * 10)
+
+
+def test_payload_budget_directory(tmp_path):
+    """Report the payload figures from a directory, without compressed size."""
+    _create_payload(tmp_path)
+    linter = PayloadBudget()
+    linter.budget = PayloadBudgetConfig(top=2)
+    result = linter.run(tmp_path)
+
+    assert result == LintResult.OK
+    assert linter.text == (
+        "Payload of 8.9 KiB in 8 files and directories.\n"
+        "Largest files: venv/yaml/_yaml.so (4.9 KiB), venv/ops/model.py (2.9 KiB).\n"
+        "Largest packages: yaml (4.9 KiB), ops (3.9 KiB)."
+    )
+
+
+def test_payload_budget_directory_symlinks(tmp_path):
+    """Symlinks are not followed, each one is counted as a single inode."""
+    _create_payload(tmp_path)
+    (tmp_path / "venv" / "loop").symlink_to(".")
+    (tmp_path / "venv" / "ops" / "link.py").symlink_to("model.py")
+    (tmp_path / "dangling").symlink_to("missing")
+    linter = PayloadBudget()
+    linter.budget = PayloadBudgetConfig(top=1)
+    result = linter.run(tmp_path)
+
+    assert result == LintResult.OK
+    assert linter.text.splitlines()[0] == "Payload of 8.9 KiB in 11 files and directories."
+
+
+def test_payload_budget_charm_file(tmp_path):
+    """Report the payload figures from the zip central directory only."""
+    prime_dir = tmp_path / "prime"
+    _create_payload(prime_dir)
+    charm_file = tmp_path / "test.charm"
+    with zipfile.ZipFile(charm_file, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for path in sorted(prime_dir.rglob("*")):
+            if path.is_file():
+                zip_file.write(path, path.relative_to(prime_dir))
+
+    linter = PayloadBudget()
+    linter.budget = PayloadBudgetConfig(top=1)
+    linter.charm_file = charm_file
+    # nothing is read from the (empty) directory given
+    result = linter.run(tmp_path / "empty")
+
+    assert result == LintResult.OK
+    first_line, *other_lines = linter.text.splitlines()
+    assert first_line.startswith("Payload of 8.9 KiB (")
+    assert first_line.endswith(" compressed) in 8 files and directories.")
+    assert other_lines == [
+        "Largest files: venv/yaml/_yaml.so (4.9 KiB).",
+        "Largest packages: yaml (4.9 KiB).",
+    ]
+
+
+@pytest.mark.parametrize(
+    ("budget", "expected_result", "expected_explanations"),
+    [
+        pytest.param({}, LintResult.OK, [], id="defaults"),
+        pytest.param(
+            {"warning_size": 5000},
+            LintResult.WARNING,
+            ["Size 8.9 KiB is over 4.9 KiB."],
+            id="warning-size",
+        ),
+        pytest.param(
+            {"warning_size": 5000, "error_size": 9000},
+            LintResult.ERROR,
+            ["Size 8.9 KiB is over the limit of 8.8 KiB."],
+            id="error-size",
+        ),
+        pytest.param(
+            {"warning_files": 5, "error_size": 9000},
+            LintResult.ERROR,
+            [
+                "Inode count 8 files and directories is over 5 files and directories.",
+                "Size 8.9 KiB is over the limit of 8.8 KiB.",
+            ],
+            id="warning-and-error",
+        ),
+        pytest.param(
+            {"error_files": 7},
+            LintResult.ERROR,
+            ["Inode count 8 files and directories is over the limit of 7 files and directories."],
+            id="error-files",
+        ),
+        pytest.param(
+            {"error_compressed_size": 1},
+            LintResult.OK,
+            [],
+            id="compressed-size-unknown",
+        ),
+    ],
+)
+def test_payload_budget_thresholds(tmp_path, budget, expected_result, expected_explanations):
+    """Thresholds turn the result into a warning or an error."""
+    _create_payload(tmp_path)
+    linter = PayloadBudget()
+    linter.budget = PayloadBudgetConfig(**budget)
+    result = linter.run(tmp_path)
+
+    assert result == expected_result
+    explanations = linter.text.splitlines()[: len(expected_explanations)]
+    assert explanations == expected_explanations
+    assert linter.text.splitlines()[len(expected_explanations)].startswith("Payload of ")
+
+
+@pytest.mark.parametrize(
+    ("entries", "expected_result", "expected_explanation"),
+    [
+        pytest.param(
+            [(f"file{index}", 1, None) for index in range(20000)],
+            LintResult.OK,
+            None,
+            id="files-at-limit",
+        ),
+        pytest.param(
+            [(f"file{index}", 1, None) for index in range(20001)],
+            LintResult.WARNING,
+            "Inode count 20001 files and directories is over 20000 files and directories.",
+            id="too-many-files",
+        ),
+        pytest.param(
+            [("big", 100 * 1024 * 1024 + 1, None)],
+            LintResult.WARNING,
+            "Size 100.0 MiB is over 100.0 MiB.",
+            id="too-big",
+        ),
+    ],
+)
+def test_payload_budget_default_budget(
+    monkeypatch, tmp_path, entries, expected_result, expected_explanation
+):
+    """The budget is checked by default, warning only on big payloads."""
+    assert PayloadBudget in CHECKERS
+    linter = PayloadBudget()
+    linter.configure(AnalysisConfig())
+    monkeypatch.setattr(linter, "_iter_dir_entries", lambda basedir: iter(entries))
+    result = linter.run(tmp_path)
+
+    assert result == expected_result
+    if expected_explanation is not None:
+        assert linter.text.splitlines()[0] == expected_explanation
+
+
+# --- tests for Import Time checker
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 | _io
+charmcraft-import-time-start
+import time:       500 |        500 |     yaml.error
+import time:      2000 |       2500 |   yaml
+import time:      1000 |       3500 | ops
+import time:       300 |        300 | charm_helpers
+"""
+
+
+def _create_import_time_charm(basedir, entrypoint_content):
+    """Create a charm with a dispatch, an entrypoint and a module in the venv."""
+    (basedir / const.DISPATCH_FILENAME).write_text(EXAMPLE_DISPATCH)
+    entrypoint = basedir / "charm.py"
+    entrypoint.write_text(entrypoint_content)
+    entrypoint.chmod(0o700)
+    (basedir / "venv").mkdir()
+    (basedir / "venv" / "fake_lib.py").write_text("import json\nimport http.client\n")
+
+
+def test_import_time_opt_in():
+    """The checker is not enabled unless configured."""
+    linter = ImportTime()
+    assert not linter.enabled
+    linter.configure(AnalysisConfig())
+    assert not linter.enabled
+    linter.configure(AnalysisConfig(import_time=ImportTimeConfig(enabled=True)))
+    assert linter.enabled
+
+
+def test_import_time_no_entrypoint(tmp_path):
+    """Nothing to measure without a Python entrypoint."""
+    linter = ImportTime()
+    result = linter.run(tmp_path)
+    assert result == ImportTime.Result.UNKNOWN
+    assert linter.text == "Cannot find a Python entrypoint to analyse."
+    assert linter.data is None
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
+def test_import_time_real(tmp_path):
+    """Measure the imports from a charm using a real interpreter."""
+    _create_import_time_charm(
+        tmp_path,
+        dedent(
+            """\
+            import fake_lib
+            from fake_lib import json
+
+            raise RuntimeError("The charm code must not be run.")
+            """
+        ),
+    )
+    linter = ImportTime()
+    result = linter.run(tmp_path)
+
+    assert result == ImportTime.Result.MEASURED
+    assert linter.text.startswith("Importing the entrypoint modules takes ")
+    module_names = {module["name"] for module in linter.data["modules"]}
+    assert "fake_lib" in module_names
+    assert linter.data["total-us"] > 0
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
+def test_import_time_import_error(tmp_path):
+    """Report the imports that cannot be done, measuring the rest anyway."""
+    _create_import_time_charm(tmp_path, "import missing_module\nimport fake_lib\n")
+    linter = ImportTime()
+    result = linter.run(tmp_path)
+
+    assert result == ImportTime.Result.MEASURED
+    assert linter.text.endswith(
+        " Could not import: missing_module "
+        "(ModuleNotFoundError: No module named 'missing_module')."
+    )
+    assert linter.data["failed-modules"] == ["missing_module"]
+    assert "fake_lib" in {module["name"] for module in linter.data["modules"]}
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
+def test_import_time_top_level_only(tmp_path):
+    """Only the imports done when loading the entrypoint are measured."""
+    _create_import_time_charm(
+        tmp_path,
+        dedent(
+            """            import typing
+            from fake_lib import json
+
+            if typing.TYPE_CHECKING:
+                import missing_module
+            try:
+                import other_missing_module
+            except ImportError:
+                pass
+
+            def main():
+                import http.server
+            """
+        ),
+    )
+    linter = ImportTime()
+    assert linter._get_imported_modules(tmp_path / "charm.py") == ["typing", "fake_lib"]
+
+    result = linter.run(tmp_path)
+
+    assert result == ImportTime.Result.MEASURED
+    assert "failed-modules" not in linter.data
+
+
+def _get_import_code(module):
+    return (
+        f"try:\n    import {module}\nexcept Exception as exc:\n"
+        "    error = '%s: %s' % (type(exc).__name__, exc)\n"
+        f"    print('charmcraft-import-time-failed', {module!r}, error, file=sys.stderr, flush=True)"
+    )
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
+def test_import_time_parsed(tmp_path, fake_process):
+    """Total and slowest modules are taken from the importtime output after the marker."""
+    _create_import_time_charm(tmp_path, "import ops\nfrom .local import x\nimport charm_helpers\n")
+    script = "\n".join(
+        [
+            "import sys",
+            f"sys.path[:0] = {[str(tmp_path), str(tmp_path / 'lib'), str(tmp_path / 'venv')]!r}",
+            "print('charmcraft-import-time-start', file=sys.stderr, flush=True)",
+            _get_import_code("ops"),
+            _get_import_code("charm_helpers"),
+        ]
+    )
+    fake_process.register(
+        ["python3", "-I", "-X", "importtime", "-c", script], stderr=IMPORTTIME_OUTPUT
+    )
+    linter = ImportTime()
+    linter.configure(AnalysisConfig(import_time=ImportTimeConfig(enabled=True, top=2)))
+    result = linter.get_result(tmp_path)
+
+    assert result.result == ImportTime.Result.MEASURED
+    assert result.data == {
+        "total-us": 3800,
+        "modules": [
+            {"name": "yaml", "self-us": 2000, "cumulative-us": 2500},
+            {"name": "ops", "self-us": 1000, "cumulative-us": 3500},
+        ],
+    }
+    assert result.text == (
+        "Importing the entrypoint modules takes 3.8 ms. "
+        "Slowest modules: yaml (2.0 ms), ops (1.0 ms)."
+    )
+
+
+def test_import_time_measured_subprocess(tmp_path, fake_process, monkeypatch):
+    """The interpreter run is measured as the other subprocesses are."""
+    _create_import_time_charm(tmp_path, "import ops\n")
+    fake_process.register([fake_process.any()], stderr=IMPORTTIME_OUTPUT)
+    measurements = instrum._Measurements()
+    monkeypatch.setattr(instrum, "_measurements", measurements)
+
+    ImportTime().run(tmp_path)
+
+    (measurement,) = measurements.measurements.values()
+    assert measurement["msg"] == "Running external command"
+
+
+# --- tests for the checkers timing
+
+
+@pytest.mark.parametrize(
+    ("run_result", "expected_result"),
+    [
+        (LintResult.OK, LintResult.OK),
+        (ValueError("boom"), LintResult.UNKNOWN),
+    ],
+)
+def test_get_result_timed(tmp_path, monkeypatch, run_result, expected_result):
+    """Each checker run is measured, with its name and result."""
+    measurements = instrum._Measurements()
+    monkeypatch.setattr(instrum, "_measurements", measurements)
+    monkeypatch.setattr(Language, "run", lambda self, base_dir: _return_or_raise(run_result))
+
+    result = Language().get_result(tmp_path)
+
+    assert result.result == expected_result
+    assert result.duration is not None
+    (measurement,) = measurements.measurements.values()
+    assert measurement["msg"] == "Running checker"
+    assert measurement["extra"] == {"checker": "language"}
+    assert measurement["stats"] == {"result": expected_result}
+    assert result.duration == pytest.approx(measurement["tend"] - measurement["tstart"])
+
+
+def _return_or_raise(value):
+    if isinstance(value, Exception):
+        raise value
+    return value
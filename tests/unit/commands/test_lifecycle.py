@@ -16,12 +16,14 @@
 """Unit tests for lifecycle commands."""
 import argparse
 import pathlib
+from unittest import mock
 
 import craft_cli
 import pytest
 
-from charmcraft import application, services
+from charmcraft import application, const, instrum, measurements, models, services
 from charmcraft.application.commands import lifecycle
+from charmcraft.models.lint import LintResult
 
 
 def get_namespace(
@@ -34,6 +36,9 @@ def get_namespace(
     shell_after=False,
     format=None,
     measure=None,
+    measure_format="json",
+    profile=False,
+    measure_resources=False,
     include_all_charms: bool = False,
     include_charm: list[pathlib.Path] | None = None,
     output_bundle: pathlib.Path | None = None,
@@ -51,6 +56,9 @@ def get_namespace(
         shell_after=shell_after,
         format=format,
         measure=measure,
+        measure_format=measure_format,
+        profile=profile,
+        measure_resources=measure_resources,
         include_all_charms=include_all_charms,
         include_charm=include_charm,
         output_bundle=output_bundle,
@@ -104,6 +112,18 @@ def test_pack_run_managed_bundle_by_os(monkeypatch, new_path, platform, expected
             "charm",
             id="output_bundle_on_charm",
         ),
+        pytest.param(
+            get_namespace(profile=True),
+            "--profile can only be used together with --measure.",
+            "charm",
+            id="profile_without_measure",
+        ),
+        pytest.param(
+            get_namespace(measure_resources=True),
+            "--measure-resources can only be used together with --measure.",
+            "charm",
+            id="measure_resources_without_measure",
+        ),
     ],
 )
 def test_pack_invalid_arguments(
@@ -119,3 +139,134 @@ def test_pack_invalid_arguments(
         pack.run(command_args)
 
     assert exc_info.value.args[0].startswith(message_start)
+
+
+def test_pack_report_lint_results(monkeypatch, emitter, pack: lifecycle.PackCommand):
+    results = [
+        models.CheckResult("ok", LintResult.OK, "url-ok", models.CheckType.LINT, "text-ok"),
+        models.CheckResult("warn", LintResult.WARNING, "url-w", models.CheckType.LINT, "text-w"),
+        models.CheckResult("attr", "python", "url-a", models.CheckType.ATTRIBUTE, "text-a"),
+    ]
+    mock_get_lint_results = mock.Mock(return_value=results)
+    monkeypatch.setattr(pack._services.package, "get_lint_results", mock_get_lint_results)
+
+    pack._report_lint_results()
+
+    mock_get_lint_results.assert_called_once_with()
+    emitter.assert_interactions(
+        [mock.call("progress", "warn: [WARNING] text-w (url-w)", permanent=True)]
+    )
+
+
+@pytest.mark.parametrize(
+    ("result", "retcode"),
+    [(LintResult.ERROR, 2), (LintResult.FATAL, 1)],
+)
+def test_pack_report_lint_results_errors(
+    monkeypatch, emitter, pack: lifecycle.PackCommand, result, retcode
+):
+    """Lint errors stop the packing."""
+    results = [
+        models.CheckResult("warn", LintResult.WARNING, "url-w", models.CheckType.LINT, "text-w"),
+        models.CheckResult("bad", result, "url-b", models.CheckType.LINT, "text-b"),
+    ]
+    monkeypatch.setattr(pack._services.package, "get_lint_results", lambda: results)
+
+    with pytest.raises(craft_cli.CraftError) as exc_info:
+        pack._report_lint_results()
+
+    assert str(exc_info.value) == "Aborting due to lint errors (use --force to override)."
+    assert exc_info.value.retcode == retcode
+    emitter.assert_interactions(
+        [
+            mock.call("progress", "warn: [WARNING] text-w (url-w)", permanent=True),
+            mock.call("progress", f"bad: [{result.upper()}] text-b (url-b)", permanent=True),
+        ]
+    )
+
+
+def test_pack_report_lint_results_errors_forced(monkeypatch, emitter, pack):
+    """Lint errors do not stop the packing if forced."""
+    results = [
+        models.CheckResult("error", LintResult.ERROR, "url-e", models.CheckType.LINT, "text-e"),
+    ]
+    monkeypatch.setattr(pack._services.package, "get_lint_results", lambda: results)
+    pack._force_packing = True
+
+    pack._report_lint_results()
+
+    emitter.assert_interactions(
+        [
+            mock.call("progress", "error: [ERROR] text-e (url-e)", permanent=True),
+            mock.call("progress", "Packing anyway as requested.", permanent=True),
+        ]
+    )
+
+
+@pytest.mark.parametrize("force", [True, False, None])
+def test_pack_run_sets_force_packing(monkeypatch, pack: lifecycle.PackCommand, force):
+    """The --force option is kept to be used when reporting the lint results."""
+    monkeypatch.setattr(lifecycle.lifecycle.PackCommand, "_run", lambda *args, **kwargs: None)
+    monkeypatch.setattr("craft_parts.utils.os_utils.OsRelease.id", lambda: "ubuntu")
+
+    pack._run(get_namespace(force=force))
+
+    assert pack._force_packing is bool(force)
+
+
+def test_pack_twice_keeps_last_packages(monkeypatch, pack: lifecycle.PackCommand):
+    """The packages file only holds the packages of the last pack."""
+    monkeypatch.setenv("CHARMCRAFT_MANAGED_MODE", "0")
+    monkeypatch.setattr("craft_parts.utils.os_utils.OsRelease.id", lambda: "ubuntu")
+    package_service = pack._services.package
+    packages_file = package_service.project_dir / const.OUTPUT_PACKAGES_FILENAME
+    packed = iter([["first_amd64.charm", "first_arm64.charm"], ["second_amd64.charm"]])
+
+    def fake_pack_run(*args, **kwargs):
+        package_service._write_package_paths(pathlib.Path(name) for name in next(packed))
+
+    monkeypatch.setattr(lifecycle.lifecycle.PackCommand, "_run", fake_pack_run)
+
+    pack._run(get_namespace())
+    assert packages_file.read_text() == "first_amd64.charm\nfirst_arm64.charm\n"
+    pack._run(get_namespace())
+    assert packages_file.read_text() == "second_amd64.charm\n"
+
+
+@pytest.mark.parametrize("measure_format", ["json", "trace-event"])
+def test_pack_dump_measurements(monkeypatch, tmp_path, pack, measure_format):
+    monkeypatch.setenv("CHARMCRAFT_MANAGED_MODE", "0")
+    mock_dump = mock.Mock()
+    monkeypatch.setitem(instrum.DUMP_FORMATS, measure_format, mock_dump)
+    mock_record_run = mock.Mock()
+    monkeypatch.setattr(measurements, "record_run", mock_record_run)
+    measure = tmp_path / "measures.json"
+
+    pack._dump_measurements(get_namespace(measure=measure, measure_format=measure_format))
+
+    mock_dump.assert_called_once_with(measure)
+    mock_record_run.assert_called_once_with(
+        pack._services.project.name, pack._services.package.platform
+    )
+
+
+def test_pack_dump_measurements_managed(monkeypatch, tmp_path, pack):
+    """In a managed instance the measurements are left for the host, in the project dir."""
+    monkeypatch.setenv("CHARMCRAFT_MANAGED_MODE", "1")
+    monkeypatch.setenv("CRAFT_PLATFORM", "my-platform")
+    mock_dump = mock.Mock()
+    monkeypatch.setattr(instrum, "dump", mock_dump)
+    mock_set_process = mock.Mock()
+    monkeypatch.setattr(instrum, "set_process", mock_set_process)
+    mock_record_run = mock.Mock()
+    monkeypatch.setattr(measurements, "record_run", mock_record_run)
+
+    pack._dump_measurements(
+        get_namespace(measure=tmp_path / "measures.json", measure_format="trace-event")
+    )
+
+    mock_set_process.assert_called_once_with("charmcraft (my-platform instance)")
+    mock_dump.assert_called_once_with(
+        pack._services.package.project_dir / ".charmcraft_measurements_my-platform.json"
+    )
+    mock_record_run.assert_not_called()
@@ -0,0 +1,317 @@
+# Copyright 2024 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# For further info, check https://github.com/canonical/charmcraft
+"""Unit tests for the measurements commands."""
+import argparse
+import datetime
+import json
+
+import pytest
+from craft_cli import CraftError
+
+from charmcraft import measurements
+from charmcraft.application.commands.measurements import (
+    MeasureCompareCommand,
+    MeasureShowCommand,
+)
+from charmcraft.application.main import APP_METADATA
+
+STARTED_AT = datetime.datetime(2024, 5, 6, 7, 8, 9, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture
+def history_path(monkeypatch, tmp_path):
+    path = tmp_path / "history.sqlite3"
+    monkeypatch.setattr(measurements, "get_history_path", lambda: path)
+    return path
+
+
+@pytest.fixture
+def add_runs(history_path):
+    """Add runs of the same project and platform, with the given phases."""
+
+    def _add_runs(*all_phases, project="my-charm", platform="amd64"):
+        with measurements.BuildHistory(history_path) as history:
+            for phases in all_phases:
+                history.add_run(
+                    project=project,
+                    platform=platform,
+                    phases=phases,
+                    charmcraft_version="3.0",
+                    started_at=STARTED_AT,
+                )
+
+    return _add_runs
+
+
+@pytest.fixture
+def command():
+    return MeasureCompareCommand({"app": APP_METADATA, "services": None})
+
+
+def get_namespace(
+    *,
+    runs=(),
+    list=False,
+    project=None,
+    platform=None,
+    window=5,
+    threshold=10,
+    min_delta=0.5,
+    format=None,
+):
+    return argparse.Namespace(
+        runs=list_(runs),
+        list=list,
+        project=project,
+        platform=platform,
+        window=window,
+        threshold=threshold,
+        min_delta=min_delta,
+        format=format,
+    )
+
+
+list_ = list
+
+
+def test_compare_two_runs(emitter, add_runs, command):
+    add_runs({"Total": 10, "Build": 8}, {"Total": 13, "Build": 11, "New": 1})
+
+    command.run(get_namespace(runs=[1, 2]))
+
+    emitter.assert_message(
+        "Comparing run 2 of 'my-charm' for 'amd64' (Charmcraft 3.0) against the run 1:"
+    )
+    emitter.assert_message(
+        "Phase    Base    Target    Delta    Change\n"
+        "Build    8.00s   11.00s    3.00s    +38%      SLOWER\n"
+        "Total    10.00s  13.00s    3.00s    +30%      SLOWER\n"
+        "New      -       1.00s     -        -"
+    )
+    emitter.assert_message("2 phase(s) got significantly slower.")
+
+
+def test_compare_against_median(emitter, add_runs, command):
+    add_runs({"Total": 10}, {"Total": 50}, {"Total": 12}, {"Total": 11}, {"Total": 11.2})
+
+    command.run(get_namespace(window=3, format="json"))
+
+    (message,) = (call.args[1] for call in emitter.interactions if call.args[0] == "message")
+    assert json.loads(message) == {
+        "target": 5,
+        "base": "median of 3 previous runs",
+        "phases": [
+            {
+                "name": "Total",
+                "base": 12,
+                "target": 11.2,
+                "delta": pytest.approx(-0.8),
+                "slower": False,
+            },
+        ],
+    }
+
+
+def test_compare_given_run_against_median(emitter, add_runs, command):
+    add_runs({"Total": 10}, {"Total": 20}, {"Total": 10})
+
+    command.run(get_namespace(runs=[2]))
+
+    emitter.assert_message(
+        "Comparing run 2 of 'my-charm' for 'amd64' (Charmcraft 3.0) "
+        "against the median of 1 previous runs:"
+    )
+    emitter.assert_message("1 phase(s) got significantly slower.")
+
+
+def test_compare_filtered_latest(emitter, add_runs, command):
+    add_runs({"Total": 10}, {"Total": 10})
+    add_runs({"Total": 1}, project="other-charm")
+
+    command.run(get_namespace(project="my-charm"))
+
+    emitter.assert_message(
+        "Comparing run 2 of 'my-charm' for 'amd64' (Charmcraft 3.0) "
+        "against the median of 1 previous runs:"
+    )
+
+
+def test_compare_no_runs(history_path, command):
+    with pytest.raises(CraftError, match="No runs found in the build history."):
+        command.run(get_namespace())
+
+
+def test_compare_no_previous_runs(add_runs, command):
+    add_runs({"Total": 10})
+
+    with pytest.raises(CraftError, match="No previous runs of 'my-charm' for 'amd64'"):
+        command.run(get_namespace())
+
+
+def test_compare_too_many_runs(history_path, command):
+    with pytest.raises(CraftError, match="Indicate at most two runs to compare."):
+        command.run(get_namespace(runs=[1, 2, 3]))
+
+
+def test_list(emitter, add_runs, command):
+    add_runs({"Total": 10}, {})
+
+    command.run(get_namespace(list=True))
+
+    emitter.assert_message(
+        "Run    Started at                 Project    Platform    Charmcraft    Total\n"
+        "2      2024-05-06T07:08:09+00:00  my-charm   amd64       3.0           -\n"
+        "1      2024-05-06T07:08:09+00:00  my-charm   amd64       3.0           10.00s"
+    )
+
+
+def test_list_empty(emitter, history_path, command):
+    command.run(get_namespace(list=True))
+
+    emitter.assert_message("No runs found in the build history.")
+
+
+def test_list_formatted(emitter, add_runs, command):
+    add_runs({"Total": 10})
+
+    command.run(get_namespace(list=True, format="json"))
+
+    emitter.assert_json_output(
+        [
+            {
+                "id": 1,
+                "project": "my-charm",
+                "platform": "amd64",
+                "charmcraft_version": "3.0",
+                "started_at": "2024-05-06T07:08:09+00:00",
+                "total": 10,
+            }
+        ]
+    )
+
+
+@pytest.fixture
+def measurements_file(tmp_path):
+    path = tmp_path / "measures.json"
+    content = {
+        "__meta__": {"baseline": 1000, "process": "charmcraft"},
+        "0": {"parent": None, "msg": "Packing", "extra": {}, "tstart": 0, "tend": 4},
+        "1": {
+            "parent": "0",
+            "msg": "Building",
+            "extra": {"part": "charm"},
+            "tstart": 0,
+            "tend": 3,
+        },
+        "2": {"parent": "0", "msg": "Linting", "extra": {}, "tstart": 3, "tend": 3.5},
+    }
+    path.write_text(json.dumps(content))
+    return path
+
+
+def get_show_namespace(
+    filepath, *, top=10, max_depth=None, min_duration=0, width=8, svg=None, format=None
+):
+    return argparse.Namespace(
+        filepath=filepath,
+        top=top,
+        max_depth=max_depth,
+        min_duration=min_duration,
+        width=width,
+        svg=svg,
+        format=format,
+    )
+
+
+@pytest.fixture
+def show_command():
+    return MeasureShowCommand({"app": APP_METADATA, "services": None})
+
+
+def test_show(emitter, measurements_file, show_command):
+    show_command.run(get_show_namespace(measurements_file))
+
+    emitter.assert_messages(
+        [
+            (
+                "Timeline of 4.00s, each column is 0.500s:\n"
+                "Packing                                               4.00s  |████████|\n"
+                "  Building (part=charm)                               3.00s  |██████  |\n"
+                "  Linting                                             0.50s  |      █ |"
+            ),
+            "Critical path:",
+            (
+                "Phase                    Start    Duration    Self\n"
+                "Packing                  0.00s    4.00s       0.50s\n"
+                "· Building (part=charm)  0.00s    3.00s       3.00s\n"
+                "· Linting                3.00s    0.50s       0.50s"
+            ),
+            "Top self time:",
+            (
+                "Phase                  Count    Self    Total\n"
+                "Building (part=charm)  1        3.00s   3.00s\n"
+                "Linting                1        0.50s   0.50s\n"
+                "Packing                1        0.50s   4.00s"
+            ),
+        ]
+    )
+
+
+def test_show_filtered(emitter, measurements_file, show_command):
+    show_command.run(get_show_namespace(measurements_file, max_depth=0, top=1))
+
+    emitter.assert_message(
+        "Timeline of 4.00s, each column is 0.500s:\n"
+        "Packing                                               4.00s  |████████|"
+    )
+    emitter.assert_message(
+        "Phase                  Count    Self    Total\n"
+        "Building (part=charm)  1        3.00s   3.00s"
+    )
+
+
+def test_show_svg(emitter, tmp_path, measurements_file, show_command):
+    svg_path = tmp_path / "chart.svg"
+
+    show_command.run(get_show_namespace(measurements_file, svg=svg_path))
+
+    assert svg_path.read_text().startswith("<svg ")
+    emitter.assert_message(f"Chart written to {str(svg_path)!r}")
+
+
+def test_show_formatted(emitter, measurements_file, show_command):
+    show_command.run(get_show_namespace(measurements_file, top=1, format="json"))
+
+    emitter.assert_json_output(
+        {
+            "critical_path": [
+                {"name": "Packing", "start": 0, "duration": 4},
+                {"name": "Building (part=charm)", "start": 0, "duration": 3},
+                {"name": "Linting", "start": 3, "duration": 0.5},
+            ],
+            "self_times": [
+                {"name": "Building (part=charm)", "count": 1, "self_time": 3, "total_time": 3},
+            ],
+        }
+    )
+
+
+def test_show_empty(tmp_path, show_command):
+    path = tmp_path / "measures.json"
+    path.write_text('{"__meta__": {"baseline": 1000}}')
+
+    with pytest.raises(CraftError, match="No measurements found in"):
+        show_command.run(get_show_namespace(path))
@@ -15,23 +15,28 @@
 # For further info, check https://github.com/canonical/charmcraft
 """Unit tests for store commands."""
 import argparse
+import contextlib
+import dataclasses
 import datetime
+import os
 import pathlib
 import textwrap
+import zipfile
 from unittest import mock
 
 import craft_cli.pytest_plugin
 import craft_store
 import freezegun
 import pytest
+import yaml
 from craft_store import models
 
-from charmcraft import errors, store
+from charmcraft import const, env, errors, store
 from charmcraft.application import commands
 from charmcraft.application.commands import SetResourceArchitecturesCommand
 from charmcraft.application.commands.store import FetchLibs, LoginCommand
 from charmcraft.application.main import APP_METADATA
-from charmcraft.models.project import CharmLib
+from charmcraft.models.project import Bundle, CharmLib
 from charmcraft.utils import cli
 from tests import get_fake_revision
 
@@ -138,7 +143,7 @@ def test_fetch_libs_no_charm_libs(
     fetch_libs = FetchLibs({"app": APP_METADATA, "services": service_factory})
 
     with pytest.raises(errors.LibraryError) as exc_info:
-        fetch_libs.run(argparse.Namespace())
+        fetch_libs.run(argparse.Namespace(offline=False))
 
     assert exc_info.value.resolution == "Add a 'charm-libs' section to charmcraft.yaml."
 
@@ -179,7 +184,7 @@ def test_fetch_libs_missing_from_store(service_factory, libs, expected):
     fetch_libs = FetchLibs({"app": APP_METADATA, "services": service_factory})
 
     with pytest.raises(errors.CraftError) as exc_info:
-        fetch_libs.run(argparse.Namespace())
+        fetch_libs.run(argparse.Namespace(offline=False))
 
     assert exc_info.value.args[0] == expected
 
@@ -220,7 +225,7 @@ def test_fetch_libs_no_content(new_path, service_factory, libs, store_libs, dl_l
     fetch_libs = FetchLibs({"app": APP_METADATA, "services": service_factory})
 
     with pytest.raises(errors.CraftError, match=expected) as exc_info:
-        fetch_libs.run(argparse.Namespace())
+        fetch_libs.run(argparse.Namespace(offline=False))
 
     assert exc_info.value.args[0] == expected
 
@@ -262,12 +267,507 @@ def test_fetch_libs_success(
     service_factory.store.anonymous_client.get_library.return_value = dl_lib
     fetch_libs = FetchLibs({"app": APP_METADATA, "services": service_factory})
 
-    fetch_libs.run(argparse.Namespace())
+    fetch_libs.run(argparse.Namespace(offline=False))
 
     emitter.assert_progress("Getting library metadata from charmhub")
     emitter.assert_message("Downloaded 1 charm libraries.")
 
 
+MYSQL_BACKUPS = store.models.Library(
+    charm_name="mysql",
+    lib_name="backups",
+    lib_id="ididid",
+    api=1,
+    patch=2,
+    content="I am a library.",
+    content_hash="hashhashhash",
+)
+
+
+@pytest.fixture
+def libs_cache(monkeypatch, service_factory) -> store.LibraryCache:
+    monkeypatch.setenv(const.SHARED_CACHE_ENV_VAR, "/shared-cache")
+    return store.LibraryCache(env.get_charm_libs_cache_path())
+
+
+def test_fetch_libs_cached(new_path, emitter, service_factory, libs_cache):
+    """The libraries in the local cache are not downloaded."""
+    service_factory.project.charm_libs = [CharmLib(lib="mysql.backups", version="1")]
+    anonymous_client = service_factory.store.anonymous_client
+    anonymous_client.fetch_libraries_metadata.return_value = [
+        dataclasses.replace(MYSQL_BACKUPS, content=None)
+    ]
+    libs_cache.put(MYSQL_BACKUPS)
+    fetch_libs = FetchLibs({"app": APP_METADATA, "services": service_factory})
+
+    fetch_libs.run(argparse.Namespace(offline=False))
+
+    anonymous_client.get_library.assert_not_called()
+    lib_path = pathlib.Path("lib/charms/mysql/v1/backups.py")
+    assert lib_path.read_text() == "I am a library."
+    emitter.assert_message("Downloaded 0 charm libraries.")
+    emitter.assert_message("Used 1 charm libraries from the local cache.")
+
+
+def test_fetch_libs_caches_downloaded(new_path, service_factory, libs_cache):
+    """The downloaded libraries are kept in the local cache."""
+    service_factory.project.charm_libs = [CharmLib(lib="mysql.backups", version="1")]
+    anonymous_client = service_factory.store.anonymous_client
+    anonymous_client.fetch_libraries_metadata.return_value = [
+        dataclasses.replace(MYSQL_BACKUPS, content=None)
+    ]
+    anonymous_client.get_library.return_value = MYSQL_BACKUPS
+    fetch_libs = FetchLibs({"app": APP_METADATA, "services": service_factory})
+
+    fetch_libs.run(argparse.Namespace(offline=False))
+
+    assert libs_cache.get(MYSQL_BACKUPS) == MYSQL_BACKUPS
+
+
+def test_fetch_libs_offline(new_path, emitter, service_factory, libs_cache):
+    service_factory.project.charm_libs = [CharmLib(lib="mysql.backups", version="1")]
+    libs_cache.put(dataclasses.replace(MYSQL_BACKUPS, patch=1, content="Old library."))
+    libs_cache.put(MYSQL_BACKUPS)
+    fetch_libs = FetchLibs({"app": APP_METADATA, "services": service_factory})
+
+    fetch_libs.run(argparse.Namespace(offline=True))
+
+    service_factory.store.anonymous_client.fetch_libraries_metadata.assert_not_called()
+    lib_path = pathlib.Path("lib/charms/mysql/v1/backups.py")
+    assert lib_path.read_text() == "I am a library."
+    emitter.assert_message("Used 1 charm libraries from the local cache.")
+
+
+def test_fetch_libs_offline_missing(new_path, service_factory, libs_cache):
+    """Offline, any library missing from the cache fails before writing any."""
+    service_factory.project.charm_libs = [
+        CharmLib(lib="mysql.backups", version="1"),
+        CharmLib(lib="mysql.client", version="0.57"),
+    ]
+    libs_cache.put(MYSQL_BACKUPS)
+    fetch_libs = FetchLibs({"app": APP_METADATA, "services": service_factory})
+
+    with pytest.raises(errors.CraftError) as exc_info:
+        fetch_libs.run(argparse.Namespace(offline=True))
+
+    assert exc_info.value.args[0] == textwrap.dedent(
+        """\
+        Could not find the following libraries in the local cache:
+        - lib: mysql.client
+          version: '0.57'
+        """
+    )
+    service_factory.store.anonymous_client.fetch_libraries_metadata.assert_not_called()
+    assert not pathlib.Path("lib").exists()
+
+
+@pytest.fixture
+def promote_bundle(monkeypatch, service_factory, fake_project_dir):
+    """Set up a bundle with two charms released in edge, returning the store mock."""
+    service_factory.project = Bundle.unmarshal({"type": "bundle", "name": "my-bundle"})
+    bundle = {
+        "name": "my-bundle",
+        "applications": {"app-a": {"charm": "charm-a"}, "app-b": {"charm": "charm-b"}},
+    }
+    (fake_project_dir / "bundle.yaml").write_text(yaml.safe_dump(bundle))
+
+    mock_store = mock.MagicMock()
+    monkeypatch.setattr("charmcraft.application.commands.store.Store", lambda config: mock_store)
+    mock_store.list_registered_names.return_value = [
+        store.models.Entity(
+            entity_type=entity_type,
+            name=name,
+            private=False,
+            status="registered",
+            publisher_display_name="me",
+        )
+        for name, entity_type in [
+            ("my-bundle", "bundle"),
+            ("charm-a", "charm"),
+            ("charm-b", "charm"),
+        ]
+    ]
+    revisions = {"my-bundle": 1, "charm-a": 10, "charm-b": 20}
+
+    def list_releases(name):
+        resources = [
+            store.models.Resource(
+                name="image", optional=False, revision=3, resource_type="oci-image"
+            )
+        ]
+        release = store.models.Release(
+            revision=revisions[name],
+            channel="latest/edge",
+            expires_at=None,
+            resources=resources if name == "charm-b" else [],
+            base=None,
+        )
+        return [release], [], []
+
+    mock_store.list_releases.side_effect = list_releases
+    return mock_store
+
+
+def get_promote_bundle_args(**kwargs) -> argparse.Namespace:
+    args = {
+        "from_channel": "latest/edge",
+        "to_channel": "latest/beta",
+        "output_bundle": None,
+        "exclude": [],
+        "dry_run": False,
+    }
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+def test_promote_bundle_dry_run(emitter, service_factory, promote_bundle):
+    cmd = commands.PromoteBundleCommand({"app": APP_METADATA, "services": service_factory})
+
+    cmd.run(get_promote_bundle_args(dry_run=True))
+
+    promote_bundle.release.assert_not_called()
+    promote_bundle.upload.assert_not_called()
+    emitter.assert_messages(
+        [
+            "Would release these charms to latest/beta:",
+            textwrap.dedent(
+                """\
+                Charm    Revision    Resources
+                charm-a  10          -
+                charm-b  20          image (r3)"""
+            ),
+            (
+                "Then the bundle my-bundle (revision 1 in the source channel) would be packed, "
+                "uploaded and released to latest/beta."
+            ),
+        ]
+    )
+
+
+def test_promote_bundle_charm_lookup_errors(service_factory, promote_bundle):
+    """The errors getting the releases of every charm are reported together."""
+    list_releases = promote_bundle.list_releases.side_effect
+
+    def failing_list_releases(name):
+        if name == "my-bundle":
+            return list_releases(name)
+        raise errors.CraftError(f"Boom on {name}")
+
+    promote_bundle.list_releases.side_effect = failing_list_releases
+    cmd = commands.PromoteBundleCommand({"app": APP_METADATA, "services": service_factory})
+
+    with pytest.raises(errors.CraftError) as exc_info:
+        cmd.run(get_promote_bundle_args())
+
+    assert str(exc_info.value) == (
+        "Could not get the releases of 2 charms:\n"
+        "- charm-a: Boom on charm-a\n"
+        "- charm-b: Boom on charm-b"
+    )
+
+
+def test_promote_bundle_release_errors(service_factory, promote_bundle):
+    """The errors releasing every charm are reported together, not releasing the bundle."""
+
+    def release(name, revision, channels, resources):
+        if name == "charm-b":
+            raise errors.CraftError("Permission denied")
+        return {}
+
+    promote_bundle.release.side_effect = release
+    cmd = commands.PromoteBundleCommand({"app": APP_METADATA, "services": service_factory})
+
+    with pytest.raises(errors.CraftError) as exc_info:
+        cmd.run(get_promote_bundle_args())
+
+    assert str(exc_info.value) == (
+        "Could not release 1 of 2 charms to latest/beta, so the bundle was not released:\n"
+        "- charm-b: Permission denied"
+    )
+    assert exc_info.value.details == "Released charms: charm-a"
+    assert promote_bundle.release.call_count == 2
+    promote_bundle.upload.assert_not_called()
+
+
+def test_promote_bundle_logs_in_once(service_factory, promote_bundle):
+    """The concurrent store calls are done after logging in, and without auto-login."""
+    logged_in = []
+
+    @contextlib.contextmanager
+    def logged_in_once():
+        logged_in.append(True)
+        yield
+        logged_in.pop()
+
+    def release(name, revision, channels, resources):
+        if name == "my-bundle":
+            raise errors.CraftError("Stop after releasing the charms")
+        assert logged_in
+        return {}
+
+    list_releases = promote_bundle.list_releases.side_effect
+
+    def checked_list_releases(name):
+        if name != "my-bundle":
+            assert logged_in
+        return list_releases(name)
+
+    promote_bundle.logged_in_once.side_effect = logged_in_once
+    promote_bundle.list_releases.side_effect = checked_list_releases
+    promote_bundle.release.side_effect = release
+    cmd = commands.PromoteBundleCommand({"app": APP_METADATA, "services": service_factory})
+
+    with pytest.raises(errors.CraftError, match="Stop after releasing the charms"):
+        cmd.run(get_promote_bundle_args())
+
+    assert promote_bundle.logged_in_once.call_count == 2
+    assert promote_bundle.release.call_count == 3
+
+
+@pytest.fixture
+def upload_store(monkeypatch, fake_project_dir):
+    """Pack two charms in the project directory, returning the store mock for uploads."""
+    # only the fake filesystem's current directory changes
+    os.chdir(fake_project_dir)
+    for filename, name in [("my-charm_amd64.charm", "my-charm"), ("other_arm64.charm", "other")]:
+        with zipfile.ZipFile(filename, "w") as zip_file:
+            zip_file.writestr("metadata.yaml", yaml.safe_dump({"name": name}))
+
+    mock_store = mock.MagicMock()
+    monkeypatch.setattr("charmcraft.application.commands.store.Store", lambda config: mock_store)
+    revisions = {"my-charm": 7, "other": 3}
+    mock_store.upload.side_effect = lambda name, filepath, **kwargs: store.models.Uploaded(
+        ok=True, status="approved", revision=revisions[name], errors=[]
+    )
+    return mock_store
+
+
+def get_upload_args(**kwargs) -> argparse.Namespace:
+    args = {
+        "filepaths": [pathlib.Path("my-charm_amd64.charm"), pathlib.Path("other_arm64.charm")],
+        "name": None,
+        "release": [],
+        "resource": [],
+        "format": None,
+    }
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+def test_upload_several(emitter, service_factory, upload_store):
+    cmd = commands.UploadCommand({"app": APP_METADATA, "services": service_factory})
+
+    retcode = cmd.run(get_upload_args(release=["edge"]))
+
+    assert retcode == 0
+    # logged in once before the uploads, and once before the releases
+    assert upload_store.logged_in_once.call_count == 2
+    upload_store.upload.assert_has_calls(
+        [
+            mock.call("my-charm", pathlib.Path("my-charm_amd64.charm"), show_progress=False),
+            mock.call("other", pathlib.Path("other_arm64.charm"), show_progress=False),
+        ],
+        any_order=True,
+    )
+    emitter.assert_progress(
+        "Uploaded 'my-charm_amd64.charm': revision 7 (approved)", permanent=True
+    )
+    emitter.assert_progress("Uploaded 'other_arm64.charm': revision 3 (approved)", permanent=True)
+    upload_store.release.assert_has_calls(
+        [mock.call("my-charm", 7, ["edge"], []), mock.call("other", 3, ["edge"], [])],
+        any_order=True,
+    )
+    emitter.assert_messages(
+        [
+            textwrap.dedent(
+                """\
+                File                  Name      Revision    Status
+                my-charm_amd64.charm  my-charm  7           approved
+                other_arm64.charm     other     3           approved"""
+            ),
+            "Revisions released to edge",
+        ]
+    )
+
+
+def test_upload_reused(emitter, service_factory, upload_store):
+    upload_store.upload.side_effect = None
+    upload_store.upload.return_value = store.models.Uploaded(
+        ok=True, status="approved", revision=7, errors=[], reused=True
+    )
+    cmd = commands.UploadCommand({"app": APP_METADATA, "services": service_factory})
+
+    retcode = cmd.run(get_upload_args(filepaths=[pathlib.Path("my-charm_amd64.charm")]))
+
+    assert retcode == 0
+    emitter.assert_message("Revision 7 of 'my-charm' has the same content, not uploaded again")
+
+
+def test_upload_several_json(emitter, service_factory, upload_store):
+    cmd = commands.UploadCommand({"app": APP_METADATA, "services": service_factory})
+
+    cmd.run(get_upload_args(format="json"))
+
+    emitter.assert_json_output(
+        [
+            {
+                "filepath": "my-charm_amd64.charm",
+                "name": "my-charm",
+                "status": "approved",
+                "revision": 7,
+                "reused": False,
+                "errors": [],
+            },
+            {
+                "filepath": "other_arm64.charm",
+                "name": "other",
+                "status": "approved",
+                "revision": 3,
+                "reused": False,
+                "errors": [],
+            },
+        ]
+    )
+
+
+def test_upload_several_rejected(emitter, service_factory, upload_store):
+    """If any upload is rejected, no revision is released."""
+    upload_store.upload.side_effect = lambda name, filepath, **kwargs: (
+        store.models.Uploaded(ok=True, status="approved", revision=7, errors=[])
+        if name == "my-charm"
+        else store.models.Uploaded(
+            ok=False,
+            status="rejected",
+            revision=None,
+            errors=[store.models.Error(code="bad-charm", message="It is bad")],
+        )
+    )
+    cmd = commands.UploadCommand({"app": APP_METADATA, "services": service_factory})
+
+    retcode = cmd.run(get_upload_args(release=["edge"]))
+
+    assert retcode == 1
+    upload_store.release.assert_not_called()
+    emitter.assert_messages(
+        [
+            textwrap.dedent(
+                """\
+                File                  Name      Revision    Status
+                my-charm_amd64.charm  my-charm  7           approved
+                other_arm64.charm     other     -           rejected"""
+            ),
+            "Upload of 'other_arm64.charm' failed with status 'rejected':",
+            "- bad-charm: It is bad",
+            "No revisions were released, as not all the uploads succeeded.",
+        ]
+    )
+
+
+def test_upload_several_errors(service_factory, upload_store):
+    """The errors uploading each file are reported together."""
+    upload = upload_store.upload.side_effect
+
+    def failing_upload(name, filepath, **kwargs):
+        if name == "other":
+            raise errors.CraftError("Timeout polling Charmhub for upload status (after 600s).")
+        return upload(name, filepath, **kwargs)
+
+    upload_store.upload.side_effect = failing_upload
+    cmd = commands.UploadCommand({"app": APP_METADATA, "services": service_factory})
+
+    with pytest.raises(errors.CraftError) as exc_info:
+        cmd.run(get_upload_args(release=["edge"]))
+
+    assert str(exc_info.value) == (
+        "Could not upload 1 of 2 files:\n"
+        "- other_arm64.charm: Timeout polling Charmhub for upload status (after 600s)."
+    )
+    assert exc_info.value.details == "Uploaded files: 'my-charm_amd64.charm' (revision 7)"
+    upload_store.release.assert_not_called()
+
+
+def test_upload_packed_files(service_factory, upload_store):
+    """Without files, the ones packed in the current directory are uploaded."""
+    pathlib.Path(const.OUTPUT_PACKAGES_FILENAME).write_text(
+        "my-charm_amd64.charm\nother_arm64.charm\nmy-charm_amd64.charm\n"
+    )
+    cmd = commands.UploadCommand({"app": APP_METADATA, "services": service_factory})
+
+    cmd.run(get_upload_args(filepaths=[]))
+
+    assert upload_store.upload.call_count == 2
+
+
+def test_upload_no_packed_files(service_factory, upload_store):
+    cmd = commands.UploadCommand({"app": APP_METADATA, "services": service_factory})
+
+    with pytest.raises(craft_cli.ArgumentParsingError, match="no packed files were found"):
+        cmd.run(get_upload_args(filepaths=[]))
+
+
+def test_upload_several_with_name(service_factory, upload_store):
+    cmd = commands.UploadCommand({"app": APP_METADATA, "services": service_factory})
+
+    with pytest.raises(craft_cli.ArgumentParsingError, match="only be used with a single file"):
+        cmd.run(get_upload_args(name="my-charm"))
+    upload_store.upload.assert_not_called()
+
+
+def get_wait_upload_args(**kwargs) -> argparse.Namespace:
+    args = {
+        "name": "my-charm",
+        "upload_id": "my-upload-id",
+        "timeout": None,
+        "release": [],
+        "resource": [],
+        "format": None,
+    }
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+def test_wait_upload_release(monkeypatch, emitter, service_factory):
+    mock_store = mock.Mock()
+    monkeypatch.setattr("charmcraft.application.commands.store.Store", lambda config: mock_store)
+    mock_store.wait_for_upload.return_value = store.models.Uploaded(
+        ok=True, status="approved", revision=7, errors=[]
+    )
+    cmd = commands.WaitUploadCommand({"app": APP_METADATA, "services": service_factory})
+
+    retcode = cmd.run(get_wait_upload_args(timeout=120.0, release=["edge"]))
+
+    assert retcode == 0
+    mock_store.wait_for_upload.assert_called_once_with("my-charm", "my-upload-id", timeout=120.0)
+    mock_store.release.assert_called_once_with("my-charm", 7, ["edge"], [])
+    emitter.assert_messages(["Revision 7 of 'my-charm' created", "Revision released to edge"])
+
+
+def test_wait_upload_rejected(monkeypatch, emitter, service_factory):
+    mock_store = mock.Mock()
+    monkeypatch.setattr("charmcraft.application.commands.store.Store", lambda config: mock_store)
+    mock_store.wait_for_upload.return_value = store.models.Uploaded(
+        ok=False,
+        status="rejected",
+        revision=None,
+        errors=[store.models.Error(code="bad-charm", message="It is bad")],
+    )
+    cmd = commands.WaitUploadCommand({"app": APP_METADATA, "services": service_factory})
+
+    retcode = cmd.run(get_wait_upload_args(release=["edge"]))
+
+    assert retcode == 1
+    mock_store.release.assert_not_called()
+    emitter.assert_messages(["Upload failed with status 'rejected':", "- bad-charm: It is bad"])
+
+
+@pytest.mark.parametrize("timeout", [0, -1.5])
+def test_wait_upload_invalid_timeout(service_factory, timeout):
+    cmd = commands.WaitUploadCommand({"app": APP_METADATA, "services": service_factory})
+
+    with pytest.raises(errors.CraftError, match="The timeout must be a positive number"):
+        cmd.run(get_wait_upload_args(timeout=timeout))
+
+
 @freezegun.freeze_time("2024-10-31")
 def test_register_bundle_warning(monkeypatch: pytest.MonkeyPatch, emitter):
     mock_store = mock.Mock()
@@ -300,3 +800,41 @@ def test_register_bundle_error(monkeypatch: pytest.MonkeyPatch, emitter):
         f"more information, see: {commands.store.BUNDLE_REGISTRATION_REMOVAL_URL}",
     )
     mock_store.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    ("command_class", "args"),
+    [
+        (commands.ListNamesCommand, []),
+        (commands.ListRevisionsCommand, ["my-charm"]),
+        (commands.StatusCommand, ["my-charm"]),
+        (commands.ListLibCommand, ["my-charm"]),
+        (commands.ListResourcesCommand, ["my-charm"]),
+    ],
+)
+@pytest.mark.parametrize(("no_cache", "use_cache"), [([], True), (["--no-cache"], False)])
+def test_read_only_commands_cache(
+    monkeypatch, service_factory, *, command_class, args, no_cache, use_cache
+):
+    """The commands that just show information use the cache, unless told not to."""
+    store_calls = []
+    mock_store = mock.Mock()
+    mock_store.list_registered_names.return_value = []
+    mock_store.list_revisions.return_value = []
+    mock_store.list_releases.return_value = ([], [], [])
+    mock_store.get_libraries_tips.return_value = {}
+    mock_store.list_resources.return_value = []
+
+    def fake_store(config, **kwargs):
+        store_calls.append(kwargs)
+        return mock_store
+
+    monkeypatch.setattr("charmcraft.application.commands.store.Store", fake_store)
+    cmd = command_class({"app": APP_METADATA, "services": service_factory})
+    parser = argparse.ArgumentParser()
+    cmd.fill_parser(parser)
+
+    cmd.run(parser.parse_args(args + no_cache))
+
+    assert len(store_calls) == 1
+    assert store_calls[0]["use_cache"] is use_cache
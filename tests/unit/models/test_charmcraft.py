@@ -29,3 +29,14 @@ from charmcraft.models import charmcraft
 )
 def test_get_base_from_str_and_arch(base_str, expected):
     assert charmcraft.Base.from_str_and_arch(base_str, []) == expected
+
+
+def test_analysis_config_payload_budget():
+    config = charmcraft.AnalysisConfig.unmarshal(
+        {"payload-budget": {"warning-size": None, "error-compressed-size": 1024, "top": 3}}
+    )
+
+    assert config.payload_budget == charmcraft.PayloadBudget(
+        warning_size=None, error_compressed_size=1024, top=3
+    )
+    assert config.ignore == charmcraft.Ignore()
@@ -16,13 +16,13 @@
 """Unit tests for charm plugin."""
 import pathlib
 import sys
-from unittest.mock import patch
+from unittest.mock import call, patch
 
 import pydantic
 import pytest
 from craft_parts import Step
 
-from charmcraft import charm_builder, env, parts
+from charmcraft import charm_builder, env, instrum, parts
 
 pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Windows not supported")
 
@@ -133,6 +133,7 @@ def test_charmplugin_get_build_commands_ubuntu(charm_plugin, tmp_path, mocker, m
         f"{charm_builder.__file__} "
         f"--builddir {str(tmp_path)}/parts/foo/build "
         f"--installdir {str(tmp_path)}/parts/foo/install "
+        f"--metrics-file {env.get_charm_builder_metrics_path('foo')} "
         f"--entrypoint {str(tmp_path)}/parts/foo/build/entrypoint "
         "-p pip "
         "-p setuptools "
@@ -177,6 +178,7 @@ def test_charmplugin_get_build_commands_centos_7(charm_plugin, tmp_path, mocker,
         f"{charm_builder.__file__} "
         f"--builddir {str(tmp_path)}/parts/foo/build "
         f"--installdir {str(tmp_path)}/parts/foo/install "
+        f"--metrics-file {env.get_charm_builder_metrics_path('foo')} "
         f"--entrypoint {str(tmp_path)}/parts/foo/build/entrypoint "
         "-b pip "
         "-b setuptools "
@@ -196,10 +198,39 @@ def test_charmplugin_get_build_commands_centos_7(charm_plugin, tmp_path, mocker,
     mock_register.assert_called_with(charm_plugin.post_build_callback, step_list=[Step.BUILD])
 
 
-def test_charmplugin_post_build_metric_collection(charm_plugin):
+def test_charmplugin_get_build_commands_profiling(charm_plugin, mocker, monkeypatch):
+    """When profiling, the charm builder is told to profile itself."""
+    mocker.patch("craft_parts.callbacks.register_post_step")
+    monkeypatch.setattr(instrum, "is_profiling", lambda: True)
+
+    (command,) = charm_plugin.get_build_commands()
+
+    assert " CHARMCRAFT_PROFILE=1 " in command
+
+
+def test_charmplugin_get_build_commands_all_resources(charm_plugin, mocker, monkeypatch):
+    """When recording all the resources, the charm builder is told to do the same."""
+    mocker.patch("craft_parts.callbacks.register_post_step")
+    monkeypatch.setattr(instrum, "is_recording_all_resources", lambda: True)
+
+    (command,) = charm_plugin.get_build_commands()
+
+    assert " CHARMCRAFT_MEASURE_RESOURCES=1 " in command
+
+
+def test_charmplugin_post_build_metric_collection(charm_plugin, fs):
+    """All the metrics left by the charm builder are collected (and removed)."""
+    for part_name in ["foo", "bar"]:
+        fs.create_file(env.get_charm_builder_metrics_path(part_name))
+    fs.create_file("/tmp/other.json")
+
     with patch("charmcraft.instrum.merge_from") as mock_collection:
         charm_plugin.post_build_callback("test step info")
-    mock_collection.assert_called_with(env.get_charm_builder_metrics_path())
+
+    assert mock_collection.mock_calls == [
+        call(env.get_charm_builder_metrics_path("bar"), remove=True),
+        call(env.get_charm_builder_metrics_path("foo"), remove=True),
+    ]
 
 
 def test_charmpluginproperties_invalid_properties():
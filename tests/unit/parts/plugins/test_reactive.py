@@ -25,7 +25,7 @@ import pytest_subprocess
 from craft_parts import plugins
 from craft_parts.errors import PluginEnvironmentValidationError
 
-from charmcraft import const
+from charmcraft import const, env, instrum
 from charmcraft.parts.plugins import _reactive
 
 pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
@@ -99,16 +99,48 @@ def test_get_build_snaps(plugin):
 
 
 def test_get_build_environment(plugin):
-    assert plugin.get_build_environment() == {"CRYPTOGRAPHY_OPENSSL_NO_LEGACY": "true"}
+    assert plugin.get_build_environment() == {
+        "CRYPTOGRAPHY_OPENSSL_NO_LEGACY": "true",
+        "CHARMCRAFT_METRICS_FILE": str(env.get_charm_builder_metrics_path("foo")),
+    }
+
+
+def test_get_build_environment_profiling(plugin, monkeypatch):
+    monkeypatch.setattr(instrum, "is_profiling", lambda: True)
+
+    assert plugin.get_build_environment()["CHARMCRAFT_PROFILE"] == "1"
+
+
+def test_get_build_environment_all_resources(plugin, monkeypatch):
+    monkeypatch.setattr(instrum, "is_recording_all_resources", lambda: True)
+
+    assert plugin.get_build_environment()["CHARMCRAFT_MEASURE_RESOURCES"] == "1"
 
 
-def test_get_build_commands(plugin, tmp_path):
+def test_get_build_commands(plugin, tmp_path, mocker):
+    mock_register = mocker.patch("craft_parts.callbacks.register_post_step")
+
     assert plugin.get_build_commands() == [
         f"{sys.executable} -I {_reactive.__file__} fake-project "
         f"{tmp_path}/parts/foo/build {tmp_path}/parts/foo/install "
         "--charm-argument --charm-argument-with argument"
     ]
 
+    # check the callback is properly registered for running own method after build
+    mock_register.assert_called_with(
+        plugin.post_build_callback, step_list=[craft_parts.Step.BUILD]
+    )
+
+
+def test_post_build_metric_collection(plugin, fs):
+    """All the metrics left by the builds are collected (and removed)."""
+    fs.create_file(env.get_charm_builder_metrics_path("foo"))
+
+    with patch("charmcraft.instrum.merge_from") as mock_collection:
+        plugin.post_build_callback("test step info")
+
+    mock_collection.assert_called_once_with(env.get_charm_builder_metrics_path("foo"), remove=True)
+
 
 def test_validate_environment(plugin, plugin_properties, charm_exe):
     validator = plugin.validator_class(
@@ -14,6 +14,7 @@
 #
 # For further info, check https://github.com/canonical/charmcraft
 """Unit tests for analysis service."""
+import dataclasses
 import pathlib
 import tempfile
 import zipfile
@@ -23,6 +24,7 @@ import pytest
 import pytest_check
 
 from charmcraft import application, linters
+from charmcraft.models.charmcraft import AnalysisConfig, ImportTime, PayloadBudget
 from charmcraft.models.lint import CheckResult, CheckType, LintResult
 from charmcraft.services import analysis
 
@@ -109,7 +111,10 @@ def analysis_service():
 def test_lint_directory_results(monkeypatch, analysis_service, checkers, expected):
     monkeypatch.setattr(linters, "CHECKERS", checkers)
 
-    assert list(analysis_service.lint_directory(pathlib.Path())) == expected
+    results = list(analysis_service.lint_directory(pathlib.Path()))
+    # all the checkers are timed
+    assert all(result.duration is not None for result in results)
+    assert [dataclasses.replace(result, duration=None) for result in results] == expected
 
 
 @pytest.mark.parametrize("checkers", [STUB_ATTRIBUTE_CHECKERS + STUB_LINTERS])
@@ -143,3 +148,149 @@ def test_lint_file_results(fs, mock_temp_dir, mock_zip_file, monkeypatch, analys
     with pytest_check.check:
         mock_checker.get_result.assert_called_once_with(fake_temp_path)
     pytest_check.equal(results, [mock_checker.get_result.return_value])
+
+
+@pytest.mark.parametrize(
+    ("ignore", "extracted"),
+    [
+        pytest.param(set(), True, id="other-checkers"),
+        pytest.param({"other"}, False, id="only-payload-budget"),
+    ],
+)
+def test_lint_file_extraction(tmp_path, monkeypatch, analysis_service, ignore, extracted):
+    """The charm file is not extracted if only the payload budget checker needs it."""
+    charm_file = tmp_path / "test.charm"
+    with zipfile.ZipFile(charm_file, "w") as zip_file:
+        zip_file.writestr("file", "content")
+    other_checker = StubLinter("other", LintResult.OK)
+    monkeypatch.setattr(other_checker, "run", mock.Mock(return_value=LintResult.OK))
+    monkeypatch.setattr(linters, "CHECKERS", [other_checker, linters.PayloadBudget])
+    mock_extract = mock.Mock(wraps=analysis_service._extract)
+    monkeypatch.setattr(analysis_service, "_extract", mock_extract)
+
+    results = list(analysis_service.lint_file(charm_file, ignore=ignore))
+
+    assert mock_extract.called == extracted
+    assert other_checker.run.called == extracted
+    assert [r.name for r in results] == ["other", "payload-budget"]
+    assert results[1].result == LintResult.OK
+    assert results[1].text.startswith("Payload of 7 Bytes (")
+
+
+def test_lint_directory_config(monkeypatch, analysis_service):
+    checker = linters.PayloadBudget()
+    monkeypatch.setattr(checker, "run", mock.Mock(return_value=LintResult.OK))
+    monkeypatch.setattr(linters, "CHECKERS", [mock.Mock(return_value=checker)])
+    config = AnalysisConfig(payload_budget=PayloadBudget(warning_size=1))
+    charm_file = pathlib.Path("/fake/charm.charm")
+
+    results = list(
+        analysis_service.lint_directory(pathlib.Path(), config=config, charm_file=charm_file)
+    )
+
+    pytest_check.equal([r.result for r in results], [LintResult.OK])
+    pytest_check.is_(checker.budget, config.payload_budget)
+    pytest_check.equal(checker.charm_file, charm_file)
+
+
+@pytest.mark.parametrize(
+    ("config", "expected"),
+    [
+        (None, []),
+        (AnalysisConfig(), []),
+        (AnalysisConfig(import_time=ImportTime(enabled=False)), []),
+        (AnalysisConfig(import_time=ImportTime(enabled=True)), ["import-time"]),
+    ],
+)
+def test_lint_directory_opt_in(monkeypatch, analysis_service, config, expected):
+    monkeypatch.setattr(linters.ImportTime, "run", mock.Mock(return_value="measured"))
+    monkeypatch.setattr(linters, "CHECKERS", [linters.ImportTime])
+
+    results = list(analysis_service.lint_directory(pathlib.Path(), config=config))
+
+    assert [r.name for r in results] == expected
+
+
+@pytest.fixture
+def counting_linter(monkeypatch):
+    linter = StubLinter("counted", LintResult.WARNING)
+    linter.run = mock.Mock(wraps=linter.run)
+    monkeypatch.setattr(linters, "CHECKERS", [linter, StubLinter("ignorable", LintResult.OK)])
+    return linter
+
+
+def test_lint_directory_memoized(tmp_path, analysis_service, counting_linter):
+    (tmp_path / "file").write_text("content")
+
+    first = list(analysis_service.lint_directory(tmp_path))
+    # the manifest is written from the results, it doesn't change the fingerprint
+    (tmp_path / "manifest.yaml").write_text("analysis: {}")
+    second = list(analysis_service.lint_directory(tmp_path))
+
+    assert first == second
+    assert counting_linter.run.call_count == 1
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        pytest.param(lambda path: (path / "new_file").touch(), id="new-file"),
+        pytest.param(lambda path: (path / "file").write_text("changed!"), id="changed-file"),
+        pytest.param(lambda path: (path / "file").unlink(), id="removed-file"),
+        pytest.param(lambda path: (path / "venv" / "manifest.yaml").touch(), id="nested"),
+    ],
+)
+def test_lint_directory_memoized_changed(tmp_path, analysis_service, counting_linter, change):
+    (tmp_path / "venv").mkdir()
+    (tmp_path / "file").write_text("content")
+
+    list(analysis_service.lint_directory(tmp_path))
+    change(tmp_path)
+    list(analysis_service.lint_directory(tmp_path))
+
+    assert counting_linter.run.call_count == 2
+
+
+@pytest.mark.parametrize(
+    ("first_kwargs", "second_kwargs"),
+    [
+        ({}, {"ignore": {"ignorable"}}),
+        ({}, {"config": AnalysisConfig()}),
+        (
+            {"config": AnalysisConfig()},
+            {"config": AnalysisConfig(payload_budget=PayloadBudget(top=1))},
+        ),
+    ],
+)
+def test_lint_directory_memoized_settings(
+    tmp_path, analysis_service, counting_linter, first_kwargs, second_kwargs
+):
+    list(analysis_service.lint_directory(tmp_path, **first_kwargs))
+    list(analysis_service.lint_directory(tmp_path, **second_kwargs))
+
+    assert counting_linter.run.call_count == 2
+
+
+def test_lint_directory_memoized_include_ignored(tmp_path, analysis_service, counting_linter):
+    first = list(analysis_service.lint_directory(tmp_path, ignore={"ignorable"}))
+    second = list(
+        analysis_service.lint_directory(tmp_path, ignore={"ignorable"}, include_ignored=False)
+    )
+
+    assert [r.result for r in first] == [LintResult.WARNING, LintResult.IGNORED]
+    assert second == first[:1]
+    assert counting_linter.run.call_count == 1
+
+
+def test_lint_file_memoized(tmp_path, analysis_service, counting_linter, monkeypatch):
+    charm_file = tmp_path / "test.charm"
+    with zipfile.ZipFile(charm_file, "w") as zip_file:
+        zip_file.writestr("file", "content")
+    first = list(analysis_service.lint_file(charm_file))
+    mock_zip_file = mock.Mock(side_effect=AssertionError("must not be opened again"))
+    monkeypatch.setattr(zipfile, "ZipFile", mock_zip_file)
+
+    second = list(analysis_service.lint_file(charm_file))
+
+    assert first == second
+    assert counting_linter.run.call_count == 1
@@ -20,6 +20,7 @@ import pathlib
 import sys
 import zipfile
 from typing import Any
+from unittest import mock
 
 import craft_cli.pytest_plugin
 import pytest
@@ -41,6 +42,12 @@ MANIFEST_WITH_ATTRIBUTE = models.Manifest(
     **SIMPLE_MANIFEST.marshal(),
     analysis={"attributes": [models.Attribute(name="boop", result="success")]},
 )
+MANIFEST_WITH_ATTRIBUTE_DATA = models.Manifest(
+    **SIMPLE_MANIFEST.marshal(),
+    analysis={
+        "attributes": [models.Attribute(name="boop", result="success", data={"total-us": 1})]
+    },
+)
 
 
 @pytest.fixture
@@ -109,6 +116,14 @@ def test_get_charm_path(fake_path, package_service, bases, expected_name):
             [models.CheckResult("boop", "success", "", models.CheckType.ATTRIBUTE, "")],
             MANIFEST_WITH_ATTRIBUTE,
         ),
+        (
+            [
+                models.CheckResult(
+                    "boop", "success", "", models.CheckType.ATTRIBUTE, "", {"total-us": 1}
+                )
+            ],
+            MANIFEST_WITH_ATTRIBUTE_DATA,
+        ),
     ],
 )
 def test_get_manifest(package_service, simple_charm, lint, expected):
@@ -117,6 +132,31 @@ def test_get_manifest(package_service, simple_charm, lint, expected):
     assert package_service.get_manifest(lint) == expected
 
 
+@pytest.mark.parametrize(
+    ("analysis", "expected_ignore"),
+    [
+        (None, set()),
+        (
+            {"ignore": {"attributes": ["framework"], "linters": ["entrypoint"]}},
+            {"framework", "entrypoint"},
+        ),
+    ],
+)
+def test_get_lint_results(
+    monkeypatch, package_service, simple_charm, service_factory, *, analysis, expected_ignore
+):
+    simple_charm.analysis = analysis
+    mock_lint_directory = mock.Mock(return_value=iter([mock.sentinel.result]))
+    monkeypatch.setattr(service_factory.analysis, "lint_directory", mock_lint_directory)
+
+    assert package_service.get_lint_results() == [mock.sentinel.result]
+    mock_lint_directory.assert_called_once_with(
+        service_factory.lifecycle.prime_dir,
+        ignore=expected_ignore,
+        config=simple_charm.analysis,
+    )
+
+
 def test_do_not_overwrite_metadata_yaml(
     emitter: craft_cli.pytest_plugin.RecordingEmitter,
     fake_path,
@@ -0,0 +1,272 @@
+# Copyright 2024 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# For further info, check https://github.com/canonical/charmcraft
+"""Unit tests for the local caches of store data."""
+import dataclasses
+import os
+import sys
+import time
+
+import pytest
+
+from charmcraft.store import HTTPCache, LibraryCache, UploadLedger
+from charmcraft.store.cache import HTTP_CACHE_MAX_AGE
+from charmcraft.store.models import Library
+
+
+def get_library(**kwargs) -> Library:
+    values = {
+        "lib_id": "ididid",
+        "lib_name": "backups",
+        "charm_name": "mysql",
+        "api": 1,
+        "patch": 2,
+        "content": "I am a library.",
+        "content_hash": "hashhashhash",
+    }
+    values.update(kwargs)
+    return Library(**values)
+
+
+@pytest.fixture
+def cache(tmp_path) -> LibraryCache:
+    return LibraryCache(tmp_path / "charm-libs")
+
+
+def test_library_cache_get(cache):
+    lib = get_library()
+    cache.put(lib)
+
+    assert cache.get(dataclasses.replace(lib, content=None)) == lib
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        {"lib_id": "other"},
+        {"api": 2},
+        {"patch": 3},
+        {"content_hash": "otherhash"},
+    ],
+)
+def test_library_cache_get_missing(cache, other):
+    cache.put(get_library())
+
+    assert cache.get(get_library(content=None, **other)) is None
+
+
+def test_library_cache_get_invalid(cache, emitter):
+    lib = get_library()
+    cache.put(lib)
+    (entry,) = cache.path.glob("**/*.json")
+    entry.write_text("{not json")
+
+    assert cache.get(lib) is None
+    emitter.assert_debug(f"Ignoring invalid cached library {str(entry)!r}", regex=True)
+
+
+@pytest.mark.parametrize(
+    ("api", "patch", "expected_patch"),
+    [
+        (1, None, 5),
+        (1, 2, 2),
+        (1, 3, None),
+        (2, None, 1),
+        (3, None, None),
+    ],
+)
+def test_library_cache_find(cache, api, patch, expected_patch):
+    for lib_api, lib_patch in [(1, 2), (1, 5), (1, 4), (2, 1)]:
+        cache.put(get_library(api=lib_api, patch=lib_patch, content_hash=f"hash{lib_patch}"))
+    cache.put(get_library(lib_name="other", api=1, patch=9))
+
+    lib = cache.find("mysql", "backups", api, patch)
+
+    if expected_patch is None:
+        assert lib is None
+    else:
+        assert lib == get_library(api=api, patch=expected_patch, content_hash=f"hash{lib.patch}")
+
+
+def test_library_cache_put_error(tmp_path, emitter):
+    """Failing to cache a library is not an error."""
+    path = tmp_path / "charm-libs"
+    path.write_text("not a directory")
+    cache = LibraryCache(path)
+
+    cache.put(get_library())
+
+    assert cache.get(get_library()) is None
+    emitter.assert_debug("Could not cache library mysql.backups: .*", regex=True)
+
+
+@pytest.fixture
+def ledger(tmp_path) -> UploadLedger:
+    return UploadLedger(tmp_path / "uploads")
+
+
+@pytest.fixture
+def charm_file(tmp_path):
+    filepath = tmp_path / "my-charm.charm"
+    filepath.write_text("charm content")
+    return filepath
+
+
+def test_upload_ledger_get_digest(ledger, charm_file):
+    assert ledger.get_digest(charm_file) is None
+
+    ledger.put(charm_file, "digestdigest")
+
+    assert ledger.get_digest(charm_file) == "digestdigest"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
+def test_upload_ledger_private(ledger, charm_file):
+    """The ledger is only accessible by the user."""
+    ledger.put(charm_file, "digestdigest")
+
+    (entry_path,) = ledger.path.iterdir()
+    assert ledger.path.stat().st_mode & 0o777 == 0o700
+    assert entry_path.stat().st_mode & 0o777 == 0o600
+
+
+def test_upload_ledger_file_changed(ledger, charm_file):
+    """The digest is not trusted if the file changed since it was recorded."""
+    ledger.put(charm_file, "digestdigest")
+    stat = charm_file.stat()
+    os.utime(charm_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert ledger.get_digest(charm_file) is None
+
+
+def test_upload_ledger_invalid_entry(emitter, ledger, charm_file):
+    ledger.put(charm_file, "digestdigest")
+    (entry_path,) = ledger.path.iterdir()
+    entry_path.write_text("not json")
+
+    assert ledger.get_digest(charm_file) is None
+    emitter.assert_debug(
+        f"Ignoring invalid upload ledger entry {str(entry_path)!r}: .*", regex=True
+    )
+
+
+def test_upload_ledger_put_error(emitter, tmp_path, charm_file):
+    """Failing to record a digest is not an error."""
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    ledger = UploadLedger(blocker / "uploads")
+
+    ledger.put(charm_file, "digestdigest")
+
+    assert ledger.get_digest(charm_file) is None
+    emitter.assert_debug(f"Could not record the upload of {str(charm_file)!r}: .*", regex=True)
+
+
+@pytest.fixture
+def http_cache(tmp_path) -> HTTPCache:
+    return HTTPCache(tmp_path / "http")
+
+
+def test_http_cache_get(http_cache):
+    assert http_cache.get("charm_my-charm", "key1") is None
+
+    before = time.time()
+    http_cache.put("charm_my-charm", "key1", {"revisions": []}, etag='"v1"')
+
+    entry = http_cache.get("charm_my-charm", "key1")
+    assert entry["content"] == {"revisions": []}
+    assert entry["etag"] == '"v1"'
+    assert entry["last_modified"] is None
+    assert before <= entry["stored_at"] <= time.time()
+    assert http_cache.get("charm_my-charm", "key2") is None
+    assert http_cache.get("charm_other", "key1") is None
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
+def test_http_cache_private(http_cache):
+    """The cached responses (which may be of an authenticated user) are private."""
+    http_cache.put("charm_my-charm", "key1", {"revisions": []})
+
+    group_path = http_cache.path / "charm_my-charm"
+    assert http_cache.path.stat().st_mode & 0o777 == 0o700
+    assert group_path.stat().st_mode & 0o777 == 0o700
+    assert (group_path / "key1.json").stat().st_mode & 0o777 == 0o600
+
+
+def test_http_cache_not_enabled(tmp_path):
+    """The cached responses are neither used nor stored."""
+    HTTPCache(tmp_path / "http").put("charm_my-charm", "key1", {"revisions": []})
+    http_cache = HTTPCache(tmp_path / "http", enabled=False)
+    http_cache.put("charm_my-charm", "key2", {"revisions": []})
+
+    assert http_cache.get("charm_my-charm", "key1") is None
+    assert HTTPCache(tmp_path / "http").get("charm_my-charm", "key1") is not None
+    assert HTTPCache(tmp_path / "http").get("charm_my-charm", "key2") is None
+
+
+def test_http_cache_pruned(http_cache):
+    """The old responses are dropped when writing the cache, once."""
+    http_cache.put("charm_my-charm", "key1", {})
+    http_cache.put("charm_other", "key1", {})
+    old = time.time() - HTTP_CACHE_MAX_AGE - 1
+    for group in ("charm_my-charm", "charm_other"):
+        os.utime(http_cache.path / group / "key1.json", (old, old))
+
+    new_cache = HTTPCache(http_cache.path)
+    new_cache.put("charm_my-charm", "key2", {})
+
+    assert new_cache.get("charm_my-charm", "key1") is None
+    assert new_cache.get("charm_my-charm", "key2") is not None
+    assert not (http_cache.path / "charm_other").exists()
+
+
+def test_http_cache_invalidate(http_cache):
+    http_cache.put("charm_my-charm", "key1", {})
+    http_cache.put("charm_my-charm", "key2", {})
+    http_cache.put("charm_other", "key1", {})
+
+    http_cache.invalidate("charm_my-charm")
+    http_cache.invalidate("charm_missing")
+
+    assert http_cache.get("charm_my-charm", "key1") is None
+    assert http_cache.get("charm_my-charm", "key2") is None
+    assert http_cache.get("charm_other", "key1") is not None
+
+
+@pytest.mark.parametrize("content", ["not json", "[]", '{"content": {}}'])
+def test_http_cache_get_invalid(http_cache, content):
+    http_cache.put("charm_my-charm", "key1", {})
+    entry_path = http_cache.path / "charm_my-charm" / "key1.json"
+    entry_path.write_text(content)
+
+    assert http_cache.get("charm_my-charm", "key1") is None
+
+
+def test_http_cache_put_error(emitter, tmp_path):
+    """Failing to cache a response is not an error."""
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    http_cache = HTTPCache(blocker / "http")
+
+    http_cache.put("charm_my-charm", "key1", {})
+
+    assert http_cache.get("charm_my-charm", "key1") is None
+    emitter.assert_debug("Could not cache the response in .*", regex=True)
+
+
+def test_http_cache_count(http_cache):
+    assert http_cache.count("hits") == "hits: 1, revalidated: 0, misses: 0"
+    assert http_cache.count("misses") == "hits: 1, revalidated: 0, misses: 1"
+    assert http_cache.count("hits") == "hits: 2, revalidated: 0, misses: 1"
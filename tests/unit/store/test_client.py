@@ -15,11 +15,21 @@
 # For further info, check https://github.com/canonical/charmcraft
 """Unit tests for store client."""
 
+import hashlib
+import http.server
+import json
+import threading
+import time
+from types import SimpleNamespace
 from unittest import mock
 
+import craft_store
 import pytest
+from craft_cli import CraftError
+from craft_store.http_client import REQUEST_BACKOFF, REQUEST_TOTAL_RETRIES
 
-from charmcraft import store
+from charmcraft import const, instrum, store
+from charmcraft.store import client as client_module
 
 
 @pytest.fixture
@@ -32,6 +42,432 @@ def anonymous_client() -> store.AnonymousClient:
     return store.AnonymousClient("http://charmhub.local", "http://storage.charmhub.local")
 
 
+@pytest.fixture
+def new_http_session(monkeypatch):
+    """Start with no shared HTTP session."""
+    monkeypatch.setattr(client_module, "_http_session", None)
+
+
+class _KeepAliveHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    """Serve (keeping the connections alive) in a local port, yielding its URL."""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+class _StorageHandler(http.server.BaseHTTPRequestHandler):
+    """A stand-in for the storage, answering each push as told by the server's script."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        answer = self.server.script.pop(0)
+        if answer == "drop":
+            # a network blip: the connection is lost in the middle of the push
+            self.rfile.read(length // 2)
+            self.close_connection = True
+            return
+
+        self.server.received.append(self.rfile.read(length))
+        if answer == 200:
+            body = json.dumps({"successful": True, "upload_id": "test-upload-id"})
+        else:
+            body = json.dumps({"error-list": [{"code": "oops", "message": "Oops"}]})
+        self.send_response(answer)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def storage_server(new_http_session):
+    """Serve a stand-in for the storage in a local port."""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _StorageHandler)
+    server.script = []
+    server.received = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def storage_client(monkeypatch, storage_server):
+    """A client to push files to the storage stand-in, retrying without delays."""
+    monkeypatch.setattr(client_module, "PUSH_RETRY_DELAY", 0)
+    url = f"http://127.0.0.1:{storage_server.server_port}"
+    client = store.Client(api_base_url=url, storage_base_url=url, ephemeral=True)
+    monkeypatch.setattr(client, "_get_authorization_header", lambda: "Macaroon test")
+    return client
+
+
+@pytest.mark.parametrize("failures", [["drop"], [503], ["drop", 502, 429]])
+def test_push_file_retried(tmp_path, emitter, storage_server, storage_client, failures):
+    """Transient errors are retried, pushing the whole file again."""
+    filepath = tmp_path / "test.charm"
+    filepath.write_bytes(b"charm content " * 10000)
+    storage_server.script = [*failures, 200]
+
+    upload_id, digest = storage_client.push_file_hashed(filepath)
+
+    assert upload_id == "test-upload-id"
+    # the digest is of the whole file, even if pushed more than once
+    assert digest == hashlib.sha3_384(b"charm content " * 10000).hexdigest()
+    assert storage_server.script == []
+    assert b"charm content " * 10000 in storage_server.received[-1]
+    retries = [
+        interaction
+        for interaction in emitter.interactions
+        if "pushing it again" in str(interaction.args[1:2])
+    ]
+    assert len(retries) == len(failures)
+
+
+@pytest.mark.parametrize("show_progress", [True, False])
+def test_push_file_progress(tmp_path, emitter, storage_server, storage_client, show_progress):
+    """The progress bar can be left out, e.g. when pushing several files at once."""
+    filepath = tmp_path / "test.charm"
+    filepath.write_bytes(b"charm content")
+    storage_server.script = [200]
+
+    storage_client.push_file_hashed(filepath, show_progress=show_progress)
+
+    progress_bars = [
+        interaction
+        for interaction in emitter.interactions
+        if interaction.args[0] == "progress_bar"
+    ]
+    assert len(progress_bars) == int(show_progress)
+
+
+def test_push_file_retries_exhausted(monkeypatch, tmp_path, storage_server, storage_client):
+    """The transient errors are retried only the configured times."""
+    monkeypatch.setenv(const.PUSH_RETRIES_ENV_VAR, "1")
+    filepath = tmp_path / "test.charm"
+    filepath.write_bytes(b"charm content")
+    storage_server.script = [503, 503, 200]
+
+    with pytest.raises(craft_store.errors.StoreServerError):
+        storage_client.push_file(filepath)
+    assert storage_server.script == [200]
+
+
+def test_push_file_not_retried(tmp_path, storage_server, storage_client):
+    """The errors that are not transient are not retried."""
+    filepath = tmp_path / "test.charm"
+    filepath.write_bytes(b"charm content")
+    storage_server.script = [400, 200]
+
+    with pytest.raises(craft_store.errors.StoreServerError):
+        storage_client.push_file(filepath)
+    assert storage_server.script == [200]
+
+
+@pytest.mark.parametrize("retries", ["-1", "many"])
+def test_push_file_retries_invalid(monkeypatch, tmp_path, retries):
+    monkeypatch.setenv(const.PUSH_RETRIES_ENV_VAR, retries)
+    client = store.Client(api_base_url="http://charmhub.local", ephemeral=True)
+
+    with pytest.raises(CraftError, match="Invalid value for CHARMCRAFT_PUSH_RETRIES"):
+        client.push_file(tmp_path / "test.charm")
+
+
+def test_http_session_shared(new_http_session, anonymous_client):
+    client = store.Client(api_base_url="http://charmhub.local", ephemeral=True)
+    response = mock.Mock(ok=True)
+    with mock.patch.object(store.get_http_session(), "request", return_value=response):
+        assert client.http_client.get("http://charmhub.local/v1/tokens/whoami") is response
+        assert anonymous_client.request_urlpath("GET", "/v1/charm") is response
+
+
+@pytest.mark.parametrize(
+    ("retries", "backoff", "expected"),
+    [
+        (None, None, (REQUEST_TOTAL_RETRIES, REQUEST_BACKOFF)),
+        ("3", "0", (3, 0)),
+        ("many", "-1", (REQUEST_TOTAL_RETRIES, REQUEST_BACKOFF)),
+    ],
+)
+def test_http_session_retries(monkeypatch, new_http_session, retries, backoff, expected):
+    """The requests are retried as craft-store configures it."""
+    for name, value in [
+        (const.STORE_RETRIES_ENV_VAR, retries),
+        (const.STORE_BACKOFF_ENV_VAR, backoff),
+    ]:
+        if value is None:
+            monkeypatch.delenv(name, raising=False)
+        else:
+            monkeypatch.setenv(name, value)
+
+    max_retries = store.get_http_session().get_adapter("https://api.charmhub.io").max_retries
+    assert (max_retries.total, max_retries.backoff_factor) == expected
+    assert max_retries.status_forcelist == [500, 502, 503, 504]
+
+
+def test_http_session_polling(new_http_session):
+    """The polls are not retried when the store is busy, nor wait for its Retry-After."""
+    session = store.get_http_session()
+    with client_module.polling():
+        max_retries = session.get_adapter("https://api.charmhub.io").max_retries
+    assert max_retries.status_forcelist == [500, 502, 504]
+    assert not max_retries.respect_retry_after_header
+    # and back to the regular retries after polling
+    max_retries = session.get_adapter("https://api.charmhub.io").max_retries
+    assert max_retries.status_forcelist == [500, 502, 503, 504]
+
+
+@pytest.mark.parametrize(("pool_size", "expected"), [(None, 10), ("3", 3)])
+def test_http_session_pool_size(monkeypatch, new_http_session, pool_size, expected):
+    if pool_size is None:
+        monkeypatch.delenv(const.HTTP_POOL_SIZE_ENV_VAR, raising=False)
+    else:
+        monkeypatch.setenv(const.HTTP_POOL_SIZE_ENV_VAR, pool_size)
+
+    adapter = store.get_http_session().get_adapter("https://api.charmhub.io")
+    assert adapter._pool_connections == expected
+    assert adapter._pool_maxsize == expected
+
+
+@pytest.mark.parametrize("pool_size", ["0", "-1", "lots"])
+def test_http_session_pool_size_invalid(monkeypatch, new_http_session, pool_size):
+    monkeypatch.setenv(const.HTTP_POOL_SIZE_ENV_VAR, pool_size)
+    with pytest.raises(CraftError, match="Invalid value for CHARMCRAFT_HTTP_POOL_SIZE"):
+        store.get_http_session()
+
+
+def test_http_session_connections_reused(new_http_session, http_server, anonymous_client):
+    """The connections are reused across clients, which is visible in the measurements."""
+    other_client = store.AnonymousClient(http_server, http_server)
+    anonymous_client.api_base_url = http_server
+
+    anonymous_client.request_urlpath_json("GET", "/first")
+    other_client.request_urlpath_json("GET", "/second")
+
+    stats = [
+        measurement["stats"]
+        for measurement in instrum.get_measurements().values()
+        if measurement["msg"] == "HTTP request"
+    ]
+    assert stats == [{"new_connections": 1}, {"new_connections": 0}]
+
+
+def test_http_session_connections_proxied(new_http_session, http_server, anonymous_client):
+    """Through a proxy, the connections counted are the ones to the proxy."""
+    anonymous_client.api_base_url = "http://charmhub.test"
+
+    for _ in range(2):
+        anonymous_client.request_urlpath_json("GET", "/path", proxies={"http": http_server})
+
+    stats = [
+        (measurement["extra"]["host"], measurement["stats"])
+        for measurement in instrum.get_measurements().values()
+        if measurement["msg"] == "HTTP request"
+    ]
+    assert stats == [
+        ("charmhub.test", {"new_connections": 1}),
+        ("charmhub.test", {"new_connections": 0}),
+    ]
+
+
+class _CharmhubHandler(http.server.BaseHTTPRequestHandler):
+    """A stand-in for Charmhub, answering with the server's content and its ETag."""
+
+    protocol_version = "HTTP/1.1"
+
+    def _answer(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if_none_match = self.headers.get("If-None-Match")
+        self.server.received.append((self.command, self.path, if_none_match))
+        if if_none_match == self.server.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.server.etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = json.dumps(self.server.content).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", self.server.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._answer()
+
+    def do_POST(self):
+        self._answer()
+
+    def do_DELETE(self):
+        self._answer()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def charmhub_server(new_http_session):
+    """Serve a stand-in for Charmhub in a local port."""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _CharmhubHandler)
+    server.content = {"revisions": [1]}
+    server.etag = '"v1"'
+    server.received = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fake_now(monkeypatch):
+    """Move the time seen by the client when checking the age of the cached responses."""
+    clock = SimpleNamespace(offset=0)
+    fake_time = SimpleNamespace(time=lambda: time.time() + clock.offset, sleep=time.sleep)
+    monkeypatch.setattr(client_module, "time", fake_time)
+    return clock
+
+
+@pytest.fixture
+def cache_client(monkeypatch, tmp_path, charmhub_server):
+    """A client to the Charmhub stand-in, caching the responses."""
+    url = f"http://127.0.0.1:{charmhub_server.server_port}"
+    client = store.Client(
+        api_base_url=url,
+        storage_base_url=url,
+        ephemeral=True,
+        http_cache=store.HTTPCache(tmp_path / "http"),
+    )
+    monkeypatch.setattr(client, "_get_authorization_header", lambda: "Macaroon test")
+    return client
+
+
+def test_http_cache_conditional_requests(emitter, fake_now, charmhub_server, cache_client):
+    """The cached responses are used while fresh, and then revalidated."""
+    urlpath = "/v1/charm/my-charm/revisions"
+
+    # not cached yet, and then used as is
+    assert cache_client.request_urlpath_json("GET", urlpath) == {"revisions": [1]}
+    assert cache_client.request_urlpath_json("GET", urlpath) == {"revisions": [1]}
+    assert charmhub_server.received == [("GET", urlpath, None)]
+
+    # too old, revalidated with the store
+    fake_now.offset = 31
+    assert cache_client.request_urlpath_json("GET", urlpath) == {"revisions": [1]}
+    assert charmhub_server.received[1:] == [("GET", urlpath, '"v1"')]
+
+    # changed in the store
+    fake_now.offset = 62
+    charmhub_server.content = {"revisions": [1, 2]}
+    charmhub_server.etag = '"v2"'
+    assert cache_client.request_urlpath_json("GET", urlpath) == {"revisions": [1, 2]}
+    assert charmhub_server.received[2:] == [("GET", urlpath, '"v1"')]
+
+    emitter.assert_debug(f"HTTP cache miss for GET {urlpath} (hits: 0, revalidated: 0, misses: 1)")
+    emitter.assert_debug(f"HTTP cache hit for GET {urlpath} (hits: 1, revalidated: 0, misses: 1)")
+    emitter.assert_debug(
+        f"HTTP cache revalidated for GET {urlpath} (hits: 1, revalidated: 1, misses: 1)"
+    )
+    emitter.assert_debug(f"HTTP cache miss for GET {urlpath} (hits: 1, revalidated: 1, misses: 2)")
+
+
+def test_http_cache_by_request(charmhub_server, cache_client):
+    """The responses are cached by request, including its parameters and user."""
+    cache_client.request_urlpath_json("GET", "/v1/charm")
+    cache_client.request_urlpath_json("GET", "/v1/charm?include-collaborations=true")
+    cache_client.request_urlpath_json("POST", "/v1/charm/libraries/bulk", json=[{"a": 1}])
+    cache_client.request_urlpath_json("POST", "/v1/charm/libraries/bulk", json=[{"a": 2}])
+    cache_client._get_authorization_header = lambda: "Macaroon other-user"
+    cache_client.request_urlpath_json("GET", "/v1/charm")
+
+    assert len(charmhub_server.received) == 5
+
+
+def test_http_cache_not_cacheable(charmhub_server, cache_client):
+    """Only the responses of the read-only endpoints are cached."""
+    for _ in range(2):
+        cache_client.request_urlpath_json("GET", "/v1/charm/my-charm/revisions/review")
+        cache_client.request_urlpath_json("POST", "/v1/charm/my-charm/revisions")
+
+    assert len(charmhub_server.received) == 4
+
+
+@pytest.mark.parametrize(
+    ("method", "urlpath", "invalidated"),
+    [
+        ("POST", "/v1/charm/my-charm/releases", ["my-charm"]),
+        ("POST", "/v1/charm/my-charm/resources/my-resource/revisions", ["my-charm"]),
+        ("DELETE", "/v1/charm/my-charm", ["my-charm", "names"]),
+        ("POST", "/v1/charm", ["names"]),
+        ("GET", "/v1/charm/my-charm/revisions/review", []),
+        ("POST", "/v1/charm/other-charm/releases", []),
+    ],
+)
+def test_http_cache_invalidated(charmhub_server, cache_client, method, urlpath, invalidated):
+    """The requests that change the store drop the cached responses they may outdate."""
+    cached_requests = {
+        "my-charm": ("GET", "/v1/charm/my-charm/releases"),
+        "names": ("GET", "/v1/charm"),
+        "libraries": ("POST", "/v1/charm/libraries/bulk"),
+    }
+    for cached_request in cached_requests.values():
+        cache_client.request_urlpath_json(*cached_request)
+
+    cache_client.request(method, cache_client.api_base_url + urlpath)
+    charmhub_server.received.clear()
+    for cached_request in cached_requests.values():
+        cache_client.request_urlpath_json(*cached_request)
+
+    assert charmhub_server.received == [(*cached_requests[name], None) for name in invalidated]
+
+
+def test_http_cache_not_enabled(tmp_path, charmhub_server, cache_client):
+    """The cached responses are not used at all, nor stored."""
+    cache_client.http_cache = store.HTTPCache(tmp_path / "http", enabled=False)
+    urlpath = "/v1/charm/my-charm/revisions"
+
+    cache_client.request_urlpath_json("GET", urlpath)
+    cache_client.request_urlpath_json("GET", urlpath)
+
+    assert charmhub_server.received == [("GET", urlpath, None), ("GET", urlpath, None)]
+    assert not (tmp_path / "http").exists()
+
+
+def test_http_cache_anonymous_client(tmp_path, charmhub_server):
+    url = f"http://127.0.0.1:{charmhub_server.server_port}"
+    client = store.AnonymousClient(url, url, http_cache=store.HTTPCache(tmp_path / "http"))
+
+    for _ in range(2):
+        client.request_urlpath_json("POST", "/v1/charm/libraries/bulk", json=[])
+
+    assert charmhub_server.received == [("POST", "/v1/charm/libraries/bulk", None)]
+
+
 @pytest.mark.parametrize(
     ("charm", "lib_id", "api", "patch", "expected_call"),
     [
@@ -14,6 +14,7 @@
 #
 # For further info, check https://github.com/canonical/charmcraft
 """Unit tests for application class."""
+import pathlib
 import textwrap
 from unittest import mock
 
@@ -23,7 +24,7 @@ import pyfakefs.fake_filesystem
 import pytest
 from craft_application import util
 
-from charmcraft import application, errors, services
+from charmcraft import application, errors, instrum, services
 from charmcraft.application.main import PRIME_BEHAVIOUR_CHANGE_MESSAGE
 
 
@@ -296,3 +297,25 @@ def test_expand_environment_multi_arch(
         f"{util.get_host_architecture()!r} as the build-for architecture "
         "because multiple run-on architectures were specified."
     )
+
+
+def test_merge_managed_measurements(
+    monkeypatch, fs: pyfakefs.fake_filesystem.FakeFilesystem, service_factory
+):
+    """The measurements left by the managed instances are merged and removed."""
+    work_dir = pathlib.Path("/work")
+    work_dir.mkdir()
+    for platform in ("riscv64", "amd64"):
+        (work_dir / f".charmcraft_measurements_{platform}.json").write_text("{}")
+    (work_dir / "other.json").write_text("{}")
+    mock_merge_from = mock.Mock()
+    monkeypatch.setattr(instrum, "merge_from", mock_merge_from)
+    app = application.Charmcraft(app=application.APP_METADATA, services=service_factory)
+    app._work_dir = work_dir
+
+    app._merge_managed_measurements()
+
+    assert mock_merge_from.mock_calls == [
+        mock.call(work_dir / ".charmcraft_measurements_amd64.json", remove=True),
+        mock.call(work_dir / ".charmcraft_measurements_riscv64.json", remove=True),
+    ]
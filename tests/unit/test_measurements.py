@@ -0,0 +1,343 @@
+# Copyright 2024 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# For further info, check https://github.com/canonical/charmcraft
+"""Tests for the measurements analysis and history."""
+import datetime
+import json
+import sqlite3
+
+import pytest
+from craft_cli import CraftError
+
+from charmcraft import instrum, measurements
+
+
+def _measurement(msg, tstart, tend, extra=None, process=None):
+    return {
+        "parent": None,
+        "msg": msg,
+        "extra": extra or {},
+        "tstart": tstart,
+        "tend": tend,
+        "process": process,
+    }
+
+
+@pytest.fixture
+def history(tmp_path):
+    with measurements.BuildHistory(tmp_path / "history.sqlite3") as history:
+        yield history
+
+
+# region Phases
+@pytest.mark.parametrize(
+    ("measurement", "expected"),
+    [
+        (_measurement("Packing", 0, 1), "Packing"),
+        (
+            _measurement("Running step", 0, 1, {"step": "BUILD", "part": "charm"}),
+            "Running step (step=BUILD, part=charm)",
+        ),
+        (
+            _measurement("Installing", 0, 1, process="charm_builder.py"),
+            "charm_builder.py: Installing",
+        ),
+    ],
+)
+def test_get_phase_name(measurement, expected):
+    assert measurements.get_phase_name(measurement) == expected
+
+
+def test_get_phases():
+    dumped = {
+        "__meta__": {"baseline": 1000},
+        "0": _measurement("Running step", 1, 5, {"step": "BUILD"}),
+        "1": _measurement("Running checker", 5, 5.5, {"checker": "language"}),
+        "2": _measurement("Running step", 6, 8, {"step": "BUILD"}),
+        "3": _measurement("Running step", 8, 10, {"step": "PRIME"}),
+        "4": _measurement("Ongoing", 9, None),
+    }
+
+    assert measurements.get_phases(dumped) == {
+        "Running step (step=BUILD)": 6,
+        "Running checker (checker=language)": 0.5,
+        "Running step (step=PRIME)": 2,
+        "Total": 9,
+    }
+
+
+def test_get_phases_empty():
+    assert measurements.get_phases({"__meta__": {"baseline": 1000}}) == {}
+
+
+def test_get_median_phases():
+    runs = [
+        measurements.Run(1, "p", "amd64", "3.0", "now", {"a": 1, "b": 10}),
+        measurements.Run(2, "p", "amd64", "3.0", "now", {"a": 3, "b": 20}),
+        measurements.Run(3, "p", "amd64", "3.0", "now", {"a": 2}),
+    ]
+
+    assert measurements.get_median_phases(runs) == {"a": 2, "b": 15}
+
+
+def test_compare_phases():
+    base = {"slower": 10, "faster": 10, "jitter": 0.1, "same": 5, "gone": 1}
+    target = {"slower": 12, "faster": 8, "jitter": 0.2, "same": 5.1, "new": 1}
+
+    comparisons = measurements.compare_phases(base, target, threshold=0.1, min_delta=0.5)
+
+    assert comparisons == [
+        measurements.PhaseComparison("slower", 10, 12, slower=True),
+        measurements.PhaseComparison("jitter", 0.1, 0.2),
+        measurements.PhaseComparison("same", 5, 5.1),
+        measurements.PhaseComparison("faster", 10, 8),
+        measurements.PhaseComparison("gone", 1, None),
+        measurements.PhaseComparison("new", None, 1),
+    ]
+    assert comparisons[0].delta == 2
+    assert comparisons[0].change == pytest.approx(0.2)
+    assert comparisons[-1].delta is None
+    assert comparisons[-1].change is None
+
+
+@pytest.mark.parametrize(
+    ("threshold", "min_delta", "slower"),
+    [
+        (0.1, 0.5, True),
+        (0.3, 0.5, False),  # not relatively slower enough
+        (0.1, 5, False),  # not absolutely slower enough
+    ],
+)
+def test_compare_phases_thresholds(threshold, min_delta, slower):
+    (comparison,) = measurements.compare_phases(
+        {"phase": 10}, {"phase": 12}, threshold=threshold, min_delta=min_delta
+    )
+
+    assert comparison.slower == slower
+
+
+# endregion
+# region Tree
+def _tree_measurement(parent, msg, tstart, tend):
+    return {**_measurement(msg, tstart, tend), "parent": parent}
+
+
+@pytest.fixture
+def tree():
+    """A run with sequential, nested and concurrent measurements."""
+    return measurements.get_tree(
+        {
+            "__meta__": {"baseline": 1000},
+            "0": _tree_measurement(None, "Packing", 0, 10),
+            "1": _tree_measurement("0", "Building", 1, 6),
+            "2": _tree_measurement("1", "Installing", 2, 5),
+            "3": _tree_measurement("0", "Downloading", 6, 8),
+            "4": _tree_measurement("0", "Downloading", 6, 9),
+            "5": _tree_measurement("0", "Downloading", 7, 8.5),
+            "6": _tree_measurement("0", "Ongoing", 9.5, None),
+        }
+    )
+
+
+def test_get_tree(tree):
+    (root,) = tree
+
+    assert [(node.name, node.depth, node.duration) for node in root.walk()] == [
+        ("Packing", 0, 10),
+        ("Building", 1, 5),
+        ("Installing", 2, 3),
+        ("Downloading", 1, 2),
+        ("Downloading", 1, 3),
+        ("Downloading", 1, 1.5),
+        ("Ongoing", 1, 0.5),
+    ]
+    assert root.children[-1].ongoing
+
+
+def test_self_time(tree):
+    (root,) = tree
+
+    # the concurrent downloads are accounted once
+    assert root.self_time == pytest.approx(10 - 5 - 3 - 0.5)
+    assert root.children[0].self_time == 2
+
+
+def test_get_critical_path(tree):
+    path = measurements.get_critical_path(tree)
+
+    assert [(node.name, node.start, node.end) for node in path] == [
+        ("Packing", 0, 10),
+        ("Building", 1, 6),
+        ("Installing", 2, 5),
+        ("Downloading", 6, 9),
+        ("Ongoing", 9.5, 10),
+    ]
+
+
+def test_get_critical_path_empty():
+    assert measurements.get_critical_path([]) == []
+
+
+def test_get_self_times(tree):
+    assert measurements.get_self_times(tree) == [
+        measurements.SelfTime("Downloading", 3, 6.5, 6.5),
+        measurements.SelfTime("Installing", 1, 3, 3),
+        measurements.SelfTime("Building", 1, 2, 5),
+        measurements.SelfTime("Packing", 1, pytest.approx(1.5), 10),
+        measurements.SelfTime("Ongoing", 1, 0.5, 0.5),
+    ]
+
+
+def test_render_svg(tree):
+    svg = measurements.render_svg(tree, width=1000)
+
+    assert svg.startswith('<svg xmlns="http://www.w3.org/2000/svg" width="1000" height="60"')
+    assert '<title>Packing: 10.000s</title><rect x="0.00" y="0" width="1000.00"' in svg
+    assert '<title>Installing: 3.000s</title><rect x="200.00" y="40" width="300.00"' in svg
+    assert "<title>Ongoing: 0.500s (ongoing)</title>" in svg
+    assert '<text x="3.00" y="14">Packing</text>' in svg
+
+
+def test_render_svg_escaped():
+    roots = measurements.get_tree(
+        {"__meta__": {}, "0": _tree_measurement(None, "<weird> & stuff", 0, 1)}
+    )
+
+    assert "<title>&lt;weird&gt; &amp; stuff: 1.000s</title>" in measurements.render_svg(roots)
+
+
+def test_load_tree(tmp_path):
+    path = tmp_path / "measures.json"
+    path.write_text(
+        '{"__meta__": {"baseline": 1000}, "0": ' + json.dumps(_measurement("A", 0, 1)) + "}"
+    )
+
+    (root,) = measurements.load_tree(path)
+
+    assert root.name == "A"
+
+
+@pytest.mark.parametrize(
+    ("content", "message"),
+    [
+        ("not json", "Invalid measurements file .*: Expecting value"),
+        ('{"traceEvents": []}', "Invalid measurements file .*\\.$"),
+    ],
+)
+def test_load_tree_invalid(tmp_path, content, message):
+    path = tmp_path / "measures.json"
+    path.write_text(content)
+
+    with pytest.raises(CraftError, match=message):
+        measurements.load_tree(path)
+
+
+def test_load_tree_missing(tmp_path):
+    with pytest.raises(CraftError, match="Cannot read the measurements file"):
+        measurements.load_tree(tmp_path / "missing.json")
+
+
+# endregion
+# region BuildHistory
+def test_history_add_and_get_run(history):
+    started_at = datetime.datetime(2024, 5, 6, 7, 8, 9, tzinfo=datetime.timezone.utc)
+    run_id = history.add_run(
+        project="my-charm",
+        platform="amd64",
+        phases={"Total": 10, "Packing": 2},
+        charmcraft_version="3.0",
+        started_at=started_at,
+    )
+
+    assert history.get_run(run_id) == measurements.Run(
+        id=run_id,
+        project="my-charm",
+        platform="amd64",
+        charmcraft_version="3.0",
+        started_at="2024-05-06T07:08:09+00:00",
+        phases={"Total": 10, "Packing": 2},
+    )
+
+
+def test_history_get_run_missing(history):
+    with pytest.raises(CraftError, match="Run 42 not found in the build history."):
+        history.get_run(42)
+
+
+def test_history_persisted(tmp_path):
+    path = tmp_path / "subdir" / "history.sqlite3"
+    with measurements.BuildHistory(path) as history:
+        run_id = history.add_run(project="p", platform="amd64", phases={"Total": 1})
+
+    with measurements.BuildHistory(path) as history:
+        assert history.get_run(run_id).phases == {"Total": 1}
+
+
+def test_history_list_runs(history):
+    for project, platform in [("a", "amd64"), ("b", "amd64"), ("a", "arm64"), ("a", "amd64")]:
+        history.add_run(project=project, platform=platform, phases={})
+
+    assert [run.id for run in history.list_runs()] == [4, 3, 2, 1]
+    assert [run.id for run in history.list_runs(limit=2)] == [4, 3]
+    assert [run.id for run in history.list_runs(project="a")] == [4, 3, 1]
+    assert [run.id for run in history.list_runs(platform="amd64")] == [4, 2, 1]
+    assert [run.id for run in history.list_runs(project="a", platform="amd64")] == [4, 1]
+
+
+def test_history_get_previous_runs(history):
+    for project, version in [("a", "2.0"), ("b", "2.0"), ("a", "3.0"), ("a", "3.0"), ("a", "3.0")]:
+        history.add_run(project=project, platform="amd64", phases={}, charmcraft_version=version)
+    run = history.get_run(4)
+
+    # from any version, but only the same project and platform, and before the run
+    assert [run.id for run in history.get_previous_runs(run, 5)] == [3, 1]
+    assert [run.id for run in history.get_previous_runs(run, 1)] == [3]
+
+
+# endregion
+# region Recording
+def test_record_run(monkeypatch, tmp_path):
+    monkeypatch.setenv("CRAFT_SHARED_CACHE", str(tmp_path))
+    measurements_in_process = instrum._Measurements()
+    mid = measurements_in_process.start("Packing", {})
+    measurements_in_process.end(mid)
+    monkeypatch.setattr(instrum, "_measurements", measurements_in_process)
+
+    measurements.record_run("my-charm", "amd64")
+
+    with measurements.BuildHistory(tmp_path / measurements.HISTORY_FILENAME) as history:
+        (run,) = history.list_runs()
+    assert (run.project, run.platform) == ("my-charm", "amd64")
+    assert set(run.phases) == {"charmcraft: Packing", "Total"}
+
+
+def test_record_run_error(monkeypatch, tmp_path, emitter):
+    """Failing to record the run is not fatal."""
+    monkeypatch.setenv("CRAFT_SHARED_CACHE", str(tmp_path))
+
+    def _fail(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(measurements.BuildHistory, "add_run", _fail)
+
+    measurements.record_run("my-charm", "amd64")
+
+    emitter.assert_debug(
+        "Could not record the measurements in the build history: "
+        "OperationalError('database is locked')"
+    )
+
+
+# endregion
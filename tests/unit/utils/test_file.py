@@ -18,11 +18,17 @@ import os
 import pathlib
 import sys
 import zipfile
+from unittest import mock
 
 import pytest
 from craft_cli import CraftError
 
-from charmcraft.utils.file import build_zip, make_executable, useful_filepath
+from charmcraft.utils.file import (
+    build_zip,
+    make_executable,
+    useful_filepath,
+    write_text_atomically,
+)
 
 
 @pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
@@ -37,6 +43,49 @@ def test_make_executable_read_bits(tmp_path):
         assert pth.stat().st_mode & 0o777 == 0o750
 
 
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
+def test_write_text_atomically_new(tmp_path):
+    path = tmp_path / "test.py"
+    write_text_atomically(path, "content")
+    assert path.read_text() == "content"
+    assert path.stat().st_mode & 0o777 == 0o644
+    assert [child.name for child in tmp_path.iterdir()] == ["test.py"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
+def test_write_text_atomically_existing(tmp_path):
+    path = tmp_path / "test.py"
+    path.write_text("old content")
+    path.chmod(0o600)
+    write_text_atomically(path, "new content")
+    assert path.read_text() == "new content"
+    assert path.stat().st_mode & 0o777 == 0o600
+    assert [child.name for child in tmp_path.iterdir()] == ["test.py"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
+@pytest.mark.parametrize("existing", [True, False])
+def test_write_text_atomically_mode(tmp_path, existing):
+    path = tmp_path / "test.py"
+    if existing:
+        path.write_text("old content")
+        path.chmod(0o644)
+    write_text_atomically(path, "new content", mode=0o600)
+    assert path.read_text() == "new content"
+    assert path.stat().st_mode & 0o777 == 0o600
+
+
+def test_write_text_atomically_interrupted(tmp_path):
+    """The original file is untouched and the temporary one removed if interrupted."""
+    path = tmp_path / "test.py"
+    path.write_text("old content")
+    with mock.patch("pathlib.Path.replace", side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            write_text_atomically(path, "new content")
+    assert path.read_text() == "old content"
+    assert [child.name for child in tmp_path.iterdir()] == ["test.py"]
+
+
 def test_usefulfilepath_pathlib(tmp_path):
     """Convert the string to Path."""
     test_file = tmp_path / "testfile.bin"
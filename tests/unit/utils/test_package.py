@@ -13,13 +13,17 @@
 # limitations under the License.
 #
 # For further info, check https://github.com/canonical/charmcraft
+import itertools
 import pathlib
 import tempfile
 
 import pytest
 
+from charmcraft import instrum
 from charmcraft.errors import MissingDependenciesError
 from charmcraft.utils.package import (
+    ALL_PACKAGES,
+    PipTimings,
     exclude_packages,
     get_package_names,
     get_pip_command,
@@ -192,3 +196,100 @@ def test_validate_strict_dependencies_missing(dependencies, other_packages, extr
         validate_strict_dependencies(dependencies, other_packages)
 
     assert exc_info.value.extra_dependencies == extra_packages
+
+
+PIP_OUTPUT = """\
+Collecting ops==2.15.0 (from -r requirements.txt (line 1))
+  Downloading ops-2.15.0.tar.gz (500 kB)
+  Installing build dependencies: started
+  Installing build dependencies: finished with status 'done'
+Collecting PyYAML==6.0.1 (from -r requirements.txt (line 2))
+  Using cached PyYAML-6.0.1.tar.gz (125 kB)
+Requirement already satisfied: websocket_client in ./venv/lib/python3.12/site-packages
+Building wheels for collected packages: ops, PyYAML
+  Building wheel for ops (pyproject.toml): started
+  Building wheel for ops (pyproject.toml): finished with status 'done'
+  Created wheel for ops: filename=ops-2.15.0-py3-none-any.whl
+  Building wheel for PyYAML (pyproject.toml): started
+  Building wheel for PyYAML (pyproject.toml): finished with status 'done'
+Successfully built ops PyYAML
+Installing collected packages: PyYAML, ops
+Successfully installed PyYAML-6.0.1 ops-2.15.0
+"""
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """Make each reading of the measurements clock one second later."""
+    clock = itertools.count(start=0, step=1_000_000_000)
+    monkeypatch.setattr(instrum, "perf_counter_ns", lambda: next(clock))
+
+
+def test_pip_timings(fake_clock):
+    pip_timings = PipTimings()
+    for line in PIP_OUTPUT.splitlines(keepends=True):
+        pip_timings.feed(line)
+    pip_timings.finish()
+
+    # each phase lasts one "second", from its start to the start of the next one
+    assert pip_timings.timings == {
+        "ops": {"resolve": 1.0, "download": 1.0, "build-wheel": 1.0},
+        "pyyaml": {"resolve": 1.0, "download": 1.0, "build-wheel": 1.0},
+        "websocket-client": {"resolve": 1.0},
+        ALL_PACKAGES: {"install": 1.0},
+    }
+
+
+def test_pip_timings_measurements(fake_clock):
+    pip_timings = PipTimings()
+    with instrum.Timer("Installing"):
+        for line in PIP_OUTPUT.splitlines(keepends=True):
+            pip_timings.feed(line)
+
+    records = [
+        record
+        for record in instrum.get_measurements().values()
+        if record["msg"] == "Running pip phase"
+    ]
+    assert [(record["extra"]["package"], record["extra"]["phase"]) for record in records][-3:] == [
+        ("ops", "build-wheel"),
+        ("pyyaml", "build-wheel"),
+        (ALL_PACKAGES, "install"),
+    ]
+    assert all(record["tend"] is not None for record in records)
+
+
+def test_pip_timings_accumulated(fake_clock):
+    """The phases of the same package in different runs are added up."""
+    pip_timings = PipTimings()
+    for _ in range(2):
+        pip_timings.feed("Collecting ops\n")
+        pip_timings.feed("Some other output\n")
+        pip_timings.finish()
+
+    assert pip_timings.timings == {"ops": {"resolve": 2.0}}
+
+
+def test_pip_timings_unknown_output(fake_clock):
+    pip_timings = PipTimings()
+    pip_timings.feed("  Downloading ops-2.15.0.tar.gz (500 kB)\n")
+    pip_timings.feed("Looking in indexes: https://pypi.org/simple\n")
+    pip_timings.finish()
+
+    assert pip_timings.timings == {}
+
+
+def test_pip_timings_summary():
+    pip_timings = PipTimings()
+    pip_timings.timings = {
+        "ops": {"resolve": 1.5, "download": 0.25, "build-wheel": 3.0},
+        "pyyaml": {"resolve": 0.5},
+        ALL_PACKAGES: {"install": 2.0},
+    }
+
+    assert pip_timings.get_summary().splitlines() == [
+        "Package  resolve  download  build-wheel  install  Total",
+        "ops        1.50s     0.25s        3.00s        -  4.75s",
+        "(all)          -         -            -    2.00s  2.00s",
+        "pyyaml     0.50s         -            -        -  0.50s",
+    ]
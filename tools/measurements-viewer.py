@@ -20,6 +20,9 @@ It needs the following dependencies, for which you need to set up a
 virtualenv or just use fades:
 
     matplotlib
+
+For a quick look without a graphical environment (e.g. in CI logs), use
+`charmcraft measure-show` instead.
 """
 
 import argparse
@@ -34,6 +37,18 @@ Y_STEPS = 10
 COLORS = itertools.cycle(mcolors.TABLEAU_COLORS)
 
 
+def get_resources_text(resources):
+    """Summarize the resources used in a measurement."""
+    cpu = resources["cpu_user"] + resources["cpu_system"]
+    children_cpu = resources["children_cpu_user"] + resources["children_cpu_system"]
+    text = (
+        f"CPU {cpu:.2f}s (+{children_cpu:.2f}s children), RSS {resources['max_rss'] // 2**20}MiB"
+    )
+    if resources["read_bytes"] is not None:
+        text += f", I/O {resources['read_bytes'] // 2**10}/{resources['write_bytes'] // 2**10}KiB"
+    return text
+
+
 def main(filepath):
     """Main entry point."""
 
@@ -90,6 +105,8 @@ def main(filepath):
             text = measurement["msg"]
             if measurement["extra"]:
                 text += "\n" + str(measurement["extra"])
+            if measurement.get("resources"):
+                text += "\n" + get_resources_text(measurement["resources"])
             bar_center = (measurement["tend"] + measurement["tstart"]) / 2
             ax.text(
                 x=bar_center,